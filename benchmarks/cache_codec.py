@@ -0,0 +1,115 @@
+# benchmarks/cache_codec.py
+
+"""
+Compare the cache codec configurations on representative payloads.
+
+Usage:
+    python -m benchmarks.cache_codec [--iterations 20000]
+
+For a full ad, a user's filters and a conversation state, prints the stored
+size and the encode/decode time of plain JSON (what was stored before the
+codec) and of every codec configuration whose libraries are installed.
+Needs neither Redis nor a database.
+"""
+
+import argparse
+import json
+import timeit
+
+from common.utils import codec
+from common.utils.codec import Codec
+
+
+def full_ad_payload():
+    """Shaped like AdRepository.to_full_ad_data"""
+    return {
+        'id': 184233,
+        'external_id': '33012894',
+        'property_type': 'apartment',
+        'city': 10009580,
+        'address': 'вул. Городоцька, 174',
+        'price': 14500.0,
+        'square_feet': 54.0,
+        'rooms_count': 2,
+        'floor': 7,
+        'total_floors': 9,
+        'insert_time': '2024-03-14T10:22:31',
+        'description': (
+            'Здається простора двокімнатна квартира з євроремонтом. Вся техніка та меблі, '
+            'автономне опалення, балкон засклений. Поруч школа, садочок, зупинка транспорту. '
+        ) * 12,
+        'resource_url': 'https://flatfy.ua/uk/redirect/33012894',
+        'images': [f'https://d1abcd2efgh3.cloudfront.net/ads-images/33012894_{i}.jpg' for i in range(15)],
+        'phones': ['+380671234567', '+380931112233'],
+        'viber_link': 'viber://chat?number=%2B380671234567',
+    }
+
+
+def filters_payload():
+    """Shaped like SubscriptionRepository.get_user_filters"""
+    return {
+        'id': 5121,
+        'user_id': 4410,
+        'property_type': 'apartment',
+        'city': 10009580,
+        'rooms_count': [1, 2, 3],
+        'price_min': 8000,
+        'price_max': 16000,
+        'is_paused': False,
+    }
+
+
+def state_payload():
+    """Conversation state kept by StateManager during the subscription flow"""
+    return {
+        'state': 'waiting_price',
+        'flow': 'subscription',
+        'property_type': 'apartment',
+        'city': 'Львів',
+        'rooms': [1, 2],
+        'edit_mode': False,
+        'last_message_id': 91823,
+    }
+
+
+def configurations():
+    configs = [("json (legacy)", None)]
+    for fmt, compression in [("msgpack", "none"), ("msgpack", "zlib"), ("msgpack", "zstd"), ("json", "zlib")]:
+        if fmt == "msgpack" and codec.msgpack is None:
+            continue
+        if compression == "zstd" and codec.zstandard is None:
+            continue
+        configs.append((f"{fmt}+{compression}", Codec(fmt=fmt, compression=compression)))
+    return configs
+
+
+def time_per_call(func, iterations):
+    """Microseconds per call, best of 3 runs"""
+    return min(timeit.repeat(func, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    payloads = [("full ad", full_ad_payload()), ("filters", filters_payload()), ("state", state_payload())]
+
+    print(f"{'payload':<10}{'codec':<16}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for payload_name, payload in payloads:
+        for codec_name, encoder in configurations():
+            if encoder is None:
+                encode = lambda: json.dumps(payload).encode()
+            else:
+                encode = lambda: encoder.encode(payload)
+            encoded = encode()
+            assert codec.decode(encoded) == payload
+
+            encode_us = time_per_call(encode, args.iterations)
+            decode_us = time_per_call(lambda: codec.decode(encoded), args.iterations)
+            print(f"{payload_name:<10}{codec_name:<16}{len(encoded):>8}{encode_us:>12.2f}{decode_us:>12.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/logging_overhead.py
+
+"""
+Measure the per-call cost of log_operation on hot helpers.
+
+Usage:
+    python -m benchmarks.logging_overhead [--iterations 200000]
+
+Each helper is timed undecorated (through __wrapped__) and decorated, with
+DEBUG disabled, with DEBUG enabled and 1% sampling, and with DEBUG fully
+enabled. Records emitted in the DEBUG runs go to a null handler, so the
+numbers are the cost of building them, not of writing them out.
+"""
+
+import argparse
+import asyncio
+import logging
+import timeit
+
+from common.utils.logging_config import log_operation, log_context, set_operation_sample_rate
+
+
+@log_operation("noop_helper")
+def noop_helper(value):
+    """The cheapest possible decorated function, isolates the decorator cost"""
+    return value
+
+
+def build_cases():
+    """(name, operation name, decorated callable, undecorated callable)"""
+    from common.utils.cache import cache_key, get_entity_cache_key
+    from common.messaging.unified_platform_utils import format_user_id_for_platform
+
+    def run_async(func):
+        loop = asyncio.new_event_loop()
+        return lambda: loop.run_until_complete(func())
+
+    @log_operation("async_noop_helper")
+    async def async_noop_helper():
+        return None
+
+    return [
+        ("noop_helper", "noop_helper",
+         lambda: noop_helper(1), lambda: noop_helper.__wrapped__(1)),
+        ("get_entity_cache_key", "get_entity_cache_key",
+         lambda: get_entity_cache_key("full_ad", 12345),
+         lambda: get_entity_cache_key.__wrapped__("full_ad", 12345)),
+        ("cache_key", "cache_key",
+         lambda: cache_key("user_filters", 12345, city=10009580),
+         lambda: cache_key.__wrapped__("user_filters", 12345, city=10009580)),
+        ("format_user_id_for_platform (plain)", None,
+         lambda: format_user_id_for_platform("380501234567", "whatsapp"), None),
+        ("async_noop_helper", "async_noop_helper",
+         run_async(async_noop_helper), run_async(async_noop_helper.__wrapped__)),
+    ]
+
+
+def configure_debug(enabled: bool):
+    """Enable or disable DEBUG on every logger a helper may log to"""
+    level = logging.DEBUG if enabled else logging.WARNING
+    root = logging.getLogger()
+    root.handlers = [logging.NullHandler()]
+    root.setLevel(level)
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            logger.setLevel(level)
+            logger.handlers = [logging.NullHandler()]
+            logger.propagate = False
+
+
+def time_call(func, iterations):
+    """Nanoseconds per call, best of 3 runs"""
+    return min(timeit.repeat(func, number=iterations, repeat=3)) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    cases = build_cases()
+    modes = [
+        ("debug off", False, 1.0),
+        ("debug on, 1% sampled", True, 0.01),
+        ("debug on", True, 1.0),
+    ]
+
+    print(f"{'helper':<40}{'plain ns':>10}" + "".join(f"{name:>24}" for name, _, _ in modes))
+    for name, operation, decorated, plain in cases:
+        plain_ns = time_call(plain, args.iterations) if plain else None
+        row = f"{name:<40}{plain_ns:>10.0f}" if plain_ns is not None else f"{name:<40}{'-':>10}"
+
+        for _, debug, rate in modes:
+            configure_debug(debug)
+            if operation:
+                set_operation_sample_rate(operation, rate)
+            with log_context(logging.getLogger(__name__), benchmark=name):
+                row += f"{time_call(decorated, args.iterations):>24.0f}"
+        print(row)
+
+    configure_debug(False)
+
+
+if __name__ == "__main__":
+    main()
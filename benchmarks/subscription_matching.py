@@ -0,0 +1,158 @@
+# benchmarks/subscription_matching.py
+
+"""
+Benchmark the in-memory SubscriptionMatcher against the SQL matching query.
+
+Usage:
+    python -m benchmarks.subscription_matching [--filters 100000] [--ads 1000]
+    python -m benchmarks.subscription_matching --sql --sql-ads 100
+
+The in-memory run needs no database. With --sql the synthetic users and filters
+are inserted into the configured database inside a transaction that is rolled
+back at the end, and both paths are checked to return the same users.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from common.config import GEO_ID_MAPPING
+from common.db.operations import SubscriptionMatcher
+from common.db.repositories.ad_repository import AdRepository
+
+PROPERTY_TYPES = ['apartment', 'house']
+
+
+def generate_filters(count, seed=42):
+    """Generate filter rows in the SubscriptionMatcher.load_rows format"""
+    rng = random.Random(seed)
+    cities = list(GEO_ID_MAPPING.keys())
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        price_min = rng.choice([None, rng.randrange(3000, 15000, 500)])
+        price_max = rng.choice([None, (price_min or 3000) + rng.randrange(2000, 30000, 500)])
+        rows.append((
+            i + 1,
+            i + 1,
+            rng.choice(PROPERTY_TYPES + [None]) if rng.random() < 0.2 else 'apartment',
+            rng.choice(cities) if rng.random() < 0.95 else None,
+            rng.choice([None, sorted(rng.sample(range(1, 6), rng.randint(1, 3)))]),
+            price_min,
+            price_max,
+            now + timedelta(days=rng.choice([-3, 7])),
+            now + timedelta(days=30) if rng.random() < 0.3 else None
+        ))
+    return rows
+
+
+def generate_ads(count, seed=7):
+    rng = random.Random(seed)
+    cities = list(GEO_ID_MAPPING.keys())
+    return [
+        {
+            'id': i + 1,
+            'property_type': 'apartment',
+            'city': rng.choice(cities),
+            'rooms_count': rng.randint(1, 5),
+            'price': float(rng.randrange(4000, 40000, 100))
+        }
+        for i in range(count)
+    ]
+
+
+def bench_matcher(filters, ads):
+    matcher = SubscriptionMatcher()
+
+    started = time.perf_counter()
+    matcher.load_rows(filters)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = {
+        ad['id']: matcher.match(ad['property_type'], ad['city'], ad['rooms_count'], ad['price'])
+        for ad in ads
+    }
+    match_time = time.perf_counter() - started
+
+    total_matches = sum(len(user_ids) for user_ids in results.values())
+    print(f"matcher: built index of {matcher.size} filters in {build_time * 1000:.1f} ms")
+    print(f"matcher: {len(ads)} ads in {match_time * 1000:.1f} ms "
+          f"({len(ads) / match_time:,.0f} ads/s, {match_time / len(ads) * 1e6:.1f} us/ad, "
+          f"{total_matches} matches)")
+    return results
+
+
+def bench_sql(filters, ads, matcher_results):
+    from common.db.models.user import User
+    from common.db.models.subscription import UserFilter
+    from common.db.session import SessionLocal
+    from sqlalchemy import func
+
+    db = SessionLocal()
+    try:
+        # Use ids past the current maximum so the synthetic rows cannot collide
+        base_id = (db.query(func.max(User.id)).scalar() or 0) + 1
+        user_rows = []
+        filter_rows = []
+        for (_, user_id, property_type, city, rooms_count,
+             price_min, price_max, free_until, subscription_until) in filters:
+            user_rows.append({
+                'id': base_id + user_id,
+                'free_until': free_until,
+                'subscription_until': subscription_until
+            })
+            filter_rows.append({
+                'user_id': base_id + user_id,
+                'property_type': property_type,
+                'city': city,
+                'rooms_count': rooms_count,
+                'price_min': price_min,
+                'price_max': price_max,
+                'is_paused': False
+            })
+
+        started = time.perf_counter()
+        db.execute(User.__table__.insert(), user_rows)
+        db.execute(UserFilter.__table__.insert(), filter_rows)
+        db.flush()
+        print(f"sql: seeded {len(filter_rows)} filters in {time.perf_counter() - started:.1f} s")
+
+        mismatches = 0
+        started = time.perf_counter()
+        for ad in ads:
+            query = AdRepository.build_matching_users_query(
+                db, ad['property_type'], ad['city'], ad['rooms_count'], ad['price']
+            )
+            user_ids = {row[0] - base_id for row in query.all() if row[0] >= base_id}
+            if user_ids != set(matcher_results[ad['id']]):
+                mismatches += 1
+        sql_time = time.perf_counter() - started
+
+        print(f"sql: {len(ads)} ads in {sql_time * 1000:.1f} ms "
+              f"({len(ads) / sql_time:,.0f} ads/s, {sql_time / len(ads) * 1e3:.2f} ms/ad, "
+              f"{mismatches} mismatches against matcher)")
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filters', type=int, default=100000)
+    parser.add_argument('--ads', type=int, default=1000)
+    parser.add_argument('--sql', action='store_true', help='also time the SQL query path')
+    parser.add_argument('--sql-ads', type=int, default=1000, help='ads to run through the SQL path')
+    args = parser.parse_args()
+
+    filters = generate_filters(args.filters)
+    ads = generate_ads(args.ads)
+    results = bench_matcher(filters, ads)
+
+    if args.sql:
+        bench_sql(filters, ads[:args.sql_ads], results)
+
+
+if __name__ == '__main__':
+    main()
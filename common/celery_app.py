@@ -54,6 +54,7 @@ celery_app.conf.update(
         'telegram_service.app.tasks.*': {'queue': 'telegram_queue'},
         'viber_service.app.tasks.*': {'queue': 'viber_queue'},
         'whatsapp_service.app.tasks.*': {'queue': 'whatsapp_queue'},
+        'scraper_service.app.tasks.mirror_ad_images': {'queue': 'image_queue'},  # Image mirroring to S3
         'scraper_service.app.tasks.*': {'queue': 'scrape_queue'},
         'system.maintenance.*': {'queue': 'maintenance_queue'},  # Maintenance queue
     },
@@ -69,20 +70,25 @@ celery_app.conf.beat_schedule = {
         'task': 'scraper_service.app.tasks.fetch_new_ads',
         'schedule': 300.0,  # 5 minutes in seconds
     },
-    'system-maintenance-weekly': {
-        'task': 'system.maintenance.cleanup_old_ads',
-        'schedule': crontab(day_of_week='sun', hour=2, minute=0),  # Sunday at 2 AM
-        'kwargs': {'days_old': 30, 'check_activity': True},  # Clean ads older than 30 days and check if they're inactive
-    },
     'check-expiring-subscriptions-daily': {
         'task': 'telegram_service.app.tasks.check_expiring_subscriptions',
         'schedule': crontab(hour=9, minute=0),  # Run daily at 9:00 AM
     },
-    # Daily maintenance task for cleaning inactive ads
-    'cleanup-inactive-ads-daily': {
+    # Daily creation of upcoming ad partitions
+    'ensure-ad-partitions-daily': {
+        'task': 'system.maintenance.ensure_ad_partitions',
+        'schedule': crontab(hour=0, minute=30),  # Daily at 0:30 AM
+    },
+    # Daily retention of ads, drops partitions older than 30 days keeping favorited and active ads
+    'cleanup-old-ads-daily': {
         'task': 'system.maintenance.cleanup_old_ads',
         'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM
-        'kwargs': {'days_old': 7, 'check_activity': True},  # Check and clean inactive ads older than 7 days
+        'kwargs': {'days_old': 30, 'check_activity': True},
+    },
+    # Weekly removal of S3 images no ad references
+    'sweep-orphan-images-weekly': {
+        'task': 'system.maintenance.sweep_orphan_images',
+        'schedule': crontab(day_of_week='sun', hour=4, minute=0),  # Sunday at 4 AM
     },
     # Daily cleanup of expired verification codes
     'cleanup-expired-verification-codes': {
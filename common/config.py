@@ -15,6 +15,30 @@ DB_CONFIG = {
     "dbname": os.getenv("DB_NAME", "mydb"),
 }
 
+# Database connection pooling, one pool per engine and process (see common/db/pool.py)
+DB_POOL_CONFIG = {
+    # Units of work using the database at once in one process (threads, concurrent handlers).
+    # Celery prefork children run one task at a time, 1 fits them
+    "concurrency": int(os.getenv("DB_POOL_CONCURRENCY", "1")),
+    # Connections kept open per pool, 0 derives it from concurrency
+    "size": int(os.getenv("DB_POOL_SIZE", "0")),
+    # Extra connections opened for bursts and closed when returned
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", "2")),
+    # Seconds to wait for a free connection
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    # Connecting through PgBouncer in transaction pooling mode
+    "pgbouncer": os.getenv("DB_PGBOUNCER", "false").lower() == "true",
+}
+
+# Time partitioning of ads, ad_images and ad_phones (see common/db/partitions.py)
+AD_PARTITION_CONFIG = {
+    # Days covered by one partition, retention drops whole partitions
+    "interval_days": int(os.getenv("AD_PARTITION_INTERVAL_DAYS", "7")),
+    # Future partitions created ahead of time
+    "premake": int(os.getenv("AD_PARTITION_PREMAKE", "4")),
+}
+
 # AWS Configuration
 AWS_CONFIG = {
     "access_key": os.getenv("AWS_ACCESS_KEY_ID"),
@@ -22,16 +46,140 @@ AWS_CONFIG = {
     "region": os.getenv("AWS_DEFAULT_REGION", "eu-west-1"),
     "s3_bucket": os.getenv("AWS_S3_BUCKET", "htodebucket"),
     "s3_prefix": os.getenv("AWS_S3_BUCKET_PREFIX", "ads-images/"),
+    # Media sent by users, kept apart from ad images which are swept when unreferenced
+    "media_prefix": os.getenv("AWS_S3_MEDIA_PREFIX", "user-media/"),
     "cloudfront_domain": os.getenv("CLOUDFRONT_DOMAIN"),
 }
 
+# Deletion of ad images from S3
+S3_CLEANUP_CONFIG = {
+    # DeleteObjects requests (up to 1000 keys each) in flight at the same time
+    "delete_concurrency": int(os.getenv("S3_DELETE_CONCURRENCY", "4")),
+    # Objects younger than this are never swept as orphans, their ad may not be saved yet
+    "orphan_grace_hours": int(os.getenv("S3_ORPHAN_GRACE_HOURS", "24")),
+}
+
+# Shared S3 client and image transfers (see common/utils/s3_transfer.py)
+S3_TRANSFER_CONFIG = {
+    # HTTP connections the process wide client keeps to S3, shared by all threads
+    "max_pool_connections": int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32")),
+    "max_attempts": int(os.getenv("S3_MAX_ATTEMPTS", "5")),
+    # Bodies above the threshold are uploaded in parts of multipart_chunksize
+    "multipart_threshold": int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024))),
+    "multipart_chunksize": int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024))),
+    # Parts of one upload sent at the same time
+    "max_concurrency": int(os.getenv("S3_TRANSFER_MAX_CONCURRENCY", "4")),
+    # Downloaded bytes kept in memory per image before spilling to a temporary file
+    "spool_max_bytes": int(os.getenv("S3_SPOOL_MAX_BYTES", str(1024 * 1024))),
+    "read_chunk_bytes": int(os.getenv("S3_READ_CHUNK_BYTES", str(64 * 1024))),
+    # Larger source images are not mirrored
+    "max_image_bytes": int(os.getenv("S3_MAX_IMAGE_BYTES", str(25 * 1024 * 1024))),
+}
+
 # Redis Configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# Serialization of cached values and state, see common/utils/codec.py
+CACHE_CODEC_CONFIG = {
+    # "msgpack" or "json"; "json" keeps new entries readable by workers without the codec
+    "format": os.getenv("CACHE_CODEC_FORMAT", "msgpack"),
+    # "zstd", "zlib" or "none"
+    "compression": os.getenv("CACHE_CODEC_COMPRESSION", "zstd"),
+    "compress_threshold": int(os.getenv("CACHE_CODEC_COMPRESS_THRESHOLD", "1024")),
+    "level": int(os.getenv("CACHE_CODEC_LEVEL", "3")),
+}
+
+# In-process cache in front of Redis for hot keys, see common/utils/local_cache.py
+LOCAL_CACHE_CONFIG = {
+    "enabled": os.getenv("LOCAL_CACHE_ENABLED", "true").lower() == "true",
+    # Cache key types ("<type>:<id>") kept in process memory
+    "key_types": [t for t in os.getenv("LOCAL_CACHE_KEY_TYPES", "user_filters,user_platform_ids,full_ad").split(",") if t],
+    "max_entries": int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "5000")),
+    "max_bytes": int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    # Upper bound on staleness if an invalidation message is lost
+    "ttl": int(os.getenv("LOCAL_CACHE_TTL", "30")),
+}
+
+# Scraper Configuration
+SCRAPER_CONFIG = {
+    # "sync" walks cities one by one, "async" scrapes them concurrently
+    "mode": os.getenv("SCRAPER_MODE", "sync"),
+    "max_connections": int(os.getenv("SCRAPER_MAX_CONNECTIONS", "20")),
+    "per_host_limit": int(os.getenv("SCRAPER_PER_HOST_LIMIT", "6")),
+    "requests_per_second": float(os.getenv("SCRAPER_REQUESTS_PER_SECOND", "5")),
+    "city_concurrency": int(os.getenv("SCRAPER_CITY_CONCURRENCY", "6")),
+    # Parallel image downloads/uploads per mirroring task
+    "image_mirror_concurrency": int(os.getenv("IMAGE_MIRROR_CONCURRENCY", "8")),
+}
+
+# Liveness checks of old ads during cleanup (see common/utils/ad_liveness.py)
+AD_LIVENESS_CONFIG = {
+    # HEAD requests in flight at the same time
+    "concurrency": int(os.getenv("AD_LIVENESS_CONCURRENCY", "20")),
+    "per_host_limit": int(os.getenv("AD_LIVENESS_PER_HOST_LIMIT", "8")),
+    # Requests per second to one domain
+    "requests_per_second": float(os.getenv("AD_LIVENESS_REQUESTS_PER_SECOND", "10")),
+    "timeout": float(os.getenv("AD_LIVENESS_TIMEOUT", "10")),
+    # Ads read from the database and checked per round
+    "chunk_size": int(os.getenv("AD_LIVENESS_CHUNK_SIZE", "500")),
+}
+
+# Notification fan-out
+NOTIFIER_CONFIG = {
+    # (user, ad) deliveries per send_ads_batch task
+    "delivery_batch_size": int(os.getenv("NOTIFIER_DELIVERY_BATCH_SIZE", "100")),
+    # Messages of one batch in flight at the same time
+    "delivery_concurrency": int(os.getenv("NOTIFIER_DELIVERY_CONCURRENCY", "10")),
+}
+
+# Outbound message rate limits per platform, in messages per second.
+# Shared by all workers through Redis token buckets, see common/messaging/rate_limiter.py
+MESSAGING_RATE_LIMITS = {
+    "telegram": {
+        "global_rate": float(os.getenv("TELEGRAM_GLOBAL_RATE", "25")),
+        "global_burst": int(os.getenv("TELEGRAM_GLOBAL_BURST", "25")),
+        "chat_rate": float(os.getenv("TELEGRAM_CHAT_RATE", "1")),
+        "chat_burst": int(os.getenv("TELEGRAM_CHAT_BURST", "3")),
+    },
+    "viber": {
+        "global_rate": float(os.getenv("VIBER_GLOBAL_RATE", "20")),
+        "global_burst": int(os.getenv("VIBER_GLOBAL_BURST", "20")),
+        "chat_rate": float(os.getenv("VIBER_CHAT_RATE", "1")),
+        "chat_burst": int(os.getenv("VIBER_CHAT_BURST", "3")),
+    },
+    "whatsapp": {
+        "global_rate": float(os.getenv("WHATSAPP_GLOBAL_RATE", "10")),
+        "global_burst": int(os.getenv("WHATSAPP_GLOBAL_BURST", "10")),
+        "chat_rate": float(os.getenv("WHATSAPP_CHAT_RATE", "1")),
+        "chat_burst": int(os.getenv("WHATSAPP_CHAT_BURST", "2")),
+    },
+}
+
+# Playwright browser pool used for phone extraction
+BROWSER_POOL_CONFIG = {
+    # Pages open at the same time in the shared Chromium process
+    "max_concurrent_pages": int(os.getenv("BROWSER_POOL_MAX_PAGES", "4")),
+    # Relaunch Chromium after this many pages to release leaked memory
+    "max_pages_per_browser": int(os.getenv("BROWSER_POOL_PAGES_PER_BROWSER", "200")),
+    # Reuse a default browser context for this many pages before closing it
+    "max_uses_per_context": int(os.getenv("BROWSER_POOL_USES_PER_CONTEXT", "20")),
+    # Extractions allowed to wait for a page before new ones are rejected
+    "max_queue": int(os.getenv("BROWSER_POOL_MAX_QUEUE", "32")),
+    # Seconds a caller waits for its extraction to finish
+    "task_timeout": int(os.getenv("BROWSER_POOL_TASK_TIMEOUT", "180")),
+    # Seconds before an extraction rejected by a full queue is retried
+    "busy_retry_delay": int(os.getenv("BROWSER_POOL_BUSY_RETRY_DELAY", "15")),
+}
+
 # Telegram Configuration
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 # TODO: I receive an error while passing token for bot creating. Nonetype is received for some reason. Check logs.
 
+# Viber and WhatsApp (Twilio) credentials, used by the messaging workers
+VIBER_TOKEN = os.getenv("VIBER_TOKEN")
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+
 # Geo ID Mappings
 GEO_ID_MAPPING = {
     10012684: 'Львів',
@@ -1,81 +1,42 @@
 # common/db/database.py
 
-from psycopg2.pool import ThreadedConnectionPool
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
-from common.config import DB_CONFIG
+from common.db.session import engine
 from common.utils.logging_config import log_operation, log_context
 
 # Import the common db logger
 from . import logger
 
-# Create a global connection pool
-pool = None
-
-
-@log_operation("initialize_pool")
-def initialize_pool(min_conn=1, max_conn=10):
-    global pool
-    try:
-        with log_context(logger, min_conn=min_conn, max_conn=max_conn):
-            pool = ThreadedConnectionPool(
-                min_conn,
-                max_conn,
-                host=DB_CONFIG["host"],
-                port=DB_CONFIG["port"],
-                dbname=DB_CONFIG["dbname"],
-                user=DB_CONFIG["user"],
-                password=DB_CONFIG["password"]
-            )
-            logger.info("DB connection pool initialized", extra={
-                'min_connections': min_conn,
-                'max_connections': max_conn,
-                'host': DB_CONFIG["host"],
-                'database': DB_CONFIG["dbname"]
-            })
-    except Exception as e:
-        logger.error("Failed to initialize connection pool", exc_info=True, extra={
-            'error_type': type(e).__name__,
-            'host': DB_CONFIG["host"],
-            'database': DB_CONFIG["dbname"]
-        })
-        raise
-
 
 @contextmanager
 @log_operation("get_db_connection")
 def get_db_connection():
     """
-    Context manager for database connections.
-    Ensures connections are always returned to the pool, even if an exception occurs.
-    """
-    global pool
-    if pool is None:
-        initialize_pool()
+    Context manager for raw psycopg2 connections.
 
+    Connections are borrowed from the SQLAlchemy engine's pool, so a process keeps
+    a single pool, and are always returned to it, even if an exception occurs.
+    """
     conn = None
     try:
-        with log_context(logger, pool_size=pool.maxconn):
-            conn = pool.getconn()
+        with log_context(logger, pool_size=engine.pool.size()):
+            conn = engine.raw_connection()
             logger.debug("Got connection from pool", extra={
                 'connection_id': id(conn)
             })
             yield conn
     finally:
         if conn is not None:
-            pool.putconn(conn)
-            logger.debug("Returned connection to pool", extra={
-                'connection_id': id(conn)
-            })
+            return_connection(conn)
 
 
 @log_operation("return_connection")
 def return_connection(conn):
-    """Return a connection to the pool"""
-    global pool
-    if pool is not None and conn is not None:
+    """Return a connection to the pool (the pool rolls back what wasn't committed)"""
+    if conn is not None:
         with log_context(logger, connection_id=id(conn)):
-            pool.putconn(conn)
+            conn.close()
             logger.debug("Connection returned to pool")
 
 
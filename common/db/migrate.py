@@ -0,0 +1,141 @@
+# common/db/migrate.py
+
+"""
+Versioned schema migrations.
+
+init.sql creates the schema of a new database, later changes are numbered SQL
+files in common/db/migrations (0001_query_indexes.sql, ...). They are applied
+in order and recorded in the schema_migrations table, so each runs once per
+database:
+
+    python -m common.db.migrate          # apply pending migrations
+    python -m common.db.migrate --list   # show applied and pending migrations
+
+A migration runs in one transaction. Migrations marked with a
+"-- migrate:no-transaction" line run their statements one at a time in
+autocommit mode instead, as CREATE INDEX CONCURRENTLY requires: one that fails
+halfway is rerun from its start and must use IF [NOT] EXISTS. A failed
+concurrent build leaves an INVALID index that IF NOT EXISTS skips, drop it
+before rerunning.
+"""
+
+import argparse
+import os
+import re
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from common.utils.logging_config import log_operation, log_context
+
+# Import the common db logger
+from . import logger
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+# Held while migrating so concurrently started services don't apply the same migration
+MIGRATION_LOCK_ID = 7_203_114
+
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+
+_VERSION_PATTERN = re.compile(r"^(\d+)_[\w-]+\.sql$")
+
+
+def migration_files(directory: str = MIGRATIONS_DIR) -> List[Tuple[str, str]]:
+    """(version, path) of every migration, in the order they are applied"""
+    migrations = []
+    for name in os.listdir(directory):
+        if _VERSION_PATTERN.match(name):
+            migrations.append((name[:-len(".sql")], os.path.join(directory, name)))
+    return sorted(migrations, key=lambda migration: int(migration[0].split("_", 1)[0]))
+
+
+def split_statements(sql: str) -> List[str]:
+    """Statements of a migration file, without comments (migrations don't contain ';' in literals)"""
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def _ensure_migrations_table(conn) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(255) PRIMARY KEY, "
+        "applied_at TIMESTAMP DEFAULT NOW())"
+    ))
+
+
+def applied_versions(conn) -> Set[str]:
+    _ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _run_migration(conn, version: str, statements: List[str]) -> None:
+    for statement in statements:
+        conn.execute(text(statement))
+    conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {'version': version})
+
+
+@log_operation("apply_migrations")
+def apply_migrations(engine: Optional[Engine] = None, directory: str = MIGRATIONS_DIR) -> List[str]:
+    """
+    Apply pending migrations.
+
+    Returns:
+        Versions applied by this call
+    """
+    if engine is None:
+        from common.db.session import engine
+
+    applied = []
+    with engine.connect() as lock_conn:
+        lock_conn = lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(:lock_id)"), {'lock_id': MIGRATION_LOCK_ID})
+        try:
+            done = applied_versions(lock_conn)
+            for version, path in migration_files(directory):
+                if version in done:
+                    continue
+
+                with log_context(logger, migration=version):
+                    with open(path, encoding="utf-8") as f:
+                        sql = f.read()
+                    statements = split_statements(sql)
+                    transactional = NO_TRANSACTION_MARKER not in sql
+                    logger.info("Applying migration", extra={
+                        'statement_count': len(statements),
+                        'transactional': transactional
+                    })
+
+                    if transactional:
+                        with engine.begin() as conn:
+                            _run_migration(conn, version, statements)
+                    else:
+                        _run_migration(lock_conn, version, statements)
+                    applied.append(version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {'lock_id': MIGRATION_LOCK_ID})
+
+    logger.info("Migrations up to date", extra={'applied': applied})
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--list", action="store_true", help="show applied and pending migrations")
+    args = parser.parse_args()
+
+    if args.list:
+        from common.db.session import engine
+
+        with engine.connect() as conn:
+            done = applied_versions(conn.execution_options(isolation_level="AUTOCOMMIT"))
+        for version, _ in migration_files():
+            print(f"{'applied' if version in done else 'pending':<9}{version}")
+        return
+
+    apply_migrations()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+-- common/db/migrations/0001_query_indexes.sql
+-- Indexes for the subscription matching, notification and cleanup queries.
+-- CONCURRENTLY keeps the tables writable while an index is built, it can't run in a transaction.
+-- migrate:no-transaction
+
+-- AdRepository.fetch_ads_for_period: equality on city and property type, newest first with a LIMIT.
+-- Price as second column kept idx_ads_filter_query from returning rows in insert_time order.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ads_city_type_insert_time
+    ON ads (city, property_type, insert_time DESC);
+DROP INDEX CONCURRENTLY IF EXISTS idx_ads_filter_query;
+
+-- AdRepository.get_older_than: range on insert_time.
+-- Created by init.sql, missing on databases created from the models.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ads_insert_time ON ads (insert_time DESC);
+
+-- Single-column indexes the models used to declare, covered by idx_ads_city_type_insert_time
+DROP INDEX CONCURRENTLY IF EXISTS ix_ads_property_type;
+DROP INDEX CONCURRENTLY IF EXISTS ix_ads_city;
+DROP INDEX CONCURRENTLY IF EXISTS ix_ads_price;
+DROP INDEX CONCURRENTLY IF EXISTS ix_ads_rooms_count;
+
+-- AdRepository.find_users_for_ad, SubscriptionRepository.get_active_cities: non-paused filters
+-- by city and property type, user_id included to join users without visiting the table.
+-- Lookups by user_id use the user_filters_user_id_unique constraint.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_filters_city_type_active
+    ON user_filters (city, property_type) INCLUDE (user_id)
+    WHERE is_paused = FALSE;
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_filters_active;
+
+-- AdRepository.find_users_for_ad: rooms_count @> ARRAY[rooms]
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_filters_rooms_count_active
+    ON user_filters USING GIN (rooms_count)
+    WHERE is_paused = FALSE;
+
+-- Active users (free_until > now() OR subscription_until > now()) and
+-- UserRepository.get_users_with_expiring_subscription
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_subscription_until
+    ON users (subscription_until)
+    WHERE subscription_until IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_free_until
+    ON users (free_until)
+    WHERE free_until IS NOT NULL;
@@ -0,0 +1,90 @@
+-- common/db/migrations/0002_partition_ads.sql
+-- Range partition ads, ad_images and ad_phones by the ad's insert_time (see common/db/partitions.py).
+-- Primary and unique keys of a partitioned table must contain the partition key, so ad_images and
+-- ad_phones carry the ad's insert_time as ad_insert_time. Existing rows are copied into the DEFAULT
+-- partitions, ensure_ad_partitions then moves them into interval partitions.
+-- Nothing references ads by foreign key anymore: rows of an interval are removed by dropping the
+-- partitions of all three tables, and the favorited ads of an interval are kept, see
+-- drop_expired_ad_partitions. The tables are locked while their rows are copied.
+
+-- Keep the ID sequences when the old tables are dropped
+ALTER SEQUENCE ads_id_seq OWNED BY NONE;
+ALTER SEQUENCE ad_images_id_seq OWNED BY NONE;
+ALTER SEQUENCE ad_phones_id_seq OWNED BY NONE;
+
+-- Move the old tables out of the way together with their index and constraint names
+CREATE SCHEMA ads_unpartitioned;
+ALTER TABLE ads SET SCHEMA ads_unpartitioned;
+ALTER TABLE ad_images SET SCHEMA ads_unpartitioned;
+ALTER TABLE ad_phones SET SCHEMA ads_unpartitioned;
+
+CREATE TABLE ads (
+    id INTEGER NOT NULL DEFAULT nextval('ads_id_seq'),
+    external_id VARCHAR(255) NOT NULL,
+    property_type VARCHAR(50) NOT NULL,
+    price NUMERIC NOT NULL,
+    rooms_count INTEGER NOT NULL,
+    city BIGINT NOT NULL,
+    insert_time TIMESTAMP NOT NULL DEFAULT NOW(),
+    address TEXT,
+    square_feet NUMERIC,
+    floor INTEGER,
+    total_floors INTEGER,
+    description TEXT,
+    resource_url TEXT,
+    PRIMARY KEY (id, insert_time),
+    UNIQUE (external_id, insert_time)
+) PARTITION BY RANGE (insert_time);
+CREATE TABLE ads_default PARTITION OF ads DEFAULT;
+ALTER SEQUENCE ads_id_seq OWNED BY ads.id;
+
+CREATE TABLE ad_images (
+    id INTEGER NOT NULL DEFAULT nextval('ad_images_id_seq'),
+    ad_id BIGINT NOT NULL,
+    ad_insert_time TIMESTAMP NOT NULL,
+    image_url TEXT NOT NULL,
+    PRIMARY KEY (id, ad_insert_time)
+) PARTITION BY RANGE (ad_insert_time);
+CREATE TABLE ad_images_default PARTITION OF ad_images DEFAULT;
+ALTER SEQUENCE ad_images_id_seq OWNED BY ad_images.id;
+
+CREATE TABLE ad_phones (
+    id INTEGER NOT NULL DEFAULT nextval('ad_phones_id_seq'),
+    ad_id BIGINT NOT NULL,
+    ad_insert_time TIMESTAMP NOT NULL,
+    phone TEXT,
+    viber_link TEXT,
+    PRIMARY KEY (id, ad_insert_time)
+) PARTITION BY RANGE (ad_insert_time);
+CREATE TABLE ad_phones_default PARTITION OF ad_phones DEFAULT;
+ALTER SEQUENCE ad_phones_id_seq OWNED BY ad_phones.id;
+
+INSERT INTO ads (
+    id, external_id, property_type, price, rooms_count, city, insert_time,
+    address, square_feet, floor, total_floors, description, resource_url
+)
+SELECT
+    id, external_id, property_type, price, rooms_count, city, COALESCE(insert_time, NOW()),
+    address, square_feet, floor, total_floors, description, resource_url
+FROM ads_unpartitioned.ads;
+
+INSERT INTO ad_images (id, ad_id, ad_insert_time, image_url)
+SELECT i.id, i.ad_id, a.insert_time, i.image_url
+FROM ads_unpartitioned.ad_images i
+JOIN ads a ON a.id = i.ad_id
+WHERE i.image_url IS NOT NULL;
+
+INSERT INTO ad_phones (id, ad_id, ad_insert_time, phone, viber_link)
+SELECT p.id, p.ad_id, a.insert_time, p.phone, p.viber_link
+FROM ads_unpartitioned.ad_phones p
+JOIN ads a ON a.id = p.ad_id;
+
+-- Also drops the favorite_ads foreign key to the old table
+DROP SCHEMA ads_unpartitioned CASCADE;
+
+-- Indexes of 0001 and init.sql, created on every partition
+CREATE INDEX idx_ads_city_type_insert_time ON ads (city, property_type, insert_time DESC);
+CREATE INDEX idx_ads_insert_time ON ads (insert_time DESC);
+CREATE INDEX idx_ads_resource_url ON ads (resource_url);
+CREATE INDEX idx_ad_images_ad_id ON ad_images (ad_id);
+CREATE INDEX idx_ad_phones_ad_id ON ad_phones (ad_id);
@@ -0,0 +1,8 @@
+-- common/db/migrations/0003_ad_images_image_url.sql
+-- Mirrored images are content addressed, so ads with the same photo share one S3 object and
+-- ad_images row URLs repeat. Cleanup only deletes objects no row references anymore, see
+-- AdRepository.get_referenced_image_urls.
+-- CONCURRENTLY isn't supported on partitioned tables: the build blocks writes to ad_images, and
+-- partitions created later get the index automatically.
+
+CREATE INDEX IF NOT EXISTS idx_ad_images_image_url ON ad_images (image_url);
@@ -0,0 +1,18 @@
+-- common/db/migrations/0004_ad_external_ids.sql
+-- Unique constraints of the partitioned ads table must contain insert_time, so
+-- UNIQUE (external_id, insert_time) of 0002 never conflicts: every ad gets its own insert_time.
+-- ad_external_ids is not partitioned and keeps external_id unique across all partitions. Ads are
+-- only inserted for the external IDs an INSERT ... ON CONFLICT DO NOTHING RETURNING into it
+-- returned, in the same transaction (see AdRepository.claim_external_ids), and deleting the last
+-- ad of an external ID releases it. Ads duplicated before this migration are left as they are.
+-- ads is locked against writes while the existing external IDs are copied.
+
+CREATE TABLE IF NOT EXISTS ad_external_ids (
+    external_id VARCHAR(255) PRIMARY KEY
+);
+
+LOCK TABLE ads IN SHARE MODE;
+
+INSERT INTO ad_external_ids (external_id)
+SELECT DISTINCT external_id FROM ads
+ON CONFLICT DO NOTHING;
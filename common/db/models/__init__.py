@@ -5,7 +5,7 @@ import logging
 # Import all model classes
 from common.db.models.user import User
 from common.db.models.subscription import UserFilter
-from common.db.models.ad import Ad, AdImage, AdPhone
+from common.db.models.ad import Ad, AdExternalId, AdImage, AdPhone
 from common.db.models.favorite import FavoriteAd
 from common.db.models.payment import PaymentOrder, PaymentHistory
 from common.db.models.verification import VerificationCode
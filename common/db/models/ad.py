@@ -2,7 +2,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -11,20 +11,25 @@ from common.db.base import Base
 
 class Ad(Base):
     __tablename__ = "ads"
+    # Contains the partition key, so it doesn't make external_id unique: AdExternalId does
+    __table_args__ = (
+        UniqueConstraint('external_id', 'insert_time', name='ads_external_id_insert_time_key'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    external_id = Column(String, unique=True, index=True)
-    property_type = Column(String, index=True)
-    city = Column(Integer, index=True)
+    external_id = Column(String, nullable=False)
+    property_type = Column(String)
+    city = Column(Integer)
     address = Column(String)
-    price = Column(Float, index=True)
+    price = Column(Float)
     square_feet = Column(Float)
-    rooms_count = Column(Integer, index=True)
+    rooms_count = Column(Integer)
     floor = Column(Integer)
     total_floors = Column(Integer)
-    insert_time = Column(DateTime, default=func.now())
+    # Partition key (see common/db/partitions.py)
+    insert_time = Column(DateTime, nullable=False, default=func.now())
     description = Column(Text)
-    resource_url = Column(String, unique=True)
+    resource_url = Column(String)
 
     # Relationships
     images = relationship("AdImage", back_populates="ad", cascade="all, delete-orphan")
@@ -32,22 +37,49 @@ class Ad(Base):
     favorites = relationship("FavoriteAd", back_populates="ad", cascade="all, delete-orphan")
 
 
+# Created by common/db/migrations/0001_query_indexes.sql, declared for create_all
+Index('idx_ads_city_type_insert_time', Ad.city, Ad.property_type, Ad.insert_time.desc())
+Index('idx_ads_insert_time', Ad.insert_time.desc())
+# Created by common/db/migrations/0002_partition_ads.sql, declared for create_all
+Index('idx_ads_resource_url', Ad.resource_url)
+
+
+class AdExternalId(Base):
+    """
+    external_id of the stored ads, unique across all ads partitions (see
+    common/db/migrations/0004_ad_external_ids.sql).
+    """
+    __tablename__ = "ad_external_ids"
+
+    external_id = Column(String, primary_key=True)
+
+
 class AdImage(Base):
     __tablename__ = "ad_images"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Not a database foreign key since ads is partitioned, declared for the relationship
     ad_id = Column(Integer, ForeignKey("ads.id"), index=True)
+    # Partition key, insert_time of the ad
+    ad_insert_time = Column(DateTime, nullable=False)
     image_url = Column(String)
 
     # Relationships
     ad = relationship("Ad", back_populates="images")
 
 
+# Created by common/db/migrations/0003_ad_images_image_url.sql, declared for create_all
+Index('idx_ad_images_image_url', AdImage.image_url)
+
+
 class AdPhone(Base):
     __tablename__ = "ad_phones"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Not a database foreign key since ads is partitioned, declared for the relationship
     ad_id = Column(Integer, ForeignKey("ads.id"), index=True)
+    # Partition key, insert_time of the ad
+    ad_insert_time = Column(DateTime, nullable=False)
     phone = Column(String, nullable=True)
     viber_link = Column(String, nullable=True)
 
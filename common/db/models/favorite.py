@@ -16,6 +16,7 @@ class FavoriteAd(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # Not a database foreign key since ads is partitioned, declared for the relationship
     ad_id = Column(Integer, ForeignKey("ads.id"), index=True)
     created_at = Column(DateTime, default=func.now())
 
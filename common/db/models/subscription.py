@@ -1,5 +1,5 @@
 # common/db/models/subscription.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, JSON, Index
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -26,4 +26,14 @@ class UserFilter(Base):
     without_broker = Column(Boolean, nullable=True)
 
     # Relationships
-    user = relationship("User", back_populates="filters")
\ No newline at end of file
+    user = relationship("User", back_populates="filters")
+
+# Created by common/db/migrations/0001_query_indexes.sql, declared for create_all
+Index(
+    'idx_user_filters_city_type_active', UserFilter.city, UserFilter.property_type,
+    postgresql_include=['user_id'], postgresql_where=UserFilter.is_paused == False
+)
+Index(
+    'idx_user_filters_rooms_count_active', UserFilter.rooms_count,
+    postgresql_using='gin', postgresql_where=UserFilter.is_paused == False
+)
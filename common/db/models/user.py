@@ -2,7 +2,7 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -59,4 +59,11 @@ class User(Base):
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
-        return new_user
\ No newline at end of file
+        return new_user
+
+# Created by common/db/migrations/0001_query_indexes.sql, declared for create_all
+Index(
+    'idx_users_subscription_until', User.subscription_until,
+    postgresql_where=User.subscription_until.isnot(None)
+)
+Index('idx_users_free_until', User.free_until, postgresql_where=User.free_until.isnot(None))
@@ -5,13 +5,17 @@ This module contains database operations that combine models and repositories.
 It should be imported after both models and repositories are initialized.
 """
 
+import bisect
 import logging
+import threading
+import time
+from itertools import islice
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timedelta, date
 
 from sqlalchemy import or_
 
-from common.db.session import db_session
+from common.db.session import db_session, async_db_session
 from common.db.models.user import User
 from common.db.models.subscription import UserFilter
 from common.db.models.ad import Ad, AdPhone
@@ -19,7 +23,7 @@ from common.db.repositories.user_repository import UserRepository
 from common.db.repositories.subscription_repository import SubscriptionRepository
 from common.db.repositories.ad_repository import AdRepository
 from common.db.repositories.favorite_repository import FavoriteRepository
-from common.utils.cache import CacheTTL
+from common.utils.cache import CacheTTL, redis_client, single_flight, async_single_flight
 from common.config import GEO_ID_MAPPING, get_key_by_value
 from common.utils.phone_parser import extract_phone_numbers_from_resource
 from common.utils.cache_invalidation import invalidate_favorite_caches, invalidate_subscription_caches, invalidate_user_caches, invalidate_ad_caches
@@ -121,6 +125,7 @@ def update_user_filter(user_id, filters):
 
                 # Use centralized cache invalidation
                 invalidate_subscription_caches(user_id)
+                mark_subscription_changed(user_id)
 
                 return user_filter
 
@@ -181,9 +186,8 @@ def batch_get_user_filters(user_ids):
         # Result dictionary
         results = {}
 
-        # Step 1: Try to get as many filters from cache as possible
-        for user_id in user_ids:
-            cached_filters = UserCacheManager.get_filters(user_id)
+        # Step 1: Try to get as many filters from cache as possible, in one round-trip
+        for user_id, cached_filters in UserCacheManager.get_filters_many(user_ids).items():
             if cached_filters:
                 results[user_id] = cached_filters
                 aggregator.add_item({'user_id': user_id, 'from_cache': True}, success=True)
@@ -203,18 +207,21 @@ def batch_get_user_filters(user_ids):
         with db_session() as db:
             for i in range(0, len(missing_user_ids), BATCH_SIZE):
                 batch = missing_user_ids[i:i + BATCH_SIZE]
+                batch_filters = {}
 
                 # Use repository to get filters for this batch
                 for user_id in batch:
                     user_filter = SubscriptionRepository.get_user_filters(db, user_id)
                     if user_filter:
-                        results[user_id] = user_filter
-                        # Cache each result
-                        UserCacheManager.set_filters(user_id, user_filter)
+                        batch_filters[user_id] = user_filter
                         aggregator.add_item({'user_id': user_id, 'from_db': True}, success=True)
                     else:
                         aggregator.add_item({'user_id': user_id, 'not_found': True}, success=False)
 
+                # Cache the batch in one round-trip
+                results.update(batch_filters)
+                UserCacheManager.set_filters_many(batch_filters)
+
         aggregator.log_summary()
         return results
 
@@ -247,13 +254,37 @@ def get_db_user_id_by_telegram_id(messenger_id, messenger_type="telegram"):
             return None
 
 
+@log_operation("async_get_db_user_id_by_messenger_id")
+async def async_get_db_user_id_by_messenger_id(messenger_id, messenger_type="telegram"):
+    """get_db_user_id_by_telegram_id for handlers, doesn't block the event loop"""
+    with log_context(logger, messenger_id=messenger_id, messenger_type=messenger_type):
+        try:
+            async with async_db_session() as db:
+                user = await UserRepository.async_get_by_messenger_id(db, messenger_id, messenger_type)
+                if user:
+                    return user.id
+
+            logger.warning(f"No database user found for {messenger_type} ID: {messenger_id}")
+            return None
+        except Exception as e:
+            logger.error("Error finding user by messenger ID", exc_info=True, extra={
+                'messenger_id': messenger_id,
+                'messenger_type': messenger_type,
+                'error_type': type(e).__name__
+            })
+            return None
+
+
 @log_operation("get_platform_ids_for_user")
 def get_platform_ids_for_user(user_id: int) -> dict:
     """
-    Get all messaging platform IDs for a user.
-    This doesn't need caching as it's called infrequently and the data is small.
+    Get all messaging platform IDs for a user, with caching.
     """
     with log_context(logger, user_id=user_id):
+        cached_ids = UserCacheManager.get_platform_ids(user_id)
+        if cached_ids is not None:
+            return cached_ids
+
         try:
             with db_session() as db:
                 user = UserRepository.get_by_id(db, user_id)
@@ -277,6 +308,7 @@ def get_platform_ids_for_user(user_id: int) -> dict:
                     'user_id': user_id,
                     'platforms': list(platform_ids.keys())
                 })
+                UserCacheManager.set_platform_ids(user_id, platform_ids)
                 return platform_ids
         except Exception as e:
             logger.error("Error getting platform IDs", exc_info=True, extra={
@@ -286,11 +318,321 @@ def get_platform_ids_for_user(user_id: int) -> dict:
             return {}
 
 
+@log_operation("get_platform_ids_for_users")
+def get_platform_ids_for_users(user_ids: List[int]) -> Dict[int, dict]:
+    """
+    Get messaging platform IDs of many users with a single query.
+    Users that don't exist are left out of the result.
+    """
+    if not user_ids:
+        return {}
+
+    with log_context(logger, user_count=len(user_ids)):
+        try:
+            with db_session() as db:
+                return UserRepository.get_platform_ids_for_users(db, user_ids)
+        except Exception as e:
+            logger.error("Error getting platform IDs for users", exc_info=True, extra={
+                'user_count': len(user_ids),
+                'error_type': type(e).__name__
+            })
+            return {}
+
+
+# Redis sorted set of user ids whose filters changed, scored by change time.
+# Every process holding a SubscriptionMatcher replays it to stay in sync.
+MATCHER_CHANGES_KEY = "subscription_matcher:changes"
+# How far back a sync re-reads the change log to tolerate clock skew between hosts
+MATCHER_SYNC_OVERLAP = 2
+# Room mask for filters without a rooms restriction (all bits set)
+ANY_ROOMS = -1
+
+_NEG_INF = float('-inf')
+_POS_INF = float('inf')
+
+
+def _normalize_city(city):
+    return int(city) if city is not None else None
+
+
+def _normalize_property_type(property_type):
+    return str(property_type) if property_type is not None else None
+
+
+def _rooms_mask(rooms_count) -> int:
+    """Convert a filter's rooms_count array into a bitmask (None matches any rooms)"""
+    if rooms_count is None:
+        return ANY_ROOMS
+    mask = 0
+    for rooms in rooms_count:
+        if rooms is not None and int(rooms) >= 0:
+            mask |= 1 << int(rooms)
+    return mask
+
+
+class SubscriptionMatcher:
+    """
+    In-memory index of active, non-paused user filters for ad matching.
+
+    Filters are bucketed by (city, property_type) with None as a wildcard, so an
+    ad only looks at four buckets. Each bucket is sorted by price_min, which lets
+    a bisect skip every filter whose lower bound is above the ad price; rooms are
+    checked with a bitmask. Matching follows the SQL semantics of
+    AdRepository.build_matching_users_query, including NULL handling.
+
+    The index is rebuilt from the database every `refresh_interval` seconds and
+    in between it reloads only users recorded by mark_subscription_changed.
+    """
+
+    def __init__(self, refresh_interval: int = CacheTTL.MEDIUM, sync_interval: int = 5):
+        self.refresh_interval = refresh_interval
+        self.sync_interval = sync_interval
+        self._lock = threading.RLock()
+        # (city, property_type) -> entries sorted by price_min
+        # entry: (price_min, price_max, room_mask, expires_at, user_id, filter_id)
+        self._buckets = {}
+        # (city, property_type) -> price_min of each entry, parallel to _buckets
+        self._mins = {}
+        # user_id -> bucket keys holding that user's entries
+        self._user_keys = {}
+        self._pending_users = set()
+        self._loaded_at = None
+        self._synced_at = 0.0
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._buckets.values())
+
+    @staticmethod
+    def _make_entry(row):
+        (filter_id, user_id, property_type, city, rooms_count,
+         price_min, price_max, free_until, subscription_until) = row
+
+        expiry_dates = [d for d in (free_until, subscription_until) if d is not None]
+        expires_at = max(expiry_dates).timestamp() if expiry_dates else _NEG_INF
+
+        key = (_normalize_city(city), _normalize_property_type(property_type))
+        entry = (
+            float(price_min) if price_min is not None else _NEG_INF,
+            float(price_max) if price_max is not None else _POS_INF,
+            _rooms_mask(rooms_count),
+            expires_at,
+            user_id,
+            filter_id
+        )
+        return key, entry
+
+    @staticmethod
+    def _query_rows(db, user_ids=None):
+        """Select the filter rows the index is built from"""
+        now = datetime.now()
+        query = db.query(
+            UserFilter.id,
+            UserFilter.user_id,
+            UserFilter.property_type,
+            UserFilter.city,
+            UserFilter.rooms_count,
+            UserFilter.price_min,
+            UserFilter.price_max,
+            User.free_until,
+            User.subscription_until
+        ).join(User, User.id == UserFilter.user_id).filter(
+            UserFilter.is_paused == False,
+            or_(User.free_until > now, User.subscription_until > now)
+        )
+        if user_ids is not None:
+            query = query.filter(UserFilter.user_id.in_(list(user_ids)))
+        return query.yield_per(1000)
+
+    def _insert(self, key, entry):
+        entries = self._buckets.setdefault(key, [])
+        mins = self._mins.setdefault(key, [])
+        position = bisect.bisect_right(mins, entry[0])
+        entries.insert(position, entry)
+        mins.insert(position, entry[0])
+        self._user_keys.setdefault(entry[4], set()).add(key)
+
+    def _remove_user(self, user_id):
+        for key in self._user_keys.pop(user_id, ()):
+            kept = [entry for entry in self._buckets.get(key, []) if entry[4] != user_id]
+            if kept:
+                self._buckets[key] = kept
+                self._mins[key] = [entry[0] for entry in kept]
+            else:
+                self._buckets.pop(key, None)
+                self._mins.pop(key, None)
+
+    def load_rows(self, rows):
+        """
+        Replace the whole index with the given filter rows.
+
+        Args:
+            rows: Iterable of (filter_id, user_id, property_type, city, rooms_count,
+                  price_min, price_max, free_until, subscription_until)
+        """
+        buckets = {}
+        user_keys = {}
+        for row in rows:
+            key, entry = self._make_entry(row)
+            buckets.setdefault(key, []).append(entry)
+            user_keys.setdefault(entry[4], set()).add(key)
+
+        for entries in buckets.values():
+            entries.sort(key=lambda entry: entry[0])
+        mins = {key: [entry[0] for entry in entries] for key, entries in buckets.items()}
+
+        with self._lock:
+            self._buckets = buckets
+            self._mins = mins
+            self._user_keys = user_keys
+            self._loaded_at = time.time()
+
+    def load_user_rows(self, user_ids, rows):
+        """Replace the entries of the given users with their current filter rows"""
+        with self._lock:
+            for user_id in user_ids:
+                self._remove_user(user_id)
+            for row in rows:
+                self._insert(*self._make_entry(row))
+
+    @log_operation("subscription_matcher_rebuild")
+    def rebuild(self):
+        """Rebuild the index from the database"""
+        started_at = time.time()
+        with db_session() as db:
+            self.load_rows(self._query_rows(db))
+        with self._lock:
+            self._synced_at = started_at
+        logger.info("Subscription matcher rebuilt", extra={
+            'filter_count': self.size,
+            'duration_ms': round((time.time() - started_at) * 1000, 2)
+        })
+
+    def reload_users(self, user_ids):
+        """Reload the filters of the given users from the database"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with db_session() as db:
+            rows = list(self._query_rows(db, user_ids))
+        self.load_user_rows(user_ids, rows)
+
+    def mark_user_changed(self, user_id):
+        """Queue a local reload of the user's filters on the next sync"""
+        with self._lock:
+            self._pending_users.add(user_id)
+
+    def sync(self):
+        """Rebuild when stale, otherwise reload users changed since the last sync"""
+        now = time.time()
+        if self._loaded_at is None or now - self._loaded_at >= self.refresh_interval:
+            with self._lock:
+                self._pending_users.clear()
+            self.rebuild()
+            return
+
+        with self._lock:
+            pending = self._pending_users
+            self._pending_users = set()
+            due = now - self._synced_at >= self.sync_interval
+            since = self._synced_at - MATCHER_SYNC_OVERLAP
+            if due:
+                self._synced_at = now
+
+        changed = set(pending)
+        if due:
+            try:
+                changed.update(
+                    int(user_id) for user_id in
+                    redis_client.zrangebyscore(MATCHER_CHANGES_KEY, since, '+inf')
+                )
+            except Exception as e:
+                logger.warning("Failed to read subscription change log", extra={
+                    'error_type': type(e).__name__
+                })
+
+        if changed:
+            self.reload_users(changed)
+
+    def match(self, property_type, city, rooms, price) -> List[int]:
+        """
+        Return ids of users with at least one filter matching the ad properties.
+        """
+        city = _normalize_city(city)
+        property_type = _normalize_property_type(property_type)
+        # A NULL rooms count only passes filters without a rooms restriction
+        room_bit = 1 << int(rooms) if rooms is not None and int(rooms) >= 0 else 0
+        if price is None:
+            # A NULL price only passes filters without price bounds:
+            # bisect keeps open price_min, the +inf comparison keeps open price_max
+            lower, upper = _NEG_INF, _POS_INF
+        else:
+            lower = upper = float(price)
+        now = time.time()
+
+        matched = {}
+        keys = dict.fromkeys(((city, property_type), (city, None), (None, property_type), (None, None)))
+
+        with self._lock:
+            for key in keys:
+                entries = self._buckets.get(key)
+                if not entries:
+                    continue
+                # Filters with price_min above the ad price sit past this index
+                end = bisect.bisect_right(self._mins[key], lower)
+                for price_min, price_max, mask, expires_at, user_id, _ in islice(entries, end):
+                    if upper > price_max or expires_at <= now:
+                        continue
+                    if mask != ANY_ROOMS and not mask & room_bit:
+                        continue
+                    matched[user_id] = None
+
+        return list(matched)
+
+
+subscription_matcher = SubscriptionMatcher()
+
+
+@log_operation("mark_subscription_changed")
+def mark_subscription_changed(user_id: int):
+    """
+    Record that a user's filters changed so every subscription matcher reloads them.
+    """
+    subscription_matcher.mark_user_changed(user_id)
+    try:
+        now = time.time()
+        pipe = redis_client.pipeline()
+        pipe.zadd(MATCHER_CHANGES_KEY, {str(user_id): now})
+        # Older entries are covered by the periodic full rebuild
+        pipe.zremrangebyscore(MATCHER_CHANGES_KEY, '-inf', now - CacheTTL.STANDARD)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Failed to record subscription change", extra={
+            'user_id': user_id,
+            'error_type': type(e).__name__
+        })
+
+
+def _ad_match_fields(ad):
+    """Get (property_type, city, rooms_count, price) of an ad dict or ORM object"""
+    if isinstance(ad, dict) and 'property_type' not in ad and ad.get('id'):
+        # Partial ad payload, take the matching fields from the stored ad
+        with db_session() as db:
+            existing_ad = db.query(Ad).get(ad.get('id'))
+            if existing_ad:
+                return (existing_ad.property_type, existing_ad.city,
+                        existing_ad.rooms_count, existing_ad.price)
+    if isinstance(ad, dict):
+        return ad.get('property_type'), ad.get('city'), ad.get('rooms_count'), ad.get('price')
+    return ad.property_type, ad.city, ad.rooms_count, ad.price
+
+
 @log_operation("find_users_for_ad")
 def find_users_for_ad(ad):
     """
     Finds users whose subscription filters match this ad.
-    Uses the cache manager approach.
+    Uses the in-memory subscription matcher, falling back to the cached SQL query.
     """
     try:
         # Extract the ad ID for caching
@@ -301,6 +643,17 @@ def find_users_for_ad(ad):
             return []
 
         with log_context(logger, ad_id=ad_id):
+            try:
+                subscription_matcher.sync()
+                user_ids = subscription_matcher.match(*_ad_match_fields(ad))
+                logger.info(f'Matched {len(user_ids)} users for ad: {ad_id}')
+                return user_ids
+            except Exception as e:
+                logger.warning("Subscription matcher failed, falling back to SQL", exc_info=True, extra={
+                    'ad_id': ad_id,
+                    'error_type': type(e).__name__
+                })
+
             # Try to get from cache using BaseCacheManager
             cache_key = get_entity_cache_key("matching_users", ad_id)
             cached_users = BaseCacheManager.get(cache_key)
@@ -349,7 +702,7 @@ def find_users_for_ad(ad):
 def batch_find_users_for_ads(ads):
     """
     Find matching users for multiple ads in an efficient way
-    using the cache manager approach.
+    using the in-memory subscription matcher, falling back to the cache manager approach.
     """
     if not ads:
         return {}
@@ -357,13 +710,29 @@ def batch_find_users_for_ads(ads):
     with log_context(logger, ad_count=len(ads)):
         aggregator = LogAggregator(logger, "batch_find_users_for_ads")
 
+        try:
+            # One sync for the whole batch, then pure in-memory matching
+            subscription_matcher.sync()
+            results = {}
+            for ad in ads:
+                ad_id = ad.get('id')
+                if not ad_id:
+                    continue
+                results[ad_id] = subscription_matcher.match(*_ad_match_fields(ad))
+                aggregator.add_item({'ad_id': ad_id, 'matching_users': len(results[ad_id])}, success=True)
+            aggregator.log_summary()
+            return results
+        except Exception as e:
+            logger.warning("Subscription matcher failed, falling back to SQL", exc_info=True, extra={
+                'ad_count': len(ads),
+                'error_type': type(e).__name__
+            })
+
         results = {}
         ad_ids = [ad.get('id') for ad in ads if ad.get('id')]
 
-        # Step 1: Try to get matches from cache
-        for ad_id in ad_ids:
-            cache_key = get_entity_cache_key("matching_users", ad_id)
-            cached_users = BaseCacheManager.get(cache_key)
+        # Step 1: Try to get matches from cache, in one round-trip
+        for ad_id, cached_users in AdCacheManager.get_matching_users_many(ad_ids).items():
             if cached_users:
                 results[ad_id] = cached_users
                 aggregator.add_item({'ad_id': ad_id, 'from_cache': True}, success=True)
@@ -397,6 +766,7 @@ def batch_find_users_for_ads(ads):
             user_filters = batch_get_user_filters(active_user_ids)
 
             # Process each ad against all user filters in memory
+            computed = {}
             for ad in ads_to_process:
                 ad_id = ad.get('id')
                 if not ad_id:
@@ -422,13 +792,14 @@ def batch_find_users_for_ads(ads):
                 # Use repository to find matching users
                 matching_users = AdRepository.find_users_for_ad(db, ad_obj)
 
-                # Store results and cache them
+                # Store results, cached together below
                 results[ad_id] = matching_users
-                cache_key = get_entity_cache_key("matching_users", ad_id)
-                BaseCacheManager.set(cache_key, matching_users, CacheTTL.STANDARD)
+                computed[ad_id] = matching_users
 
                 aggregator.add_item({'ad_id': ad_id, 'matching_users': len(matching_users)}, success=True)
 
+            AdCacheManager.set_matching_users_many(computed)
+
         aggregator.log_summary()
         return results
 
@@ -465,6 +836,34 @@ def get_subscription_data_for_user(user_id: int) -> dict:
             return None
 
 
+@log_operation("async_get_subscription_data_for_user")
+async def async_get_subscription_data_for_user(user_id: int) -> dict:
+    """get_subscription_data_for_user for handlers, doesn't block the event loop"""
+    with log_context(logger, user_id=user_id):
+        cached_data = await SubscriptionCacheManager.async_get_user_subscriptions(user_id)
+        if cached_data:
+            logger.debug("Cache hit for subscription data", extra={'user_id': user_id})
+            return cached_data
+
+        try:
+            async with async_db_session() as db:
+                user_filter = await SubscriptionRepository.async_get_user_filters(db, user_id)
+
+            if user_filter:
+                await SubscriptionCacheManager.async_set_user_subscriptions(user_id, user_filter)
+                logger.debug("Cached subscription data", extra={'user_id': user_id})
+                return user_filter
+
+            logger.debug("No subscription data found", extra={'user_id': user_id})
+            return None
+        except Exception as e:
+            logger.error("Error getting subscription data", exc_info=True, extra={
+                'user_id': user_id,
+                'error_type': type(e).__name__
+            })
+            return None
+
+
 @log_operation("get_full_ad_data")
 def get_full_ad_data(ad_id: int):
     """Get complete ad data with related entities and caching"""
@@ -475,18 +874,54 @@ def get_full_ad_data(ad_id: int):
             logger.debug("Cache hit for full ad data", extra={'ad_id': ad_id})
             return cached_data
 
-        try:
+        def load():
             with db_session() as db:
                 ad_data = AdRepository.get_full_ad_data(db, ad_id)
 
-                if ad_data:
-                    # Cache the result using the cache manager
-                    AdCacheManager.set_full_ad_data(ad_id, ad_data)
-                    logger.debug("Cached full ad data", extra={'ad_id': ad_id})
-                else:
-                    logger.debug("No ad data found", extra={'ad_id': ad_id})
+            if ad_data:
+                # Cache the result using the cache manager
+                AdCacheManager.set_full_ad_data(ad_id, ad_data)
+                logger.debug("Cached full ad data", extra={'ad_id': ad_id})
+            else:
+                logger.debug("No ad data found", extra={'ad_id': ad_id})
 
-                return ad_data
+            return ad_data
+
+        try:
+            # An ad fanned out to many users misses everywhere at once, load it only once
+            return single_flight(
+                get_entity_cache_key("full_ad", ad_id),
+                lambda: AdCacheManager.get_full_ad_data(ad_id),
+                load
+            )
+        except Exception as e:
+            logger.error("Error getting full ad data", exc_info=True, extra={
+                'ad_id': ad_id,
+                'error_type': type(e).__name__
+            })
+            return None
+
+
+@log_operation("async_get_full_ad_data")
+async def async_get_full_ad_data(ad_id: int):
+    """get_full_ad_data for handlers, doesn't block the event loop"""
+    with log_context(logger, ad_id=ad_id):
+        cached_data = await AdCacheManager.async_get_full_ad_data(ad_id)
+        if cached_data:
+            logger.debug("Cache hit for full ad data", extra={'ad_id': ad_id})
+            return cached_data
+
+        async def load():
+            # Caches the result itself
+            async with async_db_session() as db:
+                return await AdRepository.async_get_full_ad_data(db, ad_id)
+
+        try:
+            return await async_single_flight(
+                get_entity_cache_key("full_ad", ad_id),
+                lambda: AdCacheManager.async_get_full_ad_data(ad_id),
+                load
+            )
         except Exception as e:
             logger.error("Error getting full ad data", exc_info=True, extra={
                 'ad_id': ad_id,
@@ -514,9 +949,8 @@ def batch_get_full_ad_data(ad_ids):
 
         results = {}
 
-        # Try to get from cache first
-        for ad_id in ad_ids:
-            cached_data = AdCacheManager.get_full_ad_data(ad_id)
+        # Try to get from cache first, in one round-trip
+        for ad_id, cached_data in AdCacheManager.get_full_ad_data_many(ad_ids).items():
             if cached_data:
                 results[ad_id] = cached_data
                 aggregator.add_item({'ad_id': ad_id, 'from_cache': True}, success=True)
@@ -528,21 +962,25 @@ def batch_get_full_ad_data(ad_ids):
             aggregator.log_summary()
             return results
 
-        # Process batches of missing ads
+        # Process batches of missing ads, one query per batch
         with db_session() as db:
             for i in range(0, len(missing_ad_ids), BATCH_SIZE):
                 batch = missing_ad_ids[i:i + BATCH_SIZE]
+                batch_data = AdRepository.get_full_ad_data_for_ads(db, batch)
 
                 for ad_id in batch:
-                    ad_data = AdRepository.get_full_ad_data(db, ad_id)
+                    ad_data = batch_data.get(ad_id)
                     if ad_data:
                         results[ad_id] = ad_data
-                        # Cache individual results
-                        AdCacheManager.set_full_ad_data(ad_id, ad_data)
                         aggregator.add_item({'ad_id': ad_id, 'from_db': True}, success=True)
                     else:
                         aggregator.add_item({'ad_id': ad_id, 'not_found': True}, success=False)
 
+                # Cache the batch in one round-trip
+                AdCacheManager.set_full_ad_data_many({
+                    ad_id: ad_data for ad_id, ad_data in batch_data.items() if ad_data
+                })
+
         aggregator.log_summary()
         return results
 
@@ -598,6 +1036,7 @@ def add_subscription(user_id, property_type, city_id, rooms_count, price_min, pr
 
             # Invalidate cache using the cache manager
             SubscriptionCacheManager.invalidate_all(user_id)
+            mark_subscription_changed(user_id)
 
             logger.info("Added subscription", extra={
                 'user_id': user_id,
@@ -649,6 +1088,7 @@ def remove_subscription(subscription_id: int, user_id: int) -> bool:
 
                 # Invalidate relevant cache entries
                 invalidate_user_filter_caches(user_id)
+                mark_subscription_changed(user_id)
 
                 logger.info("Removed subscription", extra={
                     'subscription_id': subscription_id,
@@ -694,6 +1134,7 @@ def update_subscription(subscription_id: int, user_id: int, new_values: dict):
 
                 # Invalidate cache using the cache manager
                 SubscriptionCacheManager.invalidate_all(user_id, subscription_id)
+                mark_subscription_changed(user_id)
 
                 logger.info("Updated subscription", extra={
                     'subscription_id': subscription_id,
@@ -780,6 +1221,28 @@ def list_favorites(user_id):
             return []
 
 
+@log_operation("async_list_favorites")
+async def async_list_favorites(user_id):
+    """list_favorites for handlers, doesn't block the event loop"""
+    with log_context(logger, user_id=user_id):
+        try:
+            # Checks and fills the cache itself
+            async with async_db_session() as db:
+                favorites = await FavoriteRepository.async_list_favorites(db, user_id)
+
+            logger.info("Listed favorites", extra={
+                'user_id': user_id,
+                'favorites_count': len(favorites)
+            })
+            return favorites
+        except Exception as e:
+            logger.error("Error listing favorites", exc_info=True, extra={
+                'user_id': user_id,
+                'error_type': type(e).__name__
+            })
+            return []
+
+
 @log_operation("remove_favorite_ad")
 def remove_favorite_ad(user_id: int, ad_id: int) -> bool:
     """Remove a favorite ad with cache invalidation"""
@@ -820,7 +1283,7 @@ def get_extra_images(resource_url):
             logger.debug("Cache hit for extra images", extra={'resource_url': resource_url[:50]})
             return cached_images
 
-        try:
+        def load():
             with db_session() as db:
                 # First, look up the ad using resource_url
                 ad = AdRepository.get_by_resource_url(db, resource_url)
@@ -831,14 +1294,17 @@ def get_extra_images(resource_url):
                 # Get images for the ad
                 images = AdRepository.get_ad_images(db, ad.id)
 
-                # Cache the result
-                BaseCacheManager.set(cache_key, images, CacheTTL.LONG)
+            # Cache the result
+            BaseCacheManager.set(cache_key, images, CacheTTL.LONG)
 
-                logger.info("Retrieved and cached extra images", extra={
-                    'resource_url': resource_url[:50],
-                    'image_count': len(images)
-                })
-                return images
+            logger.info("Retrieved and cached extra images", extra={
+                'resource_url': resource_url[:50],
+                'image_count': len(images)
+            })
+            return images
+
+        try:
+            return single_flight(cache_key, lambda: BaseCacheManager.get(cache_key), load)
         except Exception as e:
             logger.error("Error getting extra images", exc_info=True, extra={
                 'resource_url': resource_url[:50],
@@ -859,7 +1325,7 @@ def get_full_ad_description(resource_url):
 
         logger.info(f'Getting full ad description for resource_url: {resource_url}...')
 
-        try:
+        def load():
             with db_session() as db:
                 description = AdRepository.get_description_by_resource_url(db, resource_url)
 
@@ -874,6 +1340,13 @@ def get_full_ad_description(resource_url):
                 logger.warning("No description found", extra={'resource_url': resource_url[:50]})
 
             return description
+
+        try:
+            return single_flight(
+                get_entity_cache_key("ad_description", resource_url),
+                lambda: AdCacheManager.get_ad_description(resource_url),
+                load
+            )
         except Exception as e:
             logger.error("Error getting full ad description", exc_info=True, extra={
                 'resource_url': resource_url[:50],
@@ -971,6 +1444,7 @@ def start_free_subscription_of_user(user_id: int) -> bool:
 
             # Use centralized cache invalidation
             invalidate_user_caches(user_id)
+            mark_subscription_changed(user_id)
 
             logger.info("Started free subscription", extra={
                 'user_id': user_id,
@@ -1053,6 +1527,47 @@ def get_subscription_until_for_user(user_id: int, free: bool = False) -> Optiona
             return None
 
 
+@log_operation("async_get_subscription_until_for_user")
+async def async_get_subscription_until_for_user(user_id: int, free: bool = False) -> Optional[str]:
+    """get_subscription_until_for_user for handlers, doesn't block the event loop"""
+    with log_context(logger, user_id=user_id, free=free):
+        cache_key = get_entity_cache_key("user_subscription", user_id, "free" if free else "paid")
+        cached_date = await BaseCacheManager.async_get(cache_key)
+        if cached_date:
+            logger.debug("Cache hit for subscription date", extra={
+                'user_id': user_id,
+                'free': free
+            })
+            return cached_date
+
+        try:
+            async with async_db_session() as db:
+                user = await UserRepository.async_get_by_id(db, user_id)
+
+            if not user:
+                logger.warning("User not found", extra={'user_id': user_id})
+                return None
+
+            date_value = user.free_until if free else user.subscription_until
+            if not date_value:
+                logger.debug("No subscription date found", extra={
+                    'user_id': user_id,
+                    'free': free
+                })
+                return None
+
+            formatted_date = date_value.strftime("%d.%m.%Y") if isinstance(date_value, datetime) else str(date_value)
+            await BaseCacheManager.async_set(cache_key, formatted_date, CacheTTL.MEDIUM)
+            return formatted_date
+        except Exception as e:
+            logger.error("Error getting subscription date", exc_info=True, extra={
+                'user_id': user_id,
+                'free': free,
+                'error_type': type(e).__name__
+            })
+            return None
+
+
 @log_operation("get_ad_images")
 def get_ad_images(ad_id: Union[int, Dict[str, Any]]) -> List[str]:
     """
@@ -1116,6 +1631,7 @@ def disable_subscription_for_user(user_id: int) -> bool:
 
                 # Use centralized cache invalidation
                 invalidate_subscription_caches(user_id)
+                mark_subscription_changed(user_id)
 
                 logger.info("Disabled subscription", extra={
                     'user_id': user_id,
@@ -1148,6 +1664,7 @@ def enable_subscription_for_user(user_id: int) -> bool:
 
                 # Use centralized cache invalidation
                 invalidate_subscription_caches(user_id)
+                mark_subscription_changed(user_id)
 
                 logger.info("Enabled subscription", extra={
                     'user_id': user_id,
@@ -0,0 +1,268 @@
+# common/db/partitions.py
+
+"""
+Time partitions of ads and its child tables.
+
+ads is range partitioned by insert_time, ad_images and ad_phones by the copy
+of their ad's insert_time in ad_insert_time (see migration 0002). Partitions
+cover AD_PARTITION_CONFIG["interval_days"] days and are named after the table
+and their first day, e.g. ads_p20260105; the three tables are always
+partitioned alike. Rows no partition covers land in the <table>_default
+partitions.
+
+Retention drops whole intervals: the ads of an expired interval that must be
+kept (favorited, or chosen by the caller) are copied with their images and
+phones into the default partitions, then the interval's partitions are
+detached and dropped. The default partitions hold few rows and are cleaned up
+chunk by chunk, see iter_retained_ads.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from common.config import AD_PARTITION_CONFIG
+from common.utils.logging_config import log_operation, log_context
+
+# Import the common db logger
+from . import logger
+
+# Partitioned tables with their partition key, the ads table first
+PARTITIONED_TABLES = (
+    ("ads", "insert_time", "id"),
+    ("ad_images", "ad_insert_time", "ad_id"),
+    ("ad_phones", "ad_insert_time", "ad_id"),
+)
+
+# Interval boundaries are whole intervals away from this Monday
+PARTITION_EPOCH = datetime(2000, 1, 3)
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+# Ads read per query when walking a partition
+DEFAULT_CHUNK_SIZE = 500
+
+
+def partition_start(moment: datetime, interval_days: int) -> datetime:
+    """Start of the interval containing a moment"""
+    days = (moment - PARTITION_EPOCH).days
+    return PARTITION_EPOCH + timedelta(days=days - days % interval_days)
+
+
+def partition_suffix(start: datetime) -> str:
+    return f"_p{start:%Y%m%d}"
+
+
+def _literal(moment: datetime) -> str:
+    # Partition bounds are part of the DDL and can't be bind parameters
+    return f"'{moment:%Y-%m-%d %H:%M:%S}'"
+
+
+def list_partitions(db: Session, table: str = "ads") -> List[Tuple[str, datetime, datetime]]:
+    """(name, start, end) of the interval partitions of a table, oldest first"""
+    rows = db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {'table': table})
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_PATTERN.search(bound or "")
+        # The default partition has no range
+        if match:
+            partitions.append((name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _create_partition(db: Session, table: str, key: str, start: datetime, end: datetime) -> None:
+    name = table + partition_suffix(start)
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    # Rows of the range that arrived before the partition existed
+    db.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {table}_default WHERE {key} >= :start AND {key} < :end RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ), {'start': start, 'end': end})
+    # Indexes of the partitioned table are built on the new partition
+    db.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ({_literal(start)}) TO ({_literal(end)})"
+    ))
+
+
+@log_operation("ensure_ad_partitions")
+def ensure_ad_partitions(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the partitions of every interval from the newest existing one up to
+    AD_PARTITION_CONFIG["premake"] intervals after the current one.
+
+    Without partitions yet, starts at the interval of the oldest ad, so rows
+    copied by the migration leave the default partitions.
+
+    Returns:
+        Names of the created ads partitions
+    """
+    interval = AD_PARTITION_CONFIG["interval_days"]
+    now = now or datetime.now()
+    horizon = partition_start(now, interval) + timedelta(days=interval * (AD_PARTITION_CONFIG["premake"] + 1))
+
+    existing = list_partitions(db, "ads")
+    if existing:
+        start = existing[-1][2]
+    else:
+        oldest = db.execute(text("SELECT min(insert_time) FROM ads")).scalar()
+        start = partition_start(min(oldest or now, now), interval)
+
+    created = []
+    with log_context(logger, interval_days=interval, horizon=horizon.isoformat()):
+        while start < horizon:
+            end = start + timedelta(days=interval)
+            try:
+                for table, key, _ in PARTITIONED_TABLES:
+                    _create_partition(db, table, key, start, end)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error("Error creating ad partitions", exc_info=True, extra={
+                    'start': start.isoformat(),
+                    'error_type': type(e).__name__
+                })
+                raise
+            created.append("ads" + partition_suffix(start))
+            start = end
+
+        if created:
+            logger.info("Created ad partitions", extra={'partitions': created})
+    return created
+
+
+def iter_unfavorited_ads(
+        db: Session,
+        table: str,
+        older_than: Optional[datetime] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Walk the ads of a partition that nobody favorited, in chunks of
+    (id, resource_url) rows keyset paginated by ID. Every chunk is read in a
+    transaction of its own, so rows may be deleted between chunks.
+    """
+    condition = "AND a.insert_time < :older_than " if older_than else ""
+    after = 0
+    while True:
+        rows = db.execute(text(
+            f"SELECT a.id, a.resource_url FROM {table} a "
+            f"WHERE a.id > :after {condition}"
+            f"AND NOT EXISTS (SELECT 1 FROM favorite_ads f WHERE f.ad_id = a.id) "
+            f"ORDER BY a.id LIMIT :limit"
+        ), {'after': after, 'older_than': older_than, 'limit': chunk_size}).fetchall()
+        db.commit()
+        if not rows:
+            return
+        yield [(row.id, row.resource_url) for row in rows]
+        after = rows[-1].id
+
+
+@log_operation("drop_expired_ad_partitions")
+def drop_expired_ad_partitions(
+        db: Session,
+        cutoff: datetime,
+        keep: Optional[Callable[[List[Tuple[int, str]]], List[int]]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Drop the partitions of every interval that ended before the cutoff.
+
+    Favorited ads, and the ads for which keep(ads) returns the ID when given
+    the other ads of an interval in chunks of (id, resource_url) rows, are
+    kept: they are copied with their images and phones into the default
+    partitions first. keep runs before the partitions are locked.
+
+    Returns:
+        'partitions': names of the dropped ads partitions,
+        'ads': (id, resource_url) of the dropped ads,
+        'images': image URLs of the dropped ads,
+        'kept': IDs of the kept ads
+    """
+    result = {'partitions': [], 'ads': [], 'images': [], 'kept': []}
+
+    for name, start, end in list_partitions(db, "ads"):
+        if end > cutoff:
+            break
+
+        suffix = partition_suffix(start)
+        with log_context(logger, partition=name):
+            kept = set()
+            if keep:
+                for chunk in iter_unfavorited_ads(db, name, chunk_size=chunk_size):
+                    kept.update(keep(chunk))
+
+            try:
+                # No ad of the interval can be favorited until its partitions are gone
+                db.execute(text("LOCK TABLE favorite_ads IN SHARE MODE"))
+                kept.update(db.execute(text(
+                    f"SELECT DISTINCT a.id FROM ads{suffix} a JOIN favorite_ads f ON f.ad_id = a.id"
+                )).scalars())
+                kept_ids = list(kept)
+
+                dropped_rows = db.execute(text(
+                    f"SELECT id, resource_url, external_id FROM ads{suffix} WHERE NOT (id = ANY(:kept))"
+                ), {'kept': kept_ids}).fetchall()
+                dropped = [(row.id, row.resource_url) for row in dropped_rows]
+                images = db.execute(text(
+                    f"SELECT image_url FROM ad_images{suffix} WHERE NOT (ad_id = ANY(:kept))"
+                ), {'kept': kept_ids}).scalars().all()
+
+                for table, _, ad_column in PARTITIONED_TABLES:
+                    db.execute(text(
+                        f"CREATE TEMP TABLE kept_{table} ON COMMIT DROP AS "
+                        f"SELECT * FROM {table}{suffix} WHERE {ad_column} = ANY(:kept)"
+                    ), {'kept': kept_ids})
+                # Child partitions first, their rows belong to the ads partition
+                for table, _, _ in reversed(PARTITIONED_TABLES):
+                    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {table}{suffix}"))
+                    db.execute(text(f"DROP TABLE {table}{suffix}"))
+                # The range has no partition anymore, kept rows are routed to the default ones
+                for table, _, _ in PARTITIONED_TABLES:
+                    db.execute(text(f"INSERT INTO {table} SELECT * FROM kept_{table}"))
+                # Dropped ads can be inserted again when scraped later (see migration 0004)
+                db.execute(text(
+                    "DELETE FROM ad_external_ids e WHERE e.external_id = ANY(:external_ids) "
+                    "AND NOT EXISTS (SELECT 1 FROM ads a WHERE a.external_id = e.external_id)"
+                ), {'external_ids': [row.external_id for row in dropped_rows]})
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error("Error dropping ad partition", exc_info=True, extra={
+                    'partition': name,
+                    'error_type': type(e).__name__
+                })
+                raise
+
+            result['partitions'].append(name)
+            result['ads'].extend(dropped)
+            result['images'].extend(images)
+            result['kept'].extend(kept_ids)
+            logger.info("Dropped expired ad partition", extra={
+                'ads_dropped': len(dropped),
+                'ads_kept': len(kept_ids),
+                'images': len(images)
+            })
+
+    return result
+
+
+def iter_retained_ads(
+        db: Session,
+        cutoff: datetime,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Chunks of (id, resource_url) of the ads kept in the default partition past
+    the cutoff that are no longer favorited, see iter_unfavorited_ads.
+    """
+    return iter_unfavorited_ads(db, "ads_default", older_than=cutoff, chunk_size=chunk_size)
@@ -0,0 +1,134 @@
+# common/db/pool.py
+
+"""
+Connection pool settings and metrics shared by every engine of a process.
+
+Each process has one pool per engine (see common.db.session), sized from
+DB_POOL_CONFIG: a Celery prefork child runs one task at a time and needs a
+single connection, a process running N threads or concurrent handlers needs N.
+Raw psycopg2 access (common.db.database) borrows connections from the same
+pool instead of keeping its own.
+
+The pools record how long checkouts wait and how long connections stay
+checked out, see pool_status.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from common.config import DB_POOL_CONFIG
+
+
+class PoolWaitStats:
+    """Checkout wait times and checked out connections of one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._checked_out_at = {}  # id(connection record) -> monotonic checkout time
+
+    def record_checkout(self, record, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._checked_out_at[id(record)] = time.monotonic()
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_checkin(self, record) -> None:
+        with self._lock:
+            self._checked_out_at.pop(id(record), None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            held = [now - since for since in self._checked_out_at.values()]
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': self.total_wait / self.checkouts * 1000 if self.checkouts else 0,
+                'max_wait_ms': self.max_wait * 1000,
+                'longest_held_seconds': max(held) if held else 0,
+                'held_over_10_minutes': sum(1 for age in held if age > 600),
+            }
+
+
+class _WaitTimingMixin:
+    """Times checkouts of a QueuePool, see PoolWaitStats"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.monotonic()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record_timeout(time.monotonic() - start)
+            raise
+        self.wait_stats.record_checkout(record, time.monotonic() - start)
+        return record
+
+    def _do_return_conn(self, record):
+        self.wait_stats.record_checkin(record)
+        super()._do_return_conn(record)
+
+
+class TimedQueuePool(_WaitTimingMixin, QueuePool):
+    """QueuePool recording checkout wait times"""
+
+
+class TimedAsyncAdaptedQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording checkout wait times"""
+
+
+def pool_size() -> int:
+    """Connections kept open per pool: DB_POOL_SIZE, or one per concurrent unit of work"""
+    return DB_POOL_CONFIG["size"] or max(1, DB_POOL_CONFIG["concurrency"])
+
+
+def engine_options(use_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments of create_engine / create_async_engine for the configured pool"""
+    options = {
+        'poolclass': TimedAsyncAdaptedQueuePool if use_async else TimedQueuePool,
+        'pool_size': pool_size(),
+        'max_overflow': DB_POOL_CONFIG["max_overflow"],
+        'pool_timeout': DB_POOL_CONFIG["timeout"],
+        'pool_recycle': DB_POOL_CONFIG["recycle"],
+        'pool_pre_ping': True,
+    }
+    if use_async and DB_POOL_CONFIG["pgbouncer"]:
+        # In transaction mode consecutive transactions may run on different server
+        # connections, prepared statements must not outlive a statement
+        options['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+    return options
+
+
+def pool_status(pool) -> Dict[str, Any]:
+    """Usage and wait time metrics of a pool"""
+    status = {
+        'pool_size': pool.size(),
+        'max_overflow': DB_POOL_CONFIG["max_overflow"],
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        # Negative while fewer than pool_size connections have been opened
+        'overflow': max(0, pool.overflow()),
+    }
+    capacity = status['pool_size'] + status['max_overflow']
+    status['usage_percent'] = status['checked_out'] / capacity * 100 if capacity else 0
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats is not None:
+        status.update(wait_stats.as_dict())
+    return status
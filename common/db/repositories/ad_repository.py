@@ -1,15 +1,17 @@
 # common/db/repositories/ad_repository.py
 
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 import decimal
 import json
 from datetime import datetime, timedelta
 
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, any_, literal, String, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
 from common.db.models import FavoriteAd
-from common.db.models.ad import Ad, AdImage, AdPhone
+from common.db.models.ad import Ad, AdExternalId, AdImage, AdPhone
 from common.utils.cache import redis_cache, CacheTTL
 from common.config import GEO_ID_MAPPING, get_key_by_value
 from common.utils.cache_invalidation import invalidate_ad_caches
@@ -50,6 +52,24 @@ class AdRepository:
                 logger.debug("No ad found for external ID", extra={'external_id': external_id})
             return ad
 
+    @staticmethod
+    @log_operation("get_existing_external_ids")
+    def get_existing_external_ids(db: Session, external_ids: List[str]) -> set:
+        """Return which of the given external IDs are already stored, in a single query"""
+        if not external_ids:
+            return set()
+
+        with log_context(logger, external_id_count=len(external_ids)):
+            rows = db.query(Ad.external_id).filter(
+                Ad.external_id == any_(literal(list(external_ids), ARRAY(String)))
+            ).all()
+            existing = {row[0] for row in rows}
+            logger.debug("Checked existing external IDs", extra={
+                'checked': len(external_ids),
+                'existing': len(existing)
+            })
+            return existing
+
     @staticmethod
     @log_operation("get_ad_by_resource_url")
     def get_by_resource_url(db: Session, resource_url: str) -> Optional[Ad]:
@@ -67,10 +87,15 @@ class AdRepository:
 
     @staticmethod
     @log_operation("create_ad")
-    def create_ad(db: Session, ad_data: Dict[str, Any]) -> Ad:
-        """Create a new ad"""
+    def create_ad(db: Session, ad_data: Dict[str, Any]) -> Optional[Ad]:
+        """Create a new ad, None when an ad with its external_id already exists"""
         with log_context(logger, external_id=ad_data.get('external_id')):
-            ad = Ad(**ad_data)
+            if not AdRepository.claim_external_ids(db, [ad_data['external_id']]):
+                logger.info("Ad already exists", extra={'external_id': ad_data['external_id']})
+                return None
+
+            # insert_time is the partition key and can't be NULL
+            ad = Ad(**dict(ad_data, insert_time=ad_data.get('insert_time') or datetime.now()))
             db.add(ad)
             db.commit()
             db.refresh(ad)
@@ -113,6 +138,8 @@ class AdRepository:
                 return False
 
             db.delete(ad)
+            db.flush()
+            AdRepository.release_external_ids(db, [ad.external_id])
             db.commit()
             logger.info("Deleted ad", extra={'ad_id': ad_id})
             return True
@@ -181,24 +208,7 @@ class AdRepository:
                 return None
 
             # Convert to dict
-            ad_dict = {
-                "id": ad.id,
-                "external_id": ad.external_id,
-                "property_type": ad.property_type,
-                "city": ad.city,
-                "address": ad.address,
-                "price": float(ad.price) if isinstance(ad.price, decimal.Decimal) else ad.price,
-                "square_feet": float(ad.square_feet) if isinstance(ad.square_feet, decimal.Decimal) else ad.square_feet,
-                "rooms_count": ad.rooms_count,
-                "floor": ad.floor,
-                "total_floors": ad.total_floors,
-                "insert_time": ad.insert_time.isoformat() if ad.insert_time else None,
-                "description": ad.description,
-                "resource_url": ad.resource_url,
-                "images": [img.image_url for img in ad.images],
-                "phones": [phone.phone for phone in ad.phones if phone.phone],
-                "viber_link": next((phone.viber_link for phone in ad.phones if phone.viber_link), None)
-            }
+            ad_dict = AdRepository.to_full_ad_data(ad)
 
             # Cache the result
             AdCacheManager.set_full_ad_data(ad_id, ad_dict)
@@ -206,12 +216,112 @@ class AdRepository:
 
             return ad_dict
 
+    @staticmethod
+    @log_operation("async_get_full_ad_data")
+    async def async_get_full_ad_data(db: AsyncSession, ad_id: int) -> Optional[Dict[str, Any]]:
+        """Get complete ad data with images and phones, without blocking the event loop"""
+        with log_context(logger, ad_id=ad_id):
+            cached_data = await AdCacheManager.async_get_full_ad_data(ad_id)
+            if cached_data:
+                logger.debug("Cache hit for full ad data", extra={'ad_id': ad_id})
+                return cached_data
+
+            query = select(Ad) \
+                .options(joinedload(Ad.images), joinedload(Ad.phones)) \
+                .filter(Ad.id == ad_id)
+            ad = (await db.execute(query)).unique().scalars().first()
+
+            if not ad:
+                logger.debug("No ad found for full data", extra={'ad_id': ad_id})
+                return None
+
+            ad_dict = AdRepository.to_full_ad_data(ad)
+
+            await AdCacheManager.async_set_full_ad_data(ad_id, ad_dict)
+            logger.debug("Cached full ad data", extra={'ad_id': ad_id})
+
+            return ad_dict
+
+    @staticmethod
+    def to_full_ad_data(ad: Ad) -> Dict[str, Any]:
+        """Convert an ad with loaded images and phones to the full ad data dict"""
+        return {
+            "id": ad.id,
+            "external_id": ad.external_id,
+            "property_type": ad.property_type,
+            "city": ad.city,
+            "address": ad.address,
+            "price": float(ad.price) if isinstance(ad.price, decimal.Decimal) else ad.price,
+            "square_feet": float(ad.square_feet) if isinstance(ad.square_feet, decimal.Decimal) else ad.square_feet,
+            "rooms_count": ad.rooms_count,
+            "floor": ad.floor,
+            "total_floors": ad.total_floors,
+            "insert_time": ad.insert_time.isoformat() if ad.insert_time else None,
+            "description": ad.description,
+            "resource_url": ad.resource_url,
+            "images": [img.image_url for img in ad.images],
+            "phones": [phone.phone for phone in ad.phones if phone.phone],
+            "viber_link": next((phone.viber_link for phone in ad.phones if phone.viber_link), None)
+        }
+
+    @staticmethod
+    @log_operation("get_full_ad_data_for_ads")
+    def get_full_ad_data_for_ads(db: Session, ad_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get complete data of many ads, with images and phones, in one query.
+        Does not use the cache, see batch_get_full_ad_data.
+
+        Returns:
+            Mapping of ad_id to full ad data, missing ads are left out
+        """
+        if not ad_ids:
+            return {}
+
+        with log_context(logger, ad_count=len(ad_ids)):
+            ads = db.query(Ad) \
+                .options(joinedload(Ad.images), joinedload(Ad.phones)) \
+                .filter(Ad.id.in_(ad_ids)) \
+                .all()
+
+            logger.debug("Retrieved full data for ads", extra={
+                'requested': len(ad_ids),
+                'found': len(ads)
+            })
+            return {ad.id: AdRepository.to_full_ad_data(ad) for ad in ads}
+
+    @staticmethod
+    @log_operation("get_insert_times")
+    def get_insert_times(db: Session, ad_ids: List[int]) -> Dict[int, datetime]:
+        """
+        Get insert_time of many ads in one query. Rows of ad_images and ad_phones
+        store it as their partition key ad_insert_time.
+        """
+        if not ad_ids:
+            return {}
+        rows = db.query(Ad.id, Ad.insert_time).filter(Ad.id.in_(set(ad_ids))).all()
+        return {row.id: row.insert_time for row in rows}
+
+    @staticmethod
+    def _with_ad_insert_times(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill in ad_insert_time of child rows, rows of unknown ads are left out"""
+        missing = [row['ad_id'] for row in rows if not row.get('ad_insert_time')]
+        insert_times = AdRepository.get_insert_times(db, missing)
+        return [
+            row if row.get('ad_insert_time') else dict(row, ad_insert_time=insert_times[row['ad_id']])
+            for row in rows
+            if row.get('ad_insert_time') or row['ad_id'] in insert_times
+        ]
+
     @staticmethod
     @log_operation("add_image")
     def add_image(db: Session, ad_id: int, image_url: str) -> AdImage:
         """Add an image to an ad"""
         with log_context(logger, ad_id=ad_id, image_url=image_url[:100]):
-            image = AdImage(ad_id=ad_id, image_url=image_url)
+            image = AdImage(
+                ad_id=ad_id,
+                ad_insert_time=AdRepository.get_insert_times(db, [ad_id]).get(ad_id),
+                image_url=image_url
+            )
             db.add(image)
             db.commit()
             db.refresh(image)
@@ -230,7 +340,12 @@ class AdRepository:
     def add_phone(db: Session, ad_id: int, phone: str, viber_link: Optional[str] = None) -> AdPhone:
         """Add a phone to an ad"""
         with log_context(logger, ad_id=ad_id, has_viber=bool(viber_link)):
-            ad_phone = AdPhone(ad_id=ad_id, phone=phone, viber_link=viber_link)
+            ad_phone = AdPhone(
+                ad_id=ad_id,
+                ad_insert_time=AdRepository.get_insert_times(db, [ad_id]).get(ad_id),
+                phone=phone,
+                viber_link=viber_link
+            )
             db.add(ad_phone)
             db.commit()
             db.refresh(ad_phone)
@@ -245,6 +360,144 @@ class AdRepository:
             })
             return ad_phone
 
+    @staticmethod
+    @log_operation("bulk_create_ads")
+    def bulk_create_ads(db: Session, ads_data: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Insert many ads with one INSERT ... RETURNING statement, skipping the
+        ads whose external_id is already stored (or repeated in ads_data).
+        The caller is responsible for committing.
+
+        Returns:
+            Mapping of external_id to database ID for the ads actually inserted
+        """
+        if not ads_data:
+            return {}
+
+        with log_context(logger, ad_count=len(ads_data)):
+            claimed = AdRepository.claim_external_ids(db, [row['external_id'] for row in ads_data])
+            # insert_time is the partition key and can't be NULL
+            now = datetime.now()
+            rows = {}
+            for row in ads_data:
+                if row['external_id'] in claimed:
+                    rows.setdefault(row['external_id'], dict(row, insert_time=row.get('insert_time') or now))
+
+            inserted = {}
+            if rows:
+                stmt = insert(Ad).values(list(rows.values())).returning(Ad.id, Ad.external_id)
+                inserted = {row.external_id: row.id for row in db.execute(stmt)}
+            logger.info("Bulk inserted ads", extra={
+                'requested': len(ads_data),
+                'inserted': len(inserted),
+                'skipped': len(ads_data) - len(inserted)
+            })
+            return inserted
+
+    @staticmethod
+    def claim_external_ids(db: Session, external_ids: List[str]) -> set:
+        """
+        Store external IDs in ad_external_ids and return those that weren't
+        stored yet: only their ads may be inserted, in the same transaction.
+        The unique constraint of the partitioned ads table contains
+        insert_time, so it can't reject duplicates itself.
+        """
+        external_ids = list(dict.fromkeys(external_ids))
+        if not external_ids:
+            return set()
+        stmt = insert(AdExternalId).values(
+            [{'external_id': external_id} for external_id in external_ids]
+        ).on_conflict_do_nothing().returning(AdExternalId.external_id)
+        return set(db.execute(stmt).scalars())
+
+    @staticmethod
+    def release_external_ids(db: Session, external_ids: List[str]) -> None:
+        """
+        Remove external IDs no ad has anymore from ad_external_ids, so the ads
+        can be inserted again when scraped later. Runs in the caller's transaction,
+        after the ads were deleted.
+        """
+        external_ids = list(dict.fromkeys(external_ids))
+        if not external_ids:
+            return
+        db.execute(text(
+            "DELETE FROM ad_external_ids e WHERE e.external_id = ANY(:external_ids) "
+            "AND NOT EXISTS (SELECT 1 FROM ads a WHERE a.external_id = e.external_id)"
+        ), {'external_ids': external_ids})
+
+    @staticmethod
+    @log_operation("bulk_add_images")
+    def bulk_add_images(db: Session, images: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert many ad_images rows ({'ad_id', 'image_url'}) in one statement,
+        ad_insert_time is looked up if missing.
+        The caller is responsible for committing and for invalidating caches of existing ads.
+        """
+        if not images:
+            return []
+
+        with log_context(logger, image_count=len(images)):
+            images = AdRepository._with_ad_insert_times(db, images)
+            if not images:
+                return []
+            stmt = insert(AdImage).values(images).on_conflict_do_nothing().returning(AdImage.id)
+            image_ids = [row.id for row in db.execute(stmt)]
+
+            logger.info("Bulk inserted ad images", extra={'image_count': len(image_ids)})
+            return image_ids
+
+    @staticmethod
+    @log_operation("bulk_add_phones")
+    def bulk_add_phones(db: Session, phones: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert many ad_phones rows ({'ad_id', 'phone', 'viber_link'}) in one statement,
+        ad_insert_time is looked up if missing.
+        The caller is responsible for committing and for invalidating caches of existing ads.
+        """
+        if not phones:
+            return []
+
+        with log_context(logger, phone_count=len(phones)):
+            phones = AdRepository._with_ad_insert_times(db, phones)
+            if not phones:
+                return []
+            stmt = insert(AdPhone).values(phones).on_conflict_do_nothing().returning(AdPhone.id)
+            phone_ids = [row.id for row in db.execute(stmt)]
+
+            logger.info("Bulk inserted ad phones", extra={'phone_count': len(phone_ids)})
+            return phone_ids
+
+    @staticmethod
+    @log_operation("get_images_for_ads")
+    def get_images_for_ads(db: Session, ad_ids: List[int]) -> List[Any]:
+        """
+        Get the images of many ads in one query as (id, ad_id, image_url, external_id) rows.
+        """
+        if not ad_ids:
+            return []
+        with log_context(logger, ad_count=len(ad_ids)):
+            return db.query(
+                AdImage.id, AdImage.ad_id, AdImage.image_url, Ad.external_id
+            ).join(Ad, Ad.id == AdImage.ad_id).filter(
+                AdImage.ad_id.in_(ad_ids)
+            ).order_by(AdImage.id).all()
+
+    @staticmethod
+    @log_operation("bulk_update_image_urls")
+    def bulk_update_image_urls(db: Session, image_urls: Dict[int, str]) -> int:
+        """
+        Replace image_url of many ad_images rows, keyed by row ID, in one executemany.
+        The caller is responsible for committing and invalidating ad caches.
+        """
+        if not image_urls:
+            return 0
+        with log_context(logger, image_count=len(image_urls)):
+            db.bulk_update_mappings(AdImage, [
+                {'id': image_id, 'image_url': url} for image_id, url in image_urls.items()
+            ])
+            logger.info("Bulk updated image URLs", extra={'image_count': len(image_urls)})
+            return len(image_urls)
+
     @staticmethod
     @log_operation("get_ad_images")
     def get_ad_images(db: Session, ad_id: int) -> List[str]:
@@ -357,6 +610,39 @@ class AdRepository:
             })
             return ads
 
+    @staticmethod
+    def build_matching_users_query(db: Session, property_type, city, rooms, price):
+        """
+        Build the query selecting ids of active users whose non-paused filters match
+        the given ad properties. NULL filter columns act as wildcards.
+        """
+        from common.db.models.user import User
+        from common.db.models.subscription import UserFilter
+
+        now = datetime.now()
+        query = db.query(User.id).join(UserFilter, User.id == UserFilter.user_id)
+
+        # Filter for active users only
+        query = query.filter(or_(
+            User.free_until > now,
+            User.subscription_until > now
+        ))
+
+        # Filter for non-paused subscriptions
+        query = query.filter(UserFilter.is_paused == False)
+
+        return query.filter(and_(
+            # Property type filter (if set)
+            or_(UserFilter.property_type == None, UserFilter.property_type == property_type),
+            # City filter (if set)
+            or_(UserFilter.city == None, UserFilter.city == city),
+            # Rooms filter (array containment, served by the GIN index on rooms_count)
+            or_(UserFilter.rooms_count == None, UserFilter.rooms_count.contains([rooms])),
+            # Price range filter
+            or_(UserFilter.price_min == None, price >= UserFilter.price_min),
+            or_(UserFilter.price_max == None, price <= UserFilter.price_max)
+        ))
+
     @staticmethod
     @log_operation("find_users_for_ad")
     def find_users_for_ad(db: Session, ad) -> List[int]:
@@ -364,9 +650,6 @@ class AdRepository:
         Finds users whose subscription filters match this ad.
         Uses caching to improve performance.
         """
-        from common.db.models.user import User
-        from common.db.models.subscription import UserFilter
-
         # Get ad ID for logging
         ad_id = ad.id if hasattr(ad, 'id') else ad.get('id')
 
@@ -401,51 +684,9 @@ class AdRepository:
                     ad_price = ad.get('price')
 
                 # Query users with matching filters
-                query = db.query(User.id).join(UserFilter, User.id == UserFilter.user_id)
-
-                # Filter for active users only
-                query = query.filter(or_(
-                    User.free_until > datetime.now(),
-                    User.subscription_until > datetime.now()
-                ))
-
-                # Filter for non-paused subscriptions
-                query = query.filter(UserFilter.is_paused == False)
-
-                # Apply ad property filters
-                filters = []
-
-                # Property type filter (if set)
-                filters.append(or_(
-                    UserFilter.property_type == None,
-                    UserFilter.property_type == ad_property_type
-                ))
-
-                # City filter (if set)
-                filters.append(or_(
-                    UserFilter.city == None,
-                    UserFilter.city == ad_city
-                ))
-
-                # Rooms filter (array membership)
-                filters.append(or_(
-                    UserFilter.rooms_count == None,
-                    UserFilter.rooms_count.any(ad_rooms)
-                ))
-
-                # Price range filter
-                filters.append(or_(
-                    UserFilter.price_min == None,
-                    ad_price >= UserFilter.price_min
-                ))
-
-                filters.append(or_(
-                    UserFilter.price_max == None,
-                    ad_price <= UserFilter.price_max
-                ))
-
-                # Apply all filters
-                query = query.filter(and_(*filters))
+                query = AdRepository.build_matching_users_query(
+                    db, ad_property_type, ad_city, ad_rooms, ad_price
+                )
 
                 # Execute query
                 results = query.all()
@@ -491,6 +732,8 @@ class AdRepository:
 
                 # Delete the ad itself
                 db.delete(ad)
+                db.flush()
+                AdRepository.release_external_ids(db, [ad.external_id])
                 db.commit()
 
                 # Use centralized cache invalidation
@@ -512,6 +755,92 @@ class AdRepository:
                 })
                 return False
 
+    @staticmethod
+    @log_operation("delete_many_with_related")
+    def delete_many_with_related(db: Session, ad_ids: List[int]) -> Dict[str, List]:
+        """
+        Delete ads and all their related data with one statement per table in
+        one transaction.
+
+        Returns:
+            'ads': IDs of the deleted ads,
+            'images': URLs of their deleted images (to remove from S3)
+        """
+        if not ad_ids:
+            return {'ads': [], 'images': []}
+
+        with log_context(logger, ad_count=len(ad_ids)):
+            try:
+                favorites_count = db.query(FavoriteAd).filter(
+                    FavoriteAd.ad_id.in_(ad_ids)
+                ).delete(synchronize_session=False)
+                phones_count = db.query(AdPhone).filter(
+                    AdPhone.ad_id.in_(ad_ids)
+                ).delete(synchronize_session=False)
+                images = db.execute(
+                    AdImage.__table__.delete().where(AdImage.ad_id.in_(ad_ids)).returning(AdImage.image_url)
+                ).scalars().all()
+                deleted = db.execute(
+                    Ad.__table__.delete().where(Ad.id.in_(ad_ids)).returning(
+                        Ad.id, Ad.resource_url, Ad.external_id
+                    )
+                ).fetchall()
+                AdRepository.release_external_ids(db, [row.external_id for row in deleted])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error("Error deleting ads", exc_info=True, extra={
+                    'ad_count': len(ad_ids),
+                    'error_type': type(e).__name__
+                })
+                return {'ads': [], 'images': []}
+
+            for ad_id, resource_url, _ in deleted:
+                invalidate_ad_caches(ad_id, resource_url)
+
+            logger.info("Successfully deleted ads and related data", extra={
+                'ads_deleted': len(deleted),
+                'favorites_deleted': favorites_count,
+                'phones_deleted': phones_count,
+                'images_deleted': len(images)
+            })
+            return {'ads': [row.id for row in deleted], 'images': images}
+
+    @staticmethod
+    @log_operation("get_referenced_image_urls")
+    def get_referenced_image_urls(db: Session, image_urls: List[str], chunk_size: int = 1000) -> set:
+        """
+        Which of the image URLs some ad_images row still points to. Mirrored
+        images are shared by every ad with the same photo.
+        """
+        image_urls = list(dict.fromkeys(image_urls))
+        referenced = set()
+        with log_context(logger, image_count=len(image_urls)):
+            for i in range(0, len(image_urls), chunk_size):
+                rows = db.query(AdImage.image_url).filter(
+                    AdImage.image_url == any_(literal(image_urls[i:i + chunk_size], ARRAY(String)))
+                ).distinct().all()
+                referenced.update(row[0] for row in rows)
+            return referenced
+
+    @staticmethod
+    def iter_image_keys(db: Session, prefix: str) -> Iterator[str]:
+        """
+        Stream the S3 keys referenced by ad_images under a prefix, in byte
+        order like S3 listings (the path of the CloudFront or S3 URL is the key).
+
+        The rows are read through a server side cursor, the caller's
+        transaction stays open until the iterator is exhausted.
+        """
+        result = db.execute(text(
+            "SELECT key FROM ("
+            "SELECT substring(image_url from '^(?:[a-z]+://)?[^/]+/(.*)$') AS key FROM ad_images"
+            ") image_keys WHERE left(key, :prefix_length) = :prefix "
+            "ORDER BY key COLLATE \"C\""
+        ).execution_options(stream_results=True), {'prefix': prefix, 'prefix_length': len(prefix)})
+        for key in result.scalars():
+            yield key
+
     @staticmethod
     @log_operation("get_ads_older_than")
     def get_older_than(db: Session, cutoff_date: datetime) -> List[Ad]:
@@ -3,6 +3,8 @@
 from typing import List, Dict, Any, Optional
 import decimal
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql import func
 
@@ -43,27 +45,8 @@ class FavoriteRepository:
             result = []
 
             for fav in favorites:
-                ad = fav.ad
-                ad_dict = {
-                    "favorite_id": fav.id,
-                    "ad_id": ad.id,
-                    "price": float(ad.price) if isinstance(ad.price, decimal.Decimal) else ad.price,
-                    "address": ad.address,
-                    "city": ad.city,
-                    "property_type": ad.property_type,
-                    "rooms_count": ad.rooms_count,
-                    "resource_url": ad.resource_url,
-                    "external_id": ad.external_id,
-                    "square_feet": float(ad.square_feet) if isinstance(ad.square_feet,
-                                                                       decimal.Decimal) else ad.square_feet,
-                    "floor": ad.floor,
-                    "total_floors": ad.total_floors,
-                    "images": [img.image_url for img in ad.images],
-                    "phones": [phone.phone for phone in ad.phones if phone.phone],
-                    "viber_link": next((phone.viber_link for phone in ad.phones if phone.viber_link), None)
-                }
-                result.append(ad_dict)
-                aggregator.add_item({'ad_id': ad.id}, success=True)
+                result.append(FavoriteRepository.to_favorite_dict(fav))
+                aggregator.add_item({'ad_id': fav.ad.id}, success=True)
 
             # Cache the result
             FavoriteCacheManager.set_user_favorites(user_id, result)
@@ -76,6 +59,59 @@ class FavoriteRepository:
 
             return result
 
+    @staticmethod
+    @log_operation("async_list_favorites")
+    async def async_list_favorites(db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """List user's favorite ads with eager loading and caching, without blocking the event loop"""
+        with log_context(logger, user_id=user_id):
+            cached_favorites = await FavoriteCacheManager.async_get_user_favorites(user_id)
+            if cached_favorites:
+                logger.debug("Cache hit for user favorites", extra={'user_id': user_id})
+                return cached_favorites
+
+            # Lazy loading isn't available on an AsyncSession, everything is loaded up front
+            query = select(FavoriteAd) \
+                .filter(FavoriteAd.user_id == user_id) \
+                .options(
+                joinedload(FavoriteAd.ad).joinedload(Ad.images),
+                joinedload(FavoriteAd.ad).joinedload(Ad.phones)
+            ) \
+                .order_by(FavoriteAd.created_at.desc())
+            favorites = (await db.execute(query)).unique().scalars().all()
+
+            result = [FavoriteRepository.to_favorite_dict(fav) for fav in favorites]
+
+            await FavoriteCacheManager.async_set_user_favorites(user_id, result)
+
+            logger.debug("Retrieved and cached user favorites", extra={
+                'user_id': user_id,
+                'favorite_count': len(result)
+            })
+
+            return result
+
+    @staticmethod
+    def to_favorite_dict(fav: FavoriteAd) -> Dict[str, Any]:
+        """Convert a favorite with its loaded ad, images and phones to the dict returned by list_favorites"""
+        ad = fav.ad
+        return {
+            "favorite_id": fav.id,
+            "ad_id": ad.id,
+            "price": float(ad.price) if isinstance(ad.price, decimal.Decimal) else ad.price,
+            "address": ad.address,
+            "city": ad.city,
+            "property_type": ad.property_type,
+            "rooms_count": ad.rooms_count,
+            "resource_url": ad.resource_url,
+            "external_id": ad.external_id,
+            "square_feet": float(ad.square_feet) if isinstance(ad.square_feet, decimal.Decimal) else ad.square_feet,
+            "floor": ad.floor,
+            "total_floors": ad.total_floors,
+            "images": [img.image_url for img in ad.images],
+            "phones": [phone.phone for phone in ad.phones if phone.phone],
+            "viber_link": next((phone.viber_link for phone in ad.phones if phone.viber_link), None)
+        }
+
     @staticmethod
     @log_operation("add_favorite")
     def add_favorite(db: Session, user_id: int, ad_id: int) -> Optional[FavoriteAd]:
@@ -3,7 +3,8 @@
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from common.db.models.subscription import UserFilter
@@ -39,22 +40,7 @@ class SubscriptionRepository:
                 return None
 
             # Convert to dict
-            filters_dict = {
-                "id": filters.id,
-                "user_id": filters.user_id,
-                "property_type": filters.property_type,
-                "city": filters.city,
-                "rooms_count": filters.rooms_count,
-                "price_min": filters.price_min,
-                "price_max": filters.price_max,
-                "is_paused": filters.is_paused,
-                "floor_max": filters.floor_max,
-                "is_not_first_floor": filters.is_not_first_floor,
-                "is_not_last_floor": filters.is_not_last_floor,
-                "is_last_floor_only": filters.is_last_floor_only,
-                "pets_allowed": filters.pets_allowed,
-                "without_broker": filters.without_broker
-            }
+            filters_dict = SubscriptionRepository.to_filters_dict(filters)
 
             # Cache the result
             UserCacheManager.set_filters(user_id, filters_dict)
@@ -62,6 +48,49 @@ class SubscriptionRepository:
 
             return filters_dict
 
+    @staticmethod
+    @log_operation("async_get_user_filters")
+    async def async_get_user_filters(db: AsyncSession, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user filters with caching, without blocking the event loop"""
+        with log_context(logger, user_id=user_id):
+            cached_filters = await UserCacheManager.async_get_filters(user_id)
+            if cached_filters:
+                logger.debug("Cache hit for user filters", extra={'user_id': user_id})
+                return cached_filters
+
+            result = await db.execute(select(UserFilter).filter(UserFilter.user_id == user_id).limit(1))
+            filters = result.scalars().first()
+            if not filters:
+                logger.debug("No filters found for user", extra={'user_id': user_id})
+                return None
+
+            filters_dict = SubscriptionRepository.to_filters_dict(filters)
+
+            await UserCacheManager.async_set_filters(user_id, filters_dict)
+            logger.debug("Cached user filters", extra={'user_id': user_id})
+
+            return filters_dict
+
+    @staticmethod
+    def to_filters_dict(filters: UserFilter) -> Dict[str, Any]:
+        """Convert user filters to the dict returned by get_user_filters"""
+        return {
+            "id": filters.id,
+            "user_id": filters.user_id,
+            "property_type": filters.property_type,
+            "city": filters.city,
+            "rooms_count": filters.rooms_count,
+            "price_min": filters.price_min,
+            "price_max": filters.price_max,
+            "is_paused": filters.is_paused,
+            "floor_max": filters.floor_max,
+            "is_not_first_floor": filters.is_not_first_floor,
+            "is_not_last_floor": filters.is_not_last_floor,
+            "is_last_floor_only": filters.is_last_floor_only,
+            "pets_allowed": filters.pets_allowed,
+            "without_broker": filters.without_broker
+        }
+
     @staticmethod
     @log_operation("update_user_filter")
     def update_user_filter(db: Session, user_id: int, filters_data: Dict[str, Any]) -> UserFilter:
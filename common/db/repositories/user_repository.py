@@ -3,6 +3,8 @@
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from common.db.models.user import User
@@ -30,6 +32,54 @@ class UserRepository:
 
             return user
 
+    @staticmethod
+    @log_operation("async_get_by_id")
+    async def async_get_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        """Get user by database ID without blocking the event loop"""
+        with log_context(logger, user_id=user_id):
+            result = await db.execute(select(User).filter(User.id == user_id).limit(1))
+            user = result.scalars().first()
+
+            if user:
+                logger.debug("Found user", extra={'user_id': user_id})
+            else:
+                logger.debug("User not found", extra={'user_id': user_id})
+
+            return user
+
+    @staticmethod
+    @log_operation("get_platform_ids_for_users")
+    def get_platform_ids_for_users(db: Session, user_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """
+        Get messenger IDs of many users in one query.
+
+        Returns:
+            Mapping of user_id to {'telegram_id', 'viber_id', 'whatsapp_id'} with None values left out
+        """
+        if not user_ids:
+            return {}
+
+        with log_context(logger, user_count=len(user_ids)):
+            rows = db.query(User.id, User.telegram_id, User.viber_id, User.whatsapp_id) \
+                .filter(User.id.in_(user_ids)) \
+                .all()
+
+            result = {
+                row.id: {
+                    key: value for key, value in (
+                        ("telegram_id", row.telegram_id),
+                        ("viber_id", row.viber_id),
+                        ("whatsapp_id", row.whatsapp_id)
+                    ) if value is not None
+                }
+                for row in rows
+            }
+            logger.debug("Retrieved platform IDs for users", extra={
+                'requested': len(user_ids),
+                'found': len(result)
+            })
+            return result
+
     @staticmethod
     @log_operation("get_by_messenger_id")
     def get_by_messenger_id(
@@ -54,6 +104,31 @@ class UserRepository:
 
             return user
 
+    @staticmethod
+    @log_operation("async_get_by_messenger_id")
+    async def async_get_by_messenger_id(
+            db: AsyncSession, messenger_id: str, messenger_type: str = "telegram"
+    ) -> Optional[User]:
+        """Get user by messenger ID without blocking the event loop"""
+        with log_context(logger, messenger_id=messenger_id, messenger_type=messenger_type):
+            filter_kwargs = {f"{messenger_type}_id": messenger_id}
+            result = await db.execute(select(User).filter_by(**filter_kwargs).limit(1))
+            user = result.scalars().first()
+
+            if user:
+                logger.debug("Found user by messenger ID", extra={
+                    'messenger_type': messenger_type,
+                    'messenger_id': messenger_id,
+                    'user_id': user.id
+                })
+            else:
+                logger.debug("User not found by messenger ID", extra={
+                    'messenger_type': messenger_type,
+                    'messenger_id': messenger_id
+                })
+
+            return user
+
     @staticmethod
     @log_operation("get_by_phone")
     def get_by_phone(db: Session, phone_number: str) -> Optional[User]:
@@ -241,6 +316,9 @@ class UserRepository:
             setattr(user, f"{messenger_type}_id", messenger_id)
             db.commit()
 
+            # Cached platform IDs are stale now
+            UserCacheManager.invalidate_all(user_id)
+
             logger.info("Updated messenger ID", extra={
                 'user_id': user_id,
                 'messenger_type': messenger_type,
@@ -326,6 +404,9 @@ class UserRepository:
             db: Session, user_id: int, subscription_until: datetime
     ) -> bool:
         """Update user subscription end date"""
+        # Imported here, common.db.operations imports this module
+        from common.db.operations import mark_subscription_changed
+
         with log_context(logger, user_id=user_id, subscription_until=subscription_until.isoformat()):
             user = UserRepository.get_by_id(db, user_id)
             if not user:
@@ -338,6 +419,7 @@ class UserRepository:
 
             # Invalidate cache using the cache manager
             UserCacheManager.invalidate_all(user_id)
+            mark_subscription_changed(user_id)
 
             logger.info("Updated subscription end date", extra={
                 'user_id': user_id,
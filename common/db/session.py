@@ -1,12 +1,17 @@
 # common/db/session.py
-from contextlib import contextmanager
-from typing import Generator
+import asyncio
+import os
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Dict, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from common.config import DB_CONFIG
+from common.db.pool import engine_options, pool_status
 from common.utils.logging_config import log_operation, log_context
 
 # Import the common db logger
@@ -15,17 +20,62 @@ from . import logger
 # Create the database URL from config
 DATABASE_URL = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
 
-# Create an engine and session factory with connection pooling settings
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    echo=False,
-)
+# The process-wide engine, its pool also serves raw psycopg2 access (common.db.database)
+engine = create_engine(DATABASE_URL, echo=False, **engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _reset_pool_after_fork():
+    # Connections inherited from the parent stay with the parent, the child opens its own
+    engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+# Async access (SQLAlchemy asyncio + asyncpg) for bot handlers, so queries don't block the event loop
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+# asyncpg connections belong to the event loop that opened them: one engine per process and loop
+_async_session_factories = weakref.WeakKeyDictionary()
+_async_session_factories_pid = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get the async engine of the running event loop"""
+    return get_async_session_factory().kw["bind"]
+
+
+def get_async_session_factory() -> sessionmaker:
+    """Get the AsyncSession factory of the running event loop, creating its engine on first use"""
+    global _async_session_factories, _async_session_factories_pid
+
+    if _async_session_factories_pid != os.getpid():
+        _async_session_factories = weakref.WeakKeyDictionary()
+        _async_session_factories_pid = os.getpid()
+
+    loop = asyncio.get_running_loop()
+    factory = _async_session_factories.get(loop)
+    if factory is None:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **engine_options(use_async=True))
+        # Objects stay usable after commit, handlers read them once the session is closed
+        factory = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        _async_session_factories[loop] = factory
+        logger.info("Created async database engine", extra={'pid': os.getpid()})
+    return factory
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool metrics of this process: the sync engine and every async engine"""
+    async_engines = []
+    if _async_session_factories_pid == os.getpid():
+        async_engines = [factory.kw["bind"] for factory in list(_async_session_factories.values())]
+    return {
+        'pid': os.getpid(),
+        'sync': pool_status(engine.pool),
+        'async': [pool_status(async_engine.sync_engine.pool) for async_engine in async_engines],
+    }
+
+
 @log_operation("get_db")
 def get_db() -> Session:
     """Get a database session"""
@@ -87,4 +137,34 @@ def get_db_dependency():
         db.close()
         logger.debug("Dependency injection session closed", extra={
             'session_id': id(db)
-        })
\ No newline at end of file
+        })
+
+
+@asynccontextmanager
+async def async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of db_session, for code running on an event loop"""
+    db = get_async_session_factory()()
+    try:
+        with log_context(logger, session_id=id(db)):
+            yield db
+            await db.commit()
+            logger.debug("Async database session committed")
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error("Database error - rolling back", exc_info=True, extra={
+            'error_type': type(e).__name__,
+            'session_id': id(db)
+        })
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error("Unexpected error - rolling back", exc_info=True, extra={
+            'error_type': type(e).__name__,
+            'session_id': id(db)
+        })
+        raise
+    finally:
+        await db.close()
+        logger.debug("Async database session closed", extra={
+            'session_id': id(db)
+        })
@@ -1,16 +1,17 @@
 # common/messaging/consolidated_tasks.py
 
 import logging
-import asyncio
 
 from typing import Dict, Any, List, Union
 
 from common.celery_app import celery_app
+from common.db.operations import get_full_ad_data
 from common.db.session import db_session
 from common.db.models.ad import Ad
 from common.db.repositories.ad_repository import AdRepository
 from common.messaging.unified_platform_utils import safe_send_message
 from common.messaging.service import messaging_service
+from common.messaging.worker_loop import run_async
 from common.utils.logging_config import log_operation, log_context, LogAggregator
 
 # Import the messaging logger
@@ -71,20 +72,8 @@ def send_notification(user_id: Union[int, str], template: str, data: Dict[str, A
                 })
                 return False
 
-    # Run the async function
-    try:
-        return asyncio.run(send())
-    except RuntimeError as e:
-        # Handle case where there's already an event loop
-        logger.warning(f"RuntimeError in send_notification", extra={
-            'error_type': type(e).__name__
-        })
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(send())
-        finally:
-            loop.close()
+    # Run on the worker's persistent event loop
+    return run_async(send())
 
 
 @celery_app.task(name='common.messaging.consolidated_tasks.send_property_notification')
@@ -102,9 +91,8 @@ def send_property_notification(user_id: Union[int, str], ad_id: int, platform: s
     async def send():
         with log_context(logger, user_id=user_id, ad_id=ad_id, platform=platform):
             try:
-                # Get complete ad data using repository
-                with db_session() as db:
-                    ad_data = AdRepository.get_full_ad_data(db, ad_id)
+                # Cached and coalesced, the same ad is sent to many users at once
+                ad_data = get_full_ad_data(ad_id)
 
                 if not ad_data:
                     logger.error(f"Ad data not found", extra={
@@ -113,8 +101,7 @@ def send_property_notification(user_id: Union[int, str], ad_id: int, platform: s
                     return False
 
                 # Get the primary image
-                with db_session() as db:
-                    images = AdRepository.get_ad_images(db, ad_id)
+                images = ad_data.get('images') or []
 
                 primary_image = images[0] if images else None
 
@@ -167,20 +154,8 @@ def send_property_notification(user_id: Union[int, str], ad_id: int, platform: s
                 })
                 return False
 
-    # Run the async function
-    try:
-        return asyncio.run(send())
-    except RuntimeError as e:
-        # Handle case where there's already an event loop
-        logger.warning(f"RuntimeError in send_property_notification", extra={
-            'error_type': type(e).__name__
-        })
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(send())
-        finally:
-            loop.close()
+    # Run on the worker's persistent event loop
+    return run_async(send())
 
 
 @celery_app.task(name='common.messaging.consolidated_tasks.send_subscription_reminder')
@@ -420,20 +395,8 @@ def get_description_and_notify(user_id: Union[int, str], resource_url: str, plat
                 })
                 return False
 
-    # Run the async function
-    try:
-        return asyncio.run(process())
-    except RuntimeError as e:
-        # Handle case where there's already an event loop
-        logger.warning(f"RuntimeError in get_description_and_notify", extra={
-            'error_type': type(e).__name__
-        })
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(process())
-        finally:
-            loop.close()
+    # Run on the worker's persistent event loop
+    return run_async(process())
 
 
 @celery_app.task(name='common.messaging.consolidated_tasks.process_new_listings')
@@ -3,13 +3,13 @@
 from typing import Dict, Any, List, Union
 
 from common.db.operations import (
-    get_subscription_data_for_user,
-    get_subscription_until_for_user, update_user_filter, add_favorite_ad,
-    remove_favorite_ad, list_favorites
+    async_get_subscription_data_for_user,
+    async_get_subscription_until_for_user, update_user_filter, add_favorite_ad,
+    remove_favorite_ad, async_list_favorites
 )
 from common.config import GEO_ID_MAPPING
 from common.messaging.unified_platform_utils import safe_send_message, safe_send_menu
-from common.messaging.unified_platform_utils import resolve_user_id
+from common.messaging.unified_platform_utils import async_resolve_db_user_id, resolve_user_id
 
 from common.messaging.handlers import logger
 from common.utils.logging_config import log_operation, log_context
@@ -93,7 +93,7 @@ async def handle_subscription_info(user_id: Union[str, int], platform: str = Non
     with log_context(logger, user_id=user_id, platform=platform):
         try:
             # Get database user ID
-            db_user_id, _, _ = resolve_user_id(user_id, platform)
+            db_user_id = await async_resolve_db_user_id(user_id, platform)
 
             if not db_user_id:
                 logger.warning("Failed to resolve user ID", extra={
@@ -104,10 +104,10 @@ async def handle_subscription_info(user_id: Union[str, int], platform: str = Non
                 return False
 
             # Get subscription data
-            sub_data = get_subscription_data_for_user(db_user_id)
-            subscription_until = get_subscription_until_for_user(db_user_id, free=True)
+            sub_data = await async_get_subscription_data_for_user(db_user_id)
+            subscription_until = await async_get_subscription_until_for_user(db_user_id, free=True)
             if not subscription_until:
-                subscription_until = get_subscription_until_for_user(db_user_id, free=False)
+                subscription_until = await async_get_subscription_until_for_user(db_user_id, free=False)
 
             if not sub_data:
                 logger.info("No active subscription found", extra={
@@ -181,7 +181,7 @@ async def handle_favorites(user_id: Union[str, int], platform: str = None):
     with log_context(logger, user_id=user_id, platform=platform):
         try:
             # Get database user ID
-            db_user_id, _, _ = resolve_user_id(user_id, platform)
+            db_user_id = await async_resolve_db_user_id(user_id, platform)
 
             if not db_user_id:
                 logger.warning("Failed to resolve user ID", extra={
@@ -192,7 +192,7 @@ async def handle_favorites(user_id: Union[str, int], platform: str = None):
                 return False
 
             # Get favorites
-            favorites = list_favorites(db_user_id)
+            favorites = await async_list_favorites(db_user_id)
 
             if not favorites:
                 logger.info("No favorites found", extra={
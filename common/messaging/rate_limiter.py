@@ -0,0 +1,209 @@
+# common/messaging/rate_limiter.py
+
+"""
+Outbound send scheduler shared by all messaging workers.
+
+Every platform has a global token bucket and one bucket per chat, both kept
+in Redis so the limits hold across worker processes. A send waits until both
+buckets have a token, so large fan-outs run at the highest rate the platform
+accepts instead of bursting into 429 responses and stalling on retries. When
+a platform still answers with a flood error, its global bucket is drained for
+the requested time.
+
+Sends run on event loops (bot pollers, webhooks, workers), so the buckets
+are read through the asyncio Redis client of the running loop.
+"""
+
+import asyncio
+import functools
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from common.config import MESSAGING_RATE_LIMITS
+from common.utils.cache import get_async_redis_client
+from common.utils.logging_config import log_context
+
+# Import the messaging logger
+from . import logger
+
+# Pause applied on a 429 that doesn't say how long to wait
+DEFAULT_FLOOD_PENALTY = 1.0
+
+# Takes a token from the global and the chat bucket only if both have one.
+# KEYS: global bucket, chat bucket
+# ARGV: now, global rate, global burst, chat rate, chat burst
+# Returns "0" when granted, otherwise the seconds to wait as a string
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+
+local function refill(key, rate, burst)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    return math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+
+local function store(key, tokens, rate, burst)
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 60)
+end
+
+local g_rate, g_burst = tonumber(ARGV[2]), tonumber(ARGV[3])
+local c_rate, c_burst = tonumber(ARGV[4]), tonumber(ARGV[5])
+local g = refill(KEYS[1], g_rate, g_burst)
+local c = refill(KEYS[2], c_rate, c_burst)
+
+if g >= 1 and c >= 1 then
+    store(KEYS[1], g - 1, g_rate, g_burst)
+    store(KEYS[2], c - 1, c_rate, c_burst)
+    return "0"
+end
+
+return tostring(math.max((1 - g) / g_rate, (1 - c) / c_rate))
+"""
+
+# Drains a bucket so that it refills only after ARGV[2] seconds.
+# KEYS: bucket
+# ARGV: now, penalty, rate, burst
+PENALIZE_SCRIPT = """
+local now, penalty = tonumber(ARGV[1]), tonumber(ARGV[2])
+local rate, burst = tonumber(ARGV[3]), tonumber(ARGV[4])
+redis.call('HSET', KEYS[1], 'tokens', -penalty * rate, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(penalty + burst / rate) + 60)
+return 1
+"""
+
+
+class SendScheduler:
+    """Redis token buckets per platform (global) and per platform chat"""
+
+    def __init__(self, limits: Dict[str, Dict[str, float]]):
+        self.limits = limits
+        # (acquire, penalize) scripts registered on each event loop's client
+        self._scripts = weakref.WeakKeyDictionary()
+
+    def _loop_scripts(self) -> Tuple[Any, Any]:
+        client = get_async_redis_client()
+        scripts = self._scripts.get(client)
+        if scripts is None:
+            scripts = self._scripts[client] = (
+                client.register_script(ACQUIRE_SCRIPT),
+                client.register_script(PENALIZE_SCRIPT)
+            )
+        return scripts
+
+    @staticmethod
+    def _global_key(platform: str) -> str:
+        return f"send_rate:{platform}"
+
+    @staticmethod
+    def _chat_key(platform: str, chat_id: str) -> str:
+        return f"send_rate:{platform}:{chat_id}"
+
+    async def try_acquire(self, platform: str, chat_id: str) -> float:
+        """
+        Take a send token for a chat.
+
+        Returns:
+            0 if the message may be sent now, otherwise the seconds to wait before trying again
+        """
+        limits = self.limits.get(platform)
+        if not limits:
+            return 0
+
+        try:
+            acquire_script, _ = self._loop_scripts()
+            wait = await acquire_script(
+                keys=[self._global_key(platform), self._chat_key(platform, chat_id)],
+                args=[time.time(), limits["global_rate"], limits["global_burst"],
+                      limits["chat_rate"], limits["chat_burst"]]
+            )
+            return float(wait)
+        except Exception as e:
+            # Fail open: a Redis outage must not stop message delivery
+            logger.warning("Send rate limiter unavailable", extra={
+                'platform': platform,
+                'error_type': type(e).__name__
+            })
+            return 0
+
+    async def acquire(self, platform: str, chat_id: str) -> float:
+        """
+        Wait until a message may be sent to a chat.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = await self.try_acquire(platform, chat_id)
+            if wait <= 0:
+                if waited:
+                    logger.debug("Send delayed by rate limiter", extra={
+                        'platform': platform,
+                        'waited': round(waited, 3)
+                    })
+                return waited
+            wait = max(wait, 0.01)
+            waited += wait
+            await asyncio.sleep(wait)
+
+    async def penalize(self, platform: str, seconds: float) -> None:
+        """Stop all sends of a platform for `seconds`, after the platform reported a flood"""
+        limits = self.limits.get(platform)
+        if not limits:
+            return
+
+        with log_context(logger, platform=platform, penalty=seconds):
+            try:
+                _, penalize_script = self._loop_scripts()
+                await penalize_script(
+                    keys=[self._global_key(platform)],
+                    args=[time.time(), seconds, limits["global_rate"], limits["global_burst"]]
+                )
+                logger.warning("Platform flood limit hit, pausing sends", extra={
+                    'platform': platform,
+                    'penalty': seconds
+                })
+            except Exception as e:
+                logger.warning("Failed to apply flood penalty", extra={
+                    'platform': platform,
+                    'error_type': type(e).__name__
+                })
+
+
+send_scheduler = SendScheduler(MESSAGING_RATE_LIMITS)
+
+
+def _flood_penalty(error: Exception) -> Optional[float]:
+    """Seconds to pause after a flood error, None if `error` isn't one"""
+    # aiogram RetryAfter carries the flood wait in seconds
+    if type(error).__name__ == "RetryAfter":
+        return float(getattr(error, "timeout", None) or DEFAULT_FLOOD_PENALTY)
+    # Twilio (and HTTP errors in general) report 429 Too Many Requests
+    if getattr(error, "status", None) == 429:
+        return DEFAULT_FLOOD_PENALTY
+    return None
+
+
+def rate_limited(func: Callable[..., Any]):
+    """
+    Decorator for MessagingInterface send methods taking `user_id` as first argument.
+
+    Waits for the platform and chat buckets before every attempt, so it must be
+    applied below any retry decorator.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, user_id, *args, **kwargs):
+        await send_scheduler.acquire(self.platform_name, user_id)
+        try:
+            return await func(self, user_id, *args, **kwargs)
+        except Exception as e:
+            penalty = _flood_penalty(e)
+            if penalty:
+                await send_scheduler.penalize(self.platform_name, penalty)
+            raise
+
+    return wrapper
@@ -33,6 +33,11 @@ class MessagingService:
             self._messengers[platform] = messenger
             logger.info(f"Registered messenger for platform", extra={'platform': platform})
 
+    @property
+    def platforms(self) -> List[str]:
+        """Platforms with a registered messenger"""
+        return sorted(self._messengers)
+
     @log_operation("get_messenger")
     def get_messenger(self, platform: str) -> Optional[MessagingInterface]:
         """
@@ -168,8 +173,7 @@ class MessagingService:
         Returns:
             True if sent successfully, False otherwise
         """
-        from common.messaging.unified_platform_utils import resolve_user_id, format_user_id_for_platform
-
+        from common.messaging.unified_platform_utils import resolve_user_id
 
         with log_context(logger, user_id=user_id, ad_id=ad_data.get('id')):
             logger.info(f'Sending ad {ad_data.get("id")} to user {user_id}...')
@@ -180,6 +184,33 @@ class MessagingService:
                 logger.warning(f"No messaging platform found for user", extra={'user_id': user_id})
                 return False
 
+            return await self.send_ad_to_platform(platform_name, platform_id, ad_data, image_url, **kwargs)
+
+    @log_operation("send_ad_to_platform")
+    async def send_ad_to_platform(
+            self,
+            platform_name: str,
+            platform_id: str,
+            ad_data: Dict[str, Any],
+            image_url: Optional[str] = None,
+            **kwargs
+    ) -> bool:
+        """
+        Send an ad to an already resolved platform user, without database lookups.
+
+        Args:
+            platform_name: Platform identifier (telegram, viber, whatsapp)
+            platform_id: User ID on that platform
+            ad_data: Dictionary with ad information
+            image_url: Optional primary image URL
+            **kwargs: Additional platform-specific parameters
+
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        from common.messaging.unified_platform_utils import format_user_id_for_platform
+
+        with log_context(logger, platform=platform_name, ad_id=ad_data.get('id')):
             messenger = self.get_messenger(platform_name)
             if not messenger:
                 logger.error(f"No messenger implementation registered for platform", extra={'platform': platform_name})
@@ -200,14 +231,12 @@ class MessagingService:
                 await messenger.send_ad(formatted_id, ad_data, image_url, **kwargs)
 
                 logger.info("Ad sent successfully", extra={
-                    'user_id': user_id,
                     'platform': platform_name,
                     'ad_id': ad_data.get('id')
                 })
                 return True
             except Exception as e:
                 logger.error(f"Error sending ad", exc_info=True, extra={
-                    'user_id': user_id,
                     'platform': platform_name,
                     'ad_id': ad_data.get('id'),
                     'error_type': type(e).__name__
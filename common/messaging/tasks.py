@@ -8,8 +8,12 @@ from typing import Dict, Any, Optional, List, Union
 from sqlalchemy import func
 
 from common.celery_app import celery_app
+from common.config import NOTIFIER_CONFIG
 from common.db.operations import get_platform_ids_for_user, get_db_user_id_by_telegram_id, get_full_ad_description, Ad
+from common.db.operations import get_platform_ids_for_users, batch_get_full_ad_data
+from .unified_platform_utils import select_user_platform
 from .service import messaging_service
+from .worker_loop import run_async
 from .handlers.support_handler import handle_support_command, handle_support_category, SUPPORT_CATEGORIES
 from common.db.repositories.user_repository import UserRepository
 from common.db.session import db_session
@@ -60,20 +64,8 @@ def send_notification(user_id: int, text: str, **kwargs):
                 })
                 return False
 
-        # Run the async function
-        try:
-            return asyncio.run(send())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in send_notification", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(send())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(send())
 
 
 @celery_app.task(name='common.messaging.tasks.send_ad')
@@ -120,20 +112,8 @@ def send_ad(user_id: int, ad_data: Dict[str, Any], image_url: Optional[str] = No
                 })
                 return False
 
-        # Run the async function
-        try:
-            return asyncio.run(send())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in send_ad", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(send())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(send())
 
 
 @celery_app.task(name='common.messaging.tasks.send_menu')
@@ -182,20 +162,8 @@ def send_menu(user_id: int, text: str, options: List[Dict[str, str]], **kwargs):
                 })
                 return False
 
-        # Run the async function
-        try:
-            return asyncio.run(send())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in send_menu", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(send())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(send())
 
 
 @celery_app.task(name='common.messaging.tasks.send_cross_platform_message')
@@ -274,20 +242,8 @@ def send_cross_platform_message(user_id: int, text: str, platforms: Optional[Lis
                 })
                 return False
 
-        # Run the async function
-        try:
-            return asyncio.run(send())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in send_cross_platform_message", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(send())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(send())
 
 
 # --- New Consolidated Tasks ---
@@ -391,20 +347,59 @@ def send_ad_with_extra_buttons(user_id, text, s3_image_url, resource_url, ad_id,
                     'user_id': db_user_id
                 })
 
-        # Run the async function
-        try:
-            return asyncio.run(send())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in send_ad_with_extra_buttons", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(send())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(send())
+
+
+@celery_app.task(name='common.messaging.tasks.send_ads_batch')
+@log_operation("send_ads_batch")
+def send_ads_batch(deliveries: List[List[int]]) -> int:
+    """
+    Deliver a chunk of ads to their recipients.
+
+    The ads and the platform IDs of all recipients are fetched once for the
+    whole chunk, then the messages are sent concurrently on one event loop.
+
+    Args:
+        deliveries: List of [user_id, ad_id] pairs of database IDs
+
+    Returns:
+        Number of delivered messages
+    """
+    with log_context(logger, deliveries_count=len(deliveries)):
+        ads = batch_get_full_ad_data(list({ad_id for _, ad_id in deliveries}))
+        platform_ids = get_platform_ids_for_users(list({user_id for user_id, _ in deliveries}))
+
+        aggregator = LogAggregator(logger, "send_ads_batch")
+
+        async def deliver(semaphore, user_id, ad_id):
+            ad_data = ads.get(ad_id)
+            platform_name, platform_id = select_user_platform(platform_ids.get(user_id, {}))
+            if not ad_data or not platform_name:
+                aggregator.add_error("Ad or user platform not found", {'user_id': user_id, 'ad_id': ad_id})
+                return False
+
+            images = ad_data.get("images") or []
+            async with semaphore:
+                success = await messaging_service.send_ad_to_platform(
+                    platform_name, platform_id, ad_data, images[0] if images else None
+                )
+
+            if success:
+                aggregator.add_item({'user_id': user_id, 'ad_id': ad_id, 'platform': platform_name}, success=True)
+            else:
+                aggregator.add_error("Failed to send ad", {'user_id': user_id, 'ad_id': ad_id})
+            return success
+
+        async def send():
+            semaphore = asyncio.Semaphore(NOTIFIER_CONFIG["delivery_concurrency"])
+            return await asyncio.gather(*(deliver(semaphore, user_id, ad_id) for user_id, ad_id in deliveries))
+
+        # Run on the worker's persistent event loop
+        results = run_async(send())
+
+        aggregator.log_summary()
+        return sum(1 for success in results if success)
 
 
 @celery_app.task(name='common.messaging.tasks.send_subscription_notification')
@@ -472,19 +467,8 @@ def send_subscription_notification(user_id, notification_type, data):
                 })
                 return False
 
-        # Run the async function
-        try:
-            asyncio.run(send())
-        except RuntimeError as e:
-            logger.warning(f"RuntimeError in send_subscription_notification", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(send())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        run_async(send())
 
 
 @celery_app.task(name='common.messaging.tasks.check_expiring_subscriptions')
@@ -685,20 +669,8 @@ def get_description_and_notify(user_id: Union[int, str], resource_url: str, plat
                 })
                 return False
 
-        # Run the async function
-        try:
-            return asyncio.run(process())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in get_description_and_notify", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(process())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(process())
 
 
 @celery_app.task(name='common.messaging.tasks.process_new_listings')
@@ -877,20 +849,8 @@ def process_show_more_description(user_id: Union[int, str], resource_url: str, m
                 })
                 return False
 
-        # Run the async function
-        try:
-            return asyncio.run(process())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in process_show_more_description", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(process())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(process())
 
 
 # --- Support-Related Tasks ---
@@ -923,20 +883,8 @@ def start_support_conversation(user_id, platform=None):
                 })
                 return {"success": False, "error": str(e)}
 
-        # Run the async function
-        try:
-            return asyncio.run(execute())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in start_support_conversation", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(execute())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(execute())
 
 
 @celery_app.task(name='common.messaging.tasks.process_support_category')
@@ -969,20 +917,8 @@ def process_support_category(user_id, category, platform=None):
                 })
                 return {"success": False, "error": str(e)}
 
-        # Run the async function
-        try:
-            return asyncio.run(execute())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in process_support_category", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(execute())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(execute())
 
 
 @celery_app.task(name='common.messaging.tasks.forward_to_support')
@@ -1043,20 +979,8 @@ def forward_to_support(user_id, message, category, platform=None):
                 })
                 return {"success": False, "error": str(e)}
 
-        # Run the async function
-        try:
-            return asyncio.run(execute())
-        except RuntimeError as e:
-            # Handle case where there's already an event loop
-            logger.warning(f"RuntimeError in forward_to_support", extra={
-                'error_type': type(e).__name__
-            })
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(execute())
-            finally:
-                loop.close()
+        # Run on the worker's persistent event loop
+        return run_async(execute())
 
 
 # Helper function to get the template for a support category
@@ -10,6 +10,7 @@ from aiogram.utils.exceptions import (
 )
 
 from .unified_interface import MessagingInterface
+from .rate_limiter import rate_limited
 from common.utils.retry_utils import retry_with_exponential_backoff, NETWORK_EXCEPTIONS
 from common.utils.logging_config import log_operation, log_context
 
@@ -34,6 +35,10 @@ class TelegramMessaging(MessagingInterface):
         """Get platform identifier."""
         return "telegram"
 
+    async def close(self) -> None:
+        """Close the Bot's aiohttp session."""
+        await self.bot.close()
+
     @log_operation("format_user_id")
     async def format_user_id(self, user_id: str) -> str:
         """Format user ID for Telegram - no special formatting needed."""
@@ -51,6 +56,7 @@ class TelegramMessaging(MessagingInterface):
         retryable_exceptions=[RetryAfter, TelegramAPIError] + NETWORK_EXCEPTIONS
     )
     @log_operation("send_text")
+    @rate_limited
     async def send_text(
             self,
             user_id: str,
@@ -97,6 +103,7 @@ class TelegramMessaging(MessagingInterface):
         retryable_exceptions=[RetryAfter, TelegramAPIError] + NETWORK_EXCEPTIONS
     )
     @log_operation("send_media")
+    @rate_limited
     async def send_media(
             self,
             user_id: str,
@@ -191,6 +198,9 @@ class TelegramMessaging(MessagingInterface):
                 if isinstance(phones, list) and phones:
                     phone_str = ",".join(phones)
                     phone_webapp_url = f"https://f3cc-178-150-42-6.ngrok-free.app/phones?numbers={phone_str}"
+            elif ad_id:
+                # Phones are extracted on first opening of the mini-app
+                phone_webapp_url = f"https://f3cc-178-150-42-6.ngrok-free.app/phones?ad_id={ad_id}"
 
             # Create buttons
             markup = InlineKeyboardMarkup(row_width=2)
@@ -215,11 +215,11 @@ class MessageFlow:
                 flow_data = initial_data or {}
 
                 # Update user state
-                await state_manager.update_state(user_id, platform, {
+                await state_manager.update_state(user_id, {
                     "state": self.initial_state,
                     "active_flow": self.name,
                     "flow_data": flow_data
-                })
+                }, platform)
 
                 # Execute initial state handler if available
                 initial_state_data = self.states.get(self.initial_state)
@@ -234,9 +234,9 @@ class MessageFlow:
                     # Save any updates to flow data
                     updates = context.get_updates()
                     if updates:
-                        await state_manager.update_state(user_id, platform, {
+                        await state_manager.update_state(user_id, {
                             "flow_data": flow_data
-                        })
+                        }, platform)
 
                 logger.info("Flow started successfully", extra={
                     'flow_name': self.name,
@@ -293,9 +293,9 @@ class MessageFlow:
                             updates = context.get_updates()
                             if updates:
                                 flow_data.update(updates)
-                                await state_manager.update_state(user_id, platform, {
+                                await state_manager.update_state(user_id, {
                                     "flow_data": flow_data
-                                })
+                                }, platform)
                             return True
                     except Exception as e:
                         logger.error(f"Error in global handler", exc_info=True, extra={
@@ -317,9 +317,9 @@ class MessageFlow:
                         updates = context.get_updates()
                         if updates:
                             flow_data.update(updates)
-                            await state_manager.update_state(user_id, platform, {
+                            await state_manager.update_state(user_id, {
                                 "flow_data": flow_data
-                            })
+                            }, platform)
 
                         # Check for transitions
                         await self._check_transitions(context, current_state, message, flow_data)
@@ -373,11 +373,18 @@ class MessageFlow:
                 # Get current state data
                 state_data = await state_manager.get_state(user_id, platform) or {}
                 flow_data = state_data.get("flow_data", {})
+                current_state = state_data.get("state")
 
-                # Update state
-                await state_manager.update_state(user_id, platform, {
+                # Update state, unless a concurrent message moved the user out of the current state first
+                if not await state_manager.compare_and_set_state(user_id, current_state, {
                     "state": target_state
-                })
+                }, platform):
+                    logger.warning("State changed concurrently, transition skipped", extra={
+                        'current_state': current_state,
+                        'target_state': target_state,
+                        'flow_name': self.name
+                    })
+                    return False
 
                 # Execute new state handler
                 state_info = self.states.get(target_state)
@@ -393,9 +400,9 @@ class MessageFlow:
                     updates = context.get_updates()
                     if updates:
                         flow_data.update(updates)
-                        await state_manager.update_state(user_id, platform, {
+                        await state_manager.update_state(user_id, {
                             "flow_data": flow_data
-                        })
+                        }, platform)
 
                 logger.info("Successfully transitioned to new state", extra={
                     'target_state': target_state,
@@ -428,11 +435,11 @@ class MessageFlow:
         with log_context(logger, user_id=user_id, platform=platform, flow_name=self.name):
             try:
                 # Clear flow state
-                await state_manager.update_state(user_id, platform, {
+                await state_manager.update_state(user_id, {
                     "state": "start",
                     "active_flow": None,
                     "flow_data": {}
-                })
+                }, platform)
                 logger.info("Flow ended successfully", extra={'flow_name': self.name})
                 return True
             except Exception as e:
@@ -470,9 +477,9 @@ class MessageFlow:
                     target_state = transition["to_state"]
 
                     # Update state
-                    await state_manager.update_state(context.user_id, context.platform, {
+                    await state_manager.update_state(context.user_id, {
                         "state": target_state
-                    })
+                    }, context.platform)
 
                     # Execute new state handler
                     target_state_info = self.states.get(target_state)
@@ -484,9 +491,9 @@ class MessageFlow:
                         updates = context.get_updates()
                         if updates:
                             flow_data.update(updates)
-                            await state_manager.update_state(context.user_id, context.platform, {
+                            await state_manager.update_state(context.user_id, {
                                 "flow_data": flow_data
-                            })
+                            }, context.platform)
 
                     # Only apply the first matching transition
                     return True
@@ -201,6 +201,12 @@ class MessagingInterface(ABC):
                 location_text = f"{title}\n{location_text}"
             return await self.send_text(user_id, location_text, **kwargs)
 
+    async def close(self) -> None:
+        """
+        Release the connections held by the messenger.
+        Default implementation does nothing, platforms with pooled sessions override it.
+        """
+
     async def get_user_info(
             self,
             user_id: str,
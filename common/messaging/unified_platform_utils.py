@@ -62,6 +62,25 @@ def format_user_id_for_platform(user_id: str, platform: str) -> str:
     return user_id
 
 
+def select_user_platform(platform_ids: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Pick the platform to reach a user on: Telegram, then Viber, then WhatsApp.
+
+    Args:
+        platform_ids: Messenger IDs of the user, as returned by get_platform_ids_for_user
+
+    Returns:
+        Tuple of (platform_name, platform_id) or (None, None)
+    """
+    if platform_ids.get("telegram_id"):
+        return "telegram", str(platform_ids["telegram_id"])
+    if platform_ids.get("viber_id"):
+        return "viber", platform_ids["viber_id"]
+    if platform_ids.get("whatsapp_id"):
+        return "whatsapp", platform_ids["whatsapp_id"]
+    return None, None
+
+
 @log_operation("resolve_user_id")
 def resolve_user_id(user_id: Union[int, str], platform: Optional[str] = None) -> Tuple[
     Optional[int], Optional[str], Optional[str]]:
@@ -87,14 +106,7 @@ def resolve_user_id(user_id: Union[int, str], platform: Optional[str] = None) ->
             platform_ids = get_platform_ids_for_user(db_user_id)
 
             # Determine which platform to use (priority order)
-            if platform_ids.get("telegram_id"):
-                result = (db_user_id, "telegram", str(platform_ids["telegram_id"]))
-            elif platform_ids.get("viber_id"):
-                result = (db_user_id, "viber", platform_ids["viber_id"])
-            elif platform_ids.get("whatsapp_id"):
-                result = (db_user_id, "whatsapp", platform_ids["whatsapp_id"])
-            else:
-                result = (db_user_id, None, None)
+            result = (db_user_id, *select_user_platform(platform_ids))
 
             logger.info("Resolved database user ID", extra={
                 'db_user_id': db_user_id,
@@ -127,6 +139,23 @@ def resolve_user_id(user_id: Union[int, str], platform: Optional[str] = None) ->
         return (db_user_id, platform_name, platform_id)
 
 
+async def async_resolve_db_user_id(user_id: Union[int, str], platform: Optional[str] = None) -> Optional[int]:
+    """
+    Database user ID of a database or platform-specific ID, like resolve_user_id
+    but without blocking the event loop.
+    """
+    from common.db.operations import async_get_db_user_id_by_messenger_id
+
+    if isinstance(user_id, int) or (isinstance(user_id, str) and user_id.isdigit()):
+        return int(user_id)
+
+    if platform:
+        platform_name, platform_id = platform, user_id
+    else:
+        platform_name, platform_id = detect_platform_from_id(user_id)
+    return await async_get_db_user_id_by_messenger_id(platform_id, messenger_type=platform_name)
+
+
 @log_operation("get_messenger_for_user")
 async def get_messenger_for_user(user_id: Union[int, str]) -> Tuple[Optional[str], Optional[str], Optional[Any]]:
     """
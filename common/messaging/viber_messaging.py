@@ -7,6 +7,7 @@ from viberbot import Api
 from viberbot.api.messages import TextMessage, PictureMessage, KeyboardMessage
 
 from .unified_interface import MessagingInterface
+from .rate_limiter import rate_limited
 from common.utils.retry_utils import retry_with_exponential_backoff, NETWORK_EXCEPTIONS
 from common.utils.logging_config import log_operation, log_context
 
@@ -37,6 +38,7 @@ class ViberMessaging(MessagingInterface):
 
     @retry_with_exponential_backoff(max_retries=3, initial_delay=1, retryable_exceptions=NETWORK_EXCEPTIONS)
     @log_operation("send_text")
+    @rate_limited
     async def send_text(
             self,
             user_id: str,
@@ -73,6 +75,7 @@ class ViberMessaging(MessagingInterface):
 
     @retry_with_exponential_backoff(max_retries=3, initial_delay=1, retryable_exceptions=NETWORK_EXCEPTIONS)
     @log_operation("send_media")
+    @rate_limited
     async def send_media(
             self,
             user_id: str,
@@ -8,6 +8,7 @@ from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
 from .unified_interface import MessagingInterface
+from .rate_limiter import rate_limited
 from common.utils.retry_utils import retry_with_exponential_backoff, NETWORK_EXCEPTIONS
 from common.utils.logging_config import log_operation, log_context
 
@@ -58,6 +59,7 @@ class WhatsAppMessaging(MessagingInterface):
         retryable_exceptions=TWILIO_EXCEPTIONS + NETWORK_EXCEPTIONS
     )
     @log_operation("send_text")
+    @rate_limited
     async def send_text(
             self,
             user_id: str,
@@ -100,6 +102,7 @@ class WhatsAppMessaging(MessagingInterface):
         retryable_exceptions=TWILIO_EXCEPTIONS + NETWORK_EXCEPTIONS
     )
     @log_operation("send_media")
+    @rate_limited
     async def send_media(
             self,
             user_id: str,
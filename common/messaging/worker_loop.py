@@ -0,0 +1,167 @@
+# common/messaging/worker_loop.py
+
+"""
+Worker-scoped event loop and messenger registry for messaging tasks.
+
+Celery tasks are synchronous while messengers are async. Running every task in
+a fresh event loop closed the aiogram Bot session and every pooled connection
+after each message. Instead, each worker process owns one event loop running in
+a daemon thread, and the messengers are created once per process on that loop
+and registered with the shared messaging_service. Tasks submit their coroutines
+to the loop, so HTTP keep-alive to the messenger APIs survives across tasks.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from common.config import TELEGRAM_TOKEN, VIBER_TOKEN, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+from common.utils.logging_config import log_operation, log_context
+from .service import MessagingService, messaging_service
+
+# Import the messaging logger
+from . import logger
+
+
+async def _create_messengers(service: MessagingService) -> None:
+    """Create a messenger for every configured platform not registered yet"""
+    if TELEGRAM_TOKEN and not service.get_messenger("telegram"):
+        from aiogram import Bot
+        from .telegram_messaging import TelegramMessaging
+        # Created on the worker loop, so the Bot's aiohttp session is bound to it
+        service.register_messenger("telegram", TelegramMessaging(Bot(token=TELEGRAM_TOKEN)))
+
+    if VIBER_TOKEN and not service.get_messenger("viber"):
+        from viberbot import Api
+        from viberbot.api.bot_configuration import BotConfiguration
+        from .viber_messaging import ViberMessaging
+        service.register_messenger("viber", ViberMessaging(Api(BotConfiguration(
+            name='YourBotName',
+            avatar='https://your-domain.com/bot-avatar.jpg',
+            auth_token=VIBER_TOKEN
+        ))))
+
+    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and not service.get_messenger("whatsapp"):
+        from twilio.rest import Client
+        from .whatsapp_messaging import WhatsAppMessaging
+        service.register_messenger("whatsapp", WhatsAppMessaging(Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)))
+
+
+class MessagingWorkerLoop:
+    """
+    A persistent event loop in a daemon thread, with the process' messengers.
+
+    Start it once per worker process, then call run() from any thread.
+    """
+
+    def __init__(self, service: MessagingService):
+        self.service = service
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @log_operation("messaging_worker_loop_start")
+    def start(self, timeout: float = 30) -> None:
+        """Start the loop thread and create the messengers on it"""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="messaging-loop", daemon=True)
+        thread.start()
+        self._loop, self._thread = loop, thread
+
+        try:
+            asyncio.run_coroutine_threadsafe(_create_messengers(self.service), loop).result(timeout=timeout)
+        except Exception as e:
+            # Tasks still run, sends to the missing platforms fail and are logged
+            logger.error("Failed to create messengers", exc_info=True, extra={
+                'error_type': type(e).__name__
+            })
+
+        logger.info("Messaging worker loop started", extra={
+            'platforms': self.service.platforms
+        })
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the worker loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    @log_operation("messaging_worker_loop_shutdown")
+    def shutdown(self, timeout: float = 30) -> None:
+        """Close the messengers' connections and stop the loop"""
+        loop, thread = self._loop, self._thread
+        self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def close_messengers():
+            for platform in self.service.platforms:
+                try:
+                    await self.service.get_messenger(platform).close()
+                except Exception as e:
+                    logger.warning("Error closing messenger", extra={
+                        'platform': platform,
+                        'error_type': type(e).__name__
+                    })
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_messengers(), loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning("Error shutting down messaging worker loop", extra={
+                'error_type': type(e).__name__
+            })
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+# Worker-scoped loop, recreated after fork so each process owns its connections
+_worker_loop: Optional[MessagingWorkerLoop] = None
+_worker_loop_pid: Optional[int] = None
+_worker_loop_lock = threading.Lock()
+
+
+def get_worker_loop() -> MessagingWorkerLoop:
+    """
+    Get the messaging loop of the current process.
+
+    Normally started by worker_process_init, started lazily for the solo pool,
+    beat or scripts where that signal is not sent.
+    """
+    global _worker_loop, _worker_loop_pid
+
+    with _worker_loop_lock:
+        if _worker_loop is None or _worker_loop_pid != os.getpid():
+            with log_context(logger, pid=os.getpid()):
+                _worker_loop = MessagingWorkerLoop(messaging_service)
+                _worker_loop_pid = os.getpid()
+                _worker_loop.start()
+        return _worker_loop
+
+
+def run_async(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine from a synchronous task on the worker's persistent event loop"""
+    return get_worker_loop().run(coro, timeout)
+
+
+def init_messaging_worker(**kwargs) -> None:
+    """worker_process_init handler, creates the loop and messengers before the first task"""
+    get_worker_loop()
+
+
+def shutdown_messaging_worker(**kwargs) -> None:
+    """worker_process_shutdown handler"""
+    global _worker_loop
+
+    with _worker_loop_lock:
+        if _worker_loop is not None and _worker_loop_pid == os.getpid():
+            _worker_loop.shutdown()
+        _worker_loop = None
+
+
+worker_process_init.connect(init_messaging_worker, weak=False)
+worker_process_shutdown.connect(shutdown_messaging_worker, weak=False)
@@ -1,10 +1,11 @@
 # common/services/ad_service.py
 
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.orm import Session
 from common.db.repositories.ad_repository import AdRepository
+from common.config import AD_LIVENESS_CONFIG, AWS_CONFIG, S3_CLEANUP_CONFIG
 from common.utils.unified_request_utils import make_request
 from common.utils.cache_managers import AdCacheManager
 from common.utils.logging_config import log_operation, log_context, LogAggregator
@@ -106,6 +107,9 @@ class AdService:
 
                 # Create the ad
                 ad = AdRepository.create_ad(db, new_ad_data)
+                if ad is None:
+                    # Inserted concurrently, e.g. by a page ingest
+                    return AdRepository.get_by_external_id(db, ad_unique_id).id
                 ad_id = ad.id
 
                 logger.info("Created new ad", extra={
@@ -113,40 +117,22 @@ class AdService:
                     'external_id': ad_unique_id
                 })
 
-                # Process images
-                from common.utils.ad_utils import process_ad_images
-                uploaded_image_urls = process_ad_images(ad_data, ad_unique_id)
+                # Insert source image URLs, they are mirrored to S3 after commit
+                from common.utils.ad_utils import get_source_image_urls, schedule_image_mirroring
+                source_image_urls = get_source_image_urls(ad_data)
 
-                # Insert image references
-                if uploaded_image_urls:
-                    for url in uploaded_image_urls:
-                        AdRepository.add_image(db, ad_id, url)
+                if source_image_urls:
+                    AdRepository.bulk_add_images(db, [
+                        {"ad_id": ad_id, "image_url": url} for url in source_image_urls
+                    ])
 
-                    logger.info("Processed and inserted images", extra={
+                    logger.info("Inserted image references", extra={
                         'ad_id': ad_id,
-                        'image_count': len(uploaded_image_urls)
+                        'image_count': len(source_image_urls)
                     })
 
-                # Extract and store phone numbers
-                from common.utils.phone_parser import extract_phone_numbers_from_resource
-                result = extract_phone_numbers_from_resource(resource_url)
-                phones = result.phone_numbers
-                viber_link = result.viber_link
-
-                if phones:
-                    for phone in phones:
-                        AdRepository.add_phone(db, ad_id, phone)
-
-                    logger.info("Extracted and stored phone numbers", extra={
-                        'ad_id': ad_id,
-                        'phone_count': len(phones)
-                    })
-
-                if viber_link:
-                    AdRepository.add_phone(db, ad_id, None, viber_link)
-                    logger.info("Stored viber link", extra={'ad_id': ad_id})
-
                 db.commit()
+                schedule_image_mirroring([ad_id])
                 return ad_id
 
             except Exception as e:
@@ -204,62 +190,78 @@ class AdService:
         """
         Clean up ads older than the specified days.
 
+        Partitions whose whole interval is older than the cutoff are dropped at
+        once. Favorited ads, and with check_activity those not confirmed dead,
+        are kept in the default partition, where they are checked again in
+        chunks on later runs and the dead ones deleted in batches.
+
         Args:
             db: Database session
             days_old: Age threshold in days
-            check_activity: Whether to check if ad is still active
+            check_activity: Whether to keep ads that are still active
 
         Returns:
             Tuple of (ads_deleted, images_deleted)
         """
+        from common.db.partitions import ensure_ad_partitions, drop_expired_ad_partitions, iter_retained_ads
+        from common.utils.ad_liveness import AdLivenessRun
         with log_context(logger, days_old=days_old, check_activity=check_activity):
             deleted_count = 0
             images_deleted_count = 0
 
             # Calculate cutoff date
             cutoff_date = datetime.now() - timedelta(days=days_old)
-
-            # Get old ads
-            old_ads = AdRepository.get_older_than(db, cutoff_date)
-
-            logger.info("Starting ad cleanup", extra={
-                'cutoff_date': cutoff_date.isoformat(),
-                'old_ads_count': len(old_ads)
-            })
-
+            chunk_size = AD_LIVENESS_CONFIG["chunk_size"]
             aggregator = LogAggregator(logger, f"cleanup_old_ads_{days_old}days")
 
-            for ad in old_ads:
-                should_delete = True
-
-                # Check if the ad is still active
-                if check_activity and not AdService.is_ad_inactive(ad.resource_url):
-                    should_delete = False
-                    aggregator.add_item({'ad_id': ad.id, 'resource_url': ad.resource_url, 'status': 'active'},
-                                        success=False)
-
-                if should_delete:
-                    # Get images before deleting
-                    images = AdRepository.get_ad_images(db, ad.id)
-
-                    # Delete the ad
-                    if AdRepository.delete_with_related(db, ad.id):
-                        deleted_count += 1
-
-                        # Delete images from S3
-                        from common.utils.s3_utils import delete_s3_image
-                        for image_url in images:
-                            if delete_s3_image(image_url):
-                                images_deleted_count += 1
-
-                        # Clear cache using the cache manager
-                        AdCacheManager.invalidate_all(ad.id, ad.resource_url)
+            ensure_ad_partitions(db)
+
+            # One connection pool and event loop serve every chunk of the run
+            with AdLivenessRun() as liveness:
+                keep = None
+                if check_activity:
+                    # Ads that couldn't be checked are kept until a later run
+                    def keep(ads):
+                        alive = liveness.check(ads)
+                        return [ad_id for ad_id, value in alive.items() if value is not False]
+
+                dropped = drop_expired_ad_partitions(db, cutoff_date, keep=keep, chunk_size=chunk_size)
+                for ad_id, resource_url in dropped['ads']:
+                    AdCacheManager.invalidate_all(ad_id, resource_url)
+                images_deleted_count += AdService.delete_unreferenced_images(db, dropped['images'])
+                deleted_count += len(dropped['ads'])
+
+                logger.info("Dropped expired ad partitions", extra={
+                    'cutoff_date': cutoff_date.isoformat(),
+                    'partitions': dropped['partitions'],
+                    'ads_dropped': len(dropped['ads']),
+                    'ads_kept': len(dropped['kept'])
+                })
 
-                        aggregator.add_item({
-                            'ad_id': ad.id,
-                            'resource_url': ad.resource_url,
-                            'images_deleted': len(images)
-                        }, success=True)
+                # Ads kept by earlier runs are checked again chunk by chunk
+                just_kept = set(dropped['kept'])
+                for chunk in iter_retained_ads(db, cutoff_date, chunk_size=chunk_size):
+                    ads = [(ad_id, resource_url) for ad_id, resource_url in chunk if ad_id not in just_kept]
+                    if not ads:
+                        continue
+
+                    dead_ids = [ad_id for ad_id, _ in ads]
+                    if check_activity:
+                        alive = liveness.check(ads)
+                        dead_ids = [ad_id for ad_id in dead_ids if alive[ad_id] is False]
+                        for ad_id, resource_url in ads:
+                            if alive[ad_id] is not False:
+                                aggregator.add_item({'ad_id': ad_id, 'resource_url': resource_url, 'status': 'active'},
+                                                    success=False)
+
+                    deleted = AdRepository.delete_many_with_related(db, dead_ids)
+                    deleted_count += len(deleted['ads'])
+                    images_deleted_count += AdService.delete_unreferenced_images(db, deleted['images'])
+
+                    aggregator.add_item({
+                        'ads_deleted': len(deleted['ads']),
+                        'images_deleted': len(deleted['images'])
+                    }, success=True)
 
             aggregator.log_summary()
 
@@ -271,6 +273,100 @@ class AdService:
 
             return deleted_count, images_deleted_count
 
+    @staticmethod
+    @log_operation("delete_unreferenced_images")
+    def delete_unreferenced_images(db: Session, image_urls: List[str]) -> int:
+        """
+        Delete the images of deleted ads from S3, except those other ads
+        still show: identical photos share one content addressed object.
+        Objects an upload handed out within the grace period are kept too,
+        the ad reusing them may not be saved yet.
+
+        Returns:
+            Number of deleted objects
+        """
+        from common.utils.s3_utils import delete_s3_objects, s3_key_from_url, unclaimed_keys
+
+        if not image_urls:
+            return 0
+
+        referenced = AdRepository.get_referenced_image_urls(db, image_urls)
+        db.commit()
+        unreferenced = [
+            s3_key_from_url(image_url) for image_url in dict.fromkeys(image_urls) if image_url not in referenced
+        ]
+        unreferenced = [key for key in unreferenced if key]
+        deletable = unclaimed_keys(unreferenced)
+        deleted = sum(delete_s3_objects(deletable).values())
+
+        logger.info("Deleted unreferenced images", extra={
+            'image_count': len(image_urls),
+            'still_referenced': len(referenced),
+            'recently_claimed': len(unreferenced) - len(deletable),
+            'deleted': deleted
+        })
+        return deleted
+
+    @staticmethod
+    @log_operation("sweep_orphan_images")
+    def sweep_orphan_images(db: Session, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Delete S3 images under the ads prefix that no ad_images row references.
+
+        The bucket listing and the referenced keys are both streamed in key
+        order and merged, so neither side is held in memory. Objects younger
+        than S3_CLEANUP_CONFIG["orphan_grace_hours"] are skipped: images are
+        uploaded before their rows are saved. So are older objects an upload
+        handed out again within that time, reuse doesn't touch LastModified.
+
+        Args:
+            db: Database session
+            dry_run: Only count the orphans
+
+        Returns:
+            Counts of listed objects, orphans found, orphans recently claimed and orphans deleted
+        """
+        from common.utils.s3_utils import delete_s3_objects, iter_s3_objects, unclaimed_keys, S3_DELETE_MAX_KEYS
+
+        prefix = AWS_CONFIG['s3_prefix']
+        grace_cutoff = datetime.now(timezone.utc) - timedelta(hours=S3_CLEANUP_CONFIG["orphan_grace_hours"])
+        # Enough keys to keep every parallel DeleteObjects request full
+        flush_size = S3_DELETE_MAX_KEYS * S3_CLEANUP_CONFIG["delete_concurrency"]
+
+        with log_context(logger, prefix=prefix, dry_run=dry_run):
+            counts = {'listed': 0, 'orphans': 0, 'claimed': 0, 'deleted': 0}
+            orphans = []
+
+            def flush():
+                deletable = unclaimed_keys(orphans)
+                counts['claimed'] += len(orphans) - len(deletable)
+                if not dry_run:
+                    counts['deleted'] += sum(delete_s3_objects(deletable).values())
+                orphans.clear()
+
+            referenced = AdRepository.iter_image_keys(db, prefix)
+            current = next(referenced, None)
+            try:
+                for key, last_modified in iter_s3_objects(prefix):
+                    counts['listed'] += 1
+                    # Both sides are sorted, skip references to keys before this one
+                    while current is not None and current < key:
+                        current = next(referenced, None)
+                    if key == current or last_modified > grace_cutoff:
+                        continue
+
+                    counts['orphans'] += 1
+                    orphans.append(key)
+                    if len(orphans) >= flush_size:
+                        flush()
+                flush()
+            finally:
+                referenced.close()
+                db.rollback()
+
+            logger.info("Swept orphan images", extra=counts)
+            return counts
+
     @staticmethod
     @log_operation("clear_ad_cache")
     def clear_ad_cache(ad_id: int, resource_url: str = None):
@@ -1,22 +1,68 @@
 # common/unified_state_management.py
 
 import logging
-import json
-import asyncio
 import redis
-from typing import Dict, Any, Optional, Union, Callable, Awaitable
+from typing import Dict, Any, Iterable, Optional, Union, Callable, Awaitable
 
 from common.config import REDIS_URL
+from common.utils import codec
+from common.utils.cache import get_async_redis_client
 from common.utils.retry_utils import retry_with_exponential_backoff, NETWORK_EXCEPTIONS
 
 logger = logging.getLogger(__name__)
 
+# Atomic compare-and-set of state fields.
+# KEYS[1] state key, ARGV[1] compared field, ARGV[2] its expected encoded value ('' if unset),
+# ARGV[3] TTL, ARGV[4..] field/value pairs to set. Returns 1 if the fields were set, 0 otherwise.
+STATE_CAS_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current == false then
+    current = ''
+end
+if current ~= ARGV[2] then
+    return 0
+end
+if #ARGV > 3 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+def _encode_fields(data: Dict[str, Any]) -> Dict[str, bytes]:
+    return {field: codec.encode(value) for field, value in data.items()}
+
+
+def _decode_fields(key: str, raw: Dict[Any, bytes]) -> Dict[str, Any]:
+    state = {}
+    for field, value in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        try:
+            state[field] = codec.decode(value)
+        except codec.CodecError:
+            logger.warning(f"Invalid state field '{field}' in Redis for key {key}")
+    return state
+
+
+def _is_legacy_key_error(error: redis.ResponseError) -> bool:
+    """Whether a hash command failed on a state still stored as a single blob"""
+    # Pipelines prefix the server error with the failed command
+    return "WRONGTYPE" in str(error)
+
 
 class StateManager:
     """
     Unified state management for all messaging platforms.
     Provides a consistent interface for state management regardless of platform.
-    Supports both synchronous and asynchronous operations.
+    Supports both synchronous and asynchronous operations: the async methods use
+    the asyncio Redis client of the running event loop, the *_sync variants (for
+    Celery tasks) a blocking client.
+
+    Each state is a Redis hash with one codec-encoded value per field, so partial
+    updates write only the changed fields in a single round-trip and concurrent
+    updates of different fields don't overwrite each other. States written as a
+    single encoded blob by earlier versions are converted on first access.
     """
 
     def __init__(self, redis_url: str = REDIS_URL, prefix: str = 'state', default_ttl: int = 86400):
@@ -28,12 +74,18 @@ class StateManager:
             prefix: Prefix for Redis keys
             default_ttl: Default time-to-live for state data in seconds (default: 24 hours)
         """
+        self.redis_url = redis_url
         self.redis = redis.from_url(redis_url)
         self.prefix = prefix
         self.default_ttl = default_ttl
         self.platform_handlers = {}
         logger.info(f"Initialized StateManager with prefix '{prefix}'")
 
+    @property
+    def async_redis(self):
+        """asyncio Redis client for the running event loop, shared by the process"""
+        return get_async_redis_client(self.redis_url)
+
     def register_platform_handler(self, platform: str, handler: Any) -> None:
         """
         Register a platform-specific handler.
@@ -61,6 +113,44 @@ class StateManager:
         else:
             return f"{self.prefix}:{user_id}"
 
+    def _cas_args(self, expected: Any, updates: Dict[str, Any], field: str, ttl: Optional[int]) -> list:
+        args = [field, codec.encode(expected) if expected is not None else b'',
+                ttl if ttl is not None else self.default_ttl]
+        for name, value in _encode_fields(updates).items():
+            args.extend((name, value))
+        return args
+
+    async def _migrate_legacy_state(self, key: str) -> None:
+        """Convert a state stored as a single blob into a hash, keeping its TTL"""
+        client = self.async_redis
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.ttl(key)
+            data, ttl = await pipe.execute()
+        try:
+            state = codec.decode(data) if data else {}
+        except codec.CodecError:
+            logger.warning(f"Invalid state in Redis for key {key}")
+            state = {}
+
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if isinstance(state, dict) and state:
+                pipe.hset(key, mapping=_encode_fields(state))
+                pipe.expire(key, ttl if ttl > 0 else self.default_ttl)
+            await pipe.execute()
+        logger.info(f"Converted state for {key} to a hash")
+
+    async def _run(self, key: str, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a hash operation, converting a legacy blob state first if needed"""
+        try:
+            return await operation()
+        except redis.ResponseError as e:
+            if not _is_legacy_key_error(e):
+                raise
+        await self._migrate_legacy_state(key)
+        return await operation()
+
     @retry_with_exponential_backoff(
         max_retries=3,
         initial_delay=0.5,
@@ -90,17 +180,8 @@ class StateManager:
         key = self._get_key(user_id, platform)
 
         try:
-            # Use asyncio to run the Redis get in a thread pool
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(None, lambda: self.redis.get(key))
-
-            if data:
-                try:
-                    return json.loads(data)
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON in Redis for key {key}")
-                    return None
-            return None
+            raw = await self._run(key, lambda: self.async_redis.hgetall(key))
+            return _decode_fields(key, raw) if raw else None
         except Exception as e:
             logger.error(f"Error getting state for {key}: {e}")
             raise
@@ -113,7 +194,7 @@ class StateManager:
     async def set_state(self, user_id: Union[str, int], data: Dict[str, Any], platform: str = None,
                         ttl: int = None) -> bool:
         """
-        Set the state for a user.
+        Set the state for a user, replacing all of its fields.
 
         Args:
             user_id: User's platform-specific ID or database ID
@@ -138,24 +219,31 @@ class StateManager:
         expire_time = ttl if ttl is not None else self.default_ttl
 
         try:
-            serialized = json.dumps(data)
-
-            # Use asyncio to run the Redis set in a thread pool
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.redis.setex(key, expire_time, serialized)
-            )
+            fields = _encode_fields(data)
+
+            async with self.async_redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                if fields:
+                    pipe.hset(key, mapping=fields)
+                    pipe.expire(key, expire_time)
+                await pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error setting state for {key}: {e}")
             raise
 
+    @retry_with_exponential_backoff(
+        max_retries=3,
+        initial_delay=0.5,
+        retryable_exceptions=NETWORK_EXCEPTIONS
+    )
     async def update_state(self, user_id: Union[str, int], updates: Dict[str, Any], platform: str = None,
                            ttl: int = None) -> bool:
         """
         Update the state for a user (partial update).
 
+        Only the given fields are written, the TTL is refreshed in the same round-trip.
+
         Args:
             user_id: User's platform-specific ID or database ID
             updates: Dictionary of state updates
@@ -175,9 +263,88 @@ class StateManager:
                 # Fall back to direct implementation
 
         # Direct implementation
-        current_state = await self.get_state(user_id, platform) or {}
-        current_state.update(updates)
-        return await self.set_state(user_id, current_state, platform, ttl)
+        key = self._get_key(user_id, platform)
+        expire_time = ttl if ttl is not None else self.default_ttl
+
+        if not updates:
+            return True
+
+        async def write():
+            async with self.async_redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=_encode_fields(updates))
+                pipe.expire(key, expire_time)
+                await pipe.execute()
+
+        try:
+            await self._run(key, write)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating state for {key}: {e}")
+            raise
+
+    async def delete_state_fields(self, user_id: Union[str, int], fields: Iterable[str], platform: str = None,
+                                  ttl: int = None) -> bool:
+        """
+        Remove fields from the state of a user.
+
+        Args:
+            user_id: User's platform-specific ID or database ID
+            fields: Names of the fields to remove
+            platform: Optional platform identifier
+            ttl: Optional time-to-live in seconds
+
+        Returns:
+            True if successful
+        """
+        key = self._get_key(user_id, platform)
+        expire_time = ttl if ttl is not None else self.default_ttl
+        fields = list(fields)
+
+        if not fields:
+            return True
+
+        async def write():
+            async with self.async_redis.pipeline(transaction=True) as pipe:
+                pipe.hdel(key, *fields)
+                pipe.expire(key, expire_time)
+                await pipe.execute()
+
+        try:
+            await self._run(key, write)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting state fields for {key}: {e}")
+            raise
+
+    async def compare_and_set_state(self, user_id: Union[str, int], expected: Any, updates: Dict[str, Any],
+                                     platform: str = None, ttl: int = None, field: str = 'state') -> bool:
+        """
+        Atomically set state fields if another field still has the expected value.
+
+        Used for state transitions: two webhooks racing to move a user out of the
+        same state can't both succeed. Platform handlers are not consulted.
+
+        Args:
+            user_id: User's platform-specific ID or database ID
+            expected: Expected value of `field`, None if it must be unset
+            updates: Fields to set
+            platform: Optional platform identifier
+            ttl: Optional time-to-live in seconds
+            field: Field compared with `expected`
+
+        Returns:
+            True if the fields were set, False if `field` had another value
+        """
+        key = self._get_key(user_id, platform)
+        args = self._cas_args(expected, updates, field, ttl)
+
+        try:
+            script = self.async_redis.register_script(STATE_CAS_SCRIPT)
+            result = await self._run(key, lambda: script(keys=[key], args=args))
+            return bool(result)
+        except Exception as e:
+            logger.error(f"Error in compare-and-set for {key}: {e}")
+            raise
 
     @retry_with_exponential_backoff(
         max_retries=3,
@@ -208,9 +375,7 @@ class StateManager:
         key = self._get_key(user_id, platform)
 
         try:
-            # Use asyncio to run the Redis delete in a thread pool
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, lambda: self.redis.delete(key))
+            await self.async_redis.delete(key)
             return True
         except Exception as e:
             logger.error(f"Error clearing state for {key}: {e}")
@@ -227,11 +392,46 @@ class StateManager:
         Returns:
             Current state name or None
         """
-        state_data = await self.get_state(user_id, platform)
-        return state_data.get('state') if state_data else None
+        if platform and platform in self.platform_handlers:
+            state_data = await self.get_state(user_id, platform)
+            return state_data.get('state') if state_data else None
+
+        key = self._get_key(user_id, platform)
+        raw = await self._run(key, lambda: self.async_redis.hget(key, 'state'))
+        return _decode_fields(key, {'state': raw}).get('state') if raw else None
 
     # --- Synchronous API equivalents ---
 
+    def _migrate_legacy_state_sync(self, key: str) -> None:
+        """Synchronous version of _migrate_legacy_state"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        data, ttl = pipe.execute()
+        try:
+            state = codec.decode(data) if data else {}
+        except codec.CodecError:
+            logger.warning(f"Invalid state in Redis for key {key}")
+            state = {}
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key)
+        if isinstance(state, dict) and state:
+            pipe.hset(key, mapping=_encode_fields(state))
+            pipe.expire(key, ttl if ttl > 0 else self.default_ttl)
+        pipe.execute()
+        logger.info(f"Converted state for {key} to a hash")
+
+    def _run_sync(self, key: str, operation: Callable[[], Any]) -> Any:
+        """Synchronous version of _run"""
+        try:
+            return operation()
+        except redis.ResponseError as e:
+            if not _is_legacy_key_error(e):
+                raise
+        self._migrate_legacy_state_sync(key)
+        return operation()
+
     def get_state_sync(self, user_id: Union[str, int], platform: str = None) -> Optional[Dict[str, Any]]:
         """
         Synchronous version of get_state.
@@ -246,14 +446,8 @@ class StateManager:
         key = self._get_key(user_id, platform)
 
         try:
-            data = self.redis.get(key)
-            if data:
-                try:
-                    return json.loads(data)
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON in Redis for key {key}")
-                    return None
-            return None
+            raw = self._run_sync(key, lambda: self.redis.hgetall(key))
+            return _decode_fields(key, raw) if raw else None
         except Exception as e:
             logger.error(f"Error getting state for {key}: {e}")
             return None
@@ -276,8 +470,13 @@ class StateManager:
         expire_time = ttl if ttl is not None else self.default_ttl
 
         try:
-            serialized = json.dumps(data)
-            self.redis.setex(key, expire_time, serialized)
+            fields = _encode_fields(data)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(key)
+            if fields:
+                pipe.hset(key, mapping=fields)
+                pipe.expire(key, expire_time)
+            pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Error setting state for {key}: {e}")
@@ -297,9 +496,42 @@ class StateManager:
         Returns:
             True if successful, False otherwise
         """
-        current_state = self.get_state_sync(user_id, platform) or {}
-        current_state.update(updates)
-        return self.set_state_sync(user_id, current_state, platform, ttl)
+        key = self._get_key(user_id, platform)
+        expire_time = ttl if ttl is not None else self.default_ttl
+
+        if not updates:
+            return True
+
+        def write():
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(key, mapping=_encode_fields(updates))
+            pipe.expire(key, expire_time)
+            pipe.execute()
+
+        try:
+            self._run_sync(key, write)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating state for {key}: {e}")
+            return False
+
+    def compare_and_set_state_sync(self, user_id: Union[str, int], expected: Any, updates: Dict[str, Any],
+                                   platform: str = None, ttl: int = None, field: str = 'state') -> bool:
+        """
+        Synchronous version of compare_and_set_state.
+
+        Returns:
+            True if the fields were set, False if `field` had another value or on error
+        """
+        key = self._get_key(user_id, platform)
+        args = self._cas_args(expected, updates, field, ttl)
+
+        try:
+            script = self.redis.register_script(STATE_CAS_SCRIPT)
+            return bool(self._run_sync(key, lambda: script(keys=[key], args=args)))
+        except Exception as e:
+            logger.error(f"Error in compare-and-set for {key}: {e}")
+            return False
 
     def clear_state_sync(self, user_id: Union[str, int], platform: str = None) -> bool:
         """
@@ -332,8 +564,14 @@ class StateManager:
         Returns:
             Current state name or None
         """
-        state_data = self.get_state_sync(user_id, platform)
-        return state_data.get('state') if state_data else None
+        key = self._get_key(user_id, platform)
+
+        try:
+            raw = self._run_sync(key, lambda: self.redis.hget(key, 'state'))
+            return _decode_fields(key, {'state': raw}).get('state') if raw else None
+        except Exception as e:
+            logger.error(f"Error getting state name for {key}: {e}")
+            return None
 
 
 class StateMachine:
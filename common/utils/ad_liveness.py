@@ -0,0 +1,183 @@
+# common/utils/ad_liveness.py
+
+"""
+Concurrent liveness checks of ad pages.
+
+An ad is alive while its resource_url answers below 400. The checks send HEAD
+requests (GET where HEAD isn't allowed, without reading the body) over one
+aiohttp connection pool, with a bounded number of requests in flight and a
+request rate limit per domain. Only a 4xx answer other than 429 marks an ad
+dead: timeouts, connection errors, 429 and 5xx responses leave it unknown,
+and cleanup keeps it until a later run.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from common.config import AD_LIVENESS_CONFIG
+from common.utils.unified_request_utils import DEFAULT_HEADERS, AsyncRateLimiter
+from common.utils.logging_config import log_operation, log_context
+
+# Import the common utils logger
+from . import logger
+
+# Answers after which the request is retried
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Answers to HEAD from servers that only support GET
+HEAD_NOT_ALLOWED = (405, 501)
+
+
+class AdLivenessChecker:
+    """
+    Check many ad URLs concurrently through a shared connection pool.
+
+    Usage:
+        async with AdLivenessChecker() as checker:
+            alive = await checker.check(urls)
+    """
+
+    def __init__(
+            self,
+            concurrency: int = AD_LIVENESS_CONFIG["concurrency"],
+            per_host_limit: int = AD_LIVENESS_CONFIG["per_host_limit"],
+            requests_per_second: float = AD_LIVENESS_CONFIG["requests_per_second"],
+            timeout: float = AD_LIVENESS_CONFIG["timeout"],
+            retries: int = 2
+    ):
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.retries = retries
+        self._limiters: Dict[str, AsyncRateLimiter] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_limit)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+
+    def _limiter(self, url: str) -> AsyncRateLimiter:
+        host = urlsplit(url).hostname or ""
+        if host not in self._limiters:
+            self._limiters[host] = AsyncRateLimiter(self.requests_per_second)
+        return self._limiters[host]
+
+    async def _status(self, url: str) -> int:
+        async with self._session.head(url, allow_redirects=True) as response:
+            if response.status not in HEAD_NOT_ALLOWED:
+                return response.status
+        async with self._session.get(url, allow_redirects=True) as response:
+            return response.status
+
+    async def is_alive(self, url: str) -> Optional[bool]:
+        """True below 400, False on another 4xx, None when the page couldn't be checked"""
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    await asyncio.sleep(2 ** (attempt - 1))
+                await self._limiter(url).acquire()
+                try:
+                    status = await self._status(url)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.debug("Liveness check failed", extra={
+                        'url': url,
+                        'attempt': attempt + 1,
+                        'error_type': type(e).__name__
+                    })
+                    continue
+                if status not in RETRY_STATUSES:
+                    return status < 400
+            return None
+
+    async def check(self, urls: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """is_alive of every distinct URL"""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.is_alive(url) for url in urls))
+        return dict(zip(urls, results))
+
+
+class AdLivenessRun:
+    """
+    One checker on one event loop for all liveness checks of a cleanup run.
+
+    The connection pool and the per domain rate limits are shared across
+    chunks, instead of being rebuilt for each of them. The loop and the
+    checker are created on the first check.
+
+    Usage:
+        with AdLivenessRun() as liveness:
+            for ads in chunks:
+                alive = liveness.check(ads)
+    """
+
+    def __init__(self, **checker_options):
+        self.checker_options = checker_options
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._checker: Optional[AdLivenessChecker] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self, coro):
+        return self._loop.run_until_complete(coro)
+
+    @log_operation("check_ads_liveness")
+    def check(self, ads: List[Tuple[int, Optional[str]]]) -> Dict[int, Optional[bool]]:
+        """
+        Check (id, resource_url) ads concurrently from synchronous code.
+
+        Returns:
+            Mapping of ad ID to True (alive), False (dead) or None (unknown).
+            Ads without a URL can't be shown anymore and count as dead.
+        """
+        urls = [url for _, url in ads if url]
+
+        with log_context(logger, ad_count=len(ads)):
+            if urls and self._checker is None:
+                self._loop = asyncio.new_event_loop()
+                self._checker = self._run(AdLivenessChecker(**self.checker_options).__aenter__())
+            alive = self._run(self._checker.check(urls)) if urls else {}
+            result = {ad_id: alive[url] if url else False for ad_id, url in ads}
+
+            logger.info("Checked ad liveness", extra={
+                'ad_count': len(ads),
+                'alive': sum(1 for value in result.values() if value),
+                'dead': sum(1 for value in result.values() if value is False),
+                'unknown': sum(1 for value in result.values() if value is None)
+            })
+            return result
+
+    def close(self) -> None:
+        """Close the connection pool and the event loop"""
+        loop, checker = self._loop, self._checker
+        self._loop = self._checker = None
+        if loop is None:
+            return
+        try:
+            if checker is not None:
+                loop.run_until_complete(checker.__aexit__(None, None, None))
+        finally:
+            loop.close()
+
+
+def check_ads_liveness(ads: List[Tuple[int, Optional[str]]]) -> Dict[int, Optional[bool]]:
+    """Check (id, resource_url) ads once, see AdLivenessRun.check"""
+    with AdLivenessRun() as liveness:
+        return liveness.check(ads)
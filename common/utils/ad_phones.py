@@ -0,0 +1,175 @@
+# common/utils/ad_phones.py
+
+"""
+On-demand phone extraction.
+
+Phones are not extracted when an ad is scraped. The first request for the
+phones of an ad schedules one extraction on a scraper worker, the result is
+stored in ad_phones and cached in Redis. Failed extractions are cached for a
+short time, so a broken source is not hit again on every click. Concurrent
+requests for the same ad are coalesced on a Redis lock: only one Playwright
+run happens per ad while the others wait for its result. When the shared
+browser is saturated the extraction is retried by its task instead, nothing
+is cached and the lock is kept so requests stay pending meanwhile.
+"""
+
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from common.celery_app import celery_app
+from common.config import BROWSER_POOL_CONFIG
+from common.db.session import db_session
+from common.db.repositories.ad_repository import AdRepository
+from common.utils.browser_pool import BrowserPoolBusy
+from common.utils.cache import redis_client, CacheTTL, get_entity_cache_key, RELEASE_LOCK_SCRIPT
+from common.utils.cache_managers import AdCacheManager
+from common.utils.logging_config import log_operation, log_context
+
+# Import the common utils logger
+from . import logger
+
+EXTRACT_PHONES_TASK = "scraper_service.app.tasks.extract_ad_phones"
+
+# Statuses returned by request_ad_phones
+PHONES_READY = "ready"
+PHONES_PENDING = "pending"
+PHONES_FAILED = "failed"
+
+# Negative cache for ads whose phones could not be extracted
+PHONES_FAILURE_TTL = CacheTTL.MEDIUM
+# Longer than one extraction, so a lock left by a dead worker expires soon after
+EXTRACTION_LOCK_TTL = BROWSER_POOL_CONFIG["task_timeout"] + CacheTTL.SHORT
+
+PhoneRows = List[Dict[str, Optional[str]]]
+
+
+def _failure_key(ad_id: int) -> str:
+    return get_entity_cache_key("ad_phones", ad_id, "failed")
+
+
+def _lock_key(ad_id: int) -> str:
+    return get_entity_cache_key("ad_phones", ad_id, "lock")
+
+
+@log_operation("get_known_ad_phones")
+def get_known_ad_phones(ad_id: int) -> Optional[PhoneRows]:
+    """
+    Get already extracted phones of an ad from Redis, falling back to ad_phones.
+
+    Returns:
+        List of {'phone', 'viber_link'} rows, or None if the phones were never extracted
+    """
+    with log_context(logger, ad_id=ad_id):
+        phones = AdCacheManager.get_ad_phones(ad_id)
+        if phones is not None:
+            return phones
+
+        with db_session() as db:
+            phones = AdRepository.get_ad_phones(db, ad_id)
+
+        if not phones:
+            return None
+
+        AdCacheManager.set_ad_phones(ad_id, phones)
+        return phones
+
+
+@log_operation("request_ad_phones")
+def request_ad_phones(ad_id: int) -> Tuple[str, PhoneRows]:
+    """
+    Get the phones of an ad, scheduling their extraction on the first request.
+
+    Never blocks on Playwright, callers poll until the status is no longer pending.
+
+    Returns:
+        Tuple of (status, phones) where status is one of:
+        - PHONES_READY: phones are known
+        - PHONES_PENDING: an extraction is scheduled or running, ask again later
+        - PHONES_FAILED: extraction failed recently, retried after PHONES_FAILURE_TTL
+    """
+    with log_context(logger, ad_id=ad_id):
+        phones = get_known_ad_phones(ad_id)
+        if phones is not None:
+            return PHONES_READY, phones
+
+        if redis_client.exists(_failure_key(ad_id)):
+            logger.debug("Phone extraction failed recently", extra={'ad_id': ad_id})
+            return PHONES_FAILED, []
+
+        lock_token = str(uuid.uuid4())
+        if not redis_client.set(_lock_key(ad_id), lock_token, ex=EXTRACTION_LOCK_TTL, nx=True):
+            logger.debug("Phone extraction already in progress", extra={'ad_id': ad_id})
+            return PHONES_PENDING, []
+
+        try:
+            celery_app.send_task(EXTRACT_PHONES_TASK, args=[ad_id, lock_token])
+        except Exception:
+            redis_client.eval(RELEASE_LOCK_SCRIPT, 1, _lock_key(ad_id), lock_token)
+            raise
+
+        logger.info("Scheduled phone extraction", extra={'ad_id': ad_id})
+        return PHONES_PENDING, []
+
+
+@log_operation("extract_and_store_ad_phones")
+def extract_and_store_ad_phones(ad_id: int, lock_token: Optional[str] = None) -> PhoneRows:
+    """
+    Extract the phones of an ad and store them in ad_phones and Redis.
+
+    Runs on a scraper worker, which owns the shared browser. Releases the
+    extraction lock taken by request_ad_phones when `lock_token` is given.
+
+    Returns:
+        Extracted {'phone', 'viber_link'} rows, empty if extraction failed
+
+    Raises:
+        BrowserPoolBusy: the shared browser has no room, retry later with the same lock_token
+    """
+    # Imported here so that callers of request_ad_phones do not load Playwright
+    from common.utils.ad_utils import extract_ad_phone_rows
+
+    with log_context(logger, ad_id=ad_id):
+        release_lock = True
+        try:
+            # A duplicate task may run after the first one has stored the phones
+            phones = get_known_ad_phones(ad_id)
+            if phones is not None:
+                return phones
+
+            with db_session() as db:
+                ad = AdRepository.get_by_id(db, ad_id)
+                resource_url = ad.resource_url if ad else None
+
+            if not resource_url:
+                logger.warning("Cannot extract phones, ad doesn't exist", extra={'ad_id': ad_id})
+                return []
+
+            try:
+                phones = extract_ad_phone_rows(resource_url)
+            except BrowserPoolBusy:
+                # Not an answer about this ad: no failure is cached and the retry keeps the lock
+                release_lock = False
+                raise
+            if not phones:
+                redis_client.set(_failure_key(ad_id), 1, ex=PHONES_FAILURE_TTL)
+                logger.info("No phones extracted, caching failure", extra={
+                    'ad_id': ad_id,
+                    'ttl': PHONES_FAILURE_TTL
+                })
+                return []
+
+            with db_session() as db:
+                AdRepository.bulk_add_phones(db, [dict(phone, ad_id=ad_id) for phone in phones])
+
+            AdCacheManager.set_ad_phones(ad_id, phones)
+            # Full ad data embeds the phones
+            AdCacheManager.delete(get_entity_cache_key("full_ad", ad_id))
+
+            logger.info("Extracted and stored phones", extra={
+                'ad_id': ad_id,
+                'phone_count': len(phones)
+            })
+            return phones
+        finally:
+            if lock_token and release_lock:
+                redis_client.eval(RELEASE_LOCK_SCRIPT, 1, _lock_key(ad_id), lock_token)
@@ -3,7 +3,10 @@
 from typing import Dict, Any, Optional, List, Union
 from common.db.session import db_session
 from common.db.repositories.ad_repository import AdRepository
-from common.utils.s3_utils import _upload_image_to_s3
+from common.celery_app import celery_app
+from common.utils.cache_invalidation import invalidate_ad_caches
+from common.utils.s3_utils import upload_images_to_s3, is_mirrored_image_url
+from common.utils.browser_pool import BrowserPoolBusy
 from common.utils.phone_parser import extract_phone_numbers_from_resource
 from common.db.models.ad import Ad
 from common.utils.logging_config import log_operation, log_context, LogAggregator
@@ -11,6 +14,10 @@ from common.utils.logging_config import log_operation, log_context, LogAggregato
 # Import the common utils logger
 from . import logger
 
+# Flatfy image CDN, used as the image URL until the image is mirrored to S3
+SOURCE_IMAGE_URL = "https://market-images.lunstatic.net/lun-ua/720/720/images/{image_id}.webp"
+MIRROR_IMAGES_TASK = "scraper_service.app.tasks.mirror_ad_images"
+
 
 @log_operation("process_and_insert_ad")
 def process_and_insert_ad(
@@ -19,7 +26,8 @@ def process_and_insert_ad(
         geo_id: int
 ) -> Optional[int]:
     """
-    Process ad data and insert into the database, including image upload and phone extraction.
+    Process ad data and insert into the database, including image upload.
+    Phones are extracted on first request, see common.utils.ad_phones.
     """
     ad_unique_id = str(ad_data.get("id", ""))
 
@@ -41,38 +49,17 @@ def process_and_insert_ad(
                     })
                     return existing_ad.id
 
-                # Process images
-                uploaded_image_urls = []
-                try:
-                    uploaded_image_urls = process_ad_images(ad_data, ad_unique_id)
-                    logger.info("Processed images", extra={
-                        'ad_id': ad_unique_id,
-                        'image_count': len(uploaded_image_urls)
-                    })
-                except Exception as img_upload_err:
-                    logger.error("Error uploading images", exc_info=True, extra={
-                        'ad_id': ad_unique_id,
-                        'error_type': type(img_upload_err).__name__
-                    })
+                # Original CDN URLs serve as placeholders until the images are mirrored
+                source_image_urls = get_source_image_urls(ad_data)
 
                 # Create ad data
-                new_ad_data = {
-                    "external_id": ad_unique_id,
-                    "property_type": property_type,
-                    "city": geo_id,
-                    "address": ad_data.get("header"),
-                    "price": ad_data.get("price"),
-                    "square_feet": ad_data.get("area_total"),
-                    "rooms_count": ad_data.get("room_count"),
-                    "floor": ad_data.get("floor"),
-                    "total_floors": ad_data.get("floor_count"),
-                    "insert_time": ad_data.get("insert_time"),
-                    "description": ad_data.get("text"),
-                    "resource_url": resource_url
-                }
+                new_ad_data = build_ad_row(ad_data, property_type, geo_id)
 
                 # Insert new ad
                 ad = AdRepository.create_ad(db, new_ad_data)
+                if ad is None:
+                    # Inserted concurrently, e.g. by a page ingest
+                    return AdRepository.get_by_external_id(db, ad_unique_id).id
                 ad_id = ad.id
                 logger.info("Created new ad", extra={
                     'external_id': ad_unique_id,
@@ -80,39 +67,17 @@ def process_and_insert_ad(
                 })
 
                 # Insert image references
-                if uploaded_image_urls:
-                    for url in uploaded_image_urls:
-                        AdRepository.add_image(db, ad_id, url)
+                if source_image_urls:
+                    AdRepository.bulk_add_images(db, [
+                        {"ad_id": ad_id, "image_url": url} for url in source_image_urls
+                    ])
                     logger.info("Inserted image references", extra={
                         'ad_id': ad_id,
-                        'image_count': len(uploaded_image_urls)
-                    })
-
-                # Extract and store phone numbers
-                try:
-                    result = extract_phone_numbers_from_resource(resource_url)
-                    phones = result.phone_numbers
-                    viber_link = result.viber_link
-
-                    if phones:
-                        for phone in phones:
-                            AdRepository.add_phone(db, ad_id, phone)
-                        logger.info("Inserted phone numbers", extra={
-                            'ad_id': ad_id,
-                            'phone_count': len(phones)
-                        })
-
-                    if viber_link:
-                        AdRepository.add_phone(db, ad_id, None, viber_link)
-                        logger.info("Inserted viber link", extra={'ad_id': ad_id})
-
-                except Exception as e:
-                    logger.error("Error extracting/storing phones", exc_info=True, extra={
-                        'ad_id': ad_id,
-                        'error_type': type(e).__name__
+                        'image_count': len(source_image_urls)
                     })
 
                 db.commit()
+                schedule_image_mirroring([ad_id])
                 logger.info("Successfully processed and inserted ad", extra={
                     'ad_id': ad_id,
                     'external_id': ad_unique_id
@@ -127,43 +92,215 @@ def process_and_insert_ad(
             return None
 
 
-@log_operation("process_ad_images")
-def process_ad_images(ad_data: Dict[str, Any], ad_unique_id: str) -> List[str]:
+def build_ad_row(ad_data: Dict[str, Any], property_type: str, geo_id: int) -> Dict[str, Any]:
+    """
+    Map a Flatfy ad payload to ads table columns.
+    """
+    ad_unique_id = str(ad_data.get("id", ""))
+    return {
+        "external_id": ad_unique_id,
+        "property_type": property_type,
+        "city": geo_id,
+        "address": ad_data.get("header"),
+        "price": ad_data.get("price"),
+        "square_feet": ad_data.get("area_total"),
+        "rooms_count": ad_data.get("room_count"),
+        "floor": ad_data.get("floor"),
+        "total_floors": ad_data.get("floor_count"),
+        "insert_time": ad_data.get("insert_time"),
+        "description": ad_data.get("text"),
+        "resource_url": f"https://flatfy.ua/uk/redirect/{ad_unique_id}"
+    }
+
+
+@log_operation("extract_ad_phone_rows")
+def extract_ad_phone_rows(resource_url: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Extract phone numbers and the viber link of an ad as ad_phones rows (without ad_id).
+    BrowserPoolBusy is raised to the caller, it is no answer about the ad's phones.
+    """
+    with log_context(logger, resource_url=resource_url):
+        try:
+            result = extract_phone_numbers_from_resource(resource_url)
+        except BrowserPoolBusy:
+            raise
+        except Exception as e:
+            logger.error("Error extracting phones", exc_info=True, extra={
+                'resource_url': resource_url,
+                'error_type': type(e).__name__
+            })
+            return []
+
+        rows = [{"phone": phone, "viber_link": None} for phone in result.phone_numbers or []]
+        if result.viber_link:
+            rows.append({"phone": None, "viber_link": result.viber_link})
+        return rows
+
+
+@log_operation("process_and_insert_ads_page")
+def process_and_insert_ads_page(
+        ads_data: List[Dict[str, Any]],
+        property_type: str,
+        geo_id: int
+) -> List[int]:
     """
-    Process and upload images associated with an ad to S3.
+    Ingest a whole page of scraped ads with a constant number of database round trips.
+
+    Known external IDs are filtered out with one ANY() query, then ads and ad_images
+    are each written with a single INSERT ... ON CONFLICT DO NOTHING RETURNING
+    statement. Images are stored with their source URLs and mirrored to S3 afterwards
+    by mirror_ad_images; phones are extracted on first request.
+
+    Returns:
+        Database IDs of the newly inserted ads, in page order
     """
-    uploaded_image_urls = []
+    # Deduplicate the page itself, keeping the first occurrence
+    page_ads = {}
+    for ad_data in ads_data:
+        ad_unique_id = str(ad_data.get("id", ""))
+        if not ad_unique_id:
+            logger.warning("Missing ad ID, skipping insertion", extra={'ad_data': ad_data})
+            continue
+        page_ads.setdefault(ad_unique_id, ad_data)
 
-    with log_context(logger, ad_id=ad_unique_id):
-        aggregator = LogAggregator(logger, f"process_ad_images_{ad_unique_id}")
+    with log_context(logger, property_type=property_type, geo_id=geo_id, page_size=len(page_ads)):
+        if not page_ads:
+            return []
 
         try:
-            images = ad_data.get('images', [])
+            with db_session() as db:
+                existing_ids = AdRepository.get_existing_external_ids(db, list(page_ads))
+
+            new_ads = {
+                external_id: ad_data for external_id, ad_data in page_ads.items()
+                if external_id not in existing_ids
+            }
+            if not new_ads:
+                logger.debug("No new ads on page", extra={'page_size': len(page_ads)})
+                return []
+
+            ad_rows = []
+            images_by_ad = {}
+            for external_id, ad_data in new_ads.items():
+                ad_row = build_ad_row(ad_data, property_type, geo_id)
+                ad_rows.append(ad_row)
+                images_by_ad[external_id] = get_source_image_urls(ad_data)
 
-            for image_info in images:
-                image_id = image_info.get("image_id")
-                if not image_id:
-                    aggregator.add_error("Missing image_id", image_info)
-                    continue
+            with db_session() as db:
+                inserted = AdRepository.bulk_create_ads(db, ad_rows)
+
+                AdRepository.bulk_add_images(db, [
+                    {"ad_id": ad_id, "image_url": url}
+                    for external_id, ad_id in inserted.items()
+                    for url in images_by_ad.get(external_id, [])
+                ])
+
+            ad_ids = [inserted[external_id] for external_id in new_ads if external_id in inserted]
+            schedule_image_mirroring([
+                inserted[external_id] for external_id in inserted if images_by_ad.get(external_id)
+            ])
+            logger.info("Ingested ads page", extra={
+                'page_size': len(page_ads),
+                'existing': len(existing_ids),
+                'inserted': len(ad_ids)
+            })
+            return ad_ids
 
-                original_url = f"https://market-images.lunstatic.net/lun-ua/720/720/images/{image_id}.webp"
-                s3_url = _upload_image_to_s3(original_url, ad_unique_id, max_retries=3)
+        except Exception as e:
+            logger.error("Error in process_and_insert_ads_page", exc_info=True, extra={
+                'page_size': len(page_ads),
+                'error_type': type(e).__name__
+            })
+            return []
+
+
+def get_source_image_urls(ad_data: Dict[str, Any]) -> List[str]:
+    """
+    Build the original CDN URLs of an ad's images from the Flatfy payload.
+    """
+    return [
+        SOURCE_IMAGE_URL.format(image_id=image_info.get("image_id"))
+        for image_info in ad_data.get('images') or []
+        if image_info.get("image_id")
+    ]
+
+
+@log_operation("schedule_image_mirroring")
+def schedule_image_mirroring(ad_ids: List[int]) -> None:
+    """
+    Queue mirroring of the ads' images to S3 on the image queue.
+    """
+    if not ad_ids:
+        return
+    try:
+        celery_app.send_task(MIRROR_IMAGES_TASK, args=[list(ad_ids)])
+    except Exception as e:
+        # Ads keep their source image URLs, which remain usable
+        logger.error("Failed to schedule image mirroring", exc_info=True, extra={
+            'ad_ids': ad_ids[:10],
+            'error_type': type(e).__name__
+        })
+
+
+@log_operation("mirror_ad_images")
+def mirror_ad_images(ad_ids: List[int]) -> int:
+    """
+    Mirror the not yet mirrored images of the given ads to S3 in parallel and
+    replace their ad_images URLs in bulk.
+
+    Returns:
+        Number of mirrored images
+    """
+    with log_context(logger, ad_count=len(ad_ids)):
+        with db_session() as db:
+            images = AdRepository.get_images_for_ads(db, ad_ids)
 
-                if s3_url:
-                    uploaded_image_urls.append(s3_url)
-                    aggregator.add_item({'image_id': image_id, 's3_url': s3_url}, success=True)
-                else:
-                    aggregator.add_error("Failed to upload", {'image_id': image_id})
+        pending = {
+            image.id: (image.image_url, image.external_id)
+            for image in images if not is_mirrored_image_url(image.image_url)
+        }
+        ad_by_image = {image.id: image.ad_id for image in images}
 
-            aggregator.log_summary()
-            return uploaded_image_urls
+        if not pending:
+            return 0
+
+        mirrored = upload_images_to_s3(pending)
+
+        if mirrored:
+            with db_session() as db:
+                AdRepository.bulk_update_image_urls(db, mirrored)
+
+            for ad_id in {ad_by_image[image_id] for image_id in mirrored}:
+                invalidate_ad_caches(ad_id)
+
+        logger.info("Mirrored ad images", extra={
+            'ad_count': len(ad_ids),
+            'pending': len(pending),
+            'mirrored': len(mirrored)
+        })
+        return len(mirrored)
+
+
+@log_operation("process_ad_images")
+def process_ad_images(ad_data: Dict[str, Any], ad_unique_id: str) -> List[str]:
+    """
+    Process and upload images associated with an ad to S3 in parallel.
+    """
+    with log_context(logger, ad_id=ad_unique_id):
+        try:
+            source_urls = get_source_image_urls(ad_data)
+            mirrored = upload_images_to_s3({
+                position: (url, ad_unique_id) for position, url in enumerate(source_urls)
+            })
+            # Keep the original image order
+            return [mirrored[position] for position in sorted(mirrored)]
 
         except Exception as e:
             logger.error("Error processing ad images", exc_info=True, extra={
                 'ad_id': ad_unique_id,
                 'error_type': type(e).__name__
             })
-            return uploaded_image_urls
+            return []
 
 
 @log_operation("insert_ad_images")
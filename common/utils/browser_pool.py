@@ -0,0 +1,322 @@
+# common/utils/browser_pool.py
+
+"""
+Worker-scoped Playwright browser pool.
+
+One Chromium process is shared by every page opened in a worker process. The
+pool owns a private event loop running in a daemon thread, so synchronous
+callers (Celery tasks, ingestion threads) submit coroutines to it instead of
+starting an event loop and a browser per call.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+from celery.signals import worker_process_shutdown
+from playwright.async_api import async_playwright, Browser, Page
+
+from common.config import BROWSER_POOL_CONFIG
+from common.utils.logging_config import log_operation, log_context
+
+# Import the common utils logger
+from . import logger
+
+# Chromium flags keeping memory low on the scraper container
+CHROMIUM_ARGS = [
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-gpu',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-site-isolation-trials',
+    '--mute-audio',
+    '--disable-infobars',
+    '--disable-breakpad',
+    '--disable-3d-apis',
+    '--disable-accelerated-2d-canvas',
+    '--disable-accelerated-jpeg-decoding',
+    '--disable-accelerated-mjpeg-decode',
+    '--disable-accelerated-video-decode',
+    '--disable-app-list-dismiss-on-blur',
+    '--disable-canvas-aa',
+    '--disable-composited-antialiasing',
+    '--disable-gl-extensions',
+    '--disable-webgl',
+    '--disable-webgl2',
+    '--ignore-certificate-errors',
+    '--disable-features=ScriptStreaming',
+    '--js-flags=--max-old-space-size=128',  # Limit JavaScript memory
+]
+
+
+# Set while the current task holds a page, so nested pages (e.g. the OLX proxy
+# fallback opened from inside a parsed page) do not wait on the page semaphore
+_holding_page = contextvars.ContextVar('browser_pool_holding_page', default=False)
+
+
+class BrowserPoolBusy(Exception):
+    """Raised when the pool already has max_queue calls in flight"""
+
+
+async def launch_optimized_browser(playwright) -> Browser:
+    """
+    Launch a headless Chromium with optimized memory settings.
+    """
+    return await playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+
+
+async def _close_quietly(closable):
+    try:
+        await closable.close()
+    except Exception as e:
+        logger.debug("Error closing browser resource", extra={'error_type': type(e).__name__})
+
+
+class _BrowserSlot:
+    """A launched browser with its usage counters and idle default contexts"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active = 0
+        self.retired = False
+        self.idle_contexts = []  # [(context, uses)]
+
+
+class BrowserPool:
+    """
+    Shared Chromium process with context recycling and browser rotation.
+
+    - at most `max_concurrent_pages` pages are open at once
+    - default contexts (no proxy, JavaScript on) are reused for up to
+      `max_uses_per_context` pages, with cookies cleared between uses
+    - after `max_pages_per_browser` pages the browser is retired: new pages go
+      to a fresh browser and the old one closes once its last page is done
+    - at most `max_queue` calls may be in flight, further calls fail fast
+      with BrowserPoolBusy instead of piling up
+    """
+
+    def __init__(
+            self,
+            max_concurrent_pages: int = BROWSER_POOL_CONFIG["max_concurrent_pages"],
+            max_pages_per_browser: int = BROWSER_POOL_CONFIG["max_pages_per_browser"],
+            max_uses_per_context: int = BROWSER_POOL_CONFIG["max_uses_per_context"],
+            max_queue: int = BROWSER_POOL_CONFIG["max_queue"]
+    ):
+        self.max_concurrent_pages = max_concurrent_pages
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_uses_per_context = max_uses_per_context
+        self.max_queue = max_queue
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        # Only touched from the pool's event loop
+        self._playwright = None
+        self._slot: Optional[_BrowserSlot] = None
+        self._retiring = []
+        self._page_semaphore: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+
+    # ---- called from any thread ----
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def run(self, coro_factory: Callable[["BrowserPool"], Awaitable[Any]], timeout: Optional[float] = None):
+        """
+        Run `coro_factory(pool)` on the pool's event loop and wait for its result.
+
+        Raises:
+            BrowserPoolBusy: max_queue calls are already in flight
+            concurrent.futures.TimeoutError: the call did not finish in time
+        """
+        with self._pending_lock:
+            if self._pending >= self.max_queue:
+                raise BrowserPoolBusy(f"Browser pool queue is full ({self.max_queue})")
+            self._pending += 1
+
+        try:
+            future = asyncio.run_coroutine_threadsafe(coro_factory(self), self._ensure_loop())
+            try:
+                return future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                raise
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    @log_operation("browser_pool_shutdown")
+    def shutdown(self, timeout: float = 30):
+        """Close all browsers and stop the pool's event loop"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning("Error shutting down browser pool", extra={'error_type': type(e).__name__})
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    # ---- called on the pool's event loop ----
+
+    async def _get_slot(self) -> _BrowserSlot:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        slot = self._slot
+        if slot is None or not slot.browser.is_connected():
+            if slot is not None:
+                logger.warning("Pooled browser disconnected, relaunching", extra={
+                    'pages_served': slot.pages_served
+                })
+                self._retire(slot)
+            slot = self._slot = _BrowserSlot(await launch_optimized_browser(self._playwright))
+            logger.info("Launched pooled browser", extra={'retiring': len(self._retiring)})
+        return slot
+
+    def _retire(self, slot: _BrowserSlot):
+        slot.retired = True
+        if slot is self._slot:
+            self._slot = None
+        if slot not in self._retiring:
+            self._retiring.append(slot)
+
+    async def _close_retired(self, force: bool = False):
+        for slot in [slot for slot in self._retiring if force or slot.active == 0]:
+            self._retiring.remove(slot)
+            for context, _ in slot.idle_contexts:
+                await _close_quietly(context)
+            slot.idle_contexts.clear()
+            await _close_quietly(slot.browser)
+            logger.info("Closed retired browser", extra={'pages_served': slot.pages_served})
+
+    async def _close_all(self):
+        if self._slot is not None:
+            self._retire(self._slot)
+        await self._close_retired(force=True)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @asynccontextmanager
+    async def page(
+            self,
+            proxy: Optional[dict] = None,
+            user_agent: Optional[str] = None,
+            java_script_enabled: bool = True
+    ):
+        """
+        Open a page in the shared browser, waiting while max_concurrent_pages are open.
+
+        Default contexts (no proxy, JavaScript on) are recycled; `user_agent` only
+        applies when a new context has to be created.
+        """
+        if self._page_semaphore is None:
+            self._page_semaphore = asyncio.Semaphore(self.max_concurrent_pages)
+            self._launch_lock = asyncio.Lock()
+
+        nested = _holding_page.get()
+        if not nested:
+            await self._page_semaphore.acquire()
+        token = _holding_page.set(True)
+
+        try:
+            async with self._launch_lock:
+                slot = await self._get_slot()
+                slot.active += 1
+                slot.pages_served += 1
+                if slot.pages_served >= self.max_pages_per_browser:
+                    # Rotate: the next page launches a fresh browser
+                    self._retire(slot)
+
+            reusable = proxy is None and java_script_enabled
+            context = None
+            try:
+                if reusable and slot.idle_contexts:
+                    context, uses = slot.idle_contexts.pop()
+                else:
+                    context, uses = await slot.browser.new_context(
+                        user_agent=user_agent,
+                        java_script_enabled=java_script_enabled,
+                        proxy=proxy
+                    ), 0
+
+                page: Page = await context.new_page()
+                try:
+                    yield page
+                finally:
+                    await _close_quietly(page)
+
+                uses += 1
+                if reusable and not slot.retired and uses < self.max_uses_per_context:
+                    await context.clear_cookies()
+                    slot.idle_contexts.append((context, uses))
+                    context = None
+            finally:
+                if context is not None:
+                    await _close_quietly(context)
+                slot.active -= 1
+                await self._close_retired()
+        finally:
+            _holding_page.reset(token)
+            if not nested:
+                self._page_semaphore.release()
+
+
+# Worker-scoped pool, recreated after fork so each process owns its browser
+_browser_pool: Optional[BrowserPool] = None
+_browser_pool_pid: Optional[int] = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Get the browser pool of the current process"""
+    global _browser_pool, _browser_pool_pid
+
+    with _browser_pool_lock:
+        if _browser_pool is None or _browser_pool_pid != os.getpid():
+            with log_context(logger, pid=os.getpid()):
+                logger.info("Creating browser pool", extra={
+                    'max_concurrent_pages': BROWSER_POOL_CONFIG["max_concurrent_pages"],
+                    'max_pages_per_browser': BROWSER_POOL_CONFIG["max_pages_per_browser"]
+                })
+            _browser_pool = BrowserPool()
+            _browser_pool_pid = os.getpid()
+        return _browser_pool
+
+
+def shutdown_browser_pool(**kwargs):
+    """Close the browser pool of the current process, if any"""
+    global _browser_pool
+
+    with _browser_pool_lock:
+        if _browser_pool is not None and _browser_pool_pid == os.getpid():
+            _browser_pool.shutdown()
+        _browser_pool = None
+
+
+atexit.register(shutdown_browser_pool)
+worker_process_shutdown.connect(shutdown_browser_pool, weak=False)
@@ -1,11 +1,22 @@
 # common/utils/cache.py
 
+import asyncio
 import json
 import hashlib
+import math
+import os
+import random
+import time
+import uuid
+import weakref
+from functools import wraps
+
 import redis
-from typing import Union, Optional
+import redis.asyncio as aioredis
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, Union
 
-from common.config import REDIS_URL
+from common.config import REDIS_URL, LOCAL_CACHE_CONFIG
+from common.utils import codec
 from common.utils.logging_config import log_operation, log_context, LogAggregator
 
 # Import the common utils logger
@@ -14,6 +25,32 @@ from . import logger
 # Create a Redis client instance
 redis_client = redis.from_url(REDIS_URL)
 
+# asyncio clients, one connection pool per process, event loop and URL
+# (asyncio connections can't be shared between event loops)
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_pid: Optional[int] = None
+
+
+def get_async_redis_client(url: str = REDIS_URL) -> aioredis.Redis:
+    """
+    Get the asyncio Redis client of the running event loop.
+
+    Async code uses it instead of redis_client so Redis round-trips don't
+    block the event loop. Sync code (Celery tasks) keeps using redis_client.
+    """
+    global _async_clients, _async_clients_pid
+
+    if _async_clients_pid != os.getpid():
+        # Pools inherited through fork hold the parent's connections
+        _async_clients = weakref.WeakKeyDictionary()
+        _async_clients_pid = os.getpid()
+
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(url)
+    if client is None:
+        client = clients[url] = aioredis.from_url(url)
+    return client
+
 
 # Standardized TTL values based on data access patterns
 class CacheTTL:
@@ -80,11 +117,458 @@ def get_entity_cache_key(entity_type: str, entity_id: Union[int, str], suffix: O
     return key
 
 
-def redis_cache(prefix, ttl=CacheTTL.STANDARD):
-    """Cache decorator that uses Redis with standardized TTL"""
+# Tag sets outlive the longest TTL of the keys they index
+TAG_TTL = CacheTTL.EXTENDED
+# User cache key types dropped when the subscriptions or the favorites of a user change
+SUBSCRIPTION_KEY_TYPES = ("user_subscriptions_list", "user_subscriptions_paginated", "user_filters",
+                          "subscription_status", "user_subscription")
+FAVORITE_KEY_TYPES = ("user_favorites",)
+
+# Keys fetched per SCAN call and deleted per UNLINK when a scan is unavoidable
+SCAN_BATCH_SIZE = 500
+
+# Entity cache key types and the entity whose tag indexes them,
+# e.g. "user_filters:42" is registered in "tag:user:42"
+ENTITY_TAGS = {
+    "user": "user",
+    "user_filters": "user",
+    "subscription_status": "user",
+    "user_favorites": "user",
+    "user_subscriptions_list": "user",
+    "user_subscriptions_paginated": "user",
+    "user_subscription": "user",
+    "user_platform_ids": "user",
+    "subscription": "subscription",
+    "ad": "ad",
+    "full_ad": "ad",
+    "ad_images": "ad",
+    "ad_phones": "ad",
+    "matching_users": "ad",
+}
+
+# Key types also registered in a tag shared by all their keys, e.g. "tag:matching_users"
+GLOBAL_TAGS = {"matching_users"}
+
+
+def cache_tag(tag_type: str, tag_id: Optional[Union[int, str]] = None) -> str:
+    """Key of the Redis set indexing the cache keys of an entity (or of a whole key type)"""
+    return f"tag:{tag_type}:{tag_id}" if tag_id is not None else f"tag:{tag_type}"
+
+
+def tags_for_key(key: str) -> List[str]:
+    """Tags an entity cache key is registered in, derived from its "<type>:<id>[:suffix]" form"""
+    entity_type, _, rest = key.partition(":")
+    tags = []
+    owner = ENTITY_TAGS.get(entity_type)
+    if owner and rest:
+        tags.append(cache_tag(owner, rest.split(":", 1)[0]))
+    if entity_type in GLOBAL_TAGS:
+        tags.append(cache_tag(entity_type))
+    return tags
+
+
+def add_tags(pipe, key: str, tags: Iterable[str]) -> None:
+    """Queue the registration of `key` in `tags` on a pipeline"""
+    for tag in tags:
+        pipe.sadd(tag, key)
+        pipe.expire(tag, TAG_TTL)
+
+
+# Channel announcing deleted or rewritten keys to the in-process caches of all workers
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+# Called with the keys this process invalidates, before the message is published
+_invalidation_listeners: List[Callable[[List[str]], None]] = []
+_origin = (None, None)  # (pid, token)
+
+
+def add_invalidation_listener(listener: Callable[[List[str]], None]) -> None:
+    """Register a callback dropping keys from an in-process cache"""
+    _invalidation_listeners.append(listener)
+
+
+def invalidation_origin() -> str:
+    """Token of the current process, so it can skip its own invalidation messages"""
+    global _origin
+    if _origin[0] != os.getpid():
+        _origin = (os.getpid(), uuid.uuid4().hex)
+    return _origin[1]
+
+
+def publish_invalidation(pipe, keys: Iterable[str]) -> None:
+    """
+    Queue an invalidation message for `keys` on a pipeline.
+
+    Only keys of the types kept in process memory are announced. They are
+    dropped from the local cache right away, other processes drop them when
+    the message arrives.
+    """
+    if not LOCAL_CACHE_CONFIG["enabled"]:
+        return
+
+    key_types = LOCAL_CACHE_CONFIG["key_types"]
+    keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+    keys = [k for k in keys if k.partition(":")[0] in key_types]
+    if not keys:
+        return
+
+    for listener in _invalidation_listeners:
+        listener(keys)
+    pipe.publish(INVALIDATION_CHANNEL, json.dumps({'origin': invalidation_origin(), 'keys': keys}))
+
+
+@log_operation("invalidate_tag")
+def invalidate_tag(tag: str, key_types: Optional[Iterable[str]] = None, keys: Optional[List[str]] = None) -> int:
+    """
+    Delete the cache keys registered in a tag.
+
+    Args:
+        tag: Tag set key, see cache_tag
+        key_types: Only delete keys of these types and keep the others registered
+        keys: Untagged keys to delete in the same round-trip
+
+    Returns:
+        Number of deleted cache keys
+    """
+    with log_context(logger, tag=tag):
+        try:
+            members = [m.decode() if isinstance(m, bytes) else m for m in redis_client.smembers(tag)]
+            if key_types is not None:
+                key_types = set(key_types)
+                members = [m for m in members if m.partition(":")[0] in key_types]
+
+            to_delete = list(dict.fromkeys(members + (keys or [])))
+            pipe = redis_client.pipeline(transaction=False)
+            if to_delete:
+                pipe.unlink(*to_delete)
+                publish_invalidation(pipe, to_delete)
+            if key_types is None:
+                pipe.delete(tag)
+            elif members:
+                pipe.srem(tag, *members)
+            results = pipe.execute()
+
+            count = results[0] if to_delete else 0
+            logger.debug("Invalidated tag", extra={'tag': tag, 'count': count})
+            return count
+        except redis.RedisError as e:
+            logger.warning("Error invalidating tag", exc_info=True, extra={
+                'tag': tag,
+                'error_type': type(e).__name__
+            })
+            return 0
+
+
+@log_operation("scan_delete")
+def scan_delete(pattern: str, batch_size: int = SCAN_BATCH_SIZE) -> int:
+    """
+    Delete keys matching a pattern with incremental SCAN.
+
+    Unlike KEYS, SCAN never blocks Redis for the whole keyspace. Only for
+    maintenance and ad-hoc cleanup, runtime invalidation goes through tags.
+
+    Returns:
+        Number of deleted keys
+    """
+    with log_context(logger, pattern=pattern):
+        deleted = 0
+        batch = []
+        def delete_batch(keys):
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.unlink(*keys)
+            publish_invalidation(pipe, keys)
+            return pipe.execute()[0]
+
+        for key in redis_client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += delete_batch(batch)
+                batch = []
+        if batch:
+            deleted += delete_batch(batch)
+        return deleted
+
+
+# Single-flight: the first miss of a key computes it under a lock, the others wait
+# for the stored result. The lock outlives a normal computation, a stuck holder
+# only delays the waiters by this long.
+SINGLE_FLIGHT_LOCK_TTL = 10
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+# Higher values refresh hot keys earlier before they expire (XFetch beta)
+EARLY_REFRESH_BETA = 1.0
+
+# Delete a lock only if it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _flight_lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def acquire_flight_lock(key: str, lock_ttl: int = SINGLE_FLIGHT_LOCK_TTL) -> Optional[str]:
+    """Take the computation lock of a cache key, returns its token or None if it is held"""
+    token = uuid.uuid4().hex
+    if redis_client.set(_flight_lock_key(key), token, ex=lock_ttl, nx=True):
+        return token
+    return None
+
+
+def release_flight_lock(key: str, token: str) -> None:
+    try:
+        redis_client.eval(RELEASE_LOCK_SCRIPT, 1, _flight_lock_key(key), token)
+    except redis.RedisError as e:
+        # Expires on its own after the lock TTL
+        logger.warning("Failed to release cache lock", extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+
+
+def _flight_lock_held(key: str) -> bool:
+    """Whether the computation lock of a key is still held, False when Redis can't tell"""
+    try:
+        return bool(redis_client.exists(_flight_lock_key(key)))
+    except redis.RedisError as e:
+        logger.warning("Cache lock unavailable, computing without it", extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+        return False
+
+
+def should_refresh_early(ttl_ms: int, delta: float, beta: float = EARLY_REFRESH_BETA) -> bool:
+    """
+    Probabilistic early expiration (XFetch).
+
+    A key whose recomputation takes `delta` seconds is refreshed with a
+    probability growing as its remaining TTL (`ttl_ms`, from PTTL) shrinks,
+    so one caller rebuilds it shortly before it expires instead of everyone
+    missing at once.
+    """
+    if ttl_ms <= 0 or delta <= 0:
+        return False
+    return -delta * beta * math.log(1.0 - random.random()) >= ttl_ms / 1000
+
+
+def single_flight(key: str, read: Callable[[], Any], compute: Callable[[], Any],
+                  lock_ttl: int = SINGLE_FLIGHT_LOCK_TTL) -> Any:
+    """
+    Compute a missing cache value once across all processes.
+
+    Args:
+        key: Cache key being computed
+        read: Returns the cached value, None on a miss
+        compute: Computes the value and stores it in the cache
+        lock_ttl: Seconds the computation lock is held at most
+
+    Returns:
+        The value computed here or by the caller holding the lock
+    """
+    try:
+        token = acquire_flight_lock(key, lock_ttl)
+    except redis.RedisError as e:
+        logger.warning("Cache lock unavailable, computing without it", extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+        return compute()
+
+    if token:
+        try:
+            # The previous holder may have stored the value since our miss
+            value = read()
+            return value if value is not None else compute()
+        finally:
+            release_flight_lock(key, token)
+
+    logger.debug("Waiting for concurrent cache computation", extra={'key': key[:50]})
+    deadline = time.monotonic() + lock_ttl
+    while time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        value = read()
+        if value is not None:
+            return value
+        if not _flight_lock_held(key):
+            break
+
+    # The holder stored nothing (empty result or failure) or is stuck
+    return compute()
+
+
+async def async_acquire_flight_lock(key: str, lock_ttl: int = SINGLE_FLIGHT_LOCK_TTL) -> Optional[str]:
+    """acquire_flight_lock on the asyncio client"""
+    token = uuid.uuid4().hex
+    if await get_async_redis_client().set(_flight_lock_key(key), token, ex=lock_ttl, nx=True):
+        return token
+    return None
+
+
+async def async_release_flight_lock(key: str, token: str) -> None:
+    try:
+        await get_async_redis_client().eval(RELEASE_LOCK_SCRIPT, 1, _flight_lock_key(key), token)
+    except redis.RedisError as e:
+        logger.warning("Failed to release cache lock", extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+
+
+async def async_single_flight(key: str, read: Callable[[], Awaitable[Any]], compute: Callable[[], Awaitable[Any]],
+                              lock_ttl: int = SINGLE_FLIGHT_LOCK_TTL) -> Any:
+    """single_flight for async reads and computations, waits without blocking the event loop"""
+    try:
+        token = await async_acquire_flight_lock(key, lock_ttl)
+    except redis.RedisError as e:
+        logger.warning("Cache lock unavailable, computing without it", extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+        return await compute()
+
+    if token:
+        try:
+            value = await read()
+            return value if value is not None else await compute()
+        finally:
+            await async_release_flight_lock(key, token)
+
+    logger.debug("Waiting for concurrent cache computation", extra={'key': key[:50]})
+    client = get_async_redis_client()
+    deadline = time.monotonic() + lock_ttl
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        value = await read()
+        if value is not None:
+            return value
+        try:
+            held = await client.exists(_flight_lock_key(key))
+        except redis.RedisError as e:
+            logger.warning("Cache lock unavailable, computing without it", extra={
+                'key': key[:50],
+                'error_type': type(e).__name__
+            })
+            break
+        if not held:
+            break
+
+    return await compute()
+
+
+def _read_cached_result(key: str) -> Tuple[Any, int]:
+    """Cached value of a decorated function and its remaining TTL in ms, (None, -2) on a miss"""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        cached, ttl_ms = pipe.execute()
+        if cached:
+            logger.debug("Cache hit", extra={'key': key[:50]})
+            return codec.decode(cached), ttl_ms
+    except (redis.RedisError, codec.CodecError) as e:
+        logger.warning("Cache retrieval error", exc_info=True, extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+    return None, -2
+
+
+def _store_result(prefix: str, key: str, result: Any, ttl: int) -> None:
+    """Cache a truthy result of a decorated function, tagged by its prefix"""
+    if not result:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(key, codec.encode(result), ex=ttl)
+        add_tags(pipe, key, [cache_tag("cache", prefix)])
+        pipe.execute()
+        logger.debug("Cached result", extra={'key': key[:50], 'ttl': ttl})
+    except (redis.RedisError, TypeError, ValueError) as e:
+        logger.warning("Cache write error", exc_info=True, extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+
+
+async def _async_read_cached_result(key: str) -> Tuple[Any, int]:
+    """_read_cached_result on the asyncio client"""
+    try:
+        async with get_async_redis_client().pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            cached, ttl_ms = await pipe.execute()
+        if cached:
+            logger.debug("Cache hit", extra={'key': key[:50]})
+            return codec.decode(cached), ttl_ms
+    except (redis.RedisError, codec.CodecError) as e:
+        logger.warning("Cache retrieval error", exc_info=True, extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+    return None, -2
+
+
+async def _async_store_result(prefix: str, key: str, result: Any, ttl: int) -> None:
+    """_store_result on the asyncio client"""
+    if not result:
+        return
+    try:
+        async with get_async_redis_client().pipeline(transaction=False) as pipe:
+            pipe.set(key, codec.encode(result), ex=ttl)
+            add_tags(pipe, key, [cache_tag("cache", prefix)])
+            await pipe.execute()
+        logger.debug("Cached result", extra={'key': key[:50], 'ttl': ttl})
+    except (redis.RedisError, TypeError, ValueError) as e:
+        logger.warning("Cache write error", exc_info=True, extra={
+            'key': key[:50],
+            'error_type': type(e).__name__
+        })
+
+
+def _make_invalidate_cache(prefix):
+    """invalidate_cache(*args, **kwargs) attached to decorated functions"""
+
+    def invalidate_cache(*args, **kwargs):
+        if args or kwargs:
+            # Invalidate specific key
+            key = cache_key(prefix, *args, **kwargs)
+            try:
+                redis_client.delete(key)
+                logger.debug("Invalidated cache key", extra={'key': key[:50]})
+            except redis.RedisError as e:
+                logger.warning("Cache invalidation error", exc_info=True, extra={
+                    'key': key[:50],
+                    'error_type': type(e).__name__
+                })
+        else:
+            # Invalidate all keys cached under this prefix
+            invalidate_tag(cache_tag("cache", prefix))
+
+    return invalidate_cache
+
+
+def redis_cache(prefix, ttl=CacheTTL.STANDARD, coalesce=False, beta=EARLY_REFRESH_BETA):
+    """
+    Cache decorator that uses Redis with standardized TTL
+
+    With coalesce=True, concurrent misses of a key call the function once (see
+    single_flight) and hot keys are refreshed shortly before they expire.
+    """
 
     def decorator(func):
-        from functools import wraps
+        # Duration of the last call, drives the early refresh
+        timing = {'delta': 0.0}
+
+        def compute_and_store(key, args, kwargs):
+            start = time.monotonic()
+            result = func(*args, **kwargs)
+            timing['delta'] = time.monotonic() - start
+            _store_result(prefix, key, result, ttl)
+            return result
 
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -92,75 +576,49 @@ def redis_cache(prefix, ttl=CacheTTL.STANDARD):
             key = cache_key(prefix, *args, **kwargs)
 
             with log_context(logger, cache_key=key[:50], ttl=ttl, function=func.__name__):
-                # Try to get from cache
-                try:
-                    cached = redis_client.get(key)
-                    if cached:
-                        logger.debug("Cache hit", extra={'key': key[:50]})
-                        return json.loads(cached)
-                except (redis.RedisError, json.JSONDecodeError) as e:
-                    logger.warning("Cache retrieval error", exc_info=True, extra={
-                        'key': key[:50],
-                        'error_type': type(e).__name__
-                    })
-
-                # Execute function
-                result = func(*args, **kwargs)
-
-                # Cache result
-                if result:
+                cached, ttl_ms = _read_cached_result(key)
+                if cached is not None:
+                    if not (coalesce and should_refresh_early(ttl_ms, timing['delta'], beta)):
+                        return cached
+                    # Refresh early unless another caller already does, who keeps serving the cached value
+                    token = acquire_flight_lock(key)
+                    if not token:
+                        return cached
                     try:
-                        redis_client.set(key, json.dumps(result), ex=ttl)
-                        logger.debug("Cached result", extra={'key': key[:50], 'ttl': ttl})
-                    except (redis.RedisError, json.JSONEncodeError) as e:
-                        logger.warning("Cache write error", exc_info=True, extra={
-                            'key': key[:50],
-                            'error_type': type(e).__name__
-                        })
-
-                return result
-
-        # Add cache invalidation method to the function
-        def invalidate_cache(*args, **kwargs):
-            if args or kwargs:
-                # Invalidate specific key
-                key = cache_key(prefix, *args, **kwargs)
-                try:
-                    redis_client.delete(key)
-                    logger.debug("Invalidated cache key", extra={'key': key[:50]})
-                except redis.RedisError as e:
-                    logger.warning("Cache invalidation error", exc_info=True, extra={
-                        'key': key[:50],
-                        'error_type': type(e).__name__
-                    })
-            else:
-                # Invalidate all keys with this prefix
-                pattern = f"{prefix}:*"
-                try:
-                    keys = redis_client.keys(pattern)
-                    if keys:
-                        redis_client.delete(*keys)
-                        logger.debug("Invalidated cache pattern", extra={
-                            'pattern': pattern,
-                            'count': len(keys)
-                        })
-                except redis.RedisError as e:
-                    logger.warning("Cache pattern invalidation error", exc_info=True, extra={
-                        'pattern': pattern,
-                        'error_type': type(e).__name__
-                    })
-
-        wrapper.invalidate_cache = invalidate_cache
+                        logger.debug("Refreshing cache early", extra={'key': key[:50], 'ttl_ms': ttl_ms})
+                        return compute_and_store(key, args, kwargs)
+                    finally:
+                        release_flight_lock(key, token)
+
+                if not coalesce:
+                    return compute_and_store(key, args, kwargs)
+                return single_flight(
+                    key,
+                    lambda: _read_cached_result(key)[0],
+                    lambda: compute_and_store(key, args, kwargs)
+                )
+
+        wrapper.invalidate_cache = _make_invalidate_cache(prefix)
         return wrapper
 
     return decorator
 
 
-def async_redis_cache(prefix, ttl=CacheTTL.STANDARD):
-    """Cache decorator for async functions"""
+def async_redis_cache(prefix, ttl=CacheTTL.STANDARD, coalesce=False, beta=EARLY_REFRESH_BETA):
+    """Cache decorator for async functions, see redis_cache. Talks to Redis through the asyncio client"""
 
     def decorator(func):
-        from functools import wraps
+        timing = {'delta': 0.0}
+
+        async def compute_and_store(key, args, kwargs):
+            start = time.monotonic()
+            result = await func(*args, **kwargs)
+            timing['delta'] = time.monotonic() - start
+            await _async_store_result(prefix, key, result, ttl)
+            return result
+
+        async def read_cached(key):
+            return (await _async_read_cached_result(key))[0]
 
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -168,65 +626,28 @@ def async_redis_cache(prefix, ttl=CacheTTL.STANDARD):
             key = cache_key(prefix, *args, **kwargs)
 
             with log_context(logger, cache_key=key[:50], ttl=ttl, function=func.__name__):
-                # Try to get from cache
-                try:
-                    cached = redis_client.get(key)
-                    if cached:
-                        logger.debug("Cache hit", extra={'key': key[:50]})
-                        return json.loads(cached)
-                except (redis.RedisError, json.JSONDecodeError) as e:
-                    logger.warning("Cache retrieval error", exc_info=True, extra={
-                        'key': key[:50],
-                        'error_type': type(e).__name__
-                    })
-
-                # Execute function
-                result = await func(*args, **kwargs)
-
-                # Cache result
-                if result:
+                cached, ttl_ms = await _async_read_cached_result(key)
+                if cached is not None:
+                    if not (coalesce and should_refresh_early(ttl_ms, timing['delta'], beta)):
+                        return cached
+                    token = await async_acquire_flight_lock(key)
+                    if not token:
+                        return cached
                     try:
-                        redis_client.set(key, json.dumps(result), ex=ttl)
-                        logger.debug("Cached result", extra={'key': key[:50], 'ttl': ttl})
-                    except (redis.RedisError, json.JSONEncodeError) as e:
-                        logger.warning("Cache write error", exc_info=True, extra={
-                            'key': key[:50],
-                            'error_type': type(e).__name__
-                        })
-
-                return result
-
-        # Add cache invalidation method to the function
-        def invalidate_cache(*args, **kwargs):
-            if args or kwargs:
-                # Invalidate specific key
-                key = cache_key(prefix, *args, **kwargs)
-                try:
-                    redis_client.delete(key)
-                    logger.debug("Invalidated cache key", extra={'key': key[:50]})
-                except redis.RedisError as e:
-                    logger.warning("Cache invalidation error", exc_info=True, extra={
-                        'key': key[:50],
-                        'error_type': type(e).__name__
-                    })
-            else:
-                # Invalidate all keys with this prefix
-                pattern = f"{prefix}:*"
-                try:
-                    keys = redis_client.keys(pattern)
-                    if keys:
-                        redis_client.delete(*keys)
-                        logger.debug("Invalidated cache pattern", extra={
-                            'pattern': pattern,
-                            'count': len(keys)
-                        })
-                except redis.RedisError as e:
-                    logger.warning("Cache pattern invalidation error", exc_info=True, extra={
-                        'pattern': pattern,
-                        'error_type': type(e).__name__
-                    })
-
-        wrapper.invalidate_cache = invalidate_cache
+                        logger.debug("Refreshing cache early", extra={'key': key[:50], 'ttl_ms': ttl_ms})
+                        return await compute_and_store(key, args, kwargs)
+                    finally:
+                        await async_release_flight_lock(key, token)
+
+                if not coalesce:
+                    return await compute_and_store(key, args, kwargs)
+                return await async_single_flight(
+                    key,
+                    lambda: read_cached(key),
+                    lambda: compute_and_store(key, args, kwargs)
+                )
+
+        wrapper.invalidate_cache = _make_invalidate_cache(prefix)
         return wrapper
 
     return decorator
@@ -240,10 +661,10 @@ def get_cached(key, default=None):
             value = redis_client.get(key)
             if value:
                 logger.debug("Cache hit", extra={'key': key})
-                return json.loads(value)
+                return codec.decode(value)
             logger.debug("Cache miss", extra={'key': key})
             return default
-        except (redis.RedisError, json.JSONDecodeError) as e:
+        except (redis.RedisError, codec.CodecError) as e:
             logger.warning("Cache retrieval error", exc_info=True, extra={
                 'key': key,
                 'error_type': type(e).__name__
@@ -256,10 +677,14 @@ def set_cached(key, value, ttl=CacheTTL.STANDARD):
     """Set a value in cache with standard TTL"""
     with log_context(logger, cache_key=key, ttl=ttl):
         try:
-            redis_client.set(key, json.dumps(value), ex=ttl)
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.set(key, codec.encode(value), ex=ttl)
+            add_tags(pipe, key, tags_for_key(key))
+            publish_invalidation(pipe, [key])
+            pipe.execute()
             logger.debug("Cached value", extra={'key': key, 'ttl': ttl})
             return value
-        except (redis.RedisError, json.JSONEncodeError) as e:
+        except (redis.RedisError, TypeError, ValueError) as e:
             logger.warning("Cache write error", exc_info=True, extra={
                 'key': key,
                 'error_type': type(e).__name__
@@ -304,13 +729,13 @@ def batch_get_cached(keys, prefix=""):
                     cache_hits += 1
                     original_key = keys[i]
                     try:
-                        result[original_key] = json.loads(value)
+                        result[original_key] = codec.decode(value)
                         aggregator.add_item({'key': original_key}, success=True)
-                    except json.JSONDecodeError:
-                        logger.warning("Invalid JSON in cache", extra={'key': prefixed_keys[i]})
-                        # Return the raw value if it can't be parsed as JSON
-                        result[original_key] = value.decode('utf-8') if isinstance(value, bytes) else value
-                        aggregator.add_error("Invalid JSON", {'key': original_key})
+                    except codec.CodecError:
+                        logger.warning("Invalid value in cache", extra={'key': prefixed_keys[i]})
+                        # Return the raw value if it can't be decoded
+                        result[original_key] = value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value
+                        aggregator.add_error("Invalid value", {'key': original_key})
                 else:
                     aggregator.add_item({'key': keys[i]}, success=False)
 
@@ -353,8 +778,10 @@ def batch_set_cached(key_values, ttl=CacheTTL.STANDARD, prefix=""):
                 for key, value in key_values.items():
                     full_key = f"{prefix}:{key}" if prefix else key
                     try:
-                        serialized = json.dumps(value)
+                        serialized = codec.encode(value)
                         pipe.set(full_key, serialized, ex=ttl)
+                        add_tags(pipe, full_key, tags_for_key(full_key))
+                        publish_invalidation(pipe, [full_key])
                         aggregator.add_item({'key': key}, success=True)
                     except (TypeError, ValueError) as e:
                         logger.warning("Failed to serialize value", extra={
@@ -387,40 +814,14 @@ def invalidate_user_caches(user_id: int) -> int:
     Returns:
         Number of invalidated cache keys
     """
-    patterns = [
-        f"user:{user_id}*",
-        f"user_filters:{user_id}*",
-        f"subscription_status:{user_id}*",
-        f"user_favorites:{user_id}*",
-        f"user_subscriptions_list:{user_id}*"
-    ]
-
     with log_context(logger, user_id=user_id):
-        deleted_count = 0
-        aggregator = LogAggregator(logger, f"invalidate_user_caches_{user_id}")
-
-        for pattern in patterns:
-            try:
-                keys = redis_client.keys(pattern)
-                if keys:
-                    count = redis_client.delete(*keys)
-                    deleted_count += count
-                    aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-                else:
-                    aggregator.add_item({'pattern': pattern, 'count': 0}, success=True)
-            except redis.RedisError as e:
-                logger.warning("Error invalidating pattern", exc_info=True, extra={
-                    'pattern': pattern,
-                    'error_type': type(e).__name__
-                })
-                aggregator.add_error(str(e), {'pattern': pattern})
+        deleted_count = invalidate_tag(cache_tag("user", user_id))
 
         logger.debug("Invalidated user caches", extra={
             'user_id': user_id,
             'total_deleted': deleted_count
         })
 
-        aggregator.log_summary()
         return deleted_count
 
 
@@ -429,6 +830,8 @@ def invalidate_subscription_caches(user_id: int, subscription_id: Optional[int]
     """
     Invalidate subscription-related caches for a user.
 
+    Matching users of every ad depend on the subscriptions, so they are dropped as well.
+
     Args:
         user_id: Database user ID
         subscription_id: Optional specific subscription ID
@@ -436,34 +839,21 @@ def invalidate_subscription_caches(user_id: int, subscription_id: Optional[int]
     Returns:
         Number of invalidated cache keys
     """
-    patterns = [
-        f"user_subscriptions_list:{user_id}*",
-        f"user_filters:{user_id}*",
-        f"subscription_status:{user_id}*"
-    ]
-
-    if subscription_id:
-        patterns.append(f"subscription:{subscription_id}*")
-
     with log_context(logger, user_id=user_id, subscription_id=subscription_id):
-        deleted_count = 0
         aggregator = LogAggregator(logger, f"invalidate_subscription_caches_{user_id}")
 
-        for pattern in patterns:
-            try:
-                keys = redis_client.keys(pattern)
-                if keys:
-                    count = redis_client.delete(*keys)
-                    deleted_count += count
-                    aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-                else:
-                    aggregator.add_item({'pattern': pattern, 'count': 0}, success=True)
-            except redis.RedisError as e:
-                logger.warning("Error invalidating pattern", exc_info=True, extra={
-                    'pattern': pattern,
-                    'error_type': type(e).__name__
-                })
-                aggregator.add_error(str(e), {'pattern': pattern})
+        tags = [
+            (cache_tag("user", user_id), SUBSCRIPTION_KEY_TYPES),
+            (cache_tag("matching_users"), None)
+        ]
+        if subscription_id:
+            tags.append((cache_tag("subscription", subscription_id), None))
+
+        deleted_count = 0
+        for tag, key_types in tags:
+            count = invalidate_tag(tag, key_types)
+            deleted_count += count
+            aggregator.add_item({'tag': tag, 'count': count}, success=True)
 
         logger.debug("Invalidated subscription caches", extra={
             'user_id': user_id,
@@ -486,34 +876,12 @@ def invalidate_favorite_caches(user_id: int) -> int:
     Returns:
         Number of invalidated cache keys
     """
-    patterns = [
-        f"user_favorites:{user_id}*"
-    ]
-
     with log_context(logger, user_id=user_id):
-        deleted_count = 0
-        aggregator = LogAggregator(logger, f"invalidate_favorite_caches_{user_id}")
-
-        for pattern in patterns:
-            try:
-                keys = redis_client.keys(pattern)
-                if keys:
-                    count = redis_client.delete(*keys)
-                    deleted_count += count
-                    aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-                else:
-                    aggregator.add_item({'pattern': pattern, 'count': 0}, success=True)
-            except redis.RedisError as e:
-                logger.warning("Error invalidating pattern", exc_info=True, extra={
-                    'pattern': pattern,
-                    'error_type': type(e).__name__
-                })
-                aggregator.add_error(str(e), {'pattern': pattern})
+        deleted_count = invalidate_tag(cache_tag("user", user_id), FAVORITE_KEY_TYPES)
 
         logger.debug("Invalidated favorite caches", extra={
             'user_id': user_id,
             'total_deleted': deleted_count
         })
 
-        aggregator.log_summary()
-        return deleted_count
\ No newline at end of file
+        return deleted_count
@@ -1,10 +1,16 @@
 # common/utils/cache_invalidation.py
 
-from typing import Optional, List, Union
-
-# Import only BaseCacheManager to avoid circular imports
-from common.utils.cache_managers import BaseCacheManager
-from common.utils.cache import get_entity_cache_key
+from typing import Optional
+
+from common.utils.cache import (
+    get_entity_cache_key,
+    cache_tag,
+    invalidate_tag,
+    # Re-exported, the user-level invalidation lives next to the tag layer
+    invalidate_user_caches,
+    invalidate_subscription_caches,
+    invalidate_favorite_caches
+)
 from common.utils.logging_config import log_operation, log_context, LogAggregator
 
 # Import the logger from the parent module
@@ -24,37 +30,22 @@ def invalidate_ad_caches(ad_id: int, resource_url: Optional[str] = None) -> int:
         Number of invalidated cache keys
     """
     with log_context(logger, ad_id=ad_id, resource_url=resource_url):
-        # Collect keys to delete
+        # Known keys are deleted even if they were cached before being tagged
         keys_to_delete = [
             get_entity_cache_key("full_ad", ad_id),
             get_entity_cache_key("ad_images", ad_id),
+            get_entity_cache_key("ad_phones", ad_id),
             get_entity_cache_key("matching_users", ad_id)
         ]
 
-        # Add resource URL-related keys
+        # Resource URL keys aren't tagged with the ad ID
         if resource_url:
             keys_to_delete.extend([
                 get_entity_cache_key("extra_images", resource_url),
                 get_entity_cache_key("ad_description", resource_url)
             ])
 
-        # Delete all collected keys
-        deleted_count = BaseCacheManager.delete_keys(keys_to_delete)
-
-        # Also delete any pattern-based keys that might be related
-        pattern_keys = [
-            f"ad:{ad_id}:*",
-            f"matching_users:*"  # This might be broader than needed
-        ]
-
-        aggregator = LogAggregator(logger, f"invalidate_ad_patterns_{ad_id}")
-
-        for pattern in pattern_keys:
-            count = BaseCacheManager.delete_pattern(pattern)
-            deleted_count += count
-            aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-
-        aggregator.log_summary()
+        deleted_count = invalidate_tag(cache_tag("ad", ad_id), keys=keys_to_delete)
 
         logger.debug("Invalidated cache keys for ad", extra={
             'ad_id': ad_id,
@@ -156,116 +147,3 @@ def warm_cache_for_user(user_id: int) -> None:
                 'user_id': user_id,
                 'error_type': type(e).__name__
             })
-
-
-@log_operation("invalidate_user_caches")
-def invalidate_user_caches(user_id: int) -> int:
-    """
-    Invalidate all caches related to a user.
-
-    Args:
-        user_id: Database user ID
-
-    Returns:
-        Number of invalidated cache keys
-    """
-    patterns = [
-        f"user:{user_id}*",
-        f"user_filters:{user_id}*",
-        f"subscription_status:{user_id}*",
-        f"user_favorites:{user_id}*",
-        f"user_subscriptions_list:{user_id}*"
-    ]
-
-    with log_context(logger, user_id=user_id):
-        deleted_count = 0
-        aggregator = LogAggregator(logger, f"invalidate_user_caches_{user_id}")
-
-        for pattern in patterns:
-            count = BaseCacheManager.delete_pattern(pattern)
-            deleted_count += count
-            aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-
-        aggregator.log_summary()
-
-        logger.debug("Invalidated cache keys for user", extra={
-            'user_id': user_id,
-            'total_deleted': deleted_count
-        })
-
-        return deleted_count
-
-
-@log_operation("invalidate_subscription_caches")
-def invalidate_subscription_caches(user_id: int, subscription_id: Optional[int] = None) -> int:
-    """
-    Invalidate all subscription-related caches for a user.
-
-    Args:
-        user_id: Database user ID
-        subscription_id: Optional specific subscription ID
-
-    Returns:
-        Number of invalidated cache keys
-    """
-    patterns = [
-        f"user_subscriptions_list:{user_id}*",
-        f"user_filters:{user_id}*",
-        f"subscription_status:{user_id}*"
-    ]
-
-    if subscription_id:
-        patterns.append(f"subscription:{subscription_id}*")
-
-    with log_context(logger, user_id=user_id, subscription_id=subscription_id):
-        deleted_count = 0
-        aggregator = LogAggregator(logger, f"invalidate_subscription_caches_{user_id}")
-
-        for pattern in patterns:
-            count = BaseCacheManager.delete_pattern(pattern)
-            deleted_count += count
-            aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-
-        aggregator.log_summary()
-
-        logger.debug("Invalidated subscription cache keys for user", extra={
-            'user_id': user_id,
-            'subscription_id': subscription_id,
-            'total_deleted': deleted_count
-        })
-
-        return deleted_count
-
-
-@log_operation("invalidate_favorite_caches")
-def invalidate_favorite_caches(user_id: int) -> int:
-    """
-    Invalidate favorite-related caches for a user.
-
-    Args:
-        user_id: Database user ID
-
-    Returns:
-        Number of invalidated cache keys
-    """
-    patterns = [
-        f"user_favorites:{user_id}*"
-    ]
-
-    with log_context(logger, user_id=user_id):
-        deleted_count = 0
-        aggregator = LogAggregator(logger, f"invalidate_favorite_caches_{user_id}")
-
-        for pattern in patterns:
-            count = BaseCacheManager.delete_pattern(pattern)
-            deleted_count += count
-            aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-
-        aggregator.log_summary()
-
-        logger.debug("Invalidated favorite cache keys for user", extra={
-            'user_id': user_id,
-            'total_deleted': deleted_count
-        })
-
-        return deleted_count
\ No newline at end of file
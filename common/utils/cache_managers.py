@@ -1,8 +1,12 @@
 # common/utils/cache_managers.py
-import json
 from typing import Dict, Any, List, Optional, Union
 
-from common.utils.cache import redis_client, CacheTTL, get_entity_cache_key
+from common.utils.cache import (
+    redis_client, CacheTTL, get_entity_cache_key, cache_tag, tags_for_key, add_tags, invalidate_tag, scan_delete,
+    publish_invalidation, get_async_redis_client
+)
+from common.utils import codec
+from common.utils.local_cache import local_get, local_put, local_generation, record_l2
 from common.utils.logging_config import log_operation, log_context, LogAggregator
 
 # Import the logger from the parent module
@@ -10,21 +14,31 @@ from . import logger
 
 
 class BaseCacheManager:
-    """Base class for all cache managers"""
+    """
+    Base class for all cache managers.
+
+    Keys of the types configured in LOCAL_CACHE_CONFIG are also kept in an
+    in-process cache in front of Redis, see common.utils.local_cache.
+    """
 
     @staticmethod
     @log_operation("cache_get")
     def get(key: str) -> Optional[Any]:
         """Get a value from a cache"""
         with log_context(logger, cache_key=key):
-            data = redis_client.get(key)
+            data = local_get(key)
+            if data is None:
+                generation = local_generation()
+                data = redis_client.get(key)
+                record_l2(bool(data))
+                local_put(key, data, generation)
             if data:
                 try:
-                    result = json.loads(data)
+                    result = codec.decode(data)
                     logger.debug("Cache hit", extra={'key': key[:50]})
                     return result
-                except json.JSONDecodeError:
-                    logger.warning("Invalid JSON in cache", extra={'key': key})
+                except codec.CodecError:
+                    logger.warning("Invalid value in cache", extra={'key': key})
                     return None
             logger.debug("Cache miss", extra={'key': key[:50]})
             return None
@@ -32,11 +46,58 @@ class BaseCacheManager:
     @staticmethod
     @log_operation("cache_set")
     def set(key: str, value: Any, ttl: int = CacheTTL.STANDARD) -> None:
-        """Set a value in the cache"""
+        """Set a value in the cache, registering entity keys in their tags"""
+        with log_context(logger, cache_key=key, ttl=ttl):
+            try:
+                serialized = codec.encode(value)
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.set(key, serialized, ex=ttl)
+                add_tags(pipe, key, tags_for_key(key))
+                publish_invalidation(pipe, [key])
+                pipe.execute()
+                local_put(key, serialized)
+                logger.debug("Value cached", extra={'key': key[:50], 'ttl': ttl})
+            except (TypeError, ValueError) as e:
+                logger.error("Failed to serialize value for cache", exc_info=True, extra={
+                    'key': key,
+                    'error_type': type(e).__name__
+                })
+
+    @staticmethod
+    @log_operation("cache_async_get")
+    async def async_get(key: str) -> Optional[Any]:
+        """get for code running on an event loop, uses the asyncio Redis client"""
+        with log_context(logger, cache_key=key):
+            data = local_get(key)
+            if data is None:
+                generation = local_generation()
+                data = await get_async_redis_client().get(key)
+                record_l2(bool(data))
+                local_put(key, data, generation)
+            if data:
+                try:
+                    result = codec.decode(data)
+                    logger.debug("Cache hit", extra={'key': key[:50]})
+                    return result
+                except codec.CodecError:
+                    logger.warning("Invalid value in cache", extra={'key': key})
+                    return None
+            logger.debug("Cache miss", extra={'key': key[:50]})
+            return None
+
+    @staticmethod
+    @log_operation("cache_async_set")
+    async def async_set(key: str, value: Any, ttl: int = CacheTTL.STANDARD) -> None:
+        """set for code running on an event loop, uses the asyncio Redis client"""
         with log_context(logger, cache_key=key, ttl=ttl):
             try:
-                serialized = json.dumps(value)
-                redis_client.set(key, serialized, ex=ttl)
+                serialized = codec.encode(value)
+                async with get_async_redis_client().pipeline(transaction=False) as pipe:
+                    pipe.set(key, serialized, ex=ttl)
+                    add_tags(pipe, key, tags_for_key(key))
+                    publish_invalidation(pipe, [key])
+                    await pipe.execute()
+                local_put(key, serialized)
                 logger.debug("Value cached", extra={'key': key[:50], 'ttl': ttl})
             except (TypeError, ValueError) as e:
                 logger.error("Failed to serialize value for cache", exc_info=True, extra={
@@ -44,12 +105,93 @@ class BaseCacheManager:
                     'error_type': type(e).__name__
                 })
 
+    @staticmethod
+    @log_operation("cache_get_many")
+    def get_many(keys: List[str]) -> Dict[str, Any]:
+        """
+        Get multiple values from the cache with a single MGET
+
+        Args:
+            keys: Keys to look up
+
+        Returns:
+            Dict mapping each found key to its value, misses are left out
+        """
+        if not keys:
+            return {}
+
+        with log_context(logger, key_count=len(keys)):
+            found = {}
+            for key in keys:
+                data = local_get(key)
+                if data is not None:
+                    found[key] = data
+
+            missing = [key for key in keys if key not in found]
+            if missing:
+                generation = local_generation()
+                for key, data in zip(missing, redis_client.mget(missing)):
+                    record_l2(bool(data))
+                    local_put(key, data, generation)
+                    found[key] = data
+
+            results = {}
+            for key, data in found.items():
+                if not data:
+                    continue
+                try:
+                    results[key] = codec.decode(data)
+                except codec.CodecError:
+                    logger.warning("Invalid value in cache", extra={'key': key})
+
+            logger.debug("Cache multi-get", extra={
+                'key_count': len(keys),
+                'hits': len(results)
+            })
+            return results
+
+    @staticmethod
+    @log_operation("cache_set_many")
+    def set_many(values: Dict[str, Any], ttl: int = CacheTTL.STANDARD) -> None:
+        """
+        Set multiple values in the cache in one round-trip
+
+        Args:
+            values: Dict mapping keys to values
+            ttl: TTL applied to every key
+        """
+        if not values:
+            return
+
+        with log_context(logger, key_count=len(values), ttl=ttl):
+            # No MULTI/EXEC, the keys are independent
+            pipe = redis_client.pipeline(transaction=False)
+            serialized = {}
+            for key, value in values.items():
+                try:
+                    serialized[key] = codec.encode(value)
+                    pipe.set(key, serialized[key], ex=ttl)
+                    add_tags(pipe, key, tags_for_key(key))
+                except (TypeError, ValueError) as e:
+                    logger.error("Failed to serialize value for cache", exc_info=True, extra={
+                        'key': key,
+                        'error_type': type(e).__name__
+                    })
+            publish_invalidation(pipe, serialized)
+            pipe.execute()
+            for key, data in serialized.items():
+                local_put(key, data)
+            logger.debug("Values cached", extra={'key_count': len(values), 'ttl': ttl})
+
     @staticmethod
     @log_operation("cache_delete")
     def delete(key: str) -> None:
         """Delete a cache key"""
         with log_context(logger, cache_key=key):
-            redis_client.delete(key)
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.delete(key)
+            publish_invalidation(pipe, [key])
+            pipe.execute()
             logger.debug("Cache key deleted", extra={'key': key[:50]})
 
     @staticmethod
@@ -68,7 +210,10 @@ class BaseCacheManager:
     @log_operation("cache_delete_pattern")
     def delete_pattern(pattern: str) -> int:
         """
-        Delete all keys matching a pattern
+        Delete all keys matching a pattern with incremental SCAN
+
+        Walks the whole keyspace, so only use it for maintenance. Invalidation
+        of entity caches goes through their tags.
 
         Args:
             pattern: Redis a key pattern to match (e.g., "user:*:filters")
@@ -78,17 +223,15 @@ class BaseCacheManager:
         """
         with log_context(logger, pattern=pattern):
             try:
-                keys = redis_client.keys(pattern)
-                if keys:
-                    count = redis_client.delete(*keys)
+                count = scan_delete(pattern)
+                if count:
                     logger.info("Deleted keys by pattern", extra={
                         'pattern': pattern,
                         'count': count
                     })
-                    return count
                 else:
                     logger.debug("No keys found for pattern", extra={'pattern': pattern})
-                    return 0
+                return count
             except Exception as e:
                 logger.error("Error deleting keys by pattern", exc_info=True, extra={
                     'pattern': pattern,
@@ -113,20 +256,16 @@ class BaseCacheManager:
 
         with log_context(logger, key_count=len(keys)):
             try:
-                existing_keys = [key for key in keys if redis_client.exists(key)]
-                if existing_keys:
-                    count = redis_client.delete(*existing_keys)
-                    logger.info("Deleted multiple keys", extra={
-                        'requested_count': len(keys),
-                        'existing_count': len(existing_keys),
-                        'deleted_count': count
-                    })
-                    return count
-                else:
-                    logger.debug("No existing keys to delete", extra={
-                        'requested_count': len(keys)
-                    })
-                    return 0
+                # Missing keys are ignored, no need to check them one by one
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.unlink(*keys)
+                publish_invalidation(pipe, keys)
+                count = pipe.execute()[0]
+                logger.debug("Deleted multiple keys", extra={
+                    'requested_count': len(keys),
+                    'deleted_count': count
+                })
+                return count
             except Exception as e:
                 logger.error("Error deleting multiple keys", exc_info=True, extra={
                     'key_count': len(keys),
@@ -144,7 +283,7 @@ class BaseCacheManager:
         Args:
             entity_type: Type of entity (e.g., 'user', 'ad')
             entity_id: Entity ID
-            extra_patterns: Optional additional patterns to match
+            extra_patterns: Optional additional patterns, deleted with a full SCAN
 
         Returns:
             Number of invalidated keys
@@ -152,10 +291,10 @@ class BaseCacheManager:
         with log_context(logger, entity_type=entity_type, entity_id=entity_id):
             aggregator = LogAggregator(logger, f"invalidate_{entity_type}_{entity_id}")
 
-            # Base pattern for this entity
-            pattern = f"{entity_type}:{entity_id}*"
-            count = BaseCacheManager.delete_pattern(pattern)
-            aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
+            # Keys registered in the entity's tag
+            tag = cache_tag(entity_type, entity_id)
+            count = invalidate_tag(tag)
+            aggregator.add_item({'tag': tag, 'count': count}, success=True)
 
             # Process additional patterns if provided
             if extra_patterns:
@@ -187,6 +326,51 @@ class UserCacheManager(BaseCacheManager):
         with log_context(logger, user_id=user_id):
             BaseCacheManager.set(key, filters_data, ttl)
 
+    @staticmethod
+    async def async_get_filters(user_id: int) -> Optional[Dict[str, Any]]:
+        """get_filters on the asyncio Redis client"""
+        return await BaseCacheManager.async_get(get_entity_cache_key("user_filters", user_id))
+
+    @staticmethod
+    async def async_set_filters(user_id: int, filters_data: Dict[str, Any], ttl: int = CacheTTL.MEDIUM) -> None:
+        """set_filters on the asyncio Redis client"""
+        await BaseCacheManager.async_set(get_entity_cache_key("user_filters", user_id), filters_data, ttl)
+
+    @staticmethod
+    @log_operation("get_user_filters_many")
+    def get_filters_many(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get cached filters of multiple users, keyed by user ID"""
+        keys = {get_entity_cache_key("user_filters", user_id): user_id for user_id in user_ids}
+        with log_context(logger, user_count=len(user_ids)):
+            cached = BaseCacheManager.get_many(list(keys))
+            return {keys[key]: value for key, value in cached.items()}
+
+    @staticmethod
+    @log_operation("set_user_filters_many")
+    def set_filters_many(filters_by_user: Dict[int, Dict[str, Any]], ttl: int = CacheTTL.MEDIUM) -> None:
+        """Cache filters of multiple users"""
+        with log_context(logger, user_count=len(filters_by_user)):
+            BaseCacheManager.set_many({
+                get_entity_cache_key("user_filters", user_id): filters_data
+                for user_id, filters_data in filters_by_user.items()
+            }, ttl)
+
+    @staticmethod
+    @log_operation("get_user_platform_ids")
+    def get_platform_ids(user_id: int) -> Optional[Dict[str, Any]]:
+        """Get cached messaging platform IDs of a user"""
+        key = get_entity_cache_key("user_platform_ids", user_id)
+        with log_context(logger, user_id=user_id):
+            return BaseCacheManager.get(key)
+
+    @staticmethod
+    @log_operation("set_user_platform_ids")
+    def set_platform_ids(user_id: int, platform_ids: Dict[str, Any], ttl: int = CacheTTL.MEDIUM) -> None:
+        """Cache messaging platform IDs of a user"""
+        key = get_entity_cache_key("user_platform_ids", user_id)
+        with log_context(logger, user_id=user_id):
+            BaseCacheManager.set(key, platform_ids, ttl)
+
     @staticmethod
     @log_operation("get_subscription_status")
     def get_subscription_status(user_id: int) -> Optional[Dict[str, Any]]:
@@ -231,6 +415,17 @@ class SubscriptionCacheManager(BaseCacheManager):
         with log_context(logger, user_id=user_id, count=len(subscriptions)):
             BaseCacheManager.set(key, subscriptions, ttl)
 
+    @staticmethod
+    async def async_get_user_subscriptions(user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """get_user_subscriptions on the asyncio Redis client"""
+        return await BaseCacheManager.async_get(get_entity_cache_key("user_subscriptions_list", user_id))
+
+    @staticmethod
+    async def async_set_user_subscriptions(user_id: int, subscriptions: List[Dict[str, Any]],
+                                           ttl: int = CacheTTL.MEDIUM) -> None:
+        """set_user_subscriptions on the asyncio Redis client"""
+        await BaseCacheManager.async_set(get_entity_cache_key("user_subscriptions_list", user_id), subscriptions, ttl)
+
     @staticmethod
     @log_operation("invalidate_all_subscription_caches")
     def invalidate_all(user_id: int, subscription_id: Optional[int] = None) -> int:
@@ -259,6 +454,54 @@ class AdCacheManager(BaseCacheManager):
         with log_context(logger, ad_id=ad_id):
             BaseCacheManager.set(key, ad_data, ttl)
 
+    @staticmethod
+    async def async_get_full_ad_data(ad_id: int) -> Optional[Dict[str, Any]]:
+        """get_full_ad_data on the asyncio Redis client"""
+        return await BaseCacheManager.async_get(get_entity_cache_key("full_ad", ad_id))
+
+    @staticmethod
+    async def async_set_full_ad_data(ad_id: int, ad_data: Dict[str, Any], ttl: int = CacheTTL.MEDIUM) -> None:
+        """set_full_ad_data on the asyncio Redis client"""
+        await BaseCacheManager.async_set(get_entity_cache_key("full_ad", ad_id), ad_data, ttl)
+
+    @staticmethod
+    @log_operation("get_full_ad_data_many")
+    def get_full_ad_data_many(ad_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get cached full data of multiple ads, keyed by ad ID"""
+        keys = {get_entity_cache_key("full_ad", ad_id): ad_id for ad_id in ad_ids}
+        with log_context(logger, ad_count=len(ad_ids)):
+            cached = BaseCacheManager.get_many(list(keys))
+            return {keys[key]: value for key, value in cached.items()}
+
+    @staticmethod
+    @log_operation("set_full_ad_data_many")
+    def set_full_ad_data_many(ad_data_by_id: Dict[int, Dict[str, Any]], ttl: int = CacheTTL.MEDIUM) -> None:
+        """Cache full data of multiple ads"""
+        with log_context(logger, ad_count=len(ad_data_by_id)):
+            BaseCacheManager.set_many({
+                get_entity_cache_key("full_ad", ad_id): ad_data
+                for ad_id, ad_data in ad_data_by_id.items()
+            }, ttl)
+
+    @staticmethod
+    @log_operation("get_matching_users_many")
+    def get_matching_users_many(ad_ids: List[int]) -> Dict[int, List[int]]:
+        """Get cached matching user IDs of multiple ads, keyed by ad ID"""
+        keys = {get_entity_cache_key("matching_users", ad_id): ad_id for ad_id in ad_ids}
+        with log_context(logger, ad_count=len(ad_ids)):
+            cached = BaseCacheManager.get_many(list(keys))
+            return {keys[key]: value for key, value in cached.items()}
+
+    @staticmethod
+    @log_operation("set_matching_users_many")
+    def set_matching_users_many(users_by_ad: Dict[int, List[int]], ttl: int = CacheTTL.STANDARD) -> None:
+        """Cache matching user IDs of multiple ads"""
+        with log_context(logger, ad_count=len(users_by_ad)):
+            BaseCacheManager.set_many({
+                get_entity_cache_key("matching_users", ad_id): user_ids
+                for ad_id, user_ids in users_by_ad.items()
+            }, ttl)
+
     @staticmethod
     @log_operation("get_ad_images")
     def get_ad_images(ad_id: int) -> Optional[List[str]]:
@@ -275,6 +518,22 @@ class AdCacheManager(BaseCacheManager):
         with log_context(logger, ad_id=ad_id, image_count=len(images)):
             BaseCacheManager.set(key, images, ttl)
 
+    @staticmethod
+    @log_operation("get_ad_phones")
+    def get_ad_phones(ad_id: int) -> Optional[List[Dict[str, Optional[str]]]]:
+        """Get cached ad phones"""
+        key = get_entity_cache_key("ad_phones", ad_id)
+        with log_context(logger, ad_id=ad_id):
+            return BaseCacheManager.get(key)
+
+    @staticmethod
+    @log_operation("set_ad_phones")
+    def set_ad_phones(ad_id: int, phones: List[Dict[str, Optional[str]]], ttl: int = CacheTTL.LONG) -> None:
+        """Cache ad phones"""
+        key = get_entity_cache_key("ad_phones", ad_id)
+        with log_context(logger, ad_id=ad_id, phone_count=len(phones)):
+            BaseCacheManager.set(key, phones, ttl)
+
     @staticmethod
     @log_operation("get_ad_description")
     def get_ad_description(resource_url: str) -> Optional[str]:
@@ -323,45 +582,9 @@ class AdCacheManager(BaseCacheManager):
         Returns:
             Number of invalidated keys
         """
+        from common.utils.cache_invalidation import invalidate_ad_caches
         with log_context(logger, ad_id=ad_id, resource_url=resource_url):
-            aggregator = LogAggregator(logger, f"invalidate_ad_{ad_id}")
-
-            # Collect keys to delete
-            keys_to_delete = [
-                get_entity_cache_key("full_ad", ad_id),
-                get_entity_cache_key("ad_images", ad_id),
-                get_entity_cache_key("matching_users", ad_id)
-            ]
-
-            # Add resource URL-related keys
-            if resource_url:
-                keys_to_delete.extend([
-                    get_entity_cache_key("extra_images", resource_url),
-                    get_entity_cache_key("ad_description", resource_url)
-                ])
-
-            # Delete all collected keys
-            deleted_count = BaseCacheManager.delete_keys(keys_to_delete)
-            aggregator.add_item({'keys': len(keys_to_delete), 'deleted': deleted_count}, success=True)
-
-            # Also delete any pattern-based keys that might be related
-            pattern_keys = [
-                f"ad:{ad_id}:*",
-                f"matching_users:*"  # This might be broader than needed
-            ]
-
-            for pattern in pattern_keys:
-                count = BaseCacheManager.delete_pattern(pattern)
-                deleted_count += count
-                aggregator.add_item({'pattern': pattern, 'count': count}, success=True)
-
-            aggregator.log_summary()
-            logger.info("Invalidated all ad caches", extra={
-                'ad_id': ad_id,
-                'total_deleted': deleted_count
-            })
-
-            return deleted_count
+            return invalidate_ad_caches(ad_id, resource_url)
 
 
 class FavoriteCacheManager(BaseCacheManager):
@@ -383,6 +606,17 @@ class FavoriteCacheManager(BaseCacheManager):
         with log_context(logger, user_id=user_id, count=len(favorites)):
             BaseCacheManager.set(key, favorites, ttl)
 
+    @staticmethod
+    async def async_get_user_favorites(user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """get_user_favorites on the asyncio Redis client"""
+        return await BaseCacheManager.async_get(get_entity_cache_key("user_favorites", user_id))
+
+    @staticmethod
+    async def async_set_user_favorites(user_id: int, favorites: List[Dict[str, Any]],
+                                       ttl: int = CacheTTL.MEDIUM) -> None:
+        """set_user_favorites on the asyncio Redis client"""
+        await BaseCacheManager.async_set(get_entity_cache_key("user_favorites", user_id), favorites, ttl)
+
     @staticmethod
     @log_operation("invalidate_all_favorite_caches")
     def invalidate_all(user_id: int) -> int:
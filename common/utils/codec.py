@@ -0,0 +1,147 @@
+# common/utils/codec.py
+
+"""
+Compact serialization for values stored in Redis.
+
+Encoded values start with a header byte naming their format:
+
+    0x01  msgpack
+    0x02  msgpack, zlib compressed
+    0x03  msgpack, zstd compressed
+    0x04  JSON, zlib compressed
+
+Values written before this codec existed are plain JSON text. JSON never
+starts with one of the header bytes, so they still decode, and values too
+small to compress are written as plain JSON when msgpack isn't installed.
+
+msgpack and zstandard are optional: without msgpack values are stored as
+JSON, without zstandard compression falls back to zlib. Either way every
+format above can be decoded as long as its library is installed.
+"""
+
+import json
+import zlib
+from typing import Any, Union
+
+from common.config import CACHE_CODEC_CONFIG
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Header bytes, see the module docstring
+MSGPACK = 0x01
+MSGPACK_ZLIB = 0x02
+MSGPACK_ZSTD = 0x03
+JSON_ZLIB = 0x04
+
+
+class CodecError(ValueError):
+    """Raised when stored bytes can't be decoded"""
+
+
+class Codec:
+    """
+    Encodes values for Redis with msgpack or JSON, compressing large ones.
+
+    Args:
+        fmt: "msgpack" or "json"
+        compression: "zstd", "zlib" or "none"
+        compress_threshold: Encoded size in bytes from which values are compressed
+        level: Compression level
+    """
+
+    def __init__(self, fmt: str = "msgpack", compression: str = "zstd", compress_threshold: int = 1024,
+                 level: int = 3):
+        self.use_msgpack = fmt == "msgpack" and msgpack is not None
+        if compression == "zstd" and zstandard is None:
+            compression = "zlib"
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Encode a value.
+
+        Raises:
+            TypeError, ValueError: the value isn't serializable
+        """
+        if self.use_msgpack:
+            payload = msgpack.packb(value, use_bin_type=True)
+        else:
+            payload = json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+        if self.compression != "none" and len(payload) >= self.compress_threshold:
+            if not self.use_msgpack:
+                return bytes([JSON_ZLIB]) + zlib.compress(payload, self.level)
+            if self.compression == "zstd":
+                return bytes([MSGPACK_ZSTD]) + zstandard.ZstdCompressor(level=self.level).compress(payload)
+            return bytes([MSGPACK_ZLIB]) + zlib.compress(payload, self.level)
+
+        if self.use_msgpack:
+            return bytes([MSGPACK]) + payload
+        # Plain JSON needs no header, it stays readable by older readers
+        return payload
+
+    @staticmethod
+    def decode(data: Union[bytes, str]) -> Any:
+        """
+        Decode a value written by any codec configuration or as plain JSON.
+
+        Raises:
+            CodecError: the data is corrupt or its format can't be decoded here
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not data:
+            raise CodecError("Empty value")
+
+        header, body = data[0], data[1:]
+        try:
+            if header == MSGPACK:
+                return _unpack(body)
+            if header == MSGPACK_ZLIB:
+                return _unpack(zlib.decompress(body))
+            if header == MSGPACK_ZSTD:
+                if zstandard is None:
+                    raise CodecError("zstandard is required to decode this value")
+                return _unpack(zstandard.ZstdDecompressor().decompress(body))
+            if header == JSON_ZLIB:
+                return json.loads(zlib.decompress(body))
+            return json.loads(data)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(f"Cannot decode value: {type(e).__name__}: {e}") from e
+
+
+def _unpack(payload: bytes) -> Any:
+    if msgpack is None:
+        raise CodecError("msgpack is required to decode this value")
+    # Keys keep their type, JSON would have turned integer keys into strings
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+default_codec = Codec(
+    fmt=CACHE_CODEC_CONFIG["format"],
+    compression=CACHE_CODEC_CONFIG["compression"],
+    compress_threshold=CACHE_CODEC_CONFIG["compress_threshold"],
+    level=CACHE_CODEC_CONFIG["level"]
+)
+
+
+def encode(value: Any) -> bytes:
+    """Encode a value with the configured codec"""
+    return default_codec.encode(value)
+
+
+def decode(data: Union[bytes, str]) -> Any:
+    """Decode a value stored by any codec configuration"""
+    return Codec.decode(data)
@@ -0,0 +1,255 @@
+# common/utils/local_cache.py
+
+"""
+In-process LRU cache (L1) in front of Redis (L2).
+
+Only keys of the types listed in LOCAL_CACHE_CONFIG["key_types"] are kept in
+process memory, as the raw bytes stored in Redis so every read decodes a fresh
+object. The cache is bounded by entry count and by size, least recently used
+entries are evicted first, and entries expire after a short TTL.
+
+Writes and invalidations of those keys are published on INVALIDATION_CHANNEL
+(see common.utils.cache.publish_invalidation). Every process listens on it in
+a daemon thread and drops the announced keys. While the listener is not
+subscribed, L1 is bypassed, so a lost connection can't serve stale data.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from common.config import LOCAL_CACHE_CONFIG
+from common.utils.cache import (
+    redis_client, INVALIDATION_CHANNEL, add_invalidation_listener, invalidation_origin
+)
+from common.utils.logging_config import log_context
+
+# Import the common utils logger
+from . import logger
+
+# Pause before resubscribing after the listener lost its connection
+RESUBSCRIBE_DELAY = 1.0
+
+
+class LocalCache:
+    """Thread-safe LRU/TTL cache bounded by entry count and total size, with hit counters"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.connected = False
+        # Bumped on every invalidation, a value read from Redis before a bump may be stale
+        self.generation = 0
+
+        self._entries = OrderedDict()  # key -> (expires_at, raw, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'l1_hits': 0,
+            'l1_misses': 0,
+            'l2_hits': 0,
+            'l2_misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Raw cached value, None on a miss or while invalidations aren't received"""
+        if not self.connected:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats['l1_hits'] += 1
+                return entry[1]
+
+            if entry is not None:
+                self._remove(key)
+            self._stats['l1_misses'] += 1
+            return None
+
+    def put(self, key: str, raw: bytes, generation: Optional[int] = None) -> None:
+        """
+        Store a raw value, evicting least recently used entries to stay within bounds.
+
+        With `generation` (taken before reading the value from Redis), the value
+        is dropped if anything was invalidated in the meantime.
+        """
+        if not self.connected:
+            return
+
+        size = len(raw) + len(key)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, raw, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """Drop keys invalidated by this or another process"""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if self._remove(key):
+                    self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def record_l2(self, hit: bool) -> None:
+        """Count a lookup that went to Redis"""
+        with self._lock:
+            self._stats['l2_hits' if hit else 'l2_misses'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters with L1 and L2 hit rates"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes, connected=self.connected)
+
+        l1_total = stats['l1_hits'] + stats['l1_misses']
+        l2_total = stats['l2_hits'] + stats['l2_misses']
+        stats['l1_hit_rate'] = stats['l1_hits'] / l1_total if l1_total else 0
+        stats['l2_hit_rate'] = stats['l2_hits'] / l2_total if l2_total else 0
+        return stats
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def listen(self) -> None:
+        """Apply invalidation messages from other processes, forever (runs in a daemon thread)"""
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Whatever changed while we weren't subscribed is unknown
+                self.clear()
+                self.connected = True
+                logger.debug("Local cache subscribed to invalidations", extra={'pid': os.getpid()})
+
+                for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    try:
+                        payload = json.loads(message['data'])
+                    except (TypeError, ValueError):
+                        continue
+                    # Own invalidations were applied when they were published
+                    if payload.get('origin') != invalidation_origin():
+                        self.discard(payload.get('keys', []))
+            except Exception as e:
+                logger.warning("Local cache invalidation listener failed, bypassing L1", extra={
+                    'error_type': type(e).__name__
+                })
+            finally:
+                self.connected = False
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            time.sleep(RESUBSCRIBE_DELAY)
+
+
+# Process-scoped cache, recreated after fork so each process runs its own listener
+_local_cache: Optional[LocalCache] = None
+_local_cache_pid: Optional[int] = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache() -> Optional[LocalCache]:
+    """Get the local cache of the current process, None if it is disabled"""
+    global _local_cache, _local_cache_pid
+
+    if not LOCAL_CACHE_CONFIG["enabled"]:
+        return None
+
+    if _local_cache is not None and _local_cache_pid == os.getpid():
+        return _local_cache
+
+    with _local_cache_lock:
+        if _local_cache is None or _local_cache_pid != os.getpid():
+            with log_context(logger, pid=os.getpid()):
+                cache = LocalCache(
+                    LOCAL_CACHE_CONFIG["max_entries"],
+                    LOCAL_CACHE_CONFIG["max_bytes"],
+                    LOCAL_CACHE_CONFIG["ttl"]
+                )
+                threading.Thread(target=cache.listen, name="local-cache-invalidation", daemon=True).start()
+                logger.info("Created local cache", extra={
+                    'key_types': LOCAL_CACHE_CONFIG["key_types"],
+                    'max_entries': cache.max_entries,
+                    'max_bytes': cache.max_bytes
+                })
+            _local_cache = cache
+            _local_cache_pid = os.getpid()
+        return _local_cache
+
+
+def is_local_key(key: str) -> bool:
+    """Whether a key is kept in process memory"""
+    return LOCAL_CACHE_CONFIG["enabled"] and key.partition(":")[0] in LOCAL_CACHE_CONFIG["key_types"]
+
+
+def local_get(key: str) -> Optional[bytes]:
+    """L1 lookup, None for keys not kept in process memory"""
+    if not is_local_key(key):
+        return None
+    cache = get_local_cache()
+    return cache.get(key) if cache else None
+
+
+def local_generation() -> Optional[int]:
+    """Invalidation generation to pass to local_put for values about to be read from Redis"""
+    cache = get_local_cache()
+    return cache.generation if cache else None
+
+
+def local_put(key: str, raw: bytes, generation: Optional[int] = None) -> None:
+    """Store a value read from or written to Redis, if its key is kept in process memory"""
+    if not raw or not is_local_key(key):
+        return
+    cache = get_local_cache()
+    if cache:
+        cache.put(key, raw if isinstance(raw, bytes) else raw.encode(), generation)
+
+
+def record_l2(hit: bool) -> None:
+    """Count a Redis lookup made on an L1 miss"""
+    cache = get_local_cache()
+    if cache:
+        cache.record_l2(hit)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """L1/L2 counters and hit rates of the current process"""
+    cache = get_local_cache()
+    return cache.get_stats() if cache else {'enabled': False}
+
+
+def _discard_local(keys):
+    if _local_cache is not None and _local_cache_pid == os.getpid():
+        _local_cache.discard(keys)
+
+
+add_invalidation_listener(_discard_local)
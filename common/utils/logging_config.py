@@ -1,33 +1,91 @@
 # common/utils/logging_config.py
 import logging
 import json
+import os
+import random
 import sys
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, Dict, Optional
 from functools import wraps
 import inspect
 from contextlib import contextmanager
 
+# Log context of the current thread or asyncio task, as a chain of
+# (parent, fields) nodes, so entering a context never copies a dict.
+# The chain is only flattened when a record is actually emitted.
+_log_context_var: ContextVar[Optional[tuple]] = ContextVar('log_context', default=None)
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "operation=rate,operation=rate" into a mapping"""
+    rates = {}
+    for item in spec.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+# Fraction of calls whose DEBUG entry/exit records log_operation emits,
+# e.g. LOG_OPERATION_SAMPLE_RATES="cache_get=0.01,get_entity_cache_key=0"
+_operation_sample_rates: Dict[str, float] = _parse_sample_rates(os.getenv("LOG_OPERATION_SAMPLE_RATES", ""))
+
+
+def set_operation_sample_rate(operation_name: str, rate: float) -> None:
+    """Emit DEBUG entry/exit records for only `rate` of the calls to an operation"""
+    _operation_sample_rates[operation_name] = rate
+
+
+def get_log_context() -> Dict[str, Any]:
+    """Get the fields of the active log contexts, innermost values winning"""
+    chain = []
+    node = _log_context_var.get()
+    while node is not None:
+        chain.append(node[1])
+        node = node[0]
+
+    context = {}
+    for fields in reversed(chain):
+        context.update(fields)
+    return context
+
+
+# LogRecord attributes that extra fields can't overwrite (makeRecord raises KeyError)
+RESERVED_RECORD_FIELDS = frozenset(
+    logging.LogRecord("", logging.INFO, "", 0, "", (), None).__dict__
+) | {"message", "asctime"}
+
+# Prefix of context and extra fields renamed because they clash with a LogRecord attribute
+RESERVED_FIELD_PREFIX = "ctx_"
+
+
+def _safe_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Rename fields clashing with LogRecord attributes, e.g. log_context(process=...)"""
+    if RESERVED_RECORD_FIELDS.isdisjoint(fields):
+        return fields
+    return {
+        (RESERVED_FIELD_PREFIX + key if key in RESERVED_RECORD_FIELDS else key): value
+        for key, value in fields.items()
+    }
+
 
 class StructuredLogger(logging.Logger):
     """Custom logger that adds structured logging capabilities"""
 
     def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False):
-        if extra is None:
-            extra = {}
-
-        # Add context information if available
-        if hasattr(self, '_context'):
-            extra.update(self._context)
-
-        # Add timestamp in ISO format
-        extra['timestamp'] = datetime.utcnow().isoformat()
+        # Only reached for enabled levels; build a new dict rather than mutating the caller's
+        fields = get_log_context()
+        if extra:
+            fields.update(extra)
+        fields = _safe_fields(fields)
 
         # Add service name if set
-        if hasattr(self, '_service_name'):
-            extra['service'] = self._service_name
+        service_name = getattr(self, '_service_name', None)
+        if service_name:
+            fields['service'] = service_name
 
-        super()._log(level, msg, args, exc_info, extra, stack_info)
+        super()._log(level, msg, args, exc_info, fields, stack_info)
 
 
 class JSONFormatter(logging.Formatter):
@@ -35,7 +93,7 @@ class JSONFormatter(logging.Formatter):
 
     def format(self, record):
         log_record = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(),
             'name': record.name,
             'level': record.levelname,
             'message': record.getMessage(),
@@ -113,76 +171,94 @@ def log_context(logger: logging.Logger, **kwargs):
     """
     Context manager for adding contextual information to logs
 
+    The context is bound to the current thread or asyncio task, so it applies to
+    every logger used inside the block and never leaks into concurrent tasks.
+
     Args:
         logger: Logger instance
         **kwargs: Context key-value pairs
     """
-    old_context = getattr(logger, '_context', {})
-    new_context = old_context.copy()
-    new_context.update(kwargs)
-    logger._context = new_context
+    token = _log_context_var.set((_log_context_var.get(), kwargs))
     try:
         yield
     finally:
-        logger._context = old_context
+        _log_context_var.reset(token)
 
 
-def log_operation(operation_name: str):
+def log_operation(operation_name: str, sample_rate: Optional[float] = None):
     """
     Decorator for logging function entry and exit
 
+    Entry/exit records are DEBUG and are not even formatted unless DEBUG is
+    enabled for the logger. Errors are always logged.
+
     Args:
         operation_name: Name of the operation being performed
+        sample_rate: Fraction of calls to log entry/exit for, overridden by
+            LOG_OPERATION_SAMPLE_RATES or set_operation_sample_rate
     """
+    if sample_rate is not None:
+        _operation_sample_rates.setdefault(operation_name, sample_rate)
+    context_fields = {'operation': operation_name}
 
     def decorator(func):
-        @wraps(func)
-        def sync_wrapper(*args, **kwargs):
+        module_logger = logging.getLogger(getattr(func, '__module__', None) or __name__)
+
+        def get_logger(args):
             # Get logger from first argument if it's a class method
             if args and hasattr(args[0], 'logger'):
-                logger = args[0].logger
-            elif hasattr(func, '__module__'):
-                logger = logging.getLogger(func.__module__)
-            else:
-                logger = logging.getLogger(__name__)
-
-            with log_context(logger, operation=operation_name):
-                logger.debug(f"Starting {operation_name}", extra={
-                    'args': str(args[1:])[:100],  # Limit args length
-                    'kwargs': str(kwargs)[:100]
-                })
-
-                try:
-                    result = func(*args, **kwargs)
+                return args[0].logger
+            return module_logger
+
+        def should_trace(logger):
+            if not logger.isEnabledFor(logging.DEBUG):
+                return False
+            rate = _operation_sample_rates.get(operation_name, 1.0)
+            return rate >= 1 or random.random() < rate
+
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            logger = get_logger(args)
+            trace = should_trace(logger)
+            token = _log_context_var.set((_log_context_var.get(), context_fields))
+            try:
+                if trace:
+                    logger.debug(f"Starting {operation_name}", extra={
+                        'call_args': str(args[1:])[:100],  # Limit args length
+                        'call_kwargs': str(kwargs)[:100]
+                    })
+
+                result = func(*args, **kwargs)
+                if trace:
                     logger.debug(f"Completed {operation_name}")
-                    return result
-                except Exception as e:
-                    logger.exception(f"Error in {operation_name}: {e}")
-                    raise
+                return result
+            except Exception as e:
+                logger.exception(f"Error in {operation_name}: {e}")
+                raise
+            finally:
+                _log_context_var.reset(token)
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # Get logger from first argument if it's a class method
-            if args and hasattr(args[0], 'logger'):
-                logger = args[0].logger
-            elif hasattr(func, '__module__'):
-                logger = logging.getLogger(func.__module__)
-            else:
-                logger = logging.getLogger(__name__)
-
-            with log_context(logger, operation=operation_name):
-                logger.debug(f"Starting {operation_name}", extra={
-                    'args': str(args[1:])[:100],  # Limit args length
-                    'kwargs': str(kwargs)[:100]
-                })
-
-                try:
-                    result = await func(*args, **kwargs)
+            logger = get_logger(args)
+            trace = should_trace(logger)
+            token = _log_context_var.set((_log_context_var.get(), context_fields))
+            try:
+                if trace:
+                    logger.debug(f"Starting {operation_name}", extra={
+                        'call_args': str(args[1:])[:100],  # Limit args length
+                        'call_kwargs': str(kwargs)[:100]
+                    })
+
+                result = await func(*args, **kwargs)
+                if trace:
                     logger.debug(f"Completed {operation_name}")
-                    return result
-                except Exception as e:
-                    logger.exception(f"Error in {operation_name}: {e}")
-                    raise
+                return result
+            except Exception as e:
+                logger.exception(f"Error in {operation_name}: {e}")
+                raise
+            finally:
+                _log_context_var.reset(token)
 
         # Return appropriate wrapper based on function type
         if inspect.iscoroutinefunction(func):
@@ -10,8 +10,10 @@ from dataclasses import dataclass
 from typing import List, Optional
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import Page
 
+from common.config import BROWSER_POOL_CONFIG
+from common.utils.browser_pool import BrowserPool, BrowserPoolBusy, get_browser_pool
 from common.utils.unified_request_utils import make_request
 from common.utils.logging_config import log_operation, log_context, LogAggregator
 
@@ -243,10 +245,10 @@ async def olx_js_fetch_phone(page: Page, sku: str, attempts: int = 3) -> Optiona
     return None
 
 
-async def olx_js_fetch_phone_via_proxies(browser: Browser, resource_url: str, sku: str) -> Optional[str]:
+async def olx_js_fetch_phone_via_proxies(pool: BrowserPool, resource_url: str, sku: str) -> Optional[str]:
     """
     If normal OLX fetch fails, do 3 attempts with random bright data proxies.
-    Each attempt => new context => fetch w/ same JS script
+    Each attempt => new pooled proxy context => fetch w/ same JS script
     """
     if not BRIGHTDATA_PROXIES:
         logger.warning("No bright data proxies available for OLX fallback.")
@@ -258,16 +260,10 @@ async def olx_js_fetch_phone_via_proxies(browser: Browser, resource_url: str, sk
         logger.info(f"OLX phone fallback via bright data proxy attempt {attempt_} => {random_proxy}")
         try:
             ua = get_random_desktop_user_agent()
-            context = await browser.new_context(
-                user_agent=ua,
-                java_script_enabled=True,
-                proxy=proxy_config
-            )
-            page = await context.new_page()
-            # Use domcontentloaded instead of networkidle
-            await page.goto(resource_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
-            phone = await olx_js_fetch_phone(page, sku, attempts=1)
-            await context.close()
+            async with pool.page(proxy=proxy_config, user_agent=ua) as page:
+                # Use domcontentloaded instead of networkidle
+                await page.goto(resource_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
+                phone = await olx_js_fetch_phone(page, sku, attempts=1)
             if phone:
                 logger.info(f"Success with bright data proxy => {phone}")
                 return phone
@@ -277,7 +273,7 @@ async def olx_js_fetch_phone_via_proxies(browser: Browser, resource_url: str, sk
     return None
 
 
-async def parse_olx_playwright(html: str, page: Page, browser: Browser, resource_url: str) -> ExtractionResult:
+async def parse_olx_playwright(html: str, page: Page, pool: BrowserPool, resource_url: str) -> ExtractionResult:
     """
     1) parse HTML => find SKU
     2) attempt phone fetch in same page context
@@ -300,7 +296,7 @@ async def parse_olx_playwright(html: str, page: Page, browser: Browser, resource
         return ExtractionResult([phone], None)
 
     # fallback => bright data
-    phone_via_proxy = await olx_js_fetch_phone_via_proxies(browser, resource_url, sku)
+    phone_via_proxy = await olx_js_fetch_phone_via_proxies(pool, resource_url, sku)
     if phone_via_proxy:
         logger.info(f"OLX phone after bright data => {phone_via_proxy}")
         return ExtractionResult([phone_via_proxy], None)
@@ -312,7 +308,7 @@ async def parse_olx_playwright(html: str, page: Page, browser: Browser, resource
 # ===========================
 # Main domain parse
 # ===========================
-async def _domain_parse_final(html: str, original_url: str, page: Page, browser: Browser) -> ExtractionResult:
+async def _domain_parse_final(html: str, original_url: str, page: Page, pool: BrowserPool) -> ExtractionResult:
     soup = BeautifulSoup(html, "lxml")
     canonical_tag = soup.find("link", rel="canonical") or soup.find("a", class_="redirect-link")
     canonical_url = canonical_tag.get("href") if canonical_tag else original_url
@@ -323,7 +319,7 @@ async def _domain_parse_final(html: str, original_url: str, page: Page, browser:
     logger.info(f"Canonical for {original_url}: {canonical_url}")
 
     if "olx.ua" in canonical_url:
-        return await parse_olx_playwright(html, page, browser, original_url)
+        return await parse_olx_playwright(html, page, pool, original_url)
     elif "real-estate.lviv.ua" in canonical_url:
         return _parse_real_estate_lviv(canonical_url)
     elif "rieltor.ua" in canonical_url:
@@ -341,34 +337,20 @@ async def _domain_parse_final(html: str, original_url: str, page: Page, browser:
 # Page fetch
 # ===========================
 @log_operation("playwright_fetch_page")
-async def _playwright_fetch_page(url: str, browser: Browser, proxy: Optional[str], attempts: int = 3) -> str:
+async def _playwright_fetch_page(url: str, page: Page, attempts: int = 3) -> str:
     """
-    Fetch page content with retry logic and proper error handling.
+    Load a URL in the given pooled page with retry logic and return its content.
+    The page stays on the loaded document for domain parsing afterwards.
     """
     aggregator = LogAggregator(logger, f"playwright_fetch_page_{url}")
 
     for i in range(1, attempts + 1):
-        ua = get_random_desktop_user_agent()
-        proxy_settings = None
-        if proxy:
-            logger.info(f"Using proxy => {proxy}")
-            proxy_settings = {"server": proxy}
-
-        with log_context(logger, attempt=i, total_attempts=attempts, user_agent=ua[:50], using_proxy=bool(proxy)):
+        with log_context(logger, attempt=i, total_attempts=attempts):
             logger.info(f"[Playwright] Attempt {i}/{attempts} for {url}")
-            context = await browser.new_context(
-                user_agent=ua,
-                java_script_enabled=True,
-                proxy=proxy_settings
-            )
-            page = await context.new_page()
-
             try:
                 # Use "domcontentloaded" instead of "networkidle" to reduce timeouts
-                # Also reduce timeout from 30 seconds to 15 seconds
                 await page.goto(url, wait_until="domcontentloaded", timeout=15000)
                 content = await page.content()
-                await context.close()
                 aggregator.add_item({'attempt': i, 'url': url}, success=True)
                 logger.debug("Page fetch successful", extra={'attempt': i})
                 return content
@@ -379,81 +361,32 @@ async def _playwright_fetch_page(url: str, browser: Browser, proxy: Optional[str
                     'attempt': i
                 })
                 aggregator.add_error(str(e), {'attempt': i, 'url': url})
-                await context.close()
                 await asyncio.sleep(1)
 
     aggregator.log_summary()
-    raise Exception(f"Failed to load {url} after {attempts} attempts, proxy={proxy}")
-
-
-async def create_optimized_browser() -> Browser:
-    """
-    Create a Playwright browser with optimized memory settings.
-    """
-    try:
-        p = await async_playwright().start()
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                '--disable-dev-shm-usage',
-                '--disable-extensions',
-                '--disable-gpu',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process',
-                '--disable-site-isolation-trials',
-                '--mute-audio',
-                '--disable-infobars',
-                '--disable-breakpad',
-                '--disable-3d-apis',
-                '--disable-accelerated-2d-canvas',
-                '--disable-accelerated-jpeg-decoding',
-                '--disable-accelerated-mjpeg-decode',
-                '--disable-accelerated-video-decode',
-                '--disable-app-list-dismiss-on-blur',
-                '--disable-canvas-aa',
-                '--disable-composited-antialiasing',
-                '--disable-gl-extensions',
-                '--disable-webgl',
-                '--disable-webgl2',
-                '--ignore-certificate-errors',
-                '--disable-features=ScriptStreaming',
-                '--js-flags=--max-old-space-size=128',  # Limit JavaScript memory
-            ]
-        )
-        return browser
-    except Exception as e:
-        logger.exception(f"Failed to create optimized browser: {e}")
-        raise
+    raise Exception(f"Failed to load {url} after {attempts} attempts")
 
 
 # ===========================
 # Async main fetch
 # ===========================
 @log_operation("extract_phone_numbers_async")
-async def _extract_phone_numbers_async(resource_url: str) -> ExtractionResult:
+async def _extract_phone_numbers_async(resource_url: str, pool: BrowserPool) -> ExtractionResult:
     """
-    1) 3 attempts no-proxy
+    1) no-proxy page with retries
     2) 3 attempts random bright data proxies
     3) fallback ZenRows
+    All pages come from the shared worker browser pool.
     """
     aggregator = LogAggregator(logger, f"extract_phone_numbers_async_{resource_url}")
 
-    # Use optimized browser instead of default
-    browser = await create_optimized_browser()
     try:
         with log_context(logger, resource_url=resource_url):
-            # 1) no-proxy (3 attempts)
+            # 1) no-proxy, parsed in the same page context (needed for OLX phone fetch)
             try:
-                html_np = await _playwright_fetch_page(resource_url, browser, None, attempts=5)
-                # parse domain => need page context to do OLX phone
-                ctx_np = await browser.new_context(java_script_enabled=True)
-                page_np = await ctx_np.new_page()
-                # Use domcontentloaded instead of networkidle
-                await page_np.goto(resource_url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT * 1000)
-                result_np = await _domain_parse_final(html_np, resource_url, page_np, browser)
-                await ctx_np.close()
+                async with pool.page(user_agent=get_random_desktop_user_agent()) as page_np:
+                    html_np = await _playwright_fetch_page(resource_url, page_np, attempts=5)
+                    result_np = await _domain_parse_final(html_np, resource_url, page_np, pool)
                 aggregator.add_item({'method': 'no-proxy'}, success=True)
                 return result_np
             except Exception as e:
@@ -470,15 +403,13 @@ async def _extract_phone_numbers_async(resource_url: str) -> ExtractionResult:
                     proxy_ = random.choice(BRIGHTDATA_PROXIES)
                     with log_context(logger, attempt=att_, proxy=proxy_[:20]):
                         try:
-                            html_px = await _playwright_fetch_page(resource_url, browser, proxy_,
-                                                                   attempts=len(BRIGHTDATA_PROXIES))
-                            ctx_px = await browser.new_context(java_script_enabled=True, proxy={"server": proxy_})
-                            page_px = await ctx_px.new_page()
-                            # Use domcontentloaded instead of networkidle
-                            await page_px.goto(resource_url, wait_until="domcontentloaded",
-                                               timeout=REQUEST_TIMEOUT * 1000)
-                            res_px = await _domain_parse_final(html_px, resource_url, page_px, browser)
-                            await ctx_px.close()
+                            async with pool.page(
+                                    proxy={"server": proxy_},
+                                    user_agent=get_random_desktop_user_agent()
+                            ) as page_px:
+                                html_px = await _playwright_fetch_page(resource_url, page_px,
+                                                                       attempts=len(BRIGHTDATA_PROXIES))
+                                res_px = await _domain_parse_final(html_px, resource_url, page_px, pool)
                             aggregator.add_item({'method': 'bright-data', 'attempt': att_}, success=True)
                             return res_px
                         except Exception as e:
@@ -493,11 +424,12 @@ async def _extract_phone_numbers_async(resource_url: str) -> ExtractionResult:
             # 3) fallback => ZenRows
             logger.info("Falling back to ZenRows")
             try:
-                zen_html = fetch_with_zenrows(resource_url, js_render=False)
-                ctx_z = await browser.new_context(java_script_enabled=False)
-                page_z = await ctx_z.new_page()  # not actually loaded => we'll parse offline
-                res_z = await _domain_parse_final(zen_html, resource_url, page_z, browser)
-                await ctx_z.close()
+                zen_html = await asyncio.get_running_loop().run_in_executor(
+                    None, fetch_with_zenrows, resource_url, False
+                )
+                # Page is not actually loaded => we'll parse offline
+                async with pool.page(java_script_enabled=False) as page_z:
+                    res_z = await _domain_parse_final(zen_html, resource_url, page_z, pool)
                 aggregator.add_item({'method': 'zenrows'}, success=True)
                 return res_z
             except Exception as e:
@@ -507,8 +439,6 @@ async def _extract_phone_numbers_async(resource_url: str) -> ExtractionResult:
                 aggregator.add_error("ZenRows failed", {'error': str(e)})
                 return ExtractionResult([], None)
     finally:
-        # Make sure browser is always closed properly
-        await browser.close()
         aggregator.log_summary()
 
 
@@ -517,6 +447,9 @@ def extract_phone_numbers_from_resource(resource_url: str) -> ExtractionResult:
     """
     Synchronous function with circuit breaker pattern:
       phones, viber = extract_phone_numbers_from_resource(url).phone_numbers, .viber_link
+
+    Raises:
+        BrowserPoolBusy: the shared browser has no room, the caller should try again later
     """
     global CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_LAST_ATTEMPT
 
@@ -543,7 +476,10 @@ def extract_phone_numbers_from_resource(resource_url: str) -> ExtractionResult:
         CIRCUIT_BREAKER_LAST_ATTEMPT = datetime.now()
 
         try:
-            result = asyncio.run(_extract_phone_numbers_async(resource_url))
+            result = get_browser_pool().run(
+                lambda pool: _extract_phone_numbers_async(resource_url, pool),
+                timeout=BROWSER_POOL_CONFIG["task_timeout"]
+            )
             # Reset failure count on success
             CIRCUIT_BREAKER_FAILURES = 0
             logger.info("Phone extraction successful", extra={
@@ -552,6 +488,12 @@ def extract_phone_numbers_from_resource(resource_url: str) -> ExtractionResult:
                 'has_viber': bool(result.viber_link)
             })
             return result
+        except BrowserPoolBusy:
+            # Back-pressure from the shared browser, not a failure of the sources: the caller retries
+            logger.warning("Browser pool busy, phone extraction deferred", extra={
+                'resource_url': resource_url
+            })
+            raise
         except Exception as e:
             logger.exception("All phone extraction attempts failed", extra={
                 'resource_url': resource_url,
@@ -0,0 +1,187 @@
+# common/utils/s3_transfer.py
+
+"""
+Process wide S3 client and streaming image transfers.
+
+Every S3 call of a process goes through one boto3 client, created on first
+use in the process (after the Celery fork) with a connection pool sized by
+S3_TRANSFER_CONFIG. boto3 clients are thread safe, so the mirroring and
+deletion thread pools share its connections.
+
+Images are streamed from their source into a spool that keeps at most
+S3_TRANSFER_CONFIG["spool_max_bytes"] in memory and spills the rest to a
+temporary file, hashing the bytes on the way: the content addressed key is
+only known once the whole image was read. The spool is then uploaded with
+upload_fileobj, in parts above the multipart threshold, so memory per
+transfer stays bounded whatever the image size.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from common.config import AWS_CONFIG, S3_TRANSFER_CONFIG
+from common.utils.unified_request_utils import make_request
+from common.utils.logging_config import log_operation, log_context
+
+# Import the common utils logger
+from . import logger
+
+
+class ImageTooLarge(Exception):
+    """Source image larger than S3_TRANSFER_CONFIG["max_image_bytes"]"""
+
+
+# Process-scoped client, recreated after fork so processes never share connections
+_s3_client = None
+_s3_client_pid: Optional[int] = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Get the S3 client of the current process"""
+    global _s3_client, _s3_client_pid
+
+    with _s3_client_lock:
+        if _s3_client is None or _s3_client_pid != os.getpid():
+            with log_context(logger, pid=os.getpid()):
+                logger.info("Creating S3 client", extra={
+                    'max_pool_connections': S3_TRANSFER_CONFIG["max_pool_connections"]
+                })
+            _s3_client = boto3.client(
+                's3',
+                aws_access_key_id=AWS_CONFIG['access_key'],
+                aws_secret_access_key=AWS_CONFIG['secret_key'],
+                region_name=AWS_CONFIG['region'],
+                config=Config(
+                    max_pool_connections=S3_TRANSFER_CONFIG["max_pool_connections"],
+                    retries={'max_attempts': S3_TRANSFER_CONFIG["max_attempts"], 'mode': 'standard'}
+                )
+            )
+            _s3_client_pid = os.getpid()
+        return _s3_client
+
+
+def get_transfer_config() -> TransferConfig:
+    """Multipart settings of upload_fileobj"""
+    return TransferConfig(
+        multipart_threshold=S3_TRANSFER_CONFIG["multipart_threshold"],
+        multipart_chunksize=S3_TRANSFER_CONFIG["multipart_chunksize"],
+        max_concurrency=S3_TRANSFER_CONFIG["max_concurrency"],
+        # Parts of one upload are only sent from threads when several may be in flight
+        use_threads=S3_TRANSFER_CONFIG["max_concurrency"] > 1
+    )
+
+
+@log_operation("download_to_spool")
+def download_to_spool(
+        image_url: str,
+        timeout: float = 10,
+        retries: int = 3
+) -> Optional[Tuple[tempfile.SpooledTemporaryFile, str, int]]:
+    """
+    Stream an image into a bounded spool while hashing it.
+
+    Returns:
+        (spool positioned at its start, SHA-256 hex digest, size in bytes),
+        None when the image couldn't be downloaded. The caller closes the spool.
+    """
+    with log_context(logger, image_url=image_url[:50]):
+        response = make_request(
+            url=image_url,
+            method='get',
+            timeout=timeout,
+            retries=retries,
+            raise_for_status=False,
+            stream=True
+        )
+
+        # A Response is falsy for any status >= 400, compare with None
+        if response is None or response.status_code != 200:
+            logger.error("Failed to download image", extra={
+                'image_url': image_url[:50],
+                'status_code': response.status_code if response is not None else 'No response'
+            })
+            if response is not None:
+                response.close()
+            return None
+
+        spool = tempfile.SpooledTemporaryFile(max_size=S3_TRANSFER_CONFIG["spool_max_bytes"])
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size=S3_TRANSFER_CONFIG["read_chunk_bytes"]):
+                size += len(chunk)
+                if size > S3_TRANSFER_CONFIG["max_image_bytes"]:
+                    raise ImageTooLarge(f"{image_url[:50]} exceeds {S3_TRANSFER_CONFIG['max_image_bytes']} bytes")
+                digest.update(chunk)
+                spool.write(chunk)
+        except Exception as e:
+            spool.close()
+            logger.error("Failed to read image", exc_info=True, extra={
+                'image_url': image_url[:50],
+                'bytes_read': size,
+                'error_type': type(e).__name__
+            })
+            return None
+        finally:
+            response.close()
+
+        spool.seek(0)
+        return spool, digest.hexdigest(), size
+
+
+@log_operation("upload_fileobj_to_s3")
+def upload_fileobj_to_s3(
+        fileobj,
+        s3_key: str,
+        content_type: str,
+        max_retries: int = 3,
+        retry_delay: float = 1
+) -> bool:
+    """
+    Upload a seekable file object to the bucket through the shared client.
+
+    Returns:
+        True once uploaded, False after max_retries failed attempts
+    """
+    for attempt in range(max_retries):
+        try:
+            with log_context(logger, attempt=attempt + 1, s3_key=s3_key):
+                fileobj.seek(0)
+                get_s3_client().upload_fileobj(
+                    fileobj,
+                    AWS_CONFIG['s3_bucket'],
+                    s3_key,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=get_transfer_config()
+                )
+                logger.debug("Successfully uploaded to S3", extra={'s3_key': s3_key})
+                return True
+
+        except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+            if attempt < max_retries - 1:
+                current_delay = retry_delay * (2 ** attempt)
+                logger.warning("S3 upload failed, retrying", extra={
+                    'attempt': attempt + 1,
+                    'max_retries': max_retries,
+                    'delay': current_delay,
+                    'error': str(e),
+                    'error_type': type(e).__name__
+                })
+                time.sleep(current_delay)
+            else:
+                logger.error("S3 upload failed after retries", exc_info=True, extra={
+                    'attempts': max_retries,
+                    'error_type': type(e).__name__
+                })
+    return False
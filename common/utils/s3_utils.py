@@ -1,30 +1,50 @@
 # common/utils/s3_utils.py
-import time
 import mimetypes
-from typing import List, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Tuple
 
-import boto3
 import redis
 
 from botocore.exceptions import ClientError
-from common.config import AWS_CONFIG, REDIS_URL
-from common.utils.unified_request_utils import make_request
+from common.config import AWS_CONFIG, REDIS_URL, S3_CLEANUP_CONFIG, SCRAPER_CONFIG
+from common.utils.cache import CacheTTL
+from common.utils.s3_transfer import download_to_spool, get_s3_client, upload_fileobj_to_s3
 from common.utils.logging_config import log_operation, log_context, LogAggregator
 
 # Import the common utils logger
 from . import logger
 
-# Initialize S3 client using config
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_CONFIG['access_key'],
-    aws_secret_access_key=AWS_CONFIG['secret_key'],
-    region_name=AWS_CONFIG['region']
-)
-
 redis_client = redis.from_url(REDIS_URL)
 
 
+# Most keys a single DeleteObjects request accepts
+S3_DELETE_MAX_KEYS = 1000
+
+# Redis markers of content addressed images:
+# s3_image:<key> is set while the object exists, s3_image_source:<source URL> holds its key
+IMAGE_OBJECT_CACHE_PREFIX = "s3_image"
+IMAGE_SOURCE_CACHE_PREFIX = "s3_image_source"
+IMAGE_CACHE_TTL = CacheTTL.EXTENDED
+
+# s3_image_claimed:<key> holds the time an upload last handed the key out to an ad,
+# cleanup leaves the object alone until it expires
+IMAGE_CLAIM_CACHE_PREFIX = "s3_image_claimed"
+IMAGE_CLAIM_TTL = S3_CLEANUP_CONFIG["orphan_grace_hours"] * 3600
+
+
+def s3_key_from_url(image_url: str) -> Optional[str]:
+    """S3 key of a CloudFront or S3 image URL, None for URLs outside our bucket"""
+    if not image_url:
+        return None
+    if AWS_CONFIG['cloudfront_domain'] and AWS_CONFIG['cloudfront_domain'] in image_url:
+        return image_url.replace(f"{AWS_CONFIG['cloudfront_domain']}/", "")
+    if AWS_CONFIG['s3_bucket'] in image_url:
+        return image_url.split(f"{AWS_CONFIG['s3_bucket']}.s3.amazonaws.com/")[-1]
+    return None
+
+
 @log_operation("delete_s3_image")
 def delete_s3_image(image_url: str) -> bool:
     """
@@ -36,20 +56,14 @@ def delete_s3_image(image_url: str) -> bool:
     Returns:
         True if successfully deleted, False otherwise
     """
-    with log_context(logger, image_url=image_url[:50]):
+    with log_context(logger, image_url=image_url[:50] if image_url else None):
         if not image_url:
             logger.warning("Empty image URL provided for deletion")
             return False
 
         try:
-            # Extract S3 key from URL
-            if AWS_CONFIG['cloudfront_domain'] and AWS_CONFIG['cloudfront_domain'] in image_url:
-                # Extract key from CloudFront URL
-                s3_key = image_url.replace(f"{AWS_CONFIG['cloudfront_domain']}/", "")
-            elif AWS_CONFIG['s3_bucket'] in image_url:
-                # Extract key from S3 URL
-                s3_key = image_url.split(f"{AWS_CONFIG['s3_bucket']}.s3.amazonaws.com/")[-1]
-            else:
+            s3_key = s3_key_from_url(image_url)
+            if not s3_key:
                 logger.warning("URL doesn't match expected CloudFront or S3 pattern", extra={
                     'image_url': image_url[:50],
                     'cloudfront_domain': AWS_CONFIG['cloudfront_domain'],
@@ -59,10 +73,11 @@ def delete_s3_image(image_url: str) -> bool:
 
             # Delete the object from S3
             try:
-                s3_client.delete_object(
+                get_s3_client().delete_object(
                     Bucket=AWS_CONFIG['s3_bucket'],
                     Key=s3_key
                 )
+                forget_stored_objects([s3_key])
                 logger.info("Successfully deleted image from S3", extra={
                     's3_key': s3_key,
                     'bucket': AWS_CONFIG['s3_bucket']
@@ -86,6 +101,68 @@ def delete_s3_image(image_url: str) -> bool:
             return False
 
 
+def _delete_s3_key_batch(keys: List[str]) -> Dict[str, bool]:
+    """One DeleteObjects request, reports the keys S3 failed to delete"""
+    try:
+        response = get_s3_client().delete_objects(
+            Bucket=AWS_CONFIG['s3_bucket'],
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+    except ClientError as e:
+        logger.error("Failed to delete objects from S3", exc_info=True, extra={
+            'key_count': len(keys),
+            'bucket': AWS_CONFIG['s3_bucket'],
+            'error_type': type(e).__name__,
+            'error_code': e.response.get('Error', {}).get('Code') if hasattr(e, 'response') else None
+        })
+        return {key: False for key in keys}
+
+    # Quiet mode only reports the failures
+    errors = response.get('Errors', [])
+    if errors:
+        logger.warning("Some objects were not deleted from S3", extra={
+            'failed_count': len(errors),
+            'error_codes': sorted({error.get('Code') for error in errors}),
+            'sample_keys': [error.get('Key') for error in errors[:5]]
+        })
+    failed = {error.get('Key') for error in errors}
+    return {key: key not in failed for key in keys}
+
+
+@log_operation("delete_s3_objects")
+def delete_s3_objects(keys: Iterable[str], max_workers: Optional[int] = None) -> Dict[str, bool]:
+    """
+    Delete objects by key with DeleteObjects requests of up to 1000 keys,
+    sent in parallel.
+
+    Args:
+        keys: S3 keys to delete
+        max_workers: Parallel requests, defaults to S3_CLEANUP_CONFIG["delete_concurrency"]
+
+    Returns:
+        Dictionary mapping key to deletion success status
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    max_workers = max_workers or S3_CLEANUP_CONFIG["delete_concurrency"]
+    batches = [keys[i:i + S3_DELETE_MAX_KEYS] for i in range(0, len(keys), S3_DELETE_MAX_KEYS)]
+    with log_context(logger, key_count=len(keys), batch_count=len(batches)):
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            for batch_results in executor.map(_delete_s3_key_batch, batches):
+                results.update(batch_results)
+        forget_stored_objects(key for key, success in results.items() if success)
+
+        logger.info("Deleted objects from S3", extra={
+            'requested': len(keys),
+            'deleted': sum(1 for success in results.values() if success),
+            'requests': len(batches)
+        })
+        return results
+
+
 @log_operation("delete_s3_image_batch")
 def delete_s3_image_batch(image_urls: List[str]) -> Dict[str, bool]:
     """
@@ -101,29 +178,28 @@ def delete_s3_image_batch(image_urls: List[str]) -> Dict[str, bool]:
         return {}
 
     with log_context(logger, image_count=len(image_urls)):
-        aggregator = LogAggregator(logger, "delete_s3_image_batch")
-        results = {}
+        keys = {image_url: s3_key_from_url(image_url) for image_url in image_urls}
+        unmatched = [image_url for image_url, key in keys.items() if not key]
+        if unmatched:
+            logger.warning("URLs don't match expected CloudFront or S3 pattern", extra={
+                'url_count': len(unmatched),
+                'sample_urls': [image_url[:50] for image_url in unmatched[:5]]
+            })
 
-        for image_url in image_urls:
-            try:
-                success = delete_s3_image(image_url)
-                results[image_url] = success
+        deleted = delete_s3_objects(key for key in keys.values() if key)
+        return {image_url: deleted.get(key, False) for image_url, key in keys.items()}
 
-                if success:
-                    aggregator.add_item({'url': image_url[:50]}, success=True)
-                else:
-                    aggregator.add_item({'url': image_url[:50]}, success=False)
 
-            except Exception as e:
-                logger.error("Error processing batch delete item", exc_info=True, extra={
-                    'image_url': image_url[:50],
-                    'error_type': type(e).__name__
-                })
-                results[image_url] = False
-                aggregator.add_error(str(e), {'url': image_url[:50]})
+def iter_s3_objects(prefix: str = AWS_CONFIG['s3_prefix']) -> Iterator[Tuple[str, datetime]]:
+    """
+    (key, last_modified) of the objects under a prefix, in the ascending
+    UTF-8 binary key order of S3 listings, one listing page at a time.
+    """
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=AWS_CONFIG['s3_bucket'], Prefix=prefix):
+        for item in page.get('Contents', []):
+            yield item['Key'], item['LastModified']
 
-        aggregator.log_summary()
-        return results
 
 @log_operation("detect_content_type")
 def detect_content_type(image_url, file_extension):
@@ -156,117 +232,175 @@ def detect_content_type(image_url, file_extension):
         return content_type
 
 
+def s3_object_url(s3_key: str) -> str:
+    """Public URL of an object, through CloudFront when configured"""
+    if AWS_CONFIG['cloudfront_domain']:
+        return f"{AWS_CONFIG['cloudfront_domain']}/{s3_key}"
+    return f"https://{AWS_CONFIG['s3_bucket']}.s3.amazonaws.com/{s3_key}"
+
+
+def content_image_key(digest: str, file_extension: str, prefix: Optional[str] = None) -> str:
+    """S3 key of an image named after the SHA-256 hex digest of its content"""
+    prefix = AWS_CONFIG['s3_prefix'] if prefix is None else prefix
+    return f"{prefix}{digest}.{file_extension}"
+
+
+def image_file_extension(image_url: str) -> str:
+    """Extension of the file name in an image URL, jpg when it has none"""
+    filename = image_url.split("/")[-1].split("?")[0]
+    if '.' in filename:
+        extension = filename.rsplit('.', 1)[1]
+        if extension.isalnum():
+            return extension.lower()
+    return "jpg"
+
+
+def _cache_get(key: str) -> Optional[str]:
+    try:
+        value = redis_client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+    except Exception as e:
+        # The lookups only save work, S3 remains the source of truth
+        logger.warning("Image key cache unavailable", extra={'error_type': type(e).__name__})
+        return None
+
+
+def _cache_set(mapping: Dict[str, str]) -> None:
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, value, ex=IMAGE_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Image key cache unavailable", extra={'error_type': type(e).__name__})
+
+
+def forget_stored_objects(keys: Iterable[str]) -> None:
+    """Drop the stored markers of deleted objects, so uploads don't reuse them"""
+    markers = [f"{IMAGE_OBJECT_CACHE_PREFIX}:{key}" for key in keys]
+    if not markers:
+        return
+    try:
+        for i in range(0, len(markers), S3_DELETE_MAX_KEYS):
+            redis_client.delete(*markers[i:i + S3_DELETE_MAX_KEYS])
+    except Exception as e:
+        logger.warning("Image key cache unavailable", extra={'error_type': type(e).__name__})
+
+
+def claim_image_key(s3_key: str) -> None:
+    """
+    Record that a key is handed out to an ad. Its ad_images row is saved
+    later, until then nothing references the object in the database.
+    """
+    try:
+        redis_client.set(f"{IMAGE_CLAIM_CACHE_PREFIX}:{s3_key}", int(time.time()), ex=IMAGE_CLAIM_TTL)
+    except Exception as e:
+        logger.warning("Image key claim not recorded", extra={'s3_key': s3_key, 'error_type': type(e).__name__})
+
+
+def unclaimed_keys(keys: Iterable[str]) -> List[str]:
+    """
+    Keys no upload handed out within S3_CLEANUP_CONFIG["orphan_grace_hours"],
+    the only ones cleanup may delete. Without Redis every key counts as claimed.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return []
+    try:
+        claims = []
+        for i in range(0, len(keys), S3_DELETE_MAX_KEYS):
+            claims.extend(redis_client.mget(
+                [f"{IMAGE_CLAIM_CACHE_PREFIX}:{key}" for key in keys[i:i + S3_DELETE_MAX_KEYS]]
+            ))
+    except Exception as e:
+        logger.warning("Image key claims unavailable, keeping all objects", extra={
+            'key_count': len(keys),
+            'error_type': type(e).__name__
+        })
+        return []
+    return [key for key, claim in zip(keys, claims) if claim is None]
+
+
+def is_stored_in_s3(s3_key: str) -> bool:
+    """Whether an object exists, from the Redis marker or else a HEAD request"""
+    if _cache_get(f"{IMAGE_OBJECT_CACHE_PREFIX}:{s3_key}"):
+        return True
+    try:
+        get_s3_client().head_object(Bucket=AWS_CONFIG['s3_bucket'], Key=s3_key)
+    except ClientError:
+        return False
+    _cache_set({f"{IMAGE_OBJECT_CACHE_PREFIX}:{s3_key}": "1"})
+    return True
+
+
 @log_operation("upload_image_to_s3")
-def _upload_image_to_s3(image_url, ad_unique_id, max_retries=3, retry_delay=1):
+def _upload_image_to_s3(image_url, ad_unique_id=None, max_retries=3, retry_delay=1, prefix=None):
     """
-    Downloads the image from `image_url` and uploads to S3.
+    Streams the image from `image_url` to S3 with bounded memory, see
+    common.utils.s3_transfer.
+
+    Images are content addressed: the key is the SHA-256 of the image, so the
+    same photo in several ads is stored once and all their ad_images rows
+    point to that object. Source URLs that were mirrored before skip the
+    download, content already in S3 skips the upload. Every key handed out is
+    claimed first (claim_image_key), so cleanup of the ads that used it
+    before doesn't delete it while the new ad is being saved.
     """
-    with log_context(logger, image_url=image_url[:50], ad_id=ad_unique_id):
+    with log_context(logger, image_url=image_url[:50] if image_url else None, ad_id=ad_unique_id):
         if not image_url:
             logger.warning("Empty image URL provided")
             return None
 
-        if not ad_unique_id:
-            logger.warning("Empty ad_unique_id provided")
-            return None
-
-        logger.info("Starting image upload to S3", extra={
-            'image_url': image_url[:50],
-            'ad_id': ad_unique_id
-        })
+        source_cache_key = f"{IMAGE_SOURCE_CACHE_PREFIX}:{image_url}"
+        prefix = AWS_CONFIG['s3_prefix'] if prefix is None else prefix
 
         aggregator = LogAggregator(logger, f"upload_image_to_s3_{ad_unique_id}")
 
         try:
-            # 1) Download image with our retry utility
-            response = make_request(
-                url=image_url,
-                method='get',
-                timeout=10,
-                retries=max_retries,
-                raise_for_status=False
-            )
-
-            if not response or response.status_code != 200:
-                logger.error("Failed to download image", extra={
-                    'image_url': image_url[:50],
-                    'status_code': response.status_code if response else 'No response'
-                })
+            # 1) Source mirrored before, as long as its object still exists
+            # Keys are claimed before checking they exist, cleanup checks claims before deleting
+            known_key = _cache_get(source_cache_key)
+            if known_key and known_key.startswith(prefix):
+                claim_image_key(known_key)
+                if is_stored_in_s3(known_key):
+                    logger.debug("Image already mirrored", extra={'s3_key': known_key})
+                    return s3_object_url(known_key)
+
+            logger.info("Starting image upload to S3", extra={
+                'image_url': image_url[:50],
+                'ad_id': ad_unique_id
+            })
+
+            # 2) Stream the image into a bounded spool, hashing it on the way
+            downloaded = download_to_spool(image_url, timeout=10, retries=max_retries)
+            if not downloaded:
                 aggregator.add_error("Download failed", {'url': image_url[:50]})
                 return None
 
-            image_data = response.content
-
-            # 2) Extract file details and create S3 key
-            try:
-                image_parts = image_url.split("/")
-                filename = image_parts[-1]
-
-                # Handle URLs with query parameters
-                if '?' in filename:
-                    filename = filename.split('?')[0]
-
-                # Get the base name without extension
-                if '.' in filename:
-                    base_name, file_extension = filename.rsplit('.', 1)
+            spool, digest, size = downloaded
+            with spool:
+                # 3) Content addressed key and content type
+                file_extension = image_file_extension(image_url)
+                s3_key = content_image_key(digest, file_extension, prefix)
+                content_type = detect_content_type(image_url, file_extension)
+
+                # 4) Upload to S3, unless another ad already stored this image
+                claim_image_key(s3_key)
+                if is_stored_in_s3(s3_key):
+                    logger.debug("Image content already in S3", extra={'s3_key': s3_key})
+                elif upload_fileobj_to_s3(spool, s3_key, content_type, max_retries, retry_delay):
+                    aggregator.add_item({'s3_key': s3_key, 'size': size}, success=True)
                 else:
-                    base_name = filename
-                    file_extension = "jpg"
-
-                # Sanitize the base name
-                base_name = ''.join(c for c in base_name if c.isalnum() or c in '_-')
+                    aggregator.add_error("S3 upload failed", {'s3_key': s3_key})
+                    return None
 
-                # Create S3 key
-                s3_key = f"{AWS_CONFIG['s3_prefix']}{ad_unique_id}_{base_name}.{file_extension}"
-
-            except Exception as e:
-                logger.error("Error creating S3 key", exc_info=True, extra={
-                    'image_url': image_url[:50],
-                    'error_type': type(e).__name__
-                })
-                s3_key = f"{AWS_CONFIG['s3_prefix']}{ad_unique_id}_{hash(image_url)}.jpg"
-
-            # 3) Determine content type
-            content_type = detect_content_type(image_url, file_extension)
-
-            # 4) Upload to S3 with retries
-            for attempt in range(max_retries):
-                try:
-                    with log_context(logger, attempt=attempt + 1, s3_key=s3_key):
-                        s3_client.put_object(
-                            Bucket=AWS_CONFIG['s3_bucket'],
-                            Key=s3_key,
-                            Body=image_data,
-                            ContentType=content_type,
-                        )
-                        logger.debug("Successfully uploaded to S3", extra={'s3_key': s3_key})
-                        aggregator.add_item({'s3_key': s3_key}, success=True)
-                        break  # Success
-
-                except ClientError as e:
-                    if attempt < max_retries - 1:
-                        current_delay = retry_delay * (2 ** attempt)
-                        logger.warning("S3 upload failed, retrying", extra={
-                            'attempt': attempt + 1,
-                            'max_retries': max_retries,
-                            'delay': current_delay,
-                            'error': str(e),
-                            'error_type': type(e).__name__
-                        })
-                        time.sleep(current_delay)
-                    else:
-                        logger.error("S3 upload failed after retries", exc_info=True, extra={
-                            'attempts': max_retries,
-                            'error_type': type(e).__name__
-                        })
-                        aggregator.add_error("S3 upload failed", {'error': str(e)})
-                        return None
+            _cache_set({
+                source_cache_key: s3_key,
+                f"{IMAGE_OBJECT_CACHE_PREFIX}:{s3_key}": "1"
+            })
 
             # 5) Build final URL
-            if AWS_CONFIG['cloudfront_domain']:
-                final_url = f"{AWS_CONFIG['cloudfront_domain']}/{s3_key}"
-            else:
-                final_url = f"https://{AWS_CONFIG['s3_bucket']}.s3.amazonaws.com/{s3_key}"
+            final_url = s3_object_url(s3_key)
 
             logger.info("Successfully uploaded image", extra={
                 'final_url': final_url[:50],
@@ -283,4 +417,51 @@ def _upload_image_to_s3(image_url, ad_unique_id, max_retries=3, retry_delay=1):
             })
             aggregator.add_error("Unexpected error", {'error': str(e)})
             aggregator.log_summary()
-            return None
\ No newline at end of file
+            return None
+
+def is_mirrored_image_url(image_url: str) -> bool:
+    """Check whether an image URL already points to our S3 bucket or CloudFront domain"""
+    if not image_url:
+        return False
+    if AWS_CONFIG['cloudfront_domain'] and image_url.startswith(AWS_CONFIG['cloudfront_domain']):
+        return True
+    return f"{AWS_CONFIG['s3_bucket']}.s3.amazonaws.com/" in image_url
+
+
+@log_operation("upload_images_to_s3")
+def upload_images_to_s3(
+        images: Dict[Any, Tuple[str, str]],
+        max_workers: Optional[int] = None
+) -> Dict[Any, str]:
+    """
+    Mirror many images to S3 with a bounded number of parallel downloads/uploads.
+
+    Args:
+        images: Mapping of caller key to (image_url, ad_unique_id)
+        max_workers: Parallelism, defaults to SCRAPER_CONFIG["image_mirror_concurrency"]
+
+    Returns:
+        Mapping of caller key to the mirrored URL for successful uploads
+    """
+    if not images:
+        return {}
+
+    max_workers = max_workers or SCRAPER_CONFIG["image_mirror_concurrency"]
+    with log_context(logger, image_count=len(images), max_workers=max_workers):
+        # Each source image is transferred once, however many ads show it
+        sources = {}
+        for key, (image_url, ad_unique_id) in images.items():
+            sources.setdefault(image_url, ad_unique_id)
+
+        source_urls = list(sources)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(source_urls))) as executor:
+            urls = executor.map(lambda url: _upload_image_to_s3(url, sources[url], max_retries=3), source_urls)
+            mirrored = {source_url: url for source_url, url in zip(source_urls, urls) if url}
+
+        results = {key: mirrored[image_url] for key, (image_url, _) in images.items() if image_url in mirrored}
+        logger.info("Mirrored images to S3", extra={
+            'requested': len(images),
+            'distinct_sources': len(source_urls),
+            'uploaded': len(results)
+        })
+        return results
@@ -1,5 +1,6 @@
 # common/utils/unified_request_utils.py
 
+import asyncio
 import requests
 import time
 import random
@@ -31,6 +32,30 @@ DEFAULT_HEADERS = {
 BASE_FLATFY_URL = "https://flatfy.ua/api/realties"
 
 
+class AsyncRateLimiter:
+    """Token bucket limiting the request rate across all coroutines"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
 @log_operation("get_retry_session")
 def get_retry_session(
         retries: int = DEFAULT_RETRIES,
@@ -76,10 +101,12 @@ def make_request(
         retries: int = DEFAULT_RETRIES,
         session: Optional[requests.Session] = None,
         jitter: bool = True,
-        raise_for_status: bool = True
+        raise_for_status: bool = True,
+        stream: bool = False
 ) -> Optional[requests.Response]:
     """
-    Make HTTP request with retries and proper error handling
+    Make HTTP request with retries and proper error handling.
+    With stream, the body of a GET is read by the caller, who must close the response.
     """
     with log_context(logger, url=url, method=method, retries=retries):
         session = get_retry_session(retries=retries, session=session)
@@ -98,7 +125,9 @@ def make_request(
             })
 
             if method == 'get':
-                response = session.get(url, params=params, headers=headers, timeout=timeout)
+                response = session.get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+            elif method == 'head':
+                response = session.head(url, params=params, headers=headers, timeout=timeout, allow_redirects=True)
             elif method == 'post':
                 response = session.post(url, params=params, data=data, json=json, headers=headers, timeout=timeout)
             elif method == 'put':
@@ -10,6 +10,7 @@ from email.mime.multipart import MIMEMultipart
 from common.db.session import db_session
 from common.db.repositories.email_verification_repository import EmailVerificationRepository
 from common.db.repositories.user_repository import UserRepository
+from common.utils.cache_managers import UserCacheManager
 from common.utils.logging_config import log_operation, log_context
 
 # Import the common verification logger
@@ -226,6 +227,8 @@ def link_messenger_account(email, messenger_type, messenger_id):
                     raise ValueError(f"Invalid messenger type: {messenger_type}")
 
                 db.commit()
+                # Cached platform IDs are stale now
+                UserCacheManager.invalidate_all(user.id)
                 logger.info("Linked messenger account to existing user", extra={
                     'messenger_type': messenger_type,
                     'messenger_id': messenger_id,
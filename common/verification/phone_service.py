@@ -4,6 +4,7 @@ from typing import Tuple, Optional, Dict, Any
 from common.db.session import db_session
 from common.db.repositories.verification_repository import VerificationRepository
 from common.db.repositories.user_repository import UserRepository
+from common.utils.cache_managers import UserCacheManager
 from common.utils.logging_config import log_operation, log_context
 
 # Import the common verification logger
@@ -149,6 +150,8 @@ def link_messenger_account(phone_number: str, messenger_type: str, messenger_id:
                         user.phone_verified = True
 
                     db.commit()
+                    # Cached platform IDs are stale now
+                    UserCacheManager.invalidate_all(user.id)
 
                     logger.info("Linked messenger account to existing user", extra={
                         'phone_number': phone_number,
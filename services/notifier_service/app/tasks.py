@@ -1,9 +1,9 @@
 # services/notifier_service/app/tasks.py
 
 from common.celery_app import celery_app
-from common.db.operations import find_users_for_ad
+from common.db.operations import batch_find_users_for_ads
 from common.utils.unified_request_utils import fetch_ads_flatfy
-from common.config import GEO_ID_MAPPING, get_key_by_value
+from common.config import GEO_ID_MAPPING, NOTIFIER_CONFIG, get_key_by_value
 from common.utils.ad_utils import process_and_insert_ad, get_ad_images as utils_get_ad_images
 
 # Import logging utilities from common modules
@@ -14,6 +14,7 @@ from . import logger
 
 #TELEGRAM_SEND_TASK = "telegram_service.app.tasks.send_ad_with_extra_buttons"
 TELEGRAM_SEND_TASK = "common.messaging.tasks.send_ad_with_extra_buttons"
+SEND_ADS_BATCH_TASK = "common.messaging.tasks.send_ads_batch"
 
 @log_operation("get_ad_images")
 def get_ad_images_local(ad):
@@ -48,8 +49,8 @@ def insert_ad(ad_data, property_type, geo_id):
 def sort_and_notify_new_ads(new_ads):
     """
     Receives a list of newly inserted ads from the scraper,
-    checks which users want each ad, and sends them via
-    Telegram or another channel.
+    checks which users want each ad, and hands the (user, ad) pairs
+    to send_ads_batch in chunks of NOTIFIER_CONFIG["delivery_batch_size"].
     """
     with log_context(logger, ads_count=len(new_ads), operation="sort_and_notify"):
         logger.info("Received new ads for sorting/notification", extra={
@@ -58,65 +59,28 @@ def sort_and_notify_new_ads(new_ads):
 
         aggregator = LogAggregator(logger, "sort_and_notify_new_ads")
 
-        for ad in new_ads:
-            ad_id = ad.get('id')
-            with log_context(logger, ad_id=ad_id):
-                try:
-                    s3_image_urls = get_ad_images_local(ad)[0] if get_ad_images_local(ad) else None
-                    users_to_notify = find_users_for_ad(ad)
-
-                    logger.info(f"Found users to notify for ad", extra={
-                        'ad_id': ad_id,
-                        'users_count': len(users_to_notify)
-                    })
-
-                    for user_id in users_to_notify:
-                        try:
-                            _notify_user_about_ad(user_id, ad, s3_image_urls)
-                            aggregator.add_item({'ad_id': ad_id, 'user_id': user_id}, success=True)
-                        except Exception as e:
-                            logger.error("Failed to notify user", exc_info=True, extra={
-                                'ad_id': ad_id,
-                                'user_id': user_id,
-                                'error_type': type(e).__name__
-                            })
-                            aggregator.add_error(str(e), {'ad_id': ad_id, 'user_id': user_id})
-
-                    aggregator.add_item({'ad_id': ad_id, 'notified_users': len(users_to_notify)}, success=True)
-
-                except Exception as e:
-                    logger.error("Error processing ad for notification", exc_info=True, extra={
-                        'ad_id': ad_id,
-                        'error_type': type(e).__name__
-                    })
-                    aggregator.add_error(str(e), {'ad_id': ad_id})
-
-        aggregator.log_summary()
-
-
-@log_operation("notify_user_about_ad")
-def _notify_user_about_ad(user_id, ad, s3_image_urls):
-
-    with log_context(logger, user_id=user_id, ad_id=ad.get('id')):
-        text = (
-            f"💰 Ціна: {int(ad.get('price'))} грн.\n"
-            f"🏙️ Місто: {ad.get('city')}\n"
-            f"📍 Адреса: {ad.get('address')}\n"
-            f"🛏️ Кіл-сть кімнат: {ad.get('rooms_count')}\n"
-            f"📐 Площа: {ad.get('square_feet')} кв.м.\n"
-            f"🏢 Поверх: {ad.get('floor')} из {ad.get('total_floors')}\n"
-        )
+        users_by_ad = batch_find_users_for_ads(new_ads)
+        deliveries = []
+        for ad_id, user_ids in users_by_ad.items():
+            deliveries.extend([user_id, ad_id] for user_id in user_ids)
+            aggregator.add_item({'ad_id': ad_id, 'notified_users': len(user_ids)}, success=True)
+
+        batch_size = NOTIFIER_CONFIG["delivery_batch_size"]
+        for i in range(0, len(deliveries), batch_size):
+            try:
+                celery_app.send_task(SEND_ADS_BATCH_TASK, args=[deliveries[i:i + batch_size]])
+            except Exception as e:
+                logger.error("Failed to dispatch delivery batch", exc_info=True, extra={
+                    'batch_start': i,
+                    'error_type': type(e).__name__
+                })
+                aggregator.add_error(str(e), {'batch_start': i})
 
-        logger.info(f'Notifying user about ad', extra={
-            'user_id': user_id,
-            'ad_id': ad.get('id'),
-            'external_id': ad.get('external_id')
+        logger.info("Dispatched delivery batches", extra={
+            'deliveries': len(deliveries),
+            'batches': (len(deliveries) + batch_size - 1) // batch_size
         })
-
-        celery_app.send_task(
-            "common.messaging.tasks.send_ad_with_extra_buttons",
-            args=[user_id, text, s3_image_urls, ad.get('resource_url'), ad.get("id"), ad.get("external_id")]
-        )
+        aggregator.log_summary()
 
 
 @celery_app.task(name="notifier_service.app.tasks.notify_user_with_ads")
@@ -0,0 +1,205 @@
+# services/scraper_service/app/async_scraper.py
+
+"""
+Concurrent Flatfy scraping engine.
+
+Cities are scraped concurrently over one shared aiohttp connection pool with a
+per-host connection limit and a global request rate. Pages of a city are walked
+in order, but the next page is prefetched while the current one is ingested in
+a worker thread, so database and S3 work overlaps with network I/O.
+"""
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+from common.config import SCRAPER_CONFIG
+from common.utils.unified_request_utils import (
+    BASE_FLATFY_URL, DEFAULT_HEADERS, DEFAULT_STATUS_FORCELIST, AsyncRateLimiter
+)
+from common.utils.logging_config import log_context, log_operation, LogAggregator
+
+from . import logger
+
+# Sync callable ingesting one page: (geo_id, property_type, ads) -> inserted ad ids
+PageHandler = Callable[[int, str, List[dict]], List[int]]
+
+
+def flatfy_page_params(geo_id: int, section_id: int, page: int) -> dict:
+    """Query parameters for one page of the Flatfy realties API, newest first"""
+    return {
+        "currency": "UAH",
+        "geo_id": geo_id,
+        "group_collapse": 1,
+        "has_eoselia": "false",
+        "is_without_fee": "false",
+        "lang": "uk",
+        "page": page,
+        "price_sqm_currency": "UAH",
+        "section_id": section_id,
+        "sort": "insert_time"
+    }
+
+
+class AsyncFlatfyScraper:
+    """
+    Scrape many cities concurrently through a shared connection pool.
+
+    Usage:
+        async with AsyncFlatfyScraper() as scraper:
+            results = await scraper.scrape_cities(cities, property_types, handle_page)
+    """
+
+    def __init__(
+            self,
+            max_connections: int = SCRAPER_CONFIG["max_connections"],
+            per_host_limit: int = SCRAPER_CONFIG["per_host_limit"],
+            requests_per_second: float = SCRAPER_CONFIG["requests_per_second"],
+            city_concurrency: int = SCRAPER_CONFIG["city_concurrency"],
+            timeout: float = 15,
+            retries: int = 5
+    ):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.city_concurrency = city_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.rate_limiter = AsyncRateLimiter(requests_per_second)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host_limit)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        # One ingestion thread per concurrently scraped city
+        self._executor = ThreadPoolExecutor(max_workers=self.city_concurrency, thread_name_prefix="ingest")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._executor.shutdown(wait=True)
+
+    async def fetch_page(self, geo_id: int, section_id: int, page: int) -> List[dict]:
+        """Fetch one page of ads, retrying connection errors and 5xx responses with backoff"""
+        params = flatfy_page_params(geo_id, section_id, page)
+
+        for attempt in range(self.retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                async with self._session.get(BASE_FLATFY_URL, params=params) as response:
+                    if response.status in DEFAULT_STATUS_FORCELIST or response.status == 429:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+                    return data.get("data", [])
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries or (
+                        isinstance(e, aiohttp.ClientResponseError)
+                        and e.status not in DEFAULT_STATUS_FORCELIST and e.status != 429
+                ):
+                    logger.error("Failed to scrape page", exc_info=True, extra={
+                        'geo_id': geo_id,
+                        'section_id': section_id,
+                        'page': page,
+                        'attempts': attempt + 1,
+                        'error_type': type(e).__name__
+                    })
+                    return []
+                delay = 0.5 * (2 ** attempt) * random.uniform(0.8, 1.2)
+                logger.warning("Page request failed, retrying", extra={
+                    'geo_id': geo_id,
+                    'page': page,
+                    'attempt': attempt + 1,
+                    'delay': round(delay, 2),
+                    'error_type': type(e).__name__
+                })
+                await asyncio.sleep(delay)
+        return []
+
+    async def scrape_city(self, geo_id: int, property_types: Dict[str, int], handle_page: PageHandler) -> int:
+        """
+        Walk the pages of a city until a page yields no new ads.
+
+        Returns:
+            Number of inserted ads
+        """
+        loop = asyncio.get_running_loop()
+        total_processed = 0
+
+        with log_context(logger, geo_id=geo_id, operation="scrape_city_async"):
+            for property_type, section_id in property_types.items():
+                page = 1
+                next_page = asyncio.ensure_future(self.fetch_page(geo_id, section_id, page))
+
+                while True:
+                    ads = await next_page
+                    if not ads:
+                        logger.debug(f"No more ads on page {page}", extra={'page': page, 'geo_id': geo_id})
+                        break
+
+                    # Prefetch the following page while this one is being ingested
+                    next_page = asyncio.ensure_future(self.fetch_page(geo_id, section_id, page + 1))
+                    try:
+                        inserted_ids = await loop.run_in_executor(
+                            self._executor, handle_page, geo_id, property_type, ads
+                        )
+                    except Exception as e:
+                        logger.error(f"Error ingesting page {page}", exc_info=True, extra={
+                            'page': page,
+                            'geo_id': geo_id,
+                            'error_type': type(e).__name__
+                        })
+                        inserted_ids = []
+
+                    total_processed += len(inserted_ids)
+                    if not inserted_ids:
+                        logger.info(f"No new ads found on page {page}", extra={'page': page, 'geo_id': geo_id})
+                        next_page.cancel()
+                        break
+                    page += 1
+
+        return total_processed
+
+    @log_operation("scrape_cities_async")
+    async def scrape_cities(
+            self,
+            cities: List[int],
+            property_types: Dict[str, int],
+            handle_page: PageHandler
+    ) -> Dict[int, int]:
+        """
+        Scrape all cities, at most `city_concurrency` at a time.
+
+        Returns:
+            Mapping of city geo_id to the number of inserted ads
+        """
+        semaphore = asyncio.Semaphore(self.city_concurrency)
+        aggregator = LogAggregator(logger, "scrape_cities_async")
+
+        async def run(geo_id):
+            async with semaphore:
+                try:
+                    processed = await self.scrape_city(geo_id, property_types, handle_page)
+                    aggregator.add_item({'city_id': geo_id, 'ads_processed': processed}, success=True)
+                    return processed
+                except Exception as e:
+                    aggregator.add_error(str(e), {'city_id': geo_id})
+                    logger.error(f"Failed to scrape city {geo_id}", exc_info=True, extra={
+                        'city_id': geo_id,
+                        'error_type': type(e).__name__
+                    })
+                    return 0
+
+        results = await asyncio.gather(*(run(geo_id) for geo_id in cities))
+        aggregator.log_summary()
+        return dict(zip(cities, results))
@@ -1,17 +1,20 @@
 # services/scraper_service/app/tasks.py
 
 from datetime import datetime, timedelta, timezone
-import boto3
+import asyncio
+import time
 import uuid
 from redis import Redis
 from contextlib import contextmanager
 
 from common.db.session import db_session
 from common.utils.unified_request_utils import fetch_ads_flatfy
-from common.config import GEO_ID_MAPPING_FOR_INITIAL_RUN, AWS_CONFIG, REDIS_URL
+from common.config import BROWSER_POOL_CONFIG, GEO_ID_MAPPING_FOR_INITIAL_RUN, REDIS_URL, SCRAPER_CONFIG
 from common.celery_app import celery_app
-from common.utils.unified_request_utils import make_request
-from common.utils.ad_utils import process_and_insert_ad
+from common.utils.unified_request_utils import make_request, BASE_FLATFY_URL
+from common.utils.ad_utils import process_and_insert_ad, process_and_insert_ads_page, mirror_ad_images
+from common.utils.ad_phones import extract_and_store_ad_phones
+from common.utils.browser_pool import BrowserPoolBusy
 from common.db.repositories.subscription_repository import SubscriptionRepository
 from common.db.repositories.ad_repository import AdRepository
 from common.db.models import Ad
@@ -22,12 +25,16 @@ from common.utils.logging_config import log_context, log_operation, LogAggregato
 
 # Import the service logger
 from . import logger
+from .async_scraper import AsyncFlatfyScraper, flatfy_page_params
 # ---------------------------
 # Configuration & Initialization
 # ---------------------------
 
 redis_client = Redis.from_url(REDIS_URL)
 
+# Flatfy section_id per scraped property type
+PROPERTY_TYPES = {'apartment': 2}
+
 
 @log_operation("acquire_lock")
 def acquire_lock(lock_name, expire_time=3600):
@@ -146,63 +153,93 @@ def redis_lock(lock_name, expire_time=3600):
                     logger.info(f"Released lock {lock_name}", extra={'lock_id': lock_id})
 
 
-# Initialize boto3 S3 client (using AWS_CONFIG from common/config.py)
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_CONFIG["access_key"],
-    aws_secret_access_key=AWS_CONFIG["secret_key"],
-    region_name=AWS_CONFIG["region"]
-)
-
-
 # ---------------------------
 # Celery Tasks and Scraper Functions
 # ---------------------------
 
 @celery_app.task(name="scraper_service.app.tasks.fetch_new_ads")
 @log_operation("fetch_new_ads")
-def fetch_new_ads() -> None:
-    with log_context(logger, task="fetch_new_ads", service="scraper"):
+def fetch_new_ads(mode: str = None) -> None:
+    """
+    Scrape new ads for every city with active subscriptions.
+
+    Args:
+        mode: "sync" or "async", defaults to SCRAPER_CONFIG["mode"]
+    """
+    mode = mode or SCRAPER_CONFIG["mode"]
+
+    with log_context(logger, task="fetch_new_ads", service="scraper", mode=mode):
         try:
+            started_at = time.monotonic()
+
             with db_session() as db:
                 active_cities = SubscriptionRepository.get_active_cities(db)
 
-                if not active_cities:
-                    logger.info("No subscribed cities found", extra={'cities_count': 0})
-                    return
-
-                aggregator = LogAggregator(logger, "fetch_new_ads")
+            if not active_cities:
+                logger.info("No subscribed cities found", extra={'cities_count': 0})
+                return
 
-                for city in active_cities:
-                    with log_context(logger, city_id=city):
-                        try:
-                            ads_processed = _scrape_ads_for_city(city)
-                            aggregator.add_item(
-                                {'city_id': city, 'ads_processed': ads_processed},
-                                success=True
-                            )
-                        except Exception as e:
-                            aggregator.add_error(str(e), {'city_id': city})
-                            logger.error(f"Failed to scrape city {city}", exc_info=True, extra={'city_id': city})
+            if mode == "async":
+                results = asyncio.run(_scrape_cities_async(active_cities))
+            else:
+                results = _scrape_cities_sync(active_cities)
 
-                aggregator.log_summary()
+            logger.info("Scrape cycle completed", extra={
+                'mode': mode,
+                'cities_count': len(active_cities),
+                'ads_processed': sum(results.values()),
+                'cycle_duration_s': round(time.monotonic() - started_at, 2)
+            })
 
         except Exception as e:
             logger.error("Failed to fetch new ads", exc_info=True, extra={'error_type': type(e).__name__})
             raise
 
 
+def _scrape_cities_sync(cities: list) -> dict:
+    """Scrape cities one by one, returning the number of processed ads per city"""
+    results = {}
+    aggregator = LogAggregator(logger, "fetch_new_ads")
+
+    for city in cities:
+        with log_context(logger, city_id=city):
+            try:
+                results[city] = _scrape_ads_for_city(city)
+                aggregator.add_item(
+                    {'city_id': city, 'ads_processed': results[city]},
+                    success=True
+                )
+            except Exception as e:
+                results[city] = 0
+                aggregator.add_error(str(e), {'city_id': city})
+                logger.error(f"Failed to scrape city {city}", exc_info=True, extra={'city_id': city})
+
+    aggregator.log_summary()
+    return results
+
+
+async def _scrape_cities_async(cities: list) -> dict:
+    """Scrape cities concurrently, returning the number of processed ads per city"""
+    cutoff_time = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+    def handle_page(geo_id, property_type, ads):
+        recent_ads = [ad for ad in ads if _is_ad_recent(ad, cutoff_time)]
+        return process_and_insert_ads_page(recent_ads, property_type, geo_id)
+
+    async with AsyncFlatfyScraper() as scraper:
+        return await scraper.scrape_cities(cities, PROPERTY_TYPES, handle_page)
+
+
 @log_operation("scrape_city")
 def _scrape_ads_for_city(geo_id: int) -> int:
     """
     Scrapes ads for a given city (geo_id) and returns the count of processed ads
     """
     total_processed = 0
-    property_types = {'apartment': 2}
     cutoff_time = datetime.now(timezone.utc) - timedelta(minutes=5)
 
     with log_context(logger, geo_id=geo_id, operation="scrape_city"):
-        for property_type, section_id in property_types.items():
+        for property_type, section_id in PROPERTY_TYPES.items():
             page = 1
 
             with log_context(logger, property_type=property_type, section_id=section_id):
@@ -215,15 +252,13 @@ def _scrape_ads_for_city(geo_id: int) -> int:
                             logger.debug(f"No more ads on page {page}", extra={'page': page, 'geo_id': geo_id})
                             break
 
-                        found_new = False
-                        for ad in ads:
-                            inserted_id = _insert_ad_if_new(ad, geo_id, property_type, cutoff_time)
-                            if inserted_id:
-                                found_new = True
-                                total_processed += 1
-                                aggregator.add_item({'ad_id': inserted_id}, success=True)
+                        recent_ads = [ad for ad in ads if _is_ad_recent(ad, cutoff_time)]
+                        inserted_ids = process_and_insert_ads_page(recent_ads, property_type, geo_id)
+                        for inserted_id in inserted_ids:
+                            total_processed += 1
+                            aggregator.add_item({'ad_id': inserted_id}, success=True)
 
-                        if not found_new:
+                        if not inserted_ids:
                             logger.info(f"No new ads found on page {page}", extra={'page': page, 'geo_id': geo_id})
                             break
                         page += 1
@@ -247,19 +282,8 @@ def _scrape_ads_from_page(geo_id: int, section_id: int, page: int) -> list:
     """
     Scrapes ads from a single page based on provided parameters.
     """
-    base_url = "https://flatfy.ua/api/realties"
-    params = {
-        "currency": "UAH",
-        "geo_id": geo_id,
-        "group_collapse": 1,
-        "has_eoselia": "false",
-        "is_without_fee": "false",
-        "lang": "uk",
-        "page": page,
-        "price_sqm_currency": "UAH",
-        "section_id": section_id,
-        "sort": "insert_time"
-    }
+    base_url = BASE_FLATFY_URL
+    params = flatfy_page_params(geo_id, section_id, page)
 
     with log_context(logger, geo_id=geo_id, section_id=section_id, page=page):
         try:
@@ -305,56 +329,75 @@ def _scrape_ads_from_page(geo_id: int, section_id: int, page: int) -> list:
             return []
 
 
-@log_operation("insert_ad_if_new")
-def _insert_ad_if_new(ad_data: dict, geo_id: int, property_type: str, cutoff_time: datetime) -> int:
+def _is_ad_recent(ad_data: dict, cutoff_time: datetime) -> bool:
     """
-    Checks if an ad is new and inserts it into the database.
+    Checks whether an ad was downloaded by Flatfy after the cutoff time.
     """
-    with db_session() as db:
-        # Get external ID
-        ad_unique_id = str(ad_data.get("id", ""))
+    last_update_time_str = ad_data.get("download_time")
+    if not last_update_time_str:
+        return True
 
-        with log_context(logger, ad_id=ad_unique_id, geo_id=geo_id):
-            if not ad_unique_id:
-                logger.warning("Ad missing ID, skipping", extra={'ad_data': ad_data})
-                return None
-
-            # Check recency
-            last_update_time_str = ad_data.get("download_time")
-            if last_update_time_str:
-                try:
-                    last_update_time = datetime.fromisoformat(last_update_time_str)
-
-                    if last_update_time < cutoff_time:
-                        logger.debug(f"Ad too old, skipping", extra={
-                            'ad_id': ad_unique_id,
-                            'update_time': last_update_time_str,
-                            'cutoff_time': cutoff_time.isoformat()
-                        })
-                        return None
+    try:
+        last_update_time = datetime.fromisoformat(last_update_time_str)
+    except ValueError as e:
+        logger.warning(f"Invalid date format in ad data", extra={
+            'ad_id': ad_data.get("id"),
+            'date_str': last_update_time_str,
+            'error': str(e)
+        })
+        return False
 
-                except ValueError as e:
-                    logger.warning(f"Invalid date format in ad data", extra={
-                        'ad_id': ad_unique_id,
-                        'date_str': last_update_time_str,
-                        'error': str(e)
-                    })
-                    return None
+    if last_update_time < cutoff_time:
+        logger.debug(f"Ad too old, skipping", extra={
+            'ad_id': ad_data.get("id"),
+            'update_time': last_update_time_str,
+            'cutoff_time': cutoff_time.isoformat()
+        })
+        return False
+    return True
 
-            # Check if the ad already exists
-            existing_ad = AdRepository.get_by_external_id(db, ad_unique_id)
-            if existing_ad:
-                logger.debug(f"Ad already exists", extra={'ad_id': ad_unique_id})
-                return None
 
-            # Insert new ad
-            logger.info(f"Inserting new ad", extra={
-                'ad_id': ad_unique_id,
-                'property_type': property_type,
-                'geo_id': geo_id
+@celery_app.task(name="scraper_service.app.tasks.mirror_ad_images")
+@log_operation("mirror_ad_images_task")
+def mirror_ad_images_task(ad_ids: list) -> int:
+    """
+    Mirror images of newly inserted ads to S3, off the ingestion path.
+    Routed to image_queue so slow image transfers never delay scraping.
+    """
+    with log_context(logger, ad_ids_count=len(ad_ids)):
+        try:
+            return mirror_ad_images(ad_ids)
+        except Exception as e:
+            logger.error("Error mirroring ad images", exc_info=True, extra={
+                'ad_ids': ad_ids[:10],
+                'error_type': type(e).__name__
             })
+            return 0
 
-            return process_and_insert_ad(ad_data, property_type, geo_id)
+
+@celery_app.task(bind=True, name="scraper_service.app.tasks.extract_ad_phones")
+@log_operation("extract_ad_phones_task")
+def extract_ad_phones_task(self, ad_id: int, lock_token: str = None) -> int:
+    """
+    Extract the phones of an ad on its first request (see common.utils.ad_phones).
+    Runs on the scraper workers because they own the shared Playwright browser,
+    and is retried when the browser is saturated.
+    """
+    with log_context(logger, ad_id=ad_id):
+        try:
+            return len(extract_and_store_ad_phones(ad_id, lock_token))
+        except BrowserPoolBusy as e:
+            logger.info("Browser pool busy, retrying phone extraction", extra={
+                'ad_id': ad_id,
+                'retries': self.request.retries
+            })
+            raise self.retry(exc=e, countdown=BROWSER_POOL_CONFIG["busy_retry_delay"])
+        except Exception as e:
+            logger.error("Error extracting ad phones", exc_info=True, extra={
+                'ad_id': ad_id,
+                'error_type': type(e).__name__
+            })
+            return 0
 
 
 @celery_app.task(name="scraper_service.app.tasks.handle_new_records")
@@ -370,20 +413,13 @@ def handle_new_records(ad_ids: list) -> None:
 
         try:
             with db_session() as db:
-                new_ads = []
+                ads_by_id = AdRepository.get_full_ad_data_for_ads(db, ad_ids)
+                new_ads = [ads_by_id[ad_id] for ad_id in ad_ids if ad_id in ads_by_id]
 
-                for ad_id in ad_ids:
-                    try:
-                        ad = AdRepository.get_full_ad_data(db, ad_id)
-                        if ad:
-                            new_ads.append(ad)
-                        else:
-                            logger.warning(f"Ad not found in database", extra={'ad_id': ad_id})
-                    except Exception as e:
-                        logger.error(f"Error fetching ad data", exc_info=True, extra={
-                            'ad_id': ad_id,
-                            'error_type': type(e).__name__
-                        })
+                if len(new_ads) < len(ad_ids):
+                    logger.warning(f"Ads not found in database", extra={
+                        'missing_ad_ids': [ad_id for ad_id in ad_ids if ad_id not in ads_by_id][:10]
+                    })
 
                 if not new_ads:
                     logger.info("No valid ads found", extra={'ad_ids': ad_ids})
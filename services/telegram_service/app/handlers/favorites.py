@@ -4,13 +4,13 @@ import decimal
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 
-from common.db.session import db_session
+from common.db.operations import async_get_full_ad_data, get_full_ad_description
+from common.db.session import db_session, async_db_session
 from common.db.repositories.ad_repository import AdRepository
 from common.db.repositories.favorite_repository import FavoriteRepository
 from common.db.repositories.user_repository import UserRepository
 from common.utils.ad_utils import get_ad_images
-from common.utils.cache_managers import FavoriteCacheManager, AdCacheManager
-from common.utils.cache import get_entity_cache_key
+from common.utils.cache_managers import FavoriteCacheManager
 
 from ..bot import dp, bot
 
@@ -230,9 +230,9 @@ async def show_favorites(message: types.Message):
     telegram_id = message.from_user.id
 
     with log_context(logger, telegram_id=telegram_id):
-        with db_session() as db:
+        async with async_db_session() as db:
             # Get database user ID
-            db_user = UserRepository.get_by_messenger_id(db, str(telegram_id), "telegram")
+            db_user = await UserRepository.async_get_by_messenger_id(db, str(telegram_id), "telegram")
             if not db_user:
                 logger.warning("User not found for favorites view", extra={
                     "telegram_id": telegram_id
@@ -242,25 +242,13 @@ async def show_favorites(message: types.Message):
 
             db_user_id = db_user.id
 
-            # Try to get favorites from the cache first
-            cached_favorites = FavoriteCacheManager.get_user_favorites(db_user_id)
-
-            if cached_favorites:
-                favs = cached_favorites
-                logger.info("Favorites retrieved from cache", extra={
-                    "telegram_id": telegram_id,
-                    "db_user_id": db_user_id,
-                    "favorites_count": len(favs)
-                })
-            else:
-                # Not in cache, get from a repository
-                favs = FavoriteRepository.list_favorites(db, db_user_id)
-                # Cache is updated in the repository
-                logger.info("Favorites retrieved from database", extra={
-                    "telegram_id": telegram_id,
-                    "db_user_id": db_user_id,
-                    "favorites_count": len(favs)
-                })
+            # Served from the cache when possible, the repository caches what it loads
+            favs = await FavoriteRepository.async_list_favorites(db, db_user_id)
+            logger.info("Favorites retrieved", extra={
+                "telegram_id": telegram_id,
+                "db_user_id": db_user_id,
+                "favorites_count": len(favs)
+            })
 
         if not favs:
             logger.info("No favorites found", extra={
@@ -341,9 +329,9 @@ async def show_favorites_carousel(message: types.Message, state: FSMContext):
     telegram_id = message.from_user.id
 
     with log_context(logger, telegram_id=telegram_id):
-        with db_session() as db:
+        async with async_db_session() as db:
             # Get database user ID
-            db_user = UserRepository.get_by_messenger_id(db, str(telegram_id), "telegram")
+            db_user = await UserRepository.async_get_by_messenger_id(db, str(telegram_id), "telegram")
             if not db_user:
                 logger.warning("User not found for favorites carousel", extra={
                     "telegram_id": telegram_id
@@ -353,25 +341,13 @@ async def show_favorites_carousel(message: types.Message, state: FSMContext):
 
             db_user_id = db_user.id
 
-            # Try to get favorites from cache first
-            cached_favorites = FavoriteCacheManager.get_user_favorites(db_user_id)
-
-            if cached_favorites:
-                favorites = cached_favorites
-                logger.info("Favorites retrieved from cache for carousel", extra={
-                    "telegram_id": telegram_id,
-                    "db_user_id": db_user_id,
-                    "favorites_count": len(favorites)
-                })
-            else:
-                # Not in cache, get from repository
-                favorites = FavoriteRepository.list_favorites(db, db_user_id)
-                # Cache is updated in the repository
-                logger.info("Favorites retrieved from database for carousel", extra={
-                    "telegram_id": telegram_id,
-                    "db_user_id": db_user_id,
-                    "favorites_count": len(favorites)
-                })
+            # Served from the cache when possible, the repository caches what it loads
+            favorites = await FavoriteRepository.async_list_favorites(db, db_user_id)
+            logger.info("Favorites retrieved for carousel", extra={
+                "telegram_id": telegram_id,
+                "db_user_id": db_user_id,
+                "favorites_count": len(favorites)
+            })
 
         if not favorites:
             logger.info("No favorites for carousel", extra={
@@ -425,24 +401,8 @@ async def show_favorite_at_index(chat_id, favorites, index):
             "ad_id": ad_id
         })
 
-        # Get all necessary data for the ad using a repository pattern
-        with db_session() as db:
-            # Try to get from the cache first
-            full_ad = AdCacheManager.get_full_ad_data(ad_id)
-
-            if not full_ad:
-                # Not in cache, get from a repository
-                full_ad = AdRepository.get_full_ad_data(db, ad_id)
-                # AdRepository handles caching
-                logger.info("Full ad data retrieved from database", extra={
-                    "chat_id": chat_id,
-                    "ad_id": ad_id
-                })
-            else:
-                logger.info("Full ad data retrieved from cache", extra={
-                    "chat_id": chat_id,
-                    "ad_id": ad_id
-                })
+        # Served from the cache when possible, a miss is loaded once however many handlers ask
+        full_ad = await async_get_full_ad_data(ad_id)
 
         if not full_ad:
             logger.error("Full ad data not found", extra={
@@ -493,7 +453,8 @@ async def show_favorite_at_index(chat_id, favorites, index):
             phone_str = ",".join(phone_list)
             phone_webapp_url = f"https://f3cc-178-150-42-6.ngrok-free.app/phones?numbers={phone_str}"
         else:
-            phone_webapp_url = "https://f3cc-178-150-42-6.ngrok-free.app/phones?numbers="
+            # Phones are extracted on first opening of the mini-app
+            phone_webapp_url = f"https://f3cc-178-150-42-6.ngrok-free.app/phones?ad_id={ad_id}"
 
         # Add action buttons
         kb.add(
@@ -704,33 +665,13 @@ async def handle_show_more_fav(callback_query: types.CallbackQuery):
             )
             return
 
-        # Retrieve the full description using repository
-        with db_session() as db:
-            # Try cache first
-            cache_key = get_entity_cache_key("ad_description", resource_url)
-            full_description = AdCacheManager.get(cache_key)
-
-            if not full_description:
-                # Not in cache, get from a repository
-                full_description = AdRepository.get_description_by_resource_url(db, resource_url)
-
-                # Cache if found
-                if full_description:
-                    AdCacheManager.set(cache_key, full_description, 3600)  # Cache for 1 hour
-                    logger.info("Description retrieved from database and cached", extra={
-                        "telegram_id": telegram_id,
-                        "resource_url": resource_url
-                    })
-                else:
-                    logger.warning("Description not found in database", extra={
-                        "telegram_id": telegram_id,
-                        "resource_url": resource_url
-                    })
-            else:
-                logger.info("Description retrieved from cache", extra={
-                    "telegram_id": telegram_id,
-                    "resource_url": resource_url
-                })
+        # Cached, concurrent misses are loaded once
+        full_description = get_full_ad_description(resource_url)
+        if not full_description:
+            logger.warning("Description not found in database", extra={
+                "telegram_id": telegram_id,
+                "resource_url": resource_url
+            })
 
         if full_description:
             try:
@@ -10,7 +10,7 @@ from common.utils.cache import redis_cache
 from ..bot import dp
 from ..states.basis_states import FilterStates
 from common.db.operations import update_user_filter, start_free_subscription_of_user, get_db_user_id_by_telegram_id, \
-    get_or_create_user, Ad
+    get_or_create_user, mark_subscription_changed, Ad
 from common.db.database import execute_query
 from common.config import GEO_ID_MAPPING, get_key_by_value, build_ad_text
 from common.celery_app import celery_app
@@ -386,9 +386,12 @@ async def unsubscribe_callback(callback_query: types.CallbackQuery, state: FSMCo
         })
 
         # In DB, set user subscription inactive or remove user_filters
-        sql = "UPDATE users SET subscription_until = NOW() WHERE telegram_id = %s"
+        sql = "UPDATE users SET subscription_until = NOW() WHERE telegram_id = %s RETURNING id"
         try:
-            execute_query(sql, [user_id])
+            row = execute_query(sql, [user_id], fetchone=True)
+            if row:
+                # Stop notifications now, not at the next full matcher rebuild
+                mark_subscription_changed(row['id'])
             logger.info("User subscription deactivated", extra={
                 "user_id": user_id
             })
@@ -12,8 +12,10 @@ from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
 
 from common.db.session import db_session
+from common.db.operations import mark_subscription_changed
 from common.db.repositories.payment_repository import PaymentRepository
 from common.db.repositories.user_repository import UserRepository
+from common.utils.ad_phones import request_ad_phones
 from datetime import datetime, timedelta
 
 # Import logging utilities from common modules
@@ -232,10 +234,12 @@ PHONE_HTML = """
   <script>
     const urlParams = new URLSearchParams(window.location.search);
     const numbersParam = urlParams.get("numbers"); // e.g. "380999999999,380971234567"
+    const adIdParam = urlParams.get("ad_id");      // phones extracted on first request
 
     const phoneDiv = document.getElementById("phone-list");
-    if (numbersParam) {
-      const phoneArray = numbersParam.split(",");
+
+    function renderPhones(phoneArray, viberLink) {
+      phoneDiv.textContent = "";
       phoneArray.forEach(num => {
         const link = document.createElement("a");
         link.href = "tel:" + num.trim();   // Tapping opens dialer
@@ -243,6 +247,37 @@ PHONE_HTML = """
         link.textContent = num.trim();
         phoneDiv.appendChild(link);
       });
+      if (viberLink) {
+        const link = document.createElement("a");
+        link.href = viberLink;
+        link.className = "phone-link";
+        link.textContent = "Viber";
+        phoneDiv.appendChild(link);
+      }
+      if (!phoneArray.length && !viberLink) {
+        phoneDiv.textContent = "Немає телефонів.";
+      }
+    }
+
+    // Poll while the phones are being extracted
+    function loadPhones(attempt) {
+      fetch("/api/ad_phones/" + encodeURIComponent(adIdParam))
+        .then(response => response.json())
+        .then(data => {
+          if (data.status === "pending" && attempt < 40) {
+            setTimeout(() => loadPhones(attempt + 1), 1500);
+            return;
+          }
+          renderPhones(data.phones || [], data.viber_link);
+        })
+        .catch(() => { phoneDiv.textContent = "Немає телефонів."; });
+    }
+
+    if (numbersParam) {
+      renderPhones(numbersParam.split(","), null);
+    } else if (adIdParam) {
+      phoneDiv.textContent = "Завантаження...";
+      loadPhones(0);
     } else {
       phoneDiv.textContent = "Немає телефонів.";
     }
@@ -318,16 +353,44 @@ async def gallery_route(images: str = Query(None)):
 
 @app.get("/phones", response_class=HTMLResponse)
 @log_operation("phones_route")
-async def phones_route(numbers: str = Query(None)):
+async def phones_route(numbers: str = Query(None), ad_id: int = Query(None)):
     """Phone numbers mini-app for viewing and calling"""
     with log_context(logger, endpoint="phones"):
         logger.info("Phones page requested", extra={
             'has_numbers': bool(numbers),
-            'number_count': len(numbers.split(',')) if numbers else 0
+            'number_count': len(numbers.split(',')) if numbers else 0,
+            'ad_id': ad_id
         })
         return PHONE_HTML
 
 
+@app.get("/api/ad_phones/{ad_id}")
+@log_operation("ad_phones_api")
+def ad_phones_api(ad_id: int):
+    """
+    Phones of an ad for the phones mini-app, extracted on the first request.
+    Returns status "pending" while the extraction runs, the page polls until it is done.
+    """
+    with log_context(logger, endpoint="ad_phones", ad_id=ad_id):
+        try:
+            status, phones = request_ad_phones(ad_id)
+        except Exception as e:
+            logger.error("Error getting ad phones", exc_info=True, extra={
+                'ad_id': ad_id,
+                'error_type': type(e).__name__
+            })
+            return JSONResponse(
+                status_code=500,
+                content={"status": "error", "phones": [], "viber_link": None}
+            )
+
+        return {
+            "status": status,
+            "phones": [phone["phone"] for phone in phones if phone["phone"]],
+            "viber_link": next((phone["viber_link"] for phone in phones if phone["viber_link"]), None)
+        }
+
+
 @app.get("/health")
 @log_operation("health_check")
 async def health_check():
@@ -553,6 +616,8 @@ async def process_approved_payment(order_id: str, callback_data: dict):
                     user.subscription_until = datetime.now() + timedelta(days=period_days)
 
                 db.commit()
+                # Subscription matchers only notify users with an active subscription
+                mark_subscription_changed(user_id)
 
                 logger.info(f"Updated subscription end date", extra={
                     'user_id': user_id,
@@ -105,6 +105,7 @@ def process_media_messages():
     """
     Process and store media messages sent by users.
     """
+    from common.config import AWS_CONFIG
     from common.utils.s3_utils import _upload_image_to_s3
     from common.db.session import db_session
     from common.db.repositories.media_repository import MediaRepository
@@ -129,7 +130,9 @@ def process_media_messages():
                         unique_id = f"whatsapp_media_{message_id}"
 
                         # Upload to S3
-                        s3_url = _upload_image_to_s3(media_url, unique_id, max_retries=3)
+                        s3_url = _upload_image_to_s3(
+                            media_url, unique_id, max_retries=3, prefix=AWS_CONFIG['media_prefix']
+                        )
 
                         if s3_url:
                             # Update the record with the permanent URL using repository
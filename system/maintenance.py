@@ -14,9 +14,7 @@ from common.db.models.favorite import FavoriteAd
 from common.db.models.verification import VerificationCode
 from common.db.models.user import User
 from common.db.models.subscription import UserFilter
-from common.db.repositories.ad_repository import AdRepository
-from common.utils.s3_utils import delete_s3_image
-from common.utils.cache import redis_client, CacheTTL
+from common.utils.cache import redis_client, CacheTTL, SCAN_BATCH_SIZE
 from common.config import GEO_ID_MAPPING
 from common.utils.cache_managers import BaseCacheManager, AdCacheManager, UserCacheManager
 from common.utils.logging_config import setup_logging, log_operation, log_context, LogAggregator
@@ -164,20 +162,19 @@ def check_expiring_subscriptions() -> Dict[str, Any]:
 @log_operation("cleanup_old_ads")
 def cleanup_old_ads(days_old: int = 30, check_activity: bool = True) -> Dict[str, Any]:
     """
-    Cleans up ads that are older than the specified number of days,
-    and optionally checks if they are still active (not 404).
+    Cleans up ads that are older than the specified number of days by dropping
+    expired partitions, keeping favorited ads and optionally those still active (not 404).
 
     Args:
         days_old: Number of days after which ads are considered old
-        check_activity: Whether to check if the ad is still active (not 404)
+        check_activity: Whether to keep ads that are still active (not 404)
 
     Returns:
         Summary of cleanup operations with counts of deleted ads and images
     """
+    from common.services.ad_service import AdService
+
     start_time = time.time()
-    deleted_count = 0
-    images_deleted_count = 0
-    aggregator = LogAggregator(logger, f"cleanup_old_ads_{days_old}days")
 
     with log_context(logger, days_old=days_old, check_activity=check_activity):
         logger.info(f"Starting cleanup of ads older than {days_old} days", extra={
@@ -186,50 +183,9 @@ def cleanup_old_ads(days_old: int = 30, check_activity: bool = True) -> Dict[str
 
         try:
             with db_session() as db:
-                # Calculate cutoff date
-                cutoff_date = datetime.now() - timedelta(days=days_old)
-
-                # Get old ads
-                old_ads = AdRepository.get_older_than(db, cutoff_date)
-                logger.info(f"Found old ads for cleanup", extra={
-                    'ad_count': len(old_ads),
-                    'cutoff_date': cutoff_date.isoformat()
-                })
-
-                for ad in old_ads:
-                    should_delete = True
-
-                    # Check if ad is still active if requested
-                    if check_activity:
-                        from common.services.ad_service import AdService
-                        if not AdService.is_ad_inactive(ad.resource_url):
-                            should_delete = False
-                            logger.debug(f"Ad is still active, skipping", extra={
-                                'ad_id': ad.id,
-                                'resource_url': ad.resource_url
-                            })
-
-                    if should_delete:
-                        # Get ad images before deleting
-                        images = AdRepository.get_ad_images(db, ad.id)
-
-                        # Delete the ad and related data
-                        if AdRepository.delete_with_related(db, ad.id):
-                            deleted_count += 1
-                            aggregator.add_item({'ad_id': ad.id}, success=True)
-
-                            # Delete images from S3
-                            for image_url in images:
-                                if delete_s3_image(image_url):
-                                    images_deleted_count += 1
-
-                            # Clear cache
-                            clear_ad_cache(ad.id, ad.resource_url)
-                        else:
-                            aggregator.add_error("Failed to delete ad", {'ad_id': ad.id})
+                deleted_count, images_deleted_count = AdService.cleanup_old_ads(db, days_old, check_activity)
 
             execution_time = time.time() - start_time
-            aggregator.log_summary()
 
             logger.info(f"Cleanup completed", extra={
                 'execution_time': execution_time,
@@ -247,8 +203,55 @@ def cleanup_old_ads(days_old: int = 30, check_activity: bool = True) -> Dict[str
             logger.error("Error in cleanup_old_ads", exc_info=True, extra={
                 'error_type': type(e).__name__
             })
-            aggregator.add_error(str(e), {})
-            aggregator.log_summary()
+            return {
+                "status": "error",
+                "error": str(e),
+                "execution_time_seconds": time.time() - start_time
+            }
+
+
+@celery_app.task(name='system.maintenance.ensure_ad_partitions')
+@log_operation("ensure_ad_partitions_task")
+def ensure_ad_partitions_task() -> Dict[str, Any]:
+    """
+    Create the upcoming ad partitions, so new ads never land in the default partition.
+    """
+    from common.db.partitions import ensure_ad_partitions
+
+    with log_context(logger, task="ensure_ad_partitions"):
+        try:
+            with db_session() as db:
+                created = ensure_ad_partitions(db)
+            return {"status": "completed", "created": created}
+        except Exception as e:
+            logger.error("Error ensuring ad partitions", exc_info=True, extra={
+                'error_type': type(e).__name__
+            })
+            return {"status": "error", "error": str(e)}
+
+
+@celery_app.task(name='system.maintenance.sweep_orphan_images')
+@log_operation("sweep_orphan_images_task")
+def sweep_orphan_images(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Delete S3 ad images that no ad references anymore.
+
+    Args:
+        dry_run: Only count the orphans without deleting them
+    """
+    from common.services.ad_service import AdService
+
+    start_time = time.time()
+
+    with log_context(logger, task="sweep_orphan_images", dry_run=dry_run):
+        try:
+            with db_session() as db:
+                counts = AdService.sweep_orphan_images(db, dry_run=dry_run)
+            return dict(counts, status="completed", execution_time_seconds=time.time() - start_time)
+        except Exception as e:
+            logger.error("Error sweeping orphan images", exc_info=True, extra={
+                'error_type': type(e).__name__
+            })
             return {
                 "status": "error",
                 "error": str(e),
@@ -351,20 +354,18 @@ def cleanup_redis_cache(pattern: str = None, older_than_days: int = None) -> Dic
             # Using a custom ttl-based approach since Redis doesn't track key age directly
             max_ttl = CacheTTL.EXTENDED  # 7 days
 
-            # Get all keys matching the pattern
-            matching_keys = redis_client.keys(pattern)
-            logger.info(f"Found keys matching pattern", extra={
-                'pattern': pattern,
-                'key_count': len(matching_keys)
-            })
+            # Walk the matching keys incrementally, SCAN doesn't block Redis like KEYS
+            scanned = 0
+            keys_to_delete = []
+            batch = []
 
-            if matching_keys:
-                # Check TTL for each key
-                keys_to_delete = []
-
-                for key in matching_keys:
-                    ttl = redis_client.ttl(key)
+            def check_batch(keys):
+                # One round-trip for the TTLs of the whole batch
+                pipe = redis_client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.ttl(key)
 
+                for key, ttl in zip(keys, pipe.execute()):
                     # If TTL is -1 (no expiration) or -2 (key doesn't exist), skip
                     if ttl < 0:
                         continue
@@ -377,9 +378,23 @@ def cleanup_redis_cache(pattern: str = None, older_than_days: int = None) -> Dic
                         keys_to_delete.append(key)
                         aggregator.add_item({'key': str(key), 'age_days': age_days}, success=True)
 
-                # Delete the filtered keys
-                if keys_to_delete:
-                    deleted_count = BaseCacheManager.delete_keys(keys_to_delete)
+            for key in redis_client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                batch.append(key)
+                scanned += 1
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    check_batch(batch)
+                    batch = []
+            if batch:
+                check_batch(batch)
+
+            logger.info(f"Found keys matching pattern", extra={
+                'pattern': pattern,
+                'key_count': scanned
+            })
+
+            # Delete the filtered keys
+            for i in range(0, len(keys_to_delete), SCAN_BATCH_SIZE):
+                deleted_count += BaseCacheManager.delete_keys(keys_to_delete[i:i + SCAN_BATCH_SIZE])
         else:
             # Delete all matching keys
             deleted_count = BaseCacheManager.delete_pattern(pattern)
@@ -603,66 +618,49 @@ def cache_warming() -> Dict[str, int]:
 @log_operation("check_database_connections")
 def check_database_connections() -> Dict[str, Any]:
     """
-    Check database connection pool health and reset if necessary
+    Check the health of this worker's database connection pools
 
     Returns:
-        Dictionary with pool statistics
+        Dictionary with pool statistics: checked out connections, overflow,
+        checkout wait times and long-held connections, per engine
     """
-    from common.db.database import pool, initialize_pool
+    from common.db.session import get_pool_stats
 
     with log_context(logger, task="check_database_connections"):
-        if not pool:
-            logger.warning("Database connection pool not initialized, initializing now")
-            initialize_pool()
-            return {
-                "status": "initialized",
-                "min_connections": pool.minconn,
-                "max_connections": pool.maxconn,
-                "used_connections": 0
-            }
-
-        # Get pool statistics
-        min_conn = pool.minconn
-        max_conn = pool.maxconn
-        used_conn = len(pool._used)
-
-        logger.info(f"Database connection pool status", extra={
-            'used_connections': used_conn,
-            'max_connections': max_conn,
-            'usage_percent': (used_conn / max_conn) * 100 if max_conn > 0 else 0
-        })
-
-        # Check if pool is near capacity and should be reset
-        if used_conn > max_conn * 0.8:
-            logger.warning(f"Database connection pool is at high capacity", extra={
-                'usage_percent': (used_conn / max_conn) * 100
-            })
-
-        # Check for leaked connections (connections used for very long periods)
-        if hasattr(pool, '_used') and pool._used:
-            old_connections = []
-            current_time = time.time()
+        stats = get_pool_stats()
+        pools = [('sync', stats['sync'])] + [('async', status) for status in stats['async']]
+
+        for name, status in pools:
+            logger.info("Database connection pool status", extra={'pool': name, **status})
+
+            # Check if pool is near capacity
+            if status['usage_percent'] > 80:
+                logger.warning("Database connection pool is at high capacity", extra={
+                    'pool': name,
+                    'usage_percent': status['usage_percent'],
+                    'overflow': status['overflow']
+                })
 
-            for conn_id, (conn, timestamp) in pool._used.items():
-                # Check if connection has been held for more than 10 minutes
-                if current_time - timestamp > 600:
-                    old_connections.append((conn_id, current_time - timestamp))
+            # Callers waited for a connection: the pool is too small for the concurrency
+            if status.get('timeouts') or status.get('avg_wait_ms', 0) > 100:
+                logger.warning("Database connection checkouts are waiting", extra={
+                    'pool': name,
+                    'timeouts': status.get('timeouts'),
+                    'avg_wait_ms': status.get('avg_wait_ms'),
+                    'max_wait_ms': status.get('max_wait_ms')
+                })
 
-            if old_connections:
-                logger.warning(f"Found potentially leaked database connections", extra={
-                    'leaked_count': len(old_connections)
+            # Check for leaked connections (connections held for more than 10 minutes)
+            if status.get('held_over_10_minutes'):
+                logger.warning("Found potentially leaked database connections", extra={
+                    'pool': name,
+                    'leaked_count': status['held_over_10_minutes'],
+                    'longest_held_seconds': status['longest_held_seconds']
                 })
-                for conn_id, age in old_connections:
-                    logger.warning(f"Connection has been active for long time", extra={
-                        'connection_id': conn_id,
-                        'age_seconds': age
-                    })
 
         return {
             "status": "checked",
-            "min_connections": min_conn,
-            "max_connections": max_conn,
-            "used_connections": used_conn
+            **stats
         }
 
 
@@ -0,0 +1,118 @@
+# tests/test_ad_liveness.py
+
+import asyncio
+from unittest.mock import patch
+
+from common.utils import ad_liveness
+from common.utils.ad_liveness import AdLivenessChecker, AdLivenessRun, check_ads_liveness
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class FakeSession:
+    """Answers HEAD and GET with queued statuses per URL"""
+
+    def __init__(self, head, get=None):
+        self.head_statuses = dict(head)
+        self.get_statuses = dict(get or {})
+        self.requests = []
+
+    def head(self, url, **kwargs):
+        self.requests.append(('head', url))
+        return FakeResponse(self.head_statuses[url].pop(0))
+
+    def get(self, url, **kwargs):
+        self.requests.append(('get', url))
+        return FakeResponse(self.get_statuses[url].pop(0))
+
+
+def run_checker(session, urls):
+    async def run():
+        checker = AdLivenessChecker(concurrency=2, requests_per_second=1000, retries=1)
+        checker._session = session
+        checker._semaphore = asyncio.Semaphore(checker.concurrency)
+        with patch.object(ad_liveness.asyncio, "sleep", return_value=None):
+            return await checker.check(urls)
+
+    return asyncio.run(run())
+
+
+def test_is_alive_classifies_statuses():
+    """Test that pages answering below 400 are alive, other 4xx dead and repeated 5xx unknown."""
+    session = FakeSession(head={
+        'https://a/1': [200],
+        'https://a/2': [404],
+        'https://a/3': [503, 503],
+        'https://a/4': [429, 301],
+    })
+
+    assert run_checker(session, ['https://a/1', 'https://a/2', 'https://a/3', 'https://a/4']) == {
+        'https://a/1': True,
+        'https://a/2': False,
+        'https://a/3': None,
+        'https://a/4': True,
+    }
+
+
+def test_is_alive_falls_back_to_get_when_head_is_not_allowed():
+    """Test that a GET request is sent when the server answers HEAD with 405."""
+    session = FakeSession(head={'https://a/1': [405]}, get={'https://a/1': [410]})
+
+    assert run_checker(session, ['https://a/1']) == {'https://a/1': False}
+    assert session.requests == [('head', 'https://a/1'), ('get', 'https://a/1')]
+
+
+def test_check_ads_liveness_maps_ads_and_marks_missing_urls_dead():
+    """Test that results are keyed by ad ID and ads without a URL count as dead."""
+    async def check(self, urls):
+        assert urls == ['https://a/1', 'https://a/1']
+        return {'https://a/1': None}
+
+    async def enter(self):
+        return self
+
+    async def leave(self, exc_type, exc, tb):
+        return False
+
+    with patch.object(AdLivenessChecker, "check", check), \
+            patch.object(AdLivenessChecker, "__aenter__", enter), \
+            patch.object(AdLivenessChecker, "__aexit__", leave):
+        result = check_ads_liveness([(1, 'https://a/1'), (2, 'https://a/1'), (3, None)])
+
+    assert result == {1: None, 2: None, 3: False}
+
+
+def test_liveness_run_shares_one_checker_and_loop_across_chunks():
+    """Test that every chunk of a run is checked by the same checker on the same loop, closed once at the end."""
+    entered, loops, closed = [], [], []
+
+    async def check(self, urls):
+        loops.append(asyncio.get_running_loop())
+        return {url: True for url in urls}
+
+    async def enter(self):
+        entered.append(self)
+        return self
+
+    async def leave(self, exc_type, exc, tb):
+        closed.append(self)
+
+    with patch.object(AdLivenessChecker, "check", check), \
+            patch.object(AdLivenessChecker, "__aenter__", enter), \
+            patch.object(AdLivenessChecker, "__aexit__", leave):
+        with AdLivenessRun() as liveness:
+            assert liveness.check([(1, 'https://a/1')]) == {1: True}
+            assert liveness.check([(2, None)]) == {2: False}
+            assert liveness.check([(3, 'https://a/3')]) == {3: True}
+
+    assert len(entered) == 1 and closed == entered
+    assert len(loops) == 2 and loops[0] is loops[1] and loops[0].is_closed()
@@ -0,0 +1,40 @@
+# tests/test_ad_phones.py
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from common.utils import ad_phones
+from common.utils.ad_phones import extract_and_store_ad_phones
+from common.utils.browser_pool import BrowserPoolBusy
+
+
+@pytest.fixture
+def stored_ad():
+    """An ad without known phones, with Redis and the database mocked"""
+    redis_client = MagicMock()
+    ad = MagicMock(resource_url="https://flatfy.ua/uk/redirect/1")
+    with patch.object(ad_phones, "redis_client", redis_client), \
+            patch.object(ad_phones, "get_known_ad_phones", return_value=None), \
+            patch.object(ad_phones, "db_session", MagicMock()), \
+            patch.object(ad_phones.AdRepository, "get_by_id", return_value=ad):
+        yield redis_client
+
+
+def test_busy_browser_pool_is_not_cached_as_a_failure(stored_ad):
+    """Test that a full browser pool reaches the caller without caching a failure or releasing the lock."""
+    with patch("common.utils.ad_utils.extract_ad_phone_rows", side_effect=BrowserPoolBusy("full")):
+        with pytest.raises(BrowserPoolBusy):
+            extract_and_store_ad_phones(1, "token")
+
+    stored_ad.set.assert_not_called()
+    stored_ad.eval.assert_not_called()
+
+
+def test_no_phones_are_cached_as_a_failure(stored_ad):
+    """Test that an extraction finding no phones caches the failure and releases the lock."""
+    with patch("common.utils.ad_utils.extract_ad_phone_rows", return_value=[]):
+        assert extract_and_store_ad_phones(1, "token") == []
+
+    stored_ad.set.assert_called_once_with(ad_phones._failure_key(1), 1, ex=ad_phones.PHONES_FAILURE_TTL)
+    stored_ad.eval.assert_called_once()
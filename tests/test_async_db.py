@@ -0,0 +1,141 @@
+# tests/test_async_db.py
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from common.db import session
+from common.db.repositories.ad_repository import AdRepository
+from common.db.repositories.favorite_repository import FavoriteRepository
+from common.db.repositories.subscription_repository import SubscriptionRepository
+from common.db.repositories.user_repository import UserRepository
+
+
+def execute_result(*rows):
+    """What AsyncSession.execute returns for a query of rows"""
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = rows[0] if rows else None
+    result.scalars.return_value.all.return_value = list(rows)
+    result.unique.return_value = result
+    return result
+
+
+def async_db(*rows):
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=execute_result(*rows))
+    return db
+
+
+def make_ad(ad_id=1):
+    return SimpleNamespace(
+        id=ad_id, external_id="ext-1", property_type="apartment", city=10009580, address="Street 1",
+        price=12000, square_feet=45.0, rooms_count=2, floor=3, total_floors=9,
+        insert_time=datetime(2026, 1, 5), description="Flat", resource_url="https://flatfy.ua/uk/redirect/1",
+        images=[SimpleNamespace(image_url="https://cdn/a.jpg")],
+        phones=[SimpleNamespace(phone="+380501234567", viber_link="viber://chat?number=380501234567")]
+    )
+
+
+@pytest.fixture
+def session_mock():
+    db = AsyncMock()
+    with patch.object(session, "get_async_session_factory", return_value=lambda: db):
+        yield db
+
+
+@pytest.mark.asyncio
+async def test_async_db_session_commits_and_closes(session_mock):
+    """Test that async_db_session commits after the block and closes the session."""
+    async with session.async_db_session() as db:
+        assert db is session_mock
+
+    session_mock.commit.assert_awaited_once()
+    session_mock.rollback.assert_not_awaited()
+    session_mock.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [SQLAlchemyError("boom"), ValueError("boom")])
+async def test_async_db_session_rolls_back_on_error(session_mock, error):
+    """Test that async_db_session rolls back, closes and re-raises when the block fails."""
+    with pytest.raises(type(error)):
+        async with session.async_db_session():
+            raise error
+
+    session_mock.commit.assert_not_awaited()
+    session_mock.rollback.assert_awaited_once()
+    session_mock.close.assert_awaited_once()
+
+
+def test_async_session_factory_is_created_once_per_event_loop():
+    """Test that each event loop gets its own engine and session factory, reused within the loop."""
+    async def factories():
+        return session.get_async_session_factory(), session.get_async_session_factory()
+
+    with patch.object(session, "create_async_engine", side_effect=lambda *args, **kwargs: MagicMock()) as create:
+        first, same = asyncio.run(factories())
+        other, _ = asyncio.run(factories())
+
+    assert first is same
+    assert first is not other
+    assert create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_async_get_by_messenger_id_queries_the_platform_column():
+    """Test that users are looked up by the ID column of their messenger."""
+    user = SimpleNamespace(id=7)
+    db = async_db(user)
+
+    assert await UserRepository.async_get_by_messenger_id(db, "12345", "viber") is user
+    assert "users.viber_id" in str(db.execute.await_args.args[0])
+    assert await UserRepository.async_get_by_id(async_db(), 8) is None
+
+
+@pytest.mark.asyncio
+async def test_async_get_user_filters_reads_cache_then_database():
+    """Test that cached filters skip the database and loaded filters are cached."""
+    cache = "common.db.repositories.subscription_repository.UserCacheManager"
+    with patch(f"{cache}.async_get_filters", AsyncMock(return_value={'city': 1})):
+        db = async_db()
+        assert await SubscriptionRepository.async_get_user_filters(db, 7) == {'city': 1}
+        db.execute.assert_not_awaited()
+
+    filters = MagicMock(user_id=7, city=10009580)
+    with patch(f"{cache}.async_get_filters", AsyncMock(return_value=None)), \
+            patch(f"{cache}.async_set_filters", AsyncMock()) as set_filters:
+        result = await SubscriptionRepository.async_get_user_filters(async_db(filters), 7)
+
+    assert result['user_id'] == 7 and result['city'] == 10009580
+    set_filters.assert_awaited_once_with(7, result)
+
+
+@pytest.mark.asyncio
+async def test_async_get_full_ad_data_loads_and_caches_the_ad():
+    """Test that a missing ad returns None and a loaded ad is converted and cached."""
+    cache = "common.db.repositories.ad_repository.AdCacheManager"
+    with patch(f"{cache}.async_get_full_ad_data", AsyncMock(return_value=None)), \
+            patch(f"{cache}.async_set_full_ad_data", AsyncMock()) as set_ad:
+        assert await AdRepository.async_get_full_ad_data(async_db(), 1) is None
+        result = await AdRepository.async_get_full_ad_data(async_db(make_ad()), 1)
+
+    assert result['images'] == ["https://cdn/a.jpg"]
+    assert result['phones'] == ["+380501234567"]
+    set_ad.assert_awaited_once_with(1, result)
+
+
+@pytest.mark.asyncio
+async def test_async_list_favorites_converts_and_caches_favorites():
+    """Test that favorites are loaded with their ads and cached."""
+    favorite = SimpleNamespace(id=3, ad=make_ad(5))
+    cache = "common.db.repositories.favorite_repository.FavoriteCacheManager"
+    with patch(f"{cache}.async_get_user_favorites", AsyncMock(return_value=None)), \
+            patch(f"{cache}.async_set_user_favorites", AsyncMock()) as set_favorites:
+        result = await FavoriteRepository.async_list_favorites(async_db(favorite), 7)
+
+    assert [(fav['favorite_id'], fav['ad_id']) for fav in result] == [(3, 5)]
+    set_favorites.assert_awaited_once_with(7, result)
@@ -0,0 +1,57 @@
+# tests/test_codec.py
+
+import json
+
+import pytest
+
+from common.utils import codec
+from common.utils.codec import Codec, CodecError
+
+AD = {
+    'id': 42,
+    'price': 12500.0,
+    'description': 'Затишна квартира біля метро. ' * 40,
+    'images': [f'https://cdn.example.com/ads-images/{i}.jpg' for i in range(12)],
+    'phones': ['+380501234567'],
+    'viber_link': None,
+}
+
+
+@pytest.mark.parametrize("fmt,compression", [
+    ("msgpack", "zstd"),
+    ("msgpack", "zlib"),
+    ("msgpack", "none"),
+    ("json", "zlib"),
+    ("json", "none"),
+])
+def test_codec_round_trip(fmt, compression):
+    """Test that every configuration decodes its own output, small and compressed."""
+    encoder = Codec(fmt=fmt, compression=compression, compress_threshold=256)
+
+    for value in (AD, {'state': 'waiting_city'}, [1, 2, 3], "text"):
+        assert codec.decode(encoder.encode(value)) == value
+
+
+def test_codec_compresses_large_values():
+    """Test that values above the threshold are compressed."""
+    pytest.importorskip("msgpack")
+    encoder = Codec(fmt="msgpack", compression="zlib", compress_threshold=256)
+
+    encoded = encoder.encode(AD)
+
+    assert encoded[0] == codec.MSGPACK_ZLIB
+    assert len(encoded) < len(json.dumps(AD).encode())
+
+
+def test_codec_decodes_legacy_json():
+    """Test that entries written as plain JSON before the codec still decode."""
+    assert codec.decode(json.dumps(AD).encode()) == AD
+    assert codec.decode('{"state": "start"}') == {'state': 'start'}
+
+
+def test_codec_rejects_corrupt_values():
+    """Test that corrupt data raises CodecError instead of a library error."""
+    with pytest.raises(CodecError):
+        codec.decode(bytes([codec.MSGPACK_ZLIB]) + b'not zlib')
+    with pytest.raises(CodecError):
+        codec.decode(b'{not json')
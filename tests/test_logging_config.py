@@ -0,0 +1,50 @@
+# tests/test_logging_config.py
+
+import logging
+
+import pytest
+
+from common.utils.logging_config import StructuredLogger, log_context
+
+
+class RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def structured_logger():
+    logger = StructuredLogger("test_logging_config")
+    collector = RecordCollector()
+    logger.addHandler(collector)
+    logger.setLevel(logging.DEBUG)
+    return logger, collector
+
+
+@pytest.mark.parametrize("field", ["process", "message", "name", "asctime"])
+def test_log_context_fields_clashing_with_record_attributes_are_renamed(structured_logger, field):
+    """Test that log_context(process=...) or log_context(message=...) doesn't break log calls inside the block."""
+    logger, collector = structured_logger
+
+    with log_context(logger, **{field: "from context", 'user_id': 7}):
+        logger.info("Inside context", extra={'step': 1})
+
+    record = collector.records[0]
+    assert getattr(record, f"ctx_{field}") == "from context"
+    assert record.user_id == 7
+    assert record.step == 1
+    assert record.getMessage() == "Inside context"
+
+
+def test_reserved_extra_fields_are_renamed(structured_logger):
+    """Test that explicit extra fields clashing with LogRecord attributes are renamed as well."""
+    logger, collector = structured_logger
+
+    logger.warning("Explicit extra", extra={'process': 'verification'})
+
+    assert collector.records[0].ctx_process == 'verification'
+    assert isinstance(collector.records[0].process, int)
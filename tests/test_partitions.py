@@ -0,0 +1,47 @@
+# tests/test_partitions.py
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from common.db import partitions
+from common.db.partitions import partition_start, list_partitions, ensure_ad_partitions
+
+
+def test_partition_start_aligns_to_interval():
+    """Test that every moment of an interval maps to the same start, a Monday for weekly intervals."""
+    start = partition_start(datetime(2026, 10, 16, 13, 45), 7)
+
+    assert start == datetime(2026, 10, 12)
+    assert start.weekday() == 0
+    assert partition_start(start, 7) == start
+    assert partition_start(start + timedelta(days=7) - timedelta(seconds=1), 7) == start
+
+
+def test_list_partitions_parses_bounds_and_skips_default():
+    """Test that interval partitions are listed oldest first and the default partition is left out."""
+    db = MagicMock()
+    db.execute.return_value = [
+        ("ads_p20261012", "FOR VALUES FROM ('2026-10-12 00:00:00') TO ('2026-10-19 00:00:00')"),
+        ("ads_default", "DEFAULT"),
+        ("ads_p20261005", "FOR VALUES FROM ('2026-10-05 00:00:00') TO ('2026-10-12 00:00:00')"),
+    ]
+
+    assert list_partitions(db) == [
+        ("ads_p20261005", datetime(2026, 10, 5), datetime(2026, 10, 12)),
+        ("ads_p20261012", datetime(2026, 10, 12), datetime(2026, 10, 19)),
+    ]
+
+
+def test_ensure_ad_partitions_continues_after_newest_partition():
+    """Test that partitions are created for all three tables up to the premake horizon."""
+    db = MagicMock()
+    existing = [("ads_p20261005", datetime(2026, 10, 5), datetime(2026, 10, 12))]
+
+    with patch.object(partitions, "list_partitions", return_value=existing), \
+            patch.dict(partitions.AD_PARTITION_CONFIG, {"interval_days": 7, "premake": 2}), \
+            patch.object(partitions, "_create_partition") as create_partition:
+        created = ensure_ad_partitions(db, now=datetime(2026, 10, 16))
+
+    assert created == ["ads_p20261012", "ads_p20261019", "ads_p20261026"]
+    assert [call.args[1] for call in create_partition.call_args_list[:3]] == ["ads", "ad_images", "ad_phones"]
+    assert db.commit.call_count == 3
@@ -0,0 +1,149 @@
+# tests/test_query_plans.py
+
+"""
+EXPLAIN based regression tests for the indexes of common/db/migrations.
+
+The plan tests need a PostgreSQL database created from init.sql, set
+TEST_DATABASE_URL to run them (they are skipped otherwise). Pending migrations
+are applied first. Every query runs with sequential scans disabled, so the
+plan shows which index the planner can use for it even on small tables.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from common.db.migrate import MIGRATIONS_DIR, apply_migrations, migration_files, split_statements
+from common.db.repositories.ad_repository import AdRepository
+from common.db.repositories.subscription_repository import SubscriptionRepository
+from common.db.repositories.user_repository import UserRepository
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="module")
+def plan_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    try:
+        engine.connect().close()
+    except OperationalError as e:
+        engine.dispose()
+        pytest.skip(f"Test database unavailable: {type(e).__name__}")
+    try:
+        # A migration that fails must fail the tests, not skip them
+        apply_migrations(engine)
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def db(plan_engine):
+    session = sessionmaker(bind=plan_engine)()
+    session.execute(text("SET LOCAL enable_seqscan = off"))
+    yield session
+    session.rollback()
+    session.close()
+
+
+def explain(db, run_query):
+    """Run a repository query and return the JSON plan of its first SELECT"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run_query()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[0]
+    return db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()[0]["Plan"]
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def plan_indexes(db, plan):
+    """Names of the indexes scanned anywhere in a plan, indexes of partitions by their parent index"""
+    names = {node["Index Name"] for node in plan_nodes(plan) if "Index Name" in node}
+    parents = dict(db.execute(text(
+        "SELECT c.relname, p.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE c.relkind = 'i'"
+    )).fetchall())
+    return {parents.get(name, name) for name in names}
+
+
+def test_migration_files_are_ordered_and_split():
+    """Test that migrations are found in version order and split into statements without comments."""
+    versions = [version for version, _ in migration_files(MIGRATIONS_DIR)]
+    assert versions == sorted(versions)
+    assert versions[:2] == ["0001_query_indexes", "0002_partition_ads"]
+
+    statements = split_statements("-- comment\nCREATE INDEX a ON t (x);\n\nDROP INDEX b;\n")
+    assert statements == ["CREATE INDEX a ON t (x)", "DROP INDEX b"]
+
+
+def test_find_users_for_ad_uses_filter_indexes(db):
+    """Test that matching users for an ad scans a partial user_filters index."""
+    plan = explain(db, lambda: AdRepository.build_matching_users_query(db, 'apartment', 10012684, 2, 12000).all())
+
+    assert plan_indexes(db, plan) & {'idx_user_filters_city_type_active', 'idx_user_filters_rooms_count_active'}
+
+
+def test_get_active_cities_uses_partial_filter_index(db):
+    """Test that active cities are read from the non-paused (city, property_type) index."""
+    plan = explain(db, lambda: SubscriptionRepository.get_active_cities(db))
+
+    assert 'idx_user_filters_city_type_active' in plan_indexes(db, plan)
+
+
+def test_fetch_ads_for_period_uses_city_type_insert_time_index(db):
+    """Test that the newest matching ads are read in insert_time order from the composite index."""
+    filters = {'city': 'Львів', 'property_type': 'apartment', 'rooms': [1, 2], 'price_min': 8000, 'price_max': 16000}
+    plan = explain(db, lambda: AdRepository.fetch_ads_for_period(db, filters, days=14, limit=3))
+
+    assert 'idx_ads_city_type_insert_time' in plan_indexes(db, plan)
+    assert 'Sort' not in {node["Node Type"] for node in plan_nodes(plan)}
+
+
+def test_get_older_than_uses_insert_time_index(db):
+    """Test that the cleanup query scans the insert_time index."""
+    plan = explain(db, lambda: AdRepository.get_older_than(db, datetime.now() - timedelta(days=30)))
+
+    assert 'idx_ads_insert_time' in plan_indexes(db, plan)
+
+
+def test_expiring_subscriptions_use_subscription_until_index(db):
+    """Test that expiring subscriptions are found through the subscription_until index."""
+    plan = explain(db, lambda: UserRepository.get_users_with_expiring_subscription(db, 3))
+
+    assert 'idx_users_subscription_until' in plan_indexes(db, plan)
+
+
+def test_bulk_create_ads_skips_external_ids_of_other_partitions(db):
+    """Test that an ad scraped again, with a later insert_time or twice in one page, is inserted once."""
+    row = {'external_id': 'test-duplicate-ad', 'property_type': 'apartment', 'price': 10000,
+           'rooms_count': 1, 'city': 10009580}
+
+    first = AdRepository.bulk_create_ads(db, [dict(row, insert_time=datetime.now() - timedelta(days=60))])
+    again = AdRepository.bulk_create_ads(db, [dict(row), dict(row)])
+
+    assert list(first) == ['test-duplicate-ad']
+    assert again == {}
+    assert AdRepository.create_ad(db, dict(row)) is None
+    assert db.execute(text("SELECT count(*) FROM ads WHERE external_id = 'test-duplicate-ad'")).scalar() == 1
@@ -0,0 +1,59 @@
+# tests/test_rate_limiter.py
+
+import asyncio
+from unittest.mock import patch
+
+import redis
+
+from common.messaging import rate_limiter
+from common.messaging.rate_limiter import ACQUIRE_SCRIPT, SendScheduler
+
+LIMITS = {'telegram': {'global_rate': 30, 'global_burst': 30, 'chat_rate': 1, 'chat_burst': 1}}
+
+
+class AsyncFakeRedis:
+    """asyncio client whose scripts answer with queued results"""
+
+    def __init__(self, acquire_results=(), fail=False):
+        self.acquire_results = list(acquire_results)
+        self.fail = fail
+        self.calls = []
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls.append(('acquire' if script == ACQUIRE_SCRIPT else 'penalize', keys))
+            if self.fail:
+                raise redis.ConnectionError("connection lost")
+            return self.acquire_results.pop(0) if script == ACQUIRE_SCRIPT else 1
+        return run
+
+
+def test_acquire_awaits_the_async_scripts_until_a_token_is_granted():
+    """Test that acquire awaits the token bucket script on the asyncio client and sleeps while it says wait."""
+    fake = AsyncFakeRedis(acquire_results=[b"0.02", b"0"])
+    scheduler = SendScheduler(LIMITS)
+
+    async def send():
+        waited = await scheduler.acquire('telegram', '42')
+        await scheduler.penalize('telegram', 1.5)
+        return waited
+
+    with patch.object(rate_limiter, "get_async_redis_client", return_value=fake):
+        waited = asyncio.run(send())
+
+    assert waited == 0.02
+    assert [name for name, _ in fake.calls] == ['acquire', 'acquire', 'penalize']
+    assert fake.calls[0][1] == ['send_rate:telegram', 'send_rate:telegram:42']
+
+
+def test_acquire_fails_open_when_redis_is_unavailable():
+    """Test that sends aren't delayed, and penalties are skipped, when Redis fails."""
+    scheduler = SendScheduler(LIMITS)
+
+    async def send():
+        waited = await scheduler.acquire('telegram', '42')
+        await scheduler.penalize('telegram', 1.5)
+        return waited
+
+    with patch.object(rate_limiter, "get_async_redis_client", return_value=AsyncFakeRedis(fail=True)):
+        assert asyncio.run(send()) == 0
@@ -0,0 +1,113 @@
+# tests/test_s3_cleanup.py
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from common.services.ad_service import AdService
+from common.utils import s3_utils
+from common.utils.s3_utils import _upload_image_to_s3, delete_s3_objects, delete_s3_image_batch
+
+SOURCE_URL = "https://market-images.lunstatic.net/lun-ua/720/720/images/123.webp"
+CDN_CONFIG = {'cloudfront_domain': 'https://cdn', 's3_prefix': 'ads-images/', 's3_bucket': 'bucket'}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def pipeline(self, transaction=False):
+        pipe = MagicMock()
+        pipe.set.side_effect = lambda key, value, ex=None: self.data.__setitem__(key, value)
+        return pipe
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_delete_s3_objects_sends_batches_of_1000_keys():
+    """Test that keys are deleted with DeleteObjects requests of at most 1000 keys and failures are reported."""
+    client = MagicMock()
+    client.delete_objects.side_effect = lambda Bucket, Delete: {
+        'Errors': [{'Key': 'k1500', 'Code': 'AccessDenied'}] if {'Key': 'k1500'} in Delete['Objects'] else []
+    }
+    keys = [f"k{i}" for i in range(2500)]
+
+    with patch.object(s3_utils, "get_s3_client", return_value=client):
+        results = delete_s3_objects(keys, max_workers=2)
+
+    sizes = sorted(len(call.kwargs['Delete']['Objects']) for call in client.delete_objects.call_args_list)
+    assert sizes == [500, 1000, 1000]
+    assert results['k0'] is True
+    assert results['k1500'] is False
+
+
+def test_delete_s3_image_batch_maps_urls_to_keys():
+    """Test that image URLs are deleted by key and URLs outside the bucket are reported as failed."""
+    with patch.dict(s3_utils.AWS_CONFIG, {'cloudfront_domain': 'https://cdn.example.com', 's3_bucket': 'bucket'}), \
+            patch.object(s3_utils, "delete_s3_objects", return_value={'ads-images/a.jpg': True}) as delete:
+        results = delete_s3_image_batch(['https://cdn.example.com/ads-images/a.jpg', 'https://img.olx.ua/b.jpg'])
+
+    assert list(delete.call_args.args[0]) == ['ads-images/a.jpg']
+    assert results == {'https://cdn.example.com/ads-images/a.jpg': True, 'https://img.olx.ua/b.jpg': False}
+
+
+def test_sweep_orphan_images_merges_sorted_listing_with_references():
+    """Test that only unreferenced objects older than the grace period are deleted."""
+    old = datetime.now(timezone.utc) - timedelta(days=3)
+    new = datetime.now(timezone.utc)
+    listing = [
+        ('ads-images/a.jpg', old),
+        ('ads-images/b.jpg', old),
+        ('ads-images/c.jpg', new),
+        ('ads-images/d.jpg', old),
+        ('ads-images/e.jpg', old),
+    ]
+    referenced = (key for key in ['ads-images/a.jpg', 'ads-images/a.jpg', 'ads-images/bb.jpg', 'ads-images/d.jpg'])
+
+    with patch("common.services.ad_service.AdRepository.iter_image_keys", return_value=referenced), \
+            patch.object(s3_utils, "redis_client", FakeRedis()), \
+            patch.object(s3_utils, "iter_s3_objects", return_value=iter(listing)), \
+            patch.object(s3_utils, "delete_s3_objects", side_effect=lambda keys: {key: True for key in keys}) as delete:
+        counts = AdService.sweep_orphan_images(MagicMock())
+
+    assert [key for call in delete.call_args_list for key in call.args[0]] == ['ads-images/b.jpg', 'ads-images/e.jpg']
+    assert counts == {'listed': 5, 'orphans': 2, 'claimed': 0, 'deleted': 2}
+
+
+def test_cleanup_keeps_objects_reused_while_their_last_ad_is_deleted():
+    """Test that an object handed out to a new ad, whose row isn't saved yet, survives both cleanup paths."""
+    redis_client = FakeRedis()
+    key = 'ads-images/abc.webp'
+    # Mirrored for an ad that is now being deleted, three days ago
+    redis_client.data.update({f"s3_image_source:{SOURCE_URL}": key, f"s3_image:{key}": "1"})
+    old = datetime.now(timezone.utc) - timedelta(days=3)
+
+    with patch.dict(s3_utils.AWS_CONFIG, CDN_CONFIG), \
+            patch.object(s3_utils, "redis_client", redis_client), \
+            patch.object(s3_utils, "get_s3_client", return_value=MagicMock()), \
+            patch.object(s3_utils, "delete_s3_objects", side_effect=lambda keys: {k: True for k in keys}) as delete, \
+            patch("common.services.ad_service.AdRepository.get_referenced_image_urls", return_value=set()), \
+            patch("common.services.ad_service.AdRepository.iter_image_keys", side_effect=lambda db, prefix: (k for k in ())), \
+            patch.object(s3_utils, "iter_s3_objects", side_effect=lambda prefix: iter([(key, old)])):
+        # A new ad reuses the object, then the old ad's images are cleaned up before the new row is saved
+        image_url = _upload_image_to_s3(SOURCE_URL, "2")
+        assert image_url == f"https://cdn/{key}"
+
+        assert AdService.delete_unreferenced_images(MagicMock(), [image_url]) == 0
+        counts = AdService.sweep_orphan_images(MagicMock())
+        assert counts == {'listed': 1, 'orphans': 1, 'claimed': 1, 'deleted': 0}
+        assert [k for call in delete.call_args_list for k in call.args[0]] == []
+
+        # Once the claim expired an unreferenced object is deleted again
+        redis_client.delete(f"s3_image_claimed:{key}")
+        assert AdService.delete_unreferenced_images(MagicMock(), [image_url]) == 1
@@ -0,0 +1,114 @@
+# tests/test_s3_images.py
+
+import hashlib
+from unittest.mock import MagicMock, patch
+
+from common.utils import s3_transfer, s3_utils
+from common.utils.s3_transfer import download_to_spool
+from common.utils.s3_utils import _upload_image_to_s3, upload_images_to_s3
+
+SOURCE_URL = "https://market-images.lunstatic.net/lun-ua/720/720/images/123.webp"
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def pipeline(self, transaction=False):
+        pipe = MagicMock()
+        pipe.set.side_effect = lambda key, value, ex=None: self.data.__setitem__(key, value)
+        return pipe
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def streamed_response(content):
+    response = MagicMock(status_code=200)
+    response.iter_content.side_effect = lambda chunk_size: (
+        content[i:i + chunk_size] for i in range(0, len(content), chunk_size)
+    )
+    return response
+
+
+def upload_env(content=b"photo"):
+    client = MagicMock()
+    client.head_object.side_effect = s3_utils.ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+    request = patch.object(s3_transfer, "make_request", side_effect=lambda **kwargs: streamed_response(content))
+    return client, FakeRedis(), request
+
+
+def test_upload_stores_identical_content_once():
+    """Test that two sources with the same content are stored under one content addressed key."""
+    client, redis_client, make_request = upload_env()
+
+    with patch.object(s3_transfer, "get_s3_client", return_value=client), \
+            patch.object(s3_utils, "get_s3_client", return_value=client), \
+            patch.object(s3_utils, "redis_client", redis_client), make_request, patch.dict(s3_utils.AWS_CONFIG, {'cloudfront_domain': 'https://cdn', 's3_prefix': 'ads-images/'}):
+        first = _upload_image_to_s3(SOURCE_URL, "1")
+        second = _upload_image_to_s3(SOURCE_URL.replace("123", "456"), "2")
+
+    assert first == second
+    assert first.startswith("https://cdn/ads-images/") and first.endswith(".webp")
+    assert client.upload_fileobj.call_count == 1
+
+
+def test_upload_skips_download_for_known_source():
+    """Test that a source mirrored before returns its object without downloading it again."""
+    client, redis_client, make_request = upload_env()
+
+    with patch.object(s3_transfer, "get_s3_client", return_value=client), \
+            patch.object(s3_utils, "get_s3_client", return_value=client), \
+            patch.object(s3_utils, "redis_client", redis_client), make_request as request, patch.dict(s3_utils.AWS_CONFIG, {'cloudfront_domain': 'https://cdn', 's3_prefix': 'ads-images/'}):
+        first = _upload_image_to_s3(SOURCE_URL, "1")
+        second = _upload_image_to_s3(SOURCE_URL, "2")
+
+    assert first == second
+    assert request.call_count == 1
+
+
+def test_upload_images_transfers_each_source_once():
+    """Test that images of several ads with the same source URL are uploaded once and all get its URL."""
+    with patch.object(s3_utils, "_upload_image_to_s3", return_value="https://cdn/ads-images/abc.webp") as upload:
+        results = upload_images_to_s3({1: (SOURCE_URL, "a"), 2: (SOURCE_URL, "b")}, max_workers=2)
+
+    assert upload.call_count == 1
+    assert results == {1: "https://cdn/ads-images/abc.webp", 2: "https://cdn/ads-images/abc.webp"}
+
+
+def test_download_to_spool_bounds_memory_and_size():
+    """Test that images are hashed while spooled, spill to disk past the memory bound and are refused when too large."""
+    content = bytes(range(256)) * 64
+    limits = {'spool_max_bytes': 1024, 'read_chunk_bytes': 256, 'max_image_bytes': len(content)}
+
+    with patch.dict(s3_transfer.S3_TRANSFER_CONFIG, limits), \
+            patch.object(s3_transfer, "make_request", return_value=streamed_response(content)):
+        spool, digest, size = download_to_spool(SOURCE_URL)
+
+    with spool:
+        assert spool._rolled
+        assert spool.read() == content
+    assert size == len(content)
+    assert digest == hashlib.sha256(content).hexdigest()
+
+    with patch.dict(s3_transfer.S3_TRANSFER_CONFIG, dict(limits, max_image_bytes=len(content) - 1)), \
+            patch.object(s3_transfer, "make_request", return_value=streamed_response(content)):
+        assert download_to_spool(SOURCE_URL) is None
+
+
+def test_download_to_spool_closes_error_responses():
+    """Test that a streamed error response, falsy like every requests Response >= 400, is closed."""
+    response = MagicMock(status_code=404)
+    response.__bool__.return_value = False
+
+    with patch.object(s3_transfer, "make_request", return_value=response):
+        assert download_to_spool(SOURCE_URL) is None
+
+    response.close.assert_called_once()
@@ -0,0 +1,117 @@
+# tests/test_single_flight.py
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import redis
+
+from common.utils import cache
+from common.utils.cache import async_single_flight, should_refresh_early, single_flight
+
+
+class FakeRedis:
+    """Thread safe stand-in for the lock commands single_flight uses"""
+
+    def __init__(self, fail_exists=False):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.fail_exists = fail_exists
+
+    def set(self, key, value, ex=None, nx=False):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def exists(self, key):
+        if self.fail_exists:
+            raise redis.ConnectionError("connection lost")
+        with self.lock:
+            return int(key in self.data)
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.data.get(key) == token:
+                del self.data[key]
+                return 1
+            return 0
+
+
+@pytest.fixture
+def fast_poll():
+    with patch.object(cache, "SINGLE_FLIGHT_POLL_INTERVAL", 0.01):
+        yield
+
+
+def test_single_flight_computes_once_while_others_wait(fast_poll):
+    """Test that one caller computes a missing value and concurrent callers wait for it."""
+    fake = FakeRedis()
+    stored = {}
+    computations = []
+
+    def compute():
+        computations.append(threading.get_ident())
+        time.sleep(0.2)
+        stored['value'] = 'result'
+        return 'result'
+
+    results = []
+    with patch.object(cache, "redis_client", fake):
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight('key', lambda: stored.get('value'), compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(computations) == 1
+    assert results == ['result'] * 5
+    assert 'lock:key' not in fake.data
+
+
+def test_single_flight_computes_when_redis_fails_while_waiting(fast_poll):
+    """Test that a Redis error while waiting for the lock holder falls back to computing the value."""
+    fake = FakeRedis(fail_exists=True)
+    fake.data['lock:key'] = 'other-token'
+
+    with patch.object(cache, "redis_client", fake):
+        assert single_flight('key', lambda: None, lambda: 'computed') == 'computed'
+
+
+def test_async_single_flight_computes_when_redis_fails_while_waiting(fast_poll):
+    """Test that the async waiter falls back to computing the value on a Redis error."""
+    class AsyncFakeRedis:
+        async def set(self, key, value, ex=None, nx=False):
+            return None
+
+        async def exists(self, key):
+            raise redis.ConnectionError("connection lost")
+
+    async def read():
+        return None
+
+    async def compute():
+        return 'computed'
+
+    with patch.object(cache, "get_async_redis_client", return_value=AsyncFakeRedis()):
+        assert asyncio.run(async_single_flight('key', read, compute)) == 'computed'
+
+
+@pytest.mark.parametrize("ttl_ms,delta,draw,expected", [
+    (0, 1.0, 0.99, False),        # Already expired, a plain miss handles it
+    (-2, 1.0, 0.99, False),       # Missing key
+    (5000, 0.0, 0.99, False),     # Nothing known about the recomputation time
+    (5000, 1.0, 0.0, False),      # Lowest draw never refreshes a live key
+    (5000, 1.0, 0.999999, True),  # Highest draws refresh, -log(1e-6) * 1s exceeds 5s
+    (60000, 0.1, 0.99, False),    # Far from expiry: -log(0.01) * 0.1s is below 60s
+])
+def test_should_refresh_early_boundaries(ttl_ms, delta, draw, expected):
+    """Test that early refresh never fires for expired keys or unknown cost and grows with the draw near expiry."""
+    with patch.object(cache.random, "random", return_value=draw):
+        assert should_refresh_early(ttl_ms, delta) is expected
@@ -2,76 +2,138 @@
 
 import pytest
 import json
-from unittest.mock import patch, MagicMock
-from common.unified_state_management import state_manager as RedisStateManager
+import redis
+from unittest.mock import patch, AsyncMock, MagicMock
+from common.unified_state_management import StateManager as RedisStateManager
+from common.utils import codec
+
+
+@pytest.fixture
+def mock_async_redis():
+    """Mock the asyncio Redis client used by the async StateManager methods"""
+    client = AsyncMock()
+    pipe = MagicMock()
+    pipe.__aenter__.return_value = pipe
+    pipe.execute = AsyncMock(return_value=[])
+    client.pipeline = MagicMock(return_value=pipe)
+    client.pipe = pipe
+    with patch('common.unified_state_management.get_async_redis_client', return_value=client):
+        yield client
 
 
 @pytest.mark.asyncio
-async def test_state_manager_get_state(mock_redis):
+async def test_state_manager_get_state(mock_async_redis):
     """Test that get_state works correctly."""
-    # Mock Redis get
-    mock_redis.get.return_value = json.dumps({"state": "test_state", "data": "test_data"}).encode()
+    # Mock Redis hgetall
+    mock_async_redis.hgetall.return_value = {
+        b"state": codec.encode("test_state"),
+        b"data": codec.encode("test_data")
+    }
 
     state_manager = RedisStateManager(prefix="test")
     state = await state_manager.get_state("test_user")
 
     assert state == {"state": "test_state", "data": "test_data"}
-    mock_redis.get.assert_called_once_with("test:test_user")
+    mock_async_redis.hgetall.assert_awaited_once_with("test:test_user")
 
 
 @pytest.mark.asyncio
-async def test_state_manager_get_state_none(mock_redis):
+async def test_state_manager_get_state_none(mock_async_redis):
     """Test that get_state returns None when no state exists."""
-    # Mock Redis get returning None
-    mock_redis.get.return_value = None
+    # Mock Redis hgetall of a missing key
+    mock_async_redis.hgetall.return_value = {}
 
     state_manager = RedisStateManager(prefix="test")
     state = await state_manager.get_state("test_user")
 
     assert state is None
-    mock_redis.get.assert_called_once_with("test:test_user")
+    mock_async_redis.hgetall.assert_awaited_once_with("test:test_user")
 
 
 @pytest.mark.asyncio
-async def test_state_manager_set_state(mock_redis):
-    """Test that set_state works correctly."""
+async def test_state_manager_get_state_converts_legacy_blob(mock_async_redis):
+    """Test that a state stored as a single JSON blob is converted to a hash."""
+    legacy = {"state": "test_state", "data": "test_data"}
+    mock_async_redis.hgetall.side_effect = [
+        redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value"),
+        _encode(legacy)
+    ]
+    mock_async_redis.pipe.execute.side_effect = [[json.dumps(legacy).encode(), 600], []]
+
+    state_manager = RedisStateManager(prefix="test")
+    state = await state_manager.get_state("test_user")
+
+    assert state == legacy
+    mock_async_redis.pipe.hset.assert_called_once_with("test:test_user", mapping=_encode(legacy))
+    mock_async_redis.pipe.expire.assert_called_once_with("test:test_user", 600)
+
+
+@pytest.mark.asyncio
+async def test_state_manager_set_state(mock_async_redis):
+    """Test that set_state replaces the state hash."""
     state_manager = RedisStateManager(prefix="test")
     await state_manager.set_state("test_user", {"state": "test_state", "data": "test_data"})
 
-    mock_redis.setex.assert_called_once()
-    # Check the key
-    args, _ = mock_redis.setex.call_args
+    pipe = mock_async_redis.pipe
+    pipe.delete.assert_called_once_with("test:test_user")
+    # Check the key and the encoded fields
+    args, kwargs = pipe.hset.call_args
     assert args[0] == "test:test_user"
-    # Check the serialized state
-    assert json.loads(args[2]) == {"state": "test_state", "data": "test_data"}
+    assert {k: codec.decode(v) for k, v in kwargs["mapping"].items()} == {"state": "test_state", "data": "test_data"}
+    pipe.expire.assert_called_once_with("test:test_user", 86400)
 
 
 @pytest.mark.asyncio
-async def test_state_manager_update_state(mock_redis, monkeypatch):
-    """Test that update_state works correctly."""
-    # Mock get_state and set_state
-    get_state_mock = MagicMock(return_value={"state": "old_state", "data": "old_data"})
-    set_state_mock = MagicMock(return_value=True)
+async def test_state_manager_update_state(mock_async_redis, monkeypatch):
+    """Test that update_state writes only the updated fields, without reading the state."""
+    get_state_mock = AsyncMock()
 
     state_manager = RedisStateManager(prefix="test")
     monkeypatch.setattr(state_manager, "get_state", get_state_mock)
-    monkeypatch.setattr(state_manager, "set_state", set_state_mock)
 
-    await state_manager.update_state("test_user", {"state": "new_state"})
+    await state_manager.update_state("test_user", {"state": "new_state"}, ttl=600)
+
+    get_state_mock.assert_not_awaited()
+    pipe = mock_async_redis.pipe
+    pipe.hset.assert_called_once_with("test:test_user", mapping={"state": codec.encode("new_state")})
+    pipe.expire.assert_called_once_with("test:test_user", 600)
+    pipe.execute.assert_awaited_once()
+
 
-    # Verify get_state was called
-    get_state_mock.assert_called_once_with("test_user")
-    # Verify set_state was called with merged state
-    set_state_mock.assert_called_once()
-    args, _ = set_state_mock.call_args
-    assert args[0] == "test_user"
-    assert args[1] == {"state": "new_state", "data": "old_data"}
+@pytest.mark.asyncio
+async def test_state_manager_compare_and_set_state(mock_async_redis):
+    """Test that compare_and_set_state reports a state changed concurrently."""
+    script = AsyncMock(return_value=0)
+    mock_async_redis.register_script = MagicMock(return_value=script)
+
+    state_manager = RedisStateManager(prefix="test")
+    result = await state_manager.compare_and_set_state("test_user", "old_state", {"state": "new_state"})
+
+    assert result is False
+    _, kwargs = script.call_args
+    assert kwargs["keys"] == ["test:test_user"]
+    assert kwargs["args"] == ["state", codec.encode("old_state"), 86400, "state", codec.encode("new_state")]
 
 
 @pytest.mark.asyncio
-async def test_state_manager_clear_state(mock_redis):
+async def test_state_manager_clear_state(mock_async_redis):
     """Test that clear_state works correctly."""
     state_manager = RedisStateManager(prefix="test")
     await state_manager.clear_state("test_user")
 
-    mock_redis.delete.assert_called_once_with("test:test_user")
\ No newline at end of file
+    mock_async_redis.delete.assert_awaited_once_with("test:test_user")
+
+
+def test_state_manager_get_state_sync(mock_redis):
+    """Test that the sync variant keeps using the blocking client."""
+    mock_redis.hgetall.return_value = {b"state": codec.encode("test_state")}
+
+    state_manager = RedisStateManager(prefix="test")
+    state = state_manager.get_state_sync("test_user")
+
+    assert state == {"state": "test_state"}
+    mock_redis.hgetall.assert_called_once_with("test:test_user")
+
+
+def _encode(state):
+    return {field: codec.encode(value) for field, value in state.items()}
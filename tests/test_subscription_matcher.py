@@ -0,0 +1,72 @@
+# tests/test_subscription_matcher.py
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from common.db.operations import SubscriptionMatcher
+from common.db.repositories.user_repository import UserRepository
+
+
+def _row(filter_id, user_id, property_type=None, city=None, rooms=None,
+         price_min=None, price_max=None, days_left=7):
+    return (filter_id, user_id, property_type, city, rooms, price_min, price_max,
+            datetime.now() + timedelta(days=days_left), None)
+
+
+def _matcher(*rows):
+    matcher = SubscriptionMatcher()
+    matcher.load_rows(rows)
+    return matcher
+
+
+def test_matcher_matches_city_property_type_and_wildcards():
+    """Test that NULL city/property_type filters act as wildcards."""
+    matcher = _matcher(
+        _row(1, 1, 'apartment', 10012684),
+        _row(2, 2, None, 10012684),
+        _row(3, 3, 'apartment', None),
+        _row(4, 4),
+        _row(5, 5, 'apartment', 10006463),
+        _row(6, 6, 'house', 10012684),
+    )
+
+    assert sorted(matcher.match('apartment', 10012684, 2, 10000)) == [1, 2, 3, 4]
+
+
+def test_matcher_price_and_rooms():
+    """Test price bounds, room masks and expired users."""
+    matcher = _matcher(
+        _row(1, 1, rooms=[1, 2], price_min=5000, price_max=10000),
+        _row(2, 2, rooms=[3], price_min=5000),
+        _row(3, 3, price_max=7000),
+        _row(4, 4, price_min=11000),
+        _row(5, 5, days_left=-1),
+    )
+
+    assert sorted(matcher.match('apartment', 10012684, 2, 8000)) == [1]
+    assert sorted(matcher.match('apartment', 10012684, 3, 6000)) == [2, 3]
+    # NULL price and rooms only match filters without those restrictions
+    assert matcher.match('apartment', 10012684, None, None) == []
+
+
+def test_matcher_reload_user_replaces_filters():
+    """Test that reloading a user replaces their previous filters."""
+    matcher = _matcher(_row(1, 1, city=10012684), _row(2, 2, city=10012684))
+
+    matcher.load_user_rows([1], [_row(3, 1, city=10006463)])
+
+    assert matcher.match('apartment', 10012684, 1, 5000) == [2]
+    assert matcher.match('apartment', 10006463, 1, 5000) == [1]
+    assert matcher.size == 2
+
+
+def test_subscription_end_date_update_marks_user_changed():
+    """Test that renewing or cancelling through UserRepository reloads the user in the matchers."""
+    user = SimpleNamespace(id=7, subscription_until=datetime.now())
+    with patch.object(UserRepository, "get_by_id", return_value=user), \
+            patch("common.db.repositories.user_repository.UserCacheManager"), \
+            patch("common.db.operations.mark_subscription_changed") as mark_changed:
+        assert UserRepository.update_subscription_end_date(MagicMock(), 7, datetime.now() + timedelta(days=30))
+
+    mark_changed.assert_called_once_with(7)